@@ -0,0 +1,47 @@
+"""
+Measures the start-up cost of the C interface: importing it, and loading
+the MIBs with the defaults of net-snmp, with a few modules or with none.
+Every case runs in a fresh interpreter.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+SETUP = 'import tdsnmp.c.interface; import tdsnmp.mibs as mibs'
+
+CASES = [
+    ('import only', ''),
+    ('default MIBs', 'mibs.load()'),
+    ('SNMPv2-MIB, IF-MIB', "mibs.configure(['SNMPv2-MIB', 'IF-MIB']); mibs.load()"),
+    ('no MIBs', 'mibs.configure([]); mibs.load()'),
+]
+
+
+def best_of(repeat, code):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', code])
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = best_of(args.repeat, 'pass')
+    print('{0:<20} {1:>10}'.format('case', 'ms'))
+    for name, code in CASES:
+        elapsed = best_of(args.repeat, '; '.join(filter(None, [SETUP, code])))
+        print('{0:<20} {1:>10.1f}'.format(name, 1e3 * (elapsed - baseline)))
+
+
+if __name__ == '__main__':
+    main()
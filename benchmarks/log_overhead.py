@@ -0,0 +1,61 @@
+"""
+Measures the per-variable cost of the C interface's logging while walking,
+with the tdsnmp.c.interface logger disabled, at WARNING and at DEBUG (to a
+NullHandler).
+
+Usage:
+    python benchmarks/log_overhead.py [--hostname localhost:11161]
+        [--community public] [--oid .1.3.6.1.2.1] [--repeat 5]
+"""
+import argparse
+import logging
+import time
+
+from tdsnmp import Session
+
+
+def best_of(repeat, func, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(func(*args, **kwargs))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hostname', default='localhost:11161')
+    parser.add_argument('--community', default='public')
+    parser.add_argument('--oid', default='.1.3.6.1.2.1')
+    parser.add_argument('--max-repetitions', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logger = logging.getLogger('tdsnmp.c.interface')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    session = Session(hostname=args.hostname, community=args.community,
+                      version=2)
+
+    settings = [
+        ('disabled', True, logging.DEBUG),
+        ('WARNING', False, logging.WARNING),
+        ('DEBUG', False, logging.DEBUG),
+    ]
+    print('{0:<10} {1:<10} {2:>10} {3:>12}'.format(
+        'logger', 'method', 'variables', 'us/variable'))
+    for name, disabled, level in settings:
+        logger.disabled = disabled
+        logger.setLevel(level)
+        for method, kwargs in [(session.walk, {}),
+                               (session.bulkwalk,
+                                {'max_repetitions': args.max_repetitions})]:
+            count, elapsed = best_of(args.repeat, method, args.oid, **kwargs)
+            print('{0:<10} {1:<10} {2:>10} {3:>12.2f}'.format(
+                name, method.__name__, count, 1e6 * elapsed / max(count, 1)))
+
+
+if __name__ == '__main__':
+    main()
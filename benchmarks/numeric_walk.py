@@ -0,0 +1,54 @@
+"""
+Compares the cost of walking a large subtree with MIB translation (walk,
+bulkwalk) and without it (walk_numeric, bulkwalk_numeric).
+
+Usage:
+    python benchmarks/numeric_walk.py [--hostname localhost:11161]
+        [--community public] [--oid .1.3.6.1.2.1] [--repeat 5]
+"""
+import argparse
+import time
+
+from tdsnmp import Session
+
+
+def best_of(repeat, func, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(func(*args, **kwargs))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hostname', default='localhost:11161')
+    parser.add_argument('--community', default='public')
+    parser.add_argument('--oid', default='.1.3.6.1.2.1')
+    parser.add_argument('--max-repetitions', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    session = Session(hostname=args.hostname, community=args.community,
+                      version=2)
+    cases = [
+        ('walk', session.walk, {}),
+        ('walk_numeric', session.walk_numeric, {}),
+        ('bulkwalk', session.bulkwalk,
+         {'max_repetitions': args.max_repetitions}),
+        ('bulkwalk_numeric', session.bulkwalk_numeric,
+         {'max_repetitions': args.max_repetitions}),
+    ]
+
+    print('{0:<18} {1:>10} {2:>10} {3:>12}'.format(
+        'method', 'variables', 'seconds', 'us/variable'))
+    for name, method, kwargs in cases:
+        count, elapsed = best_of(args.repeat, method, args.oid, **kwargs)
+        print('{0:<18} {1:>10} {2:>10.4f} {3:>12.2f}'.format(
+            name, count, elapsed, 1e6 * elapsed / max(count, 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Measures the latency and throughput of get, get_next, get_bulk, walk,
+bulkwalk and set_multiple against the synthetic agent of responder.py,
+started in this process on loopback, and prints the results as JSON so that
+runs can be compared.
+
+Usage:
+    python benchmarks/operations.py [--rows 1000] [--value-size 1024]
+        [--iterations 1000] [--walk-iterations 3] [--max-repetitions 50]
+        [--only get,walk] [--format json|table] [--hostname host:port]
+
+With --hostname the benchmarks run against an agent started separately
+(e.g. python benchmarks/responder.py) instead.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+from responder import BLOB_ENTRY, IF_ENTRY, SYSTEM, Responder
+
+from tdsnmp import Session
+
+
+def oid(*subids):
+    return '.' + '.'.join(map(str, subids))
+
+
+def cases(session, args):
+    """
+    Returns:
+        list: (name, iterations, callable) of each benchmark.
+    """
+    if_descr = [oid(*IF_ENTRY, 2, row) for row in range(1, min(args.rows, 50) + 1)]
+    blobs = [oid(*BLOB_ENTRY, 2, row) for row in range(1, min(args.blobs, 10) + 1)]
+    if_table = oid(*IF_ENTRY[:-1])
+    settings = [
+        (oid(*SYSTEM, 4, 0), 'benchmarks', 's'),
+        (oid(*SYSTEM, 5, 0), 'localhost', 's'),
+        (oid(*SYSTEM, 6, 0), 'loopback', 's'),
+    ]
+    return [
+        ('get', args.iterations, lambda: session.get(oid(*SYSTEM, 1, 0))),
+        ('get_{0}'.format(len(if_descr)), args.iterations,
+         lambda: session.get(if_descr)),
+        ('get_large_values', args.iterations, lambda: session.get(blobs)),
+        ('get_next', args.iterations,
+         lambda: session.get_next(oid(*SYSTEM, 1, 0))),
+        ('get_bulk', args.iterations,
+         lambda: session.get_bulk(if_table,
+                                  max_repetitions=args.max_repetitions)),
+        ('walk', args.walk_iterations, lambda: session.walk(if_table)),
+        ('bulkwalk', args.walk_iterations,
+         lambda: session.bulkwalk(if_table,
+                                  max_repetitions=args.max_repetitions)),
+        ('set_multiple', args.iterations,
+         lambda: session.set_multiple(settings)),
+    ]
+
+
+def measure(func, iterations, responder):
+    """
+    Returns:
+        dict: The statistics of calling func iterations times.
+    """
+    func()  # warm up the OID caches and the agent
+    requests = responder.requests if responder else None
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+
+    variables = len(result) if isinstance(result, list) else 1
+    total = sum(timings)
+    timings.sort()
+    stats = {
+        'iterations': iterations,
+        'variables': variables,
+        'seconds': total,
+        'min_us': 1e6 * timings[0],
+        'median_us': 1e6 * statistics.median(timings),
+        'p99_us': 1e6 * timings[min(len(timings) - 1, int(0.99 * len(timings)))],
+        'calls_per_s': iterations / total,
+        'variables_per_s': iterations * variables / total,
+    }
+    if responder:
+        stats['requests'] = (responder.requests - requests) / iterations
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hostname', help='use this agent instead')
+    parser.add_argument('--community', default='public')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--blobs', type=int, default=100)
+    parser.add_argument('--value-size', type=int, default=1024)
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--walk-iterations', type=int, default=3)
+    parser.add_argument('--max-repetitions', type=int, default=50)
+    parser.add_argument('--only', help='comma-separated benchmark names')
+    parser.add_argument('--format', choices=('json', 'table'), default='json')
+    args = parser.parse_args()
+
+    responder = None
+    hostname = args.hostname
+    if hostname is None:
+        responder = Responder(rows=args.rows, blobs=args.blobs,
+                              value_size=args.value_size).start()
+        hostname = '{0}:{1}'.format(*responder.address)
+
+    session = Session(hostname=hostname, community=args.community,
+                      version=2, timeout=5, retries=0)
+    only = set(args.only.split(',')) if args.only else None
+    results = []
+    try:
+        for name, iterations, func in cases(session, args):
+            if only is None or name in only:
+                results.append(dict(name=name, **measure(func, iterations, responder)))
+    finally:
+        if responder:
+            responder.close()
+
+    if args.format == 'table':
+        print('{0:<18} {1:>9} {2:>11} {3:>11} {4:>12}'.format(
+            'benchmark', 'variables', 'median us', 'p99 us', 'variables/s'))
+        for result in results:
+            print('{name:<18} {variables:>9} {median_us:>11.1f} '
+                  '{p99_us:>11.1f} {variables_per_s:>12.0f}'.format(**result))
+        return
+
+    json.dump({
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'agent': 'external' if args.hostname else 'responder',
+        'rows': args.rows,
+        'value_size': args.value_size,
+        'max_repetitions': args.max_repetitions,
+        'results': results,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
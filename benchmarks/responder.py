@@ -0,0 +1,420 @@
+"""
+A minimal SNMP v1/v2c agent serving synthetic MIB data over UDP, so that
+the benchmarks can run on loopback without snmpd. It answers GET, GETNEXT,
+GETBULK and SET requests for any community from:
+
+    the system group (1.3.6.1.2.1.1), with a writable sysContact, sysName
+    and sysLocation
+    ifNumber (1.3.6.1.2.1.2.1.0) and an ifTable (1.3.6.1.2.1.2.2) of
+    --rows rows
+    the HC counters of the ifXTable (1.3.6.1.2.1.31.1.1.1.6 and .10)
+    a table of --blobs OCTET STRING values of --value-size bytes
+    (1.3.6.1.4.1.99999.1.1)
+
+Rows are generated on demand, so large tables cost no memory. The agent can
+also run on its own, e.g. to keep it off the benchmark's interpreter:
+
+Usage:
+    python benchmarks/responder.py [--port 11162] [--rows 100000]
+        [--blobs 100] [--value-size 4096]
+"""
+import argparse
+import bisect
+import socket
+import threading
+
+# ASN.1/BER tags
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_ID = 0x06
+SEQUENCE = 0x30
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+COUNTER64 = 0x46
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+GET = 0xA0
+GET_NEXT = 0xA1
+RESPONSE = 0xA2
+SET = 0xA3
+GET_BULK = 0xA5
+
+NO_SUCH_NAME = 2
+NOT_WRITABLE = 17
+
+# Responses are cut short, as agents do, to fit in a UDP datagram
+MAX_RESPONSE_SIZE = 65000
+
+SYSTEM = (1, 3, 6, 1, 2, 1, 1)
+IF_NUMBER = (1, 3, 6, 1, 2, 1, 2, 1, 0)
+IF_ENTRY = (1, 3, 6, 1, 2, 1, 2, 2, 1)
+IFX_ENTRY = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1)
+BLOB_ENTRY = (1, 3, 6, 1, 4, 1, 99999, 1, 1)
+
+
+def encode_length(length):
+    if length < 0x80:
+        return bytes((length,))
+    octets = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes((0x80 | len(octets),)) + octets
+
+
+def encode(tag, content):
+    return bytes((tag,)) + encode_length(len(content)) + content
+
+
+def encode_integer(value):
+    return value.to_bytes(value.bit_length() // 8 + 1, 'big', signed=True)
+
+
+def encode_unsigned(value):
+    # A leading zero octet keeps values with the top bit set positive
+    return value.to_bytes(value.bit_length() // 8 + 1, 'big')
+
+
+def encode_oid(oid):
+    content = bytearray((40 * oid[0] + oid[1],))
+    for subid in oid[2:]:
+        chunk = [subid & 0x7F]
+        subid >>= 7
+        while subid:
+            chunk.append(0x80 | (subid & 0x7F))
+            subid >>= 7
+        content.extend(reversed(chunk))
+    return bytes(content)
+
+
+def decode(data, offset):
+    """
+    Returns:
+        tuple: The tag, the content and the offset of the next element of
+               the TLV at offset.
+    """
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(data[offset:offset + size], 'big')
+        offset += size
+    return tag, data[offset:offset + length], offset + length
+
+
+def decode_oid(content):
+    first = content[0]
+    oid = [first // 40, first % 40]
+    subid = 0
+    for octet in content[1:]:
+        subid = (subid << 7) | (octet & 0x7F)
+        if not octet & 0x80:
+            oid.append(subid)
+            subid = 0
+    return tuple(oid)
+
+
+class Scalars:
+    """
+    A fixed set of objects, which SET requests may change.
+    """
+
+    def __init__(self, values):
+        self.values = dict(values)
+        self.oids = sorted(self.values)
+
+    def get(self, oid):
+        return self.values.get(oid)
+
+    def next(self, oid):
+        position = bisect.bisect_right(self.oids, oid)
+        if position < len(self.oids):
+            found = self.oids[position]
+            return found, self.values[found]
+        return None
+
+    def set(self, oid, value):
+        if oid not in self.values:
+            return False
+        self.values[oid] = value
+        return True
+
+
+class Table:
+    """
+    A conceptual table indexed by 1..rows whose cells are computed by the
+    functions of its columns, which take the row index and return an
+    encoded (tag, content) value.
+    """
+
+    def __init__(self, entry, rows, columns):
+        self.entry = entry
+        self.rows = rows
+        self.columns = sorted(columns.items())
+
+    def get(self, oid):
+        if len(oid) != len(self.entry) + 2 or oid[:len(self.entry)] != self.entry:
+            return None
+        column, row = oid[len(self.entry):]
+        if 1 <= row <= self.rows:
+            for number, cell in self.columns:
+                if number == column:
+                    return cell(row)
+        return None
+
+    def next(self, oid):
+        if not self.rows:
+            return None
+        prefix = oid[:len(self.entry)]
+        if prefix < self.entry:
+            start = (0,)
+        elif prefix > self.entry:
+            return None
+        else:
+            start = oid[len(self.entry):] or (0,)
+
+        for number, cell in self.columns:
+            if number < start[0]:
+                continue
+            row = 1
+            if number == start[0] and len(start) > 1:
+                row = max(start[1] + 1, 1)
+            if row <= self.rows:
+                return self.entry + (number, row), cell(row)
+        return None
+
+
+def build_mib(rows, blobs, value_size):
+    """
+    Returns:
+        list: The regions of the MIB, in OID order.
+    """
+    def octets(text):
+        return OCTET_STRING, text.encode()
+
+    def integer(value):
+        return INTEGER, encode_integer(value)
+
+    def unsigned(tag):
+        return lambda value: (tag, encode_unsigned(value & 0xFFFFFFFF))
+
+    counter32 = unsigned(COUNTER32)
+    gauge32 = unsigned(GAUGE32)
+    blob = bytes(index % 256 for index in range(value_size))
+
+    system = Scalars({
+        SYSTEM + (1, 0): octets('tdsnmp benchmark responder'),
+        SYSTEM + (2, 0): (OBJECT_ID, encode_oid((1, 3, 6, 1, 4, 1, 99999))),
+        SYSTEM + (3, 0): (TIMETICKS, encode_unsigned(123456)),
+        SYSTEM + (4, 0): octets('benchmarks'),
+        SYSTEM + (5, 0): octets('localhost'),
+        SYSTEM + (6, 0): octets('loopback'),
+        SYSTEM + (7, 0): integer(72),
+        IF_NUMBER: integer(rows),
+    })
+    if_table = Table(IF_ENTRY, rows, {
+        1: integer,
+        2: lambda row: octets('eth{0}'.format(row)),
+        3: lambda row: integer(6),
+        4: lambda row: integer(1500),
+        5: lambda row: gauge32(1000000000),
+        6: lambda row: (OCTET_STRING, b'\x00\x1b' + row.to_bytes(4, 'big')),
+        7: lambda row: integer(1),
+        8: lambda row: integer(1 if row % 10 else 2),
+        10: lambda row: counter32(row * 7919),
+        11: lambda row: counter32(row * 104729),
+        16: lambda row: counter32(row * 15485863),
+        17: lambda row: counter32(row * 32452843),
+    })
+    ifx_table = Table(IFX_ENTRY, rows, {
+        6: lambda row: (COUNTER64, encode_unsigned(row * 2 ** 33 + 7)),
+        10: lambda row: (COUNTER64, encode_unsigned(row * 2 ** 34 + 11)),
+    })
+    blob_table = Table(BLOB_ENTRY, blobs, {
+        2: lambda row: (OCTET_STRING, blob),
+    })
+    return [system, if_table, ifx_table, blob_table]
+
+
+class Responder:
+    """
+    Serves the MIB built by build_mib on a UDP socket from a daemon thread.
+
+    Args:
+        host (str): The address to listen on
+        port (int): The port, 0 to pick a free one (see address)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, rows=1000, blobs=100,
+                 value_size=1024):
+        self.regions = build_mib(rows, blobs, value_size)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.address = self.socket.getsockname()
+        self.requests = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def serve_forever(self):
+        while True:
+            try:
+                request, peer = self.socket.recvfrom(65535)
+            except OSError:
+                return
+            try:
+                response = self.respond(request)
+            except (IndexError, ValueError):
+                continue
+            self.requests += 1
+            try:
+                self.socket.sendto(response, peer)
+            except OSError:
+                return
+
+    def get(self, oid):
+        for region in self.regions:
+            value = region.get(oid)
+            if value is not None:
+                return value
+        return None
+
+    def next(self, oid):
+        for region in self.regions:
+            found = region.next(oid)
+            if found is not None:
+                return found
+        return None
+
+    def set(self, oid, value):
+        return any(region.set(oid, value) for region in self.regions
+                   if isinstance(region, Scalars))
+
+    def respond(self, request):
+        _, message, _ = decode(request, 0)
+        _, version, offset = decode(message, 0)
+        _, community, offset = decode(message, offset)
+        command, pdu, _ = decode(message, offset)
+
+        _, request_id, offset = decode(pdu, 0)
+        _, field1, offset = decode(pdu, offset)
+        _, field2, offset = decode(pdu, offset)
+        _, varbind_list, _ = decode(pdu, offset)
+
+        names = []
+        values = []
+        offset = 0
+        while offset < len(varbind_list):
+            _, varbind, offset = decode(varbind_list, offset)
+            _, name, value_offset = decode(varbind, 0)
+            tag, content, _ = decode(varbind, value_offset)
+            names.append(decode_oid(name))
+            values.append((tag, content))
+
+        v1 = version == b'\x00'
+        error_status = error_index = 0
+        results = []
+        if command == GET:
+            for position, oid in enumerate(names):
+                value = self.get(oid)
+                if value is None:
+                    if v1:
+                        error_status, error_index = NO_SUCH_NAME, position + 1
+                        break
+                    value = (NO_SUCH_OBJECT, b'')
+                results.append((oid, value))
+        elif command == GET_NEXT:
+            for position, oid in enumerate(names):
+                found = self.next(oid)
+                if found is None:
+                    if v1:
+                        error_status, error_index = NO_SUCH_NAME, position + 1
+                        break
+                    found = (oid, (END_OF_MIB_VIEW, b''))
+                results.append(found)
+        elif command == GET_BULK:
+            non_repeaters = int.from_bytes(field1, 'big', signed=True)
+            max_repetitions = int.from_bytes(field2, 'big', signed=True)
+            non_repeaters = min(max(non_repeaters, 0), len(names))
+            for oid in names[:non_repeaters]:
+                results.append(self.next(oid) or (oid, (END_OF_MIB_VIEW, b'')))
+            cursors = names[non_repeaters:]
+            for _ in range(max(max_repetitions, 0) if cursors else 0):
+                row = []
+                for oid in cursors:
+                    row.append(self.next(oid) or (oid, (END_OF_MIB_VIEW, b'')))
+                results.extend(row)
+                cursors = [name for name, _ in row]
+                if all(value[0] == END_OF_MIB_VIEW for _, value in row):
+                    break
+        elif command == SET:
+            for position, (oid, value) in enumerate(zip(names, values)):
+                if not self.set(oid, value):
+                    error_status = NO_SUCH_NAME if v1 else NOT_WRITABLE
+                    error_index = position + 1
+                    break
+            results = list(zip(names, values))
+        else:
+            raise ValueError('unsupported PDU type {0:#x}'.format(command))
+
+        if error_status:
+            results = list(zip(names, values))
+        return self.encode_response(version, community, request_id,
+                                    error_status, error_index, results)
+
+    @staticmethod
+    def encode_response(version, community, request_id, error_status,
+                        error_index, results):
+        header = (encode(INTEGER, version) + encode(OCTET_STRING, community))
+        varbinds = bytearray()
+        # 64 bytes cover the header of the PDU and of the message
+        budget = MAX_RESPONSE_SIZE - len(header) - 64
+        for oid, (tag, content) in results:
+            varbind = encode(SEQUENCE, encode(OBJECT_ID, encode_oid(oid)) +
+                             encode(tag, content))
+            if len(varbinds) + len(varbind) > budget and varbinds:
+                break
+            varbinds += varbind
+
+        pdu = (encode(INTEGER, request_id) +
+               encode(INTEGER, encode_integer(error_status)) +
+               encode(INTEGER, encode_integer(error_index)) +
+               encode(SEQUENCE, bytes(varbinds)))
+        return encode(SEQUENCE, header + encode(RESPONSE, pdu))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11162)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--blobs', type=int, default=100)
+    parser.add_argument('--value-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    responder = Responder(args.host, args.port, args.rows, args.blobs,
+                          args.value_size)
+    print('serving on {0}:{1}'.format(*responder.address))
+    try:
+        responder.serve_forever()
+    except KeyboardInterrupt:
+        responder.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 from .session.base import Session  # noqa
+from .session.aio import AsyncSession  # noqa
+from .session.engine_cache import EngineCache  # noqa
+from .pool import SessionPool, set_default_pool  # noqa
+from .recording import Recording  # noqa
 
 from .simple import (  # noqa
     snmp_get, snmp_set, snmp_set_multiple, snmp_get_next, snmp_get_bulk,
-    snmp_walk, snmp_bulkwalk
+    snmp_walk, snmp_bulkwalk, snmp_iter_walk, snmp_iter_bulkwalk,
+    snmp_get_table
 )
 
 from .exceptions import (  # noqa
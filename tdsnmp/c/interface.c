@@ -24,6 +24,7 @@
 #include <net-snmp/net-snmp-config.h>
 #include <net-snmp/net-snmp-includes.h>
 #include <net-snmp/snmpv3_api.h>
+#include <net-snmp/library/large_fd_set.h>
 #include <sys/types.h>
 #include <arpa/inet.h>
 #include <errno.h>
@@ -71,6 +72,8 @@
 #define MAX_INVALID_OIDS  (MAX_VALUE_SIZE / MIN_OID_LEN)
 #define ENG_ID_BUF_SIZE   (32)
 
+#define DEFAULT_OID_CACHE_SIZE (4096)
+
 #define NO_RETRY_NOSUCH (0)
 
 #define USE_NUMERIC_OIDS (0x08)
@@ -90,6 +93,54 @@
     while (0)
 
 typedef netsnmp_session SnmpSession;
+
+/*
+ * Counters of the requests sent on a session, blocking or asynchronous,
+ * returned to Python by netsnmp_session_stats(). The bytes are those of the
+ * BER-encoded variable bindings, without the message and PDU headers.
+ */
+struct session_stats
+{
+    unsigned long long requests;
+    unsigned long long responses;
+    /* resent by net-snmp before timing out, or by retry_no_such */
+    unsigned long long retries;
+    unsigned long long timeouts;
+    unsigned long long varbinds;
+    unsigned long long bytes_out;
+    unsigned long long bytes_in;
+};
+
+/* The phases the time of an operation is broken down into */
+#define TIMING_WAIT    (0) /* waiting for the agent's responses */
+#define TIMING_FORMAT  (1) /* formatting names and values with the MIB */
+#define TIMING_OBJECTS (2) /* building the Python variables */
+#define TIMING_PHASES  (3)
+
+/* Seconds spent by the last operation of a session, by phase */
+struct session_timing
+{
+    double started;
+    double total;
+    double phases[TIMING_PHASES];
+};
+
+/*
+ * A response (or failure) handed to __async_callback() by net-snmp for a
+ * request sent with netsnmp_async_send(). Responses are queued on the
+ * session context until netsnmp_async_poll() returns them to Python.
+ */
+struct async_response
+{
+    int reqid;
+    int status;
+    /* SNMPv3 report type when status is STAT_ERROR */
+    int report_type;
+    /* cloned response PDU, NULL unless status is STAT_SUCCESS */
+    netsnmp_pdu *pdu;
+    struct async_response *next;
+};
+
 /*
  * This structure is attached to the tdsnmp.session.base.Session
  * object as a Python Capsule (or CObject).
@@ -124,15 +175,24 @@ struct session_capsule_ctx
      */
     unsigned char invalid_oids_buf[MAX_INVALID_OIDS / CHAR_BIT];
     bitarray *invalid_oids;
+    /* responses to asynchronous requests waiting for netsnmp_async_poll() */
+    struct async_response *async_head;
+    struct async_response *async_tail;
+    struct session_stats stats;
+    struct session_timing timing;
+    /* the operation this one runs within on the same thread, if any */
+    struct session_capsule_ctx *outer;
 };
 static PyObject *create_session_capsule(SnmpSession *ss);
 static void *get_session_handle_from_capsule(PyObject *session_capsule);
+static void free_async_responses(struct session_capsule_ctx *ctx);
 #ifdef USE_DEPRECATED_COBJECT_API
     static void delete_session_capsule(void *session_ptr);
 #else
     static void delete_session_capsule(PyObject *session_capsule);
 #endif
 
+static void __mibs_init(void);
 static int __is_numeric_oid(char *oidstr);
 static int __is_leaf(struct tree *tp);
 static int __translate_appl_type(char *typestr);
@@ -147,13 +207,30 @@ static int __get_label_iid(char *name, char **last_label, char **iid,
                            int flag);
 static struct tree *__tag2oid(char *tag, char *iid, oid *oid_arr,
                               int *oid_arr_len, int *type, int best_guess);
+static struct tree *__tag2oid_cached(char *tag, char *iid, oid *oid_arr,
+                                     int *oid_arr_len, int *type,
+                                     int best_guess);
 static int __concat_oid_str(oid *doid_arr, int *doid_arr_len, char *soid_str);
 static int __add_var_val_str(netsnmp_pdu *pdu, oid *name, int name_length,
                              char *val, int len, int type);
+static void __py_netsnmp_session_flags(PyObject *session, int *getlabel_flag,
+                                       int *sprintval_flag);
+static int py_netsnmp_fill_varbind(PyObject *varbind,
+                                   netsnmp_variable_list *vars,
+                                   int getlabel_flag, int sprintval_flag,
+                                   u_char *str_buf, size_t str_buf_size);
+static PyObject *py_netsnmp_build_varbind(netsnmp_variable_list *vars,
+                                          int getlabel_flag,
+                                          int sprintval_flag,
+                                          u_char *str_buf,
+                                          size_t str_buf_size);
+static int __py_netsnmp_walk_varlist(PyObject *session, int command,
+                                     int nonrepeaters, int maxrepetitions,
+                                     PyObject *varlist);
 
 static void py_log_msg(int log_level, char *printf_fmt, ...);
 
-enum { INFO, WARNING, ERROR, DEBUG, EXCEPTION };
+enum { INFO, WARNING, ERROR, DEBUG, EXCEPTION, LOG_LEVEL_COUNT };
 
 static PyObject *tdsnmp_import = NULL;
 static PyObject *tdsnmp_exceptions_import = NULL;
@@ -161,6 +238,17 @@ static PyObject *tdsnmp_compat_import = NULL;
 static PyObject *logging_import = NULL;
 
 static PyObject *PyLogger = NULL;
+
+/*
+ * The lowest logging level py_log_msg() passes on to PyLogger, read with
+ * the public logging API (Logger.getEffectiveLevel() and the level set by
+ * logging.disable()) the first time a message is logged during an
+ * operation: the per-variable messages of a walk only cost a comparison,
+ * and a configuration change is noticed by the next operation.
+ */
+#define LOG_THRESHOLD_UNKNOWN (-1)
+static long py_log_threshold = LOG_THRESHOLD_UNKNOWN;
+static PyObject *LogDisabledName = NULL;
 static PyObject *TDSNMPException = NULL;
 static PyObject *TDSNMPConnectionError = NULL;
 static PyObject *TDSNMPTimeoutError = NULL;
@@ -169,6 +257,71 @@ static PyObject *TDSNMPUnknownObjectIDError = NULL;
 static PyObject *TDSNMPNoSuchObjectError = NULL;
 static PyObject *TDSNMPUndeterminedTypeError = NULL;
 
+/* the session_capsule_ctx of the operation running on each thread */
+static Py_tss_t current_operation = Py_tss_NEEDS_INIT;
+
+/*
+ * A translation of a symbolic tag (without its index) into an OID, kept in
+ * the OID cache.
+ */
+struct oid_cache_entry
+{
+    char *tag;
+    int best_guess;
+    unsigned long hash;
+    oid *name;
+    int name_len;
+    int type;
+    struct tree *tp;
+    struct oid_cache_entry *bucket_next;
+    struct oid_cache_entry *lru_prev;
+    struct oid_cache_entry *lru_next;
+};
+
+/*
+ * Bounded LRU cache of tag translations, so that the MIB tree is not
+ * searched again for the names requested over and over. It is only used
+ * with the GIL held.
+ */
+struct oid_cache
+{
+    struct oid_cache_entry **buckets;
+    size_t bucket_count; /* a power of two */
+    size_t size;
+    size_t max_size;
+    unsigned long long hits;
+    unsigned long long misses;
+    struct oid_cache_entry *lru_head; /* most recently used */
+    struct oid_cache_entry *lru_tail;
+};
+
+static struct oid_cache oid_cache = {
+    NULL, 0, 0, DEFAULT_OID_CACHE_SIZE, 0, 0, NULL, NULL
+};
+
+/* tdsnmp.utils.variables.SNMPVariable and the names of its slots */
+static PyObject *SNMPVariableType = NULL;
+/* tdsnmp.utils.variables.NumericVariable */
+static PyObject *NumericVariableType = NULL;
+enum { VARBIND_OID, VARBIND_OID_INDEX, VARBIND_SNMP_TYPE, VARBIND_VALUE,
+       VARBIND_ATTR_COUNT };
+static PyObject *VarbindAttrNames[VARBIND_ATTR_COUNT];
+
+/*
+ * The MIB modules (colon separated, "" for none) and directories to load,
+ * NULL for the defaults of the library (MIBS, MIBDIRS and snmp.conf).
+ */
+static char *mib_modules = NULL;
+static char *mib_directories = NULL;
+static int mibs_loaded = 0;
+
+/* A saved value of the MIBS environment variable */
+struct mibs_env
+{
+    int changed;
+    char *value;
+};
+
 /*
  * Ripped wholesale from library/tools.h from Net-SNMP 5.7.3
  * to remain compatible with versions 5.7.2 and earlier.
@@ -188,9 +341,48 @@ static void *compat_netsnmp_memdup(const void *from, size_t size)
     return to;
 }
 
+/*
+ * Point the MIBS environment variable, which init_mib() reads, at modules
+ * (left alone when NULL) and remember its previous value in saved.
+ */
+static void __set_mibs_env(const char *modules, struct mibs_env *saved)
+{
+    const char *current = getenv("MIBS");
+
+    saved->changed = (modules != NULL);
+    saved->value = NULL;
+    if (!modules)
+    {
+        return;
+    }
+    if (current)
+    {
+        saved->value = strdup(current);
+    }
+    setenv("MIBS", modules, 1);
+}
+
+static void __restore_mibs_env(struct mibs_env *saved)
+{
+    if (!saved->changed)
+    {
+        return;
+    }
+    if (saved->value)
+    {
+        setenv("MIBS", saved->value, 1);
+        free(saved->value);
+    }
+    else
+    {
+        unsetenv("MIBS");
+    }
+}
+
 void __libraries_init(char *appname)
 {
     static int have_inited = 0;
+    struct mibs_env saved;
 
     if (have_inited)
     {
@@ -203,7 +395,10 @@ void __libraries_init(char *appname)
     /* completely disable logging otherwise it will default to stderr */
     netsnmp_register_loghandler(NETSNMP_LOGHANDLER_NONE, 0);
 
+    /* MIBs are only parsed once they are needed, see __mibs_init() */
+    __set_mibs_env("", &saved);
     init_snmp(appname);
+    __restore_mibs_env(&saved);
 
     netsnmp_ds_set_boolean(NETSNMP_DS_LIBRARY_ID,
                            NETSNMP_DS_LIB_DONT_BREAKDOWN_OIDS, 1);
@@ -213,6 +408,36 @@ void __libraries_init(char *appname)
                        NETSNMP_OID_OUTPUT_SUFFIX);
 }
 
+/*
+ * Parse the configured MIB modules, unless done already. This is deferred
+ * until a name or a value has to be translated through the MIB, so that
+ * importing the module and numeric-only use stay cheap.
+ */
+static void __mibs_init(void)
+{
+    struct mibs_env saved;
+
+    if (mibs_loaded)
+    {
+        return;
+    }
+    mibs_loaded = 1;
+
+    __libraries_init("python");
+
+    if (mib_directories)
+    {
+        netsnmp_set_mib_directory(mib_directories);
+    }
+    __set_mibs_env(mib_modules, &saved);
+    shutdown_mib();
+    init_mib();
+    __restore_mibs_env(&saved);
+
+    py_log_msg(DEBUG, "loaded the MIB modules %s",
+               (mib_modules ? mib_modules : "<default>"));
+}
+
 static int __is_numeric_oid(char *oidstr)
 {
     if (!oidstr)
@@ -401,6 +626,10 @@ static int __translate_asn_type(int type)
 #define USE_BASIC        (0)
 #define USE_ENUMS        (1)
 #define USE_SPRINT_VALUE (2)
+#define USE_TYPED_VALUES (3)
+/* or'ed into the above: OCTET STRING values are returned as bytes */
+#define RAW_OCTET_STRINGS (0x10)
+#define VALUE_FORMAT(flag) ((flag) & 0x0f)
 static int __snprint_value(char *buf, size_t buf_len,
                            netsnmp_variable_list *var,
                            struct tree *tp, int type, int flag)
@@ -802,6 +1031,8 @@ static struct tree *__tag2oid(char *tag, char *iid, oid *oid_arr,
     oid newname[MAX_OID_LEN], *op;
     size_t newname_len = 0;
 
+    __mibs_init();
+
     if (type)
     {
         *type = TYPE_UNKNOWN;
@@ -984,6 +1215,230 @@ static int __concat_oid_str(oid *doid_arr, int *doid_arr_len, char *soid_str)
     return SUCCESS;
 }
 
+static unsigned long __oid_cache_hash(const char *tag, int best_guess)
+{
+    unsigned long hash = 5381 + best_guess;
+
+    for (; *tag; tag++)
+    {
+        hash = hash * 33 + (unsigned char) *tag;
+    }
+    return hash;
+}
+
+/* Remove an entry from its bucket and from the LRU list and free it */
+static void __oid_cache_remove(struct oid_cache_entry *entry)
+{
+    struct oid_cache_entry **link;
+
+    link = &oid_cache.buckets[entry->hash & (oid_cache.bucket_count - 1)];
+    while (*link != entry)
+    {
+        link = &(*link)->bucket_next;
+    }
+    *link = entry->bucket_next;
+
+    if (entry->lru_prev)
+    {
+        entry->lru_prev->lru_next = entry->lru_next;
+    }
+    else
+    {
+        oid_cache.lru_head = entry->lru_next;
+    }
+    if (entry->lru_next)
+    {
+        entry->lru_next->lru_prev = entry->lru_prev;
+    }
+    else
+    {
+        oid_cache.lru_tail = entry->lru_prev;
+    }
+
+    oid_cache.size--;
+    free(entry->tag);
+    free(entry->name);
+    free(entry);
+}
+
+static void __oid_cache_clear(void)
+{
+    while (oid_cache.lru_tail)
+    {
+        __oid_cache_remove(oid_cache.lru_tail);
+    }
+    free(oid_cache.buckets);
+    oid_cache.buckets = NULL;
+    oid_cache.bucket_count = 0;
+    oid_cache.hits = 0;
+    oid_cache.misses = 0;
+}
+
+/* Look a tag up, making it the most recently used entry when found */
+static struct oid_cache_entry *__oid_cache_lookup(char *tag, int best_guess)
+{
+    struct oid_cache_entry *entry;
+    unsigned long hash;
+
+    if (!oid_cache.buckets)
+    {
+        return NULL;
+    }
+
+    hash = __oid_cache_hash(tag, best_guess);
+    for (entry = oid_cache.buckets[hash & (oid_cache.bucket_count - 1)];
+         entry; entry = entry->bucket_next)
+    {
+        if (entry->hash == hash && entry->best_guess == best_guess &&
+            !strcmp(entry->tag, tag))
+        {
+            break;
+        }
+    }
+
+    if (entry && entry != oid_cache.lru_head)
+    {
+        entry->lru_prev->lru_next = entry->lru_next;
+        if (entry->lru_next)
+        {
+            entry->lru_next->lru_prev = entry->lru_prev;
+        }
+        else
+        {
+            oid_cache.lru_tail = entry->lru_prev;
+        }
+        entry->lru_prev = NULL;
+        entry->lru_next = oid_cache.lru_head;
+        oid_cache.lru_head->lru_prev = entry;
+        oid_cache.lru_head = entry;
+    }
+    return entry;
+}
+
+/* Remember a translation, evicting the least recently used one if full */
+static void __oid_cache_store(char *tag, int best_guess, oid *name,
+                              int name_len, int type, struct tree *tp)
+{
+    struct oid_cache_entry *entry;
+    size_t bucket;
+
+    if (oid_cache.max_size == 0)
+    {
+        return;
+    }
+
+    if (!oid_cache.buckets)
+    {
+        oid_cache.bucket_count = 16;
+        while (oid_cache.bucket_count < oid_cache.max_size)
+        {
+            oid_cache.bucket_count *= 2;
+        }
+        oid_cache.buckets = calloc(oid_cache.bucket_count,
+                                   sizeof(struct oid_cache_entry *));
+        if (!oid_cache.buckets)
+        {
+            oid_cache.bucket_count = 0;
+            return;
+        }
+    }
+
+    while (oid_cache.size >= oid_cache.max_size)
+    {
+        __oid_cache_remove(oid_cache.lru_tail);
+    }
+
+    if (!(entry = calloc(1, sizeof(struct oid_cache_entry))))
+    {
+        return;
+    }
+    entry->tag = strdup(tag);
+    entry->name = malloc(name_len * sizeof(oid));
+    if (!entry->tag || !entry->name)
+    {
+        free(entry->tag);
+        free(entry->name);
+        free(entry);
+        return;
+    }
+    memcpy(entry->name, name, name_len * sizeof(oid));
+    entry->name_len = name_len;
+    entry->best_guess = best_guess;
+    entry->hash = __oid_cache_hash(tag, best_guess);
+    entry->type = type;
+    entry->tp = tp;
+
+    bucket = entry->hash & (oid_cache.bucket_count - 1);
+    entry->bucket_next = oid_cache.buckets[bucket];
+    oid_cache.buckets[bucket] = entry;
+
+    entry->lru_next = oid_cache.lru_head;
+    if (oid_cache.lru_head)
+    {
+        oid_cache.lru_head->lru_prev = entry;
+    }
+    else
+    {
+        oid_cache.lru_tail = entry;
+    }
+    oid_cache.lru_head = entry;
+    oid_cache.size++;
+}
+
+/*
+ * Same as __tag2oid, but symbolic tags are translated through the OID
+ * cache. Numeric tags are cheap to scan and usually unique (e.g. the
+ * cursors of a walk), so they bypass the cache.
+ */
+static struct tree *__tag2oid_cached(char *tag, char *iid, oid *oid_arr,
+                                     int *oid_arr_len, int *type,
+                                     int best_guess)
+{
+    struct oid_cache_entry *entry;
+    struct tree *tp;
+    int tag_type;
+
+    if (!tag || __is_numeric_oid(tag))
+    {
+        return __tag2oid(tag, iid, oid_arr, oid_arr_len, type, best_guess);
+    }
+
+    if ((entry = __oid_cache_lookup(tag, best_guess)))
+    {
+        oid_cache.hits++;
+        memcpy(oid_arr, entry->name, entry->name_len * sizeof(oid));
+        *oid_arr_len = entry->name_len;
+        if (type)
+        {
+            *type = entry->type;
+        }
+        if (iid && *iid)
+        {
+            __concat_oid_str(oid_arr, oid_arr_len, iid);
+        }
+        return entry->tp;
+    }
+
+    oid_cache.misses++;
+    tp = __tag2oid(tag, NULL, oid_arr, oid_arr_len, &tag_type, best_guess);
+    if (*oid_arr_len == 0)
+    {
+        /* Unknown tags are left to __tag2oid, uncached */
+        return __tag2oid(tag, iid, oid_arr, oid_arr_len, type, best_guess);
+    }
+
+    __oid_cache_store(tag, best_guess, oid_arr, *oid_arr_len, tag_type, tp);
+    if (type)
+    {
+        *type = tag_type;
+    }
+    if (iid && *iid)
+    {
+        __concat_oid_str(oid_arr, oid_arr_len, iid);
+    }
+    return tp;
+}
+
 /* add a varbind to PDU */
 static int __add_var_val_str(netsnmp_pdu *pdu, oid *name, int name_length,
                              char *val, int len, int type)
@@ -1134,444 +1589,1128 @@ OCT:
     return ret;
 }
 
-/* takes ss and pdu as input and updates the 'response' argument */
-/* the input 'pdu' argument will be freed */
-static int __send_sync_pdu(netsnmp_session *ss, netsnmp_pdu *pdu,
-                           netsnmp_pdu **response, int retry_nosuch,
-                           char *err_str, int *err_num, int *err_ind,
-                           bitarray *invalid_oids)
+/*
+ * Recorded PDUs (see tdsnmp.recording) hold the command, two 32 bit fields
+ * (the error status and index, or the non-repeaters and max-repetitions of
+ * a GETBULK) and the variable count, followed by each variable: the length
+ * of its name, its type, the length of its value, the sub-identifiers of
+ * its name and its value. Integers are little-endian and values are
+ * written independently of the size of long and oid, so recordings can be
+ * replayed on any platform.
+ */
+#define RECORDED_PDU_HEADER_SIZE (16)
+#define RECORDED_VAR_HEADER_SIZE (9)
+
+static u_char *__record_put(u_char *buf, unsigned long long value, int size)
 {
-    int status = 0;
-    long command = pdu->command;
-    char *tmp_err_str;
-    size_t retry_num = 0;
+    int i;
 
-    /* Note: SNMP uses 1-based indexing with OIDs, so 0 is unused */
-    unsigned long last_errindex = 0;
+    for (i = 0; i < size; i++)
+    {
+        *buf++ = (u_char) (value >> (8 * i));
+    }
+    return buf;
+}
 
-    *err_num = 0;
-    *err_ind = 0;
-    *response = NULL;
-    tmp_err_str = NULL;
-    memset(err_str, '\0', STR_BUF_SIZE);
+static unsigned long long __record_get(const u_char *buf, int size)
+{
+    unsigned long long value = 0;
+    int i;
 
-    if (ss == NULL)
+    for (i = 0; i < size; i++)
     {
-        *err_num = 0;
-        *err_ind = SNMPERR_BAD_SESSION;
-        status = SNMPERR_BAD_SESSION;
-        strlcpy(err_str, snmp_api_errstring(*err_ind), STR_BUF_SIZE);
-        goto done;
+        value |= (unsigned long long) buf[i] << (8 * i);
     }
+    return value;
+}
 
-retry:
+/*
+ * The size of the recorded value of a variable, 0 when it has none.
+ */
+static size_t __record_value_size(netsnmp_variable_list *vars)
+{
+    if (!vars->val.string || !vars->val_len)
+    {
+        return 0;
+    }
+    switch (vars->type)
+    {
+        case ASN_INTEGER:
+        case ASN_GAUGE:
+        case ASN_COUNTER:
+        case ASN_TIMETICKS:
+        case ASN_UINTEGER:
+        case ASN_COUNTER64:
+#ifdef OPAQUE_SPECIAL_TYPES
+        case ASN_OPAQUE_COUNTER64:
+        case ASN_OPAQUE_U64:
+        case ASN_OPAQUE_I64:
+#endif
+            return 8;
 
-    Py_BEGIN_ALLOW_THREADS
-    status = snmp_sess_synch_response(ss, pdu, response);
-    Py_END_ALLOW_THREADS
+        case ASN_OBJECT_ID:
+            return 4 * (vars->val_len / sizeof(oid));
 
-    if ((*response == NULL) && (status == STAT_SUCCESS))
+        default:
+            return vars->val_len;
+    }
+}
+
+/*
+ * Returns a new bytes object holding a PDU in the recorded format, with
+ * field1 and field2 as its two fields.
+ */
+static PyObject *__py_netsnmp_record_pdu(netsnmp_pdu *pdu, long field1,
+                                         long field2)
+{
+    netsnmp_variable_list *vars;
+    PyObject *record;
+    u_char *buf;
+    size_t size = RECORDED_PDU_HEADER_SIZE;
+    size_t value_size;
+    size_t count = 0;
+    size_t i;
+
+    for (vars = pdu->variables; vars; vars = vars->next_variable)
     {
-        status = STAT_ERROR;
+        size += RECORDED_VAR_HEADER_SIZE + 4 * vars->name_length +
+                __record_value_size(vars);
+        count++;
     }
 
-    // SNMP v3 doesn't quite raise timeouts correctly, so we correct it
-    if (strcmp(err_str, "Timeout") && (status == STAT_ERROR))
+    if (!(record = PyBytes_FromStringAndSize(NULL, size)))
     {
-        status = STAT_TIMEOUT;
+        return NULL;
     }
+    buf = (u_char *) PyBytes_AS_STRING(record);
+    buf = __record_put(buf, pdu->command, 4);
+    buf = __record_put(buf, field1, 4);
+    buf = __record_put(buf, field2, 4);
+    buf = __record_put(buf, count, 4);
 
-    switch (status)
+    for (vars = pdu->variables; vars; vars = vars->next_variable)
     {
-        case STAT_SUCCESS:
-            status = (*response)->errstat;
-            switch (status)
-            {
-                case SNMP_ERR_NOERROR:
-                    break;
+        value_size = __record_value_size(vars);
+        buf = __record_put(buf, vars->name_length, 4);
+        buf = __record_put(buf, vars->type, 1);
+        buf = __record_put(buf, value_size, 4);
+        for (i = 0; i < vars->name_length; i++)
+        {
+            buf = __record_put(buf, vars->name[i], 4);
+        }
 
-                case SNMP_ERR_NOSUCHNAME:
+        if (!value_size)
+        {
+            continue;
+        }
+        switch (vars->type)
+        {
+            case ASN_COUNTER64:
+#ifdef OPAQUE_SPECIAL_TYPES
+            case ASN_OPAQUE_COUNTER64:
+            case ASN_OPAQUE_U64:
+            case ASN_OPAQUE_I64:
+#endif
+                buf = __record_put(buf, vars->val.counter64->high, 4);
+                buf = __record_put(buf, vars->val.counter64->low, 4);
+                break;
 
-                    /*
-                     * if retry_nosuch is set, then remove the offending
-                     * OID which returns with NoSuchName, until none exist.
-                     */
-                    if (retry_nosuch)
-                    {
-                        /*
-                         * When using retry, we expect the agent to behave
-                         * in two ways:
-                         *
-                         *  (1) provide error index in descending order (easy case)
-                         *  (2) provide error index in ascending order (hard case)
-                         *
-                         *  The reason (2) is hard, is because everytime an OID
-                         *  is elided in the request PDU, we need to compensate.
-                         *
-                         *  It is possible that the agent may perform pathologically
-                         *  in which case we provide no guarantees whatsoever.
-                         */
+            case ASN_INTEGER:
+            case ASN_GAUGE:
+            case ASN_COUNTER:
+            case ASN_TIMETICKS:
+            case ASN_UINTEGER:
+                buf = __record_put(buf, *vars->val.integer, 8);
+                break;
 
-                        if (!last_errindex)
-                        {
-                            /* we haven't seen an errindex yet */
-                            bitarray_set_bit(invalid_oids, (*response)->errindex - 1);
-                        }
-                        else if (last_errindex > (*response)->errindex)
-                        {
-                            /* case (1) where error index is in descending order */
-                            bitarray_set_bit(invalid_oids, (*response)->errindex - 1);
-                        }
-                        else
-                        {
-                            /* case (2) where error index is in ascending order */
-                            bitarray_set_bit(invalid_oids, (*response)->errindex - 1 + retry_num);
-                        }
+            case ASN_OBJECT_ID:
+                for (i = 0; i < value_size / 4; i++)
+                {
+                    buf = __record_put(buf, vars->val.objid[i], 4);
+                }
+                break;
 
-                        /* finally we update the last_errindex for the next retry */
-                        last_errindex = (*response)->errindex;
+            default:
+                memcpy(buf, vars->val.string, value_size);
+                buf += value_size;
+        }
+    }
+    return record;
+}
 
-                        /*
-                         * fix the GET REQUEST message using snmp_fix_pdu
-                         * which elidse variable which return NOSUCHNAME error,
-                         * until there is either a successful response
-                         * (which indicates SNMP_ERR_NOERROR) or returns NULL
-                         * likely indicating no more remaining variables.
-                         */
-                        pdu = snmp_fix_pdu(*response, command);
+/*
+ * Returns a new response PDU decoded from the recorded format, or NULL with
+ * an exception set when the record is malformed.
+ */
+static netsnmp_pdu *__py_netsnmp_replay_pdu(PyObject *record)
+{
+    netsnmp_pdu *pdu = NULL;
+    const u_char *buf;
+    const u_char *end;
+    Py_ssize_t size;
+    struct counter64 counter;
+    oid name[MAX_OID_LEN];
+    oid objid[MAX_OID_LEN];
+    size_t name_length;
+    size_t value_size;
+    size_t count;
+    size_t i;
+    long integer;
+    u_char type;
+
+    if (PyBytes_AsStringAndSize(record, (char **) &buf, &size) < 0)
+    {
+        return NULL;
+    }
+    end = buf + size;
+    if (size < RECORDED_PDU_HEADER_SIZE)
+    {
+        goto malformed;
+    }
 
-                        /*
-                         * The condition when pdu==NULL will happen when
-                         * there are no OIDs left to retry.
-                         */
-                        if (!pdu)
-                        {
-                            status = STAT_SUCCESS;
-                            goto done;
-                        }
+    pdu = snmp_pdu_create((int) __record_get(buf, 4));
+    pdu->errstat = (long) (int) __record_get(buf + 4, 4);
+    pdu->errindex = (long) (int) __record_get(buf + 8, 4);
+    count = __record_get(buf + 12, 4);
+    buf += RECORDED_PDU_HEADER_SIZE;
 
-                        if (*response)
-                        {
-                            snmp_free_pdu(*response);
-                            *response = NULL;
-                        }
+    while (count--)
+    {
+        if (end - buf < RECORDED_VAR_HEADER_SIZE)
+        {
+            goto malformed;
+        }
+        name_length = __record_get(buf, 4);
+        type = buf[4];
+        value_size = __record_get(buf + 5, 4);
+        buf += RECORDED_VAR_HEADER_SIZE;
+        if (name_length > MAX_OID_LEN ||
+            (size_t) (end - buf) < 4 * name_length + value_size)
+        {
+            goto malformed;
+        }
+        for (i = 0; i < name_length; i++, buf += 4)
+        {
+            name[i] = __record_get(buf, 4);
+        }
 
-                        retry_num++;
-                        goto retry;
-                    }
-                    else /* !retry_nosuch */
-                    {
-                        PyErr_SetString(TDSNMPNoSuchNameError,
-                                        "no such name error encountered");
-                    }
+        if (!value_size)
+        {
+            snmp_pdu_add_variable(pdu, name, name_length, type, NULL, 0);
+            continue;
+        }
+        switch (type)
+        {
+            case ASN_COUNTER64:
+#ifdef OPAQUE_SPECIAL_TYPES
+            case ASN_OPAQUE_COUNTER64:
+            case ASN_OPAQUE_U64:
+            case ASN_OPAQUE_I64:
+#endif
+                if (value_size != 8)
+                {
+                    goto malformed;
+                }
+                counter.high = __record_get(buf, 4);
+                counter.low = __record_get(buf + 4, 4);
+                snmp_pdu_add_variable(pdu, name, name_length, type,
+                                      &counter, sizeof(counter));
+                break;
 
-                    break;
+            case ASN_INTEGER:
+            case ASN_GAUGE:
+            case ASN_COUNTER:
+            case ASN_TIMETICKS:
+            case ASN_UINTEGER:
+                if (value_size != 8)
+                {
+                    goto malformed;
+                }
+                integer = (long) __record_get(buf, 8);
+                snmp_pdu_add_variable(pdu, name, name_length, type,
+                                      &integer, sizeof(integer));
+                break;
 
-                /* Pv1, SNMPsec, Pv2p, v2c, v2u, v2*, and SNMPv3 PDUs */
-                case SNMP_ERR_TOOBIG:
-                case SNMP_ERR_BADVALUE:
-                case SNMP_ERR_READONLY:
-                case SNMP_ERR_GENERR:
-                /* in SNMPv2p, SNMPv2c, SNMPv2u, SNMPv2*, and SNMPv3 PDUs */
-                case SNMP_ERR_NOACCESS:
-                case SNMP_ERR_WRONGTYPE:
-                case SNMP_ERR_WRONGLENGTH:
-                case SNMP_ERR_WRONGENCODING:
-                case SNMP_ERR_WRONGVALUE:
-                case SNMP_ERR_NOCREATION:
-                case SNMP_ERR_INCONSISTENTVALUE:
-                case SNMP_ERR_RESOURCEUNAVAILABLE:
-                case SNMP_ERR_COMMITFAILED:
-                case SNMP_ERR_UNDOFAILED:
-                case SNMP_ERR_AUTHORIZATIONERROR:
-                case SNMP_ERR_NOTWRITABLE:
-                /* in SNMPv2c, SNMPv2u, SNMPv2*, and SNMPv3 PDUs */
-                case SNMP_ERR_INCONSISTENTNAME:
-                default:
-                    strlcpy(err_str,
-                            (char *)snmp_errstring((*response)->errstat),
-                            STR_BUF_SIZE);
-                    *err_num = (int)(*response)->errstat;
-                    *err_ind = (*response)->errindex;
-                    py_log_msg(DEBUG, "sync PDU: %s", err_str);
+            case ASN_OBJECT_ID:
+                if (value_size % 4 || value_size / 4 > MAX_OID_LEN)
+                {
+                    goto malformed;
+                }
+                for (i = 0; i < value_size / 4; i++)
+                {
+                    objid[i] = __record_get(buf + 4 * i, 4);
+                }
+                snmp_pdu_add_variable(pdu, name, name_length, type, objid,
+                                      (value_size / 4) * sizeof(oid));
+                break;
 
-                    PyErr_SetString(TDSNMPException, err_str);
-                    break;
-             }
-             break;
+            default:
+                snmp_pdu_add_variable(pdu, name, name_length, type, buf,
+                                      value_size);
+        }
+        buf += value_size;
+    }
+    return pdu;
 
-        case STAT_TIMEOUT:
-            snmp_sess_error(ss, err_num, err_ind, &tmp_err_str);
-            strlcpy(err_str, tmp_err_str, STR_BUF_SIZE);
-            py_log_msg(DEBUG, "sync PDU: %s", err_str);
+malformed:
+    if (pdu)
+    {
+        snmp_free_pdu(pdu);
+    }
+    PyErr_SetString(PyExc_ValueError, "malformed recorded PDU");
+    return NULL;
+}
 
-            PyErr_SetString(TDSNMPTimeoutError,
-                            "timed out while connecting to remote host");
-            break;
+/*
+ * Returns a new reference to the tdsnmp.recording.Recording a python
+ * session has set as attr_name, or NULL when it has none.
+ */
+static PyObject *__py_netsnmp_recording(PyObject *session, char *attr_name)
+{
+    PyObject *recording;
 
-        case STAT_ERROR:
-            snmp_sess_error(ss, err_num, err_ind, &tmp_err_str);
-            strlcpy(err_str, tmp_err_str, STR_BUF_SIZE);
-            py_log_msg(DEBUG, "sync PDU: %s", err_str);
+    if (!session || !(recording = PyObject_GetAttrString(session, attr_name)))
+    {
+        PyErr_Clear();
+        return NULL;
+    }
+    if (recording == Py_None)
+    {
+        Py_DECREF(recording);
+        return NULL;
+    }
+    return recording;
+}
 
-            PyErr_SetString(TDSNMPException, tmp_err_str);
-            break;
+static double __stats_clock(void)
+{
+    struct timespec now;
 
-        default:
-            strcat(err_str, "send_sync_pdu: unknown status");
-            *err_num = ss->s_snmp_errno;
-            py_log_msg(DEBUG, "sync PDU: %s", err_str);
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return now.tv_sec + now.tv_nsec / 1e9;
+}
 
-            break;
+/*
+ * Start an operation (a call into this module sending blocking requests)
+ * on a session: until __stats_end(), the requests sent and variables
+ * decoded by this thread are counted for the session, and the time they
+ * take accounted to its phases. Helpers find the session with
+ * __stats_current() rather than having it passed down.
+ */
+static void __stats_begin(struct session_capsule_ctx *ctx)
+{
+    /* the logging configuration may have changed since the last one */
+    py_log_threshold = LOG_THRESHOLD_UNKNOWN;
+    ctx->outer = PyThread_tss_get(&current_operation);
+    memset(&ctx->timing, 0, sizeof(ctx->timing));
+    ctx->timing.started = __stats_clock();
+    PyThread_tss_set(&current_operation, ctx);
+}
+
+/* End the operation started by __stats_begin(), if any. */
+static void __stats_end(struct session_capsule_ctx *ctx)
+{
+    if (!ctx || PyThread_tss_get(&current_operation) != ctx)
+    {
+        return;
     }
+    ctx->timing.total = __stats_clock() - ctx->timing.started;
+    PyThread_tss_set(&current_operation, ctx->outer);
+    ctx->outer = NULL;
+}
 
-done:
+/* Returns the session of the operation running on this thread, or NULL. */
+static struct session_capsule_ctx *__stats_current(void)
+{
+    return PyThread_tss_get(&current_operation);
+}
 
-    if (tmp_err_str)
+/* Returns the time to pass to __stats_lap(), read only during operations. */
+static double __stats_mark(struct session_capsule_ctx *ctx)
+{
+    return ctx ? __stats_clock() : 0;
+}
+
+/* Account the time since *mark to a phase of ctx and move *mark to now. */
+static void __stats_lap(struct session_capsule_ctx *ctx, int phase,
+                        double *mark)
+{
+    double now;
+
+    if (ctx)
     {
-        free(tmp_err_str);
+        now = __stats_clock();
+        ctx->timing.phases[phase] += now - *mark;
+        *mark = now;
     }
+}
 
-    return status;
+/* The number of bytes of a BER length field for a length */
+static size_t __ber_length_size(size_t len)
+{
+    size_t size = 1;
+
+    if (len >= 0x80)
+    {
+        for (; len; len >>= 8)
+        {
+            size++;
+        }
+    }
+    return size;
 }
 
-static PyObject *py_netsnmp_construct_varbind(void)
+/* The number of bytes of a BER TLV holding len bytes */
+static size_t __ber_tlv_size(size_t len)
 {
-    return PyObject_CallMethod(tdsnmp_import, "SNMPVariable", NULL);
+    return 1 + __ber_length_size(len) + len;
 }
 
-static int py_netsnmp_attr_string(PyObject *obj, char *attr_name, char **val,
-                                  Py_ssize_t *len)
+/* The number of content bytes of a BER unsigned integer */
+static size_t __ber_unsigned_size(unsigned long long value)
 {
-    *val = NULL;
-    if (obj && attr_name && PyObject_HasAttrString(obj, attr_name))
+    size_t size = 1;
+
+    for (; value >= 0x80; value >>= 8)
     {
-        PyObject *attr = PyObject_GetAttrString(obj, attr_name);
-        if (attr)
+        size++;
+    }
+    return size;
+}
+
+/* The number of content bytes of a BER OBJECT IDENTIFIER */
+static size_t __ber_oid_size(oid *name, size_t name_length)
+{
+    /* the first two sub-identifiers share a byte */
+    size_t size = 1;
+    size_t i;
+    oid subid;
+
+    for (i = 2; i < name_length; i++)
+    {
+        for (subid = name[i], size++; subid >= 0x80; subid >>= 7)
         {
-            int retval;
+            size++;
+        }
+    }
+    return size;
+}
 
-#if PY_MAJOR_VERSION >= 3
-            // Encode the provided attribute using latin-1 into bytes and
-            // retrieve its value and length
-            PyObject *attr_bytes = PyUnicode_AsEncodedString(attr, "latin-1",
-                                                             "surrogateescape");
-            if (!attr_bytes)
-            {
-                /* Needs decrement? */
-                Py_XDECREF(attr);
-                return -1;
-            }
-            retval = PyBytes_AsStringAndSize(attr_bytes, val, len);
-            //Py_DECREF(attr_bytes);
-#else
-            retval = PyString_AsStringAndSize(attr, val, len);
-#endif
-
-            Py_DECREF(attr);
-            return retval;
-        }
-    }
-
-    return -1;
-}
-
-static long long py_netsnmp_attr_long(PyObject *obj, char *attr_name)
+/*
+ * Returns the number of bytes of a list of variables once BER-encoded as
+ * variable bindings.
+ */
+static size_t __varbinds_size(netsnmp_variable_list *vars)
 {
-    long long val = -1;
+    size_t size = 0;
+    size_t value_size;
+    long integer;
 
-    if (obj && attr_name && PyObject_HasAttrString(obj, attr_name))
+    for (; vars; vars = vars->next_variable)
     {
-        PyObject *attr = PyObject_GetAttrString(obj, attr_name);
-        if (attr)
+        switch (vars->type)
         {
-            val = PyLong_AsLong(attr);
-            Py_DECREF(attr);
+            case ASN_INTEGER:
+                integer = *vars->val.integer;
+                value_size = __ber_unsigned_size(integer < 0 ? ~integer
+                                                             : integer);
+                break;
+            case ASN_COUNTER:
+            case ASN_GAUGE:
+            case ASN_TIMETICKS:
+            case ASN_UINTEGER:
+                value_size = __ber_unsigned_size(*vars->val.integer &
+                                                 0xffffffff);
+                break;
+            case ASN_COUNTER64:
+                value_size = __ber_unsigned_size(
+                    ((unsigned long long) vars->val.counter64->high << 32) |
+                    (vars->val.counter64->low & 0xffffffff));
+                break;
+            case ASN_OBJECT_ID:
+                value_size = __ber_oid_size(vars->val.objid,
+                                            vars->val_len / sizeof(oid));
+                break;
+            default:
+                value_size = vars->val_len;
+                break;
         }
+        size += __ber_tlv_size(
+            __ber_tlv_size(__ber_oid_size(vars->name, vars->name_length)) +
+            __ber_tlv_size(value_size));
     }
-
-    return val;
+    return size;
 }
 
-static void *py_netsnmp_attr_void_ptr(PyObject *obj, char *attr_name)
+/*
+ * Send a PDU and wait for the response like snmp_sess_synch_response(),
+ * which consumes the PDU. When the python session has a Recording set as
+ * replay, the response recorded for the same request is decoded instead
+ * and nothing is sent; when it has one set as record, the request and the
+ * response are added to it.
+ */
+static int __synch_response(PyObject *session, netsnmp_session *ss,
+                            netsnmp_pdu *pdu, netsnmp_pdu **response)
 {
-    void *val = NULL;
+    PyObject *record = __py_netsnmp_recording(session, "record");
+    PyObject *replay = __py_netsnmp_recording(session, "replay");
+    PyObject *request = NULL;
+    PyObject *recorded = NULL;
+    PyObject *ret;
+    int status = STAT_ERROR;
+    struct session_capsule_ctx *op = __stats_current();
+    double mark = __stats_mark(op);
 
-    if (obj && attr_name && PyObject_HasAttrString(obj, attr_name))
+    *response = NULL;
+    if (op)
     {
-        PyObject *attr = PyObject_GetAttrString(obj, attr_name);
-        if (attr)
+        op->stats.requests++;
+        op->stats.bytes_out += __varbinds_size(pdu->variables);
+    }
+    if (record || replay)
+    {
+        if (pdu->command == SNMP_MSG_GETBULK)
         {
-            val = PyLong_AsVoidPtr(attr);
-            Py_DECREF(attr);
+            request = __py_netsnmp_record_pdu(pdu, pdu->non_repeaters,
+                                              pdu->max_repetitions);
+        }
+        else
+        {
+            request = __py_netsnmp_record_pdu(pdu, 0, 0);
+        }
+        if (!request)
+        {
+            snmp_free_pdu(pdu);
+            goto done;
         }
     }
 
-    return val;
-}
-
-static int py_netsnmp_attr_set_string(PyObject *obj, char *attr_name,
-                                      char *val, size_t len)
-{
-    int ret = -1;
-    if (obj && attr_name)
+    if (replay)
     {
-        PyObject* val_obj = PyUnicode_Decode(val, len, "latin-1",
-                                             "surrogateescape");
-        if (!val_obj)
+        snmp_free_pdu(pdu);
+        if (!(recorded = PyObject_CallMethod(replay, "response", "O",
+                                             request)))
         {
-            return -1;
+            goto done;
         }
-        ret = PyObject_SetAttrString(obj, attr_name, val_obj);
-        Py_DECREF(val_obj);
+        if (recorded == Py_None)
+        {
+            PyErr_SetString(TDSNMPTimeoutError,
+                            "no recorded response to the request");
+            status = STAT_TIMEOUT;
+            goto done;
+        }
+        if ((*response = __py_netsnmp_replay_pdu(recorded)))
+        {
+            status = STAT_SUCCESS;
+        }
+        goto done;
     }
-    return ret;
-}
-
-/**
- * Update python session object error attributes.
- *
- * Copy the error info which may have been returned from __send_sync_pdu(...)
- * into the python object. This will allow the python code to determine if
- * an error occured during an snmp operation.
- *
- * Currently there are 3 attributes we care about
- *
- * error_number - Copy of the value of netsnmp_session.s_errno. This is the
- * system errno that was generated during our last call into the net-snmp
- * library.
- *
- * error_index - Copy of the value of netsmp_session.s_snmp_errno. These error
- * numbers are separate from the system errno's and describe SNMP errors.
- *
- * error_string - A string describing the error_index that was returned during
- * our last operation.
- *
- * @param[in] session The python object that represents our current Session
- * @param[in|out] err_str A string describing err_ind
- * @param[in|out] err_num The system errno currently stored by our session
- * @param[in|out] err_ind The snmp errno currently stored by our session
- */
-static void __py_netsnmp_update_session_errors(PyObject *session,
-                                               char *err_str, int err_num,
-                                               int err_ind)
-{
-    PyObject *tmp_for_conversion;
 
-    py_netsnmp_attr_set_string(session, "error_string", err_str,
-                               STRLEN(err_str));
+    Py_BEGIN_ALLOW_THREADS
+    status = snmp_sess_synch_response(ss, pdu, response);
+    Py_END_ALLOW_THREADS
 
-    tmp_for_conversion = PyLong_FromLong(err_num);
-    if (!tmp_for_conversion)
+    __stats_lap(op, TIMING_WAIT, &mark);
+    if (op && status == STAT_SUCCESS && *response)
     {
-        return; /* nothing better to do? */
+        op->stats.bytes_in += __varbinds_size((*response)->variables);
     }
-    PyObject_SetAttrString(session, "error_number", tmp_for_conversion);
-    Py_DECREF(tmp_for_conversion);
 
-    tmp_for_conversion = PyLong_FromLong(err_ind);
-    if (!tmp_for_conversion)
+    if (record && status == STAT_SUCCESS && *response)
     {
-        return; /* nothing better to do? */
+        if (!(recorded = __py_netsnmp_record_pdu(*response,
+                                                 (*response)->errstat,
+                                                 (*response)->errindex)) ||
+            !(ret = PyObject_CallMethod(record, "record", "OO", request,
+                                        recorded)))
+        {
+            snmp_free_pdu(*response);
+            *response = NULL;
+            status = STAT_ERROR;
+            goto done;
+        }
+        Py_DECREF(ret);
     }
-    PyObject_SetAttrString(session, "error_index", tmp_for_conversion);
-    Py_DECREF(tmp_for_conversion);
+
+done:
+    Py_XDECREF(record);
+    Py_XDECREF(replay);
+    Py_XDECREF(request);
+    Py_XDECREF(recorded);
+    return status;
 }
 
-/*
- * Returns a new reference to a python capsule object containing
- * a newly allocated session_capsule_ctx.
- *
- * This function will raise an exception on failure.
- */
-static PyObject *create_session_capsule(SnmpSession *session)
+/* takes ss and pdu as input and updates the 'response' argument */
+/* the input 'pdu' argument will be freed */
+/* session is the python session object, see __synch_response() */
+static int __send_sync_pdu(PyObject *session, netsnmp_session *ss,
+                           netsnmp_pdu *pdu, netsnmp_pdu **response,
+                           int retry_nosuch, char *err_str, int *err_num,
+                           int *err_ind, bitarray *invalid_oids)
 {
-    void *handle = NULL;
-    struct session_capsule_ctx *ctx = NULL;
-    PyObject *capsule = NULL;
-    /* create a long lived handle from throwaway session object */
-    if (!(handle = snmp_sess_open(session)))
-    {
-        PyErr_SetString(TDSNMPConnectionError,
-                        "couldn't create SNMP handle");
-        goto done;
-    }
-    if (!(ctx = malloc(sizeof *ctx)))
-    {
-        PyErr_SetString(PyExc_RuntimeError,
-                        "could not malloc() session_capsule_ctx");
-        goto done;
-    }
-    /*
-     * Create a capsule containing the ctx pointer with an "anonymous" name,
-     * which is automatically destroyed by delete_session_capsule() when
-     * no more references to the object are held.
-     */
-    if (!(capsule = PyCapsule_New(ctx, NULL, delete_session_capsule)))
+    int status = 0;
+    long command = pdu->command;
+    char *tmp_err_str;
+    size_t retry_num = 0;
+    struct session_capsule_ctx *op = __stats_current();
+
+    /* Note: SNMP uses 1-based indexing with OIDs, so 0 is unused */
+    unsigned long last_errindex = 0;
+
+    *err_num = 0;
+    *err_ind = 0;
+    *response = NULL;
+    tmp_err_str = NULL;
+    memset(err_str, '\0', STR_BUF_SIZE);
+
+    if (ss == NULL)
     {
-        PyErr_SetString(PyExc_RuntimeError,
-                        "failed to create Python Capsule object");
+        *err_num = 0;
+        *err_ind = SNMPERR_BAD_SESSION;
+        status = SNMPERR_BAD_SESSION;
+        strlcpy(err_str, snmp_api_errstring(*err_ind), STR_BUF_SIZE);
         goto done;
     }
-    /* init session context variables */
-    ctx->handle = handle;
-    ctx->invalid_oids = (bitarray *) ctx->invalid_oids_buf;
-    bitarray_buf_init(ctx->invalid_oids, sizeof(ctx->invalid_oids_buf));
-    return (capsule);
-done:
-    if (handle)
-    {
-        snmp_sess_close(handle);
-    }
-    if (ctx)
+
+retry:
+
+    status = __synch_response(session, ss, pdu, response);
+
+    if ((*response == NULL) && (status == STAT_SUCCESS))
     {
-        free(ctx);
+        status = STAT_ERROR;
     }
 
-    Py_XDECREF(capsule);
-    return NULL;
-}
-
-static void *get_session_handle_from_capsule(PyObject *session_capsule)
-{
-    if (!session_capsule)
+    // SNMP v3 doesn't quite raise timeouts correctly, so we correct it
+    if (strcmp(err_str, "Timeout") && (status == STAT_ERROR))
     {
-        PyErr_SetString(PyExc_RuntimeError,
-                        "NULL arg calling get_session_handle_from_capsule");
-        return NULL;
+        status = STAT_TIMEOUT;
     }
-    /* raises exception on failure. */
-    return PyCapsule_GetPointer(session_capsule, NULL);
-}
 
-#ifdef USE_DEPRECATED_COBJECT_API
-/* The CObject API calls destructor with stored pointer */
-    static void delete_session_capsule(void *session_ptr)
+    if (op && status == STAT_SUCCESS)
     {
-        struct session_capsule_ctx *ctx = session_ptr;
-        if (ctx)
-        {
-            snmp_sess_close(ctx->handle);
-            free(ctx);
-        }
+        op->stats.responses++;
     }
-#else
-    /* Automatically called when Python reclaims session_capsule object. */
-    static void delete_session_capsule(PyObject *session_capsule)
+    else if (op && status == STAT_TIMEOUT)
     {
-        /* PyCapsule_GetPointer will raise an exception if it fails. */
-        struct session_capsule_ctx *ctx = PyCapsule_GetPointer(session_capsule, NULL);
-        if (ctx)
-        {
-            snmp_sess_close(ctx->handle);
-            free(ctx);
-        }
+        op->stats.timeouts++;
+        op->stats.retries += ss->retries > 0 ? ss->retries : 0;
     }
-#endif /* USE_DEPRECATED_COBJECT_API */
 
+    switch (status)
+    {
+        case STAT_SUCCESS:
+            status = (*response)->errstat;
+            switch (status)
+            {
+                case SNMP_ERR_NOERROR:
+                    break;
 
-static PyObject *netsnmp_create_session(PyObject *self, PyObject *args)
-{
+                case SNMP_ERR_NOSUCHNAME:
+
+                    /*
+                     * if retry_nosuch is set, then remove the offending
+                     * OID which returns with NoSuchName, until none exist.
+                     */
+                    if (retry_nosuch)
+                    {
+                        /*
+                         * When using retry, we expect the agent to behave
+                         * in two ways:
+                         *
+                         *  (1) provide error index in descending order (easy case)
+                         *  (2) provide error index in ascending order (hard case)
+                         *
+                         *  The reason (2) is hard, is because everytime an OID
+                         *  is elided in the request PDU, we need to compensate.
+                         *
+                         *  It is possible that the agent may perform pathologically
+                         *  in which case we provide no guarantees whatsoever.
+                         */
+
+                        if (!last_errindex)
+                        {
+                            /* we haven't seen an errindex yet */
+                            bitarray_set_bit(invalid_oids, (*response)->errindex - 1);
+                        }
+                        else if (last_errindex > (*response)->errindex)
+                        {
+                            /* case (1) where error index is in descending order */
+                            bitarray_set_bit(invalid_oids, (*response)->errindex - 1);
+                        }
+                        else
+                        {
+                            /* case (2) where error index is in ascending order */
+                            bitarray_set_bit(invalid_oids, (*response)->errindex - 1 + retry_num);
+                        }
+
+                        /* finally we update the last_errindex for the next retry */
+                        last_errindex = (*response)->errindex;
+
+                        /*
+                         * fix the GET REQUEST message using snmp_fix_pdu
+                         * which elidse variable which return NOSUCHNAME error,
+                         * until there is either a successful response
+                         * (which indicates SNMP_ERR_NOERROR) or returns NULL
+                         * likely indicating no more remaining variables.
+                         */
+                        pdu = snmp_fix_pdu(*response, command);
+
+                        /*
+                         * The condition when pdu==NULL will happen when
+                         * there are no OIDs left to retry.
+                         */
+                        if (!pdu)
+                        {
+                            status = STAT_SUCCESS;
+                            goto done;
+                        }
+
+                        if (*response)
+                        {
+                            snmp_free_pdu(*response);
+                            *response = NULL;
+                        }
+
+                        retry_num++;
+                        if (op)
+                        {
+                            op->stats.retries++;
+                        }
+                        goto retry;
+                    }
+                    else /* !retry_nosuch */
+                    {
+                        /*
+                         * the error index tells which variable ran off the
+                         * end of the MIB view, which ends that column of a
+                         * SNMPv1 walk
+                         */
+                        strlcpy(err_str,
+                                (char *)snmp_errstring((*response)->errstat),
+                                STR_BUF_SIZE);
+                        *err_num = (int)(*response)->errstat;
+                        *err_ind = (*response)->errindex;
+                        PyErr_SetString(TDSNMPNoSuchNameError,
+                                        "no such name error encountered");
+                    }
+
+                    break;
+
+                /* Pv1, SNMPsec, Pv2p, v2c, v2u, v2*, and SNMPv3 PDUs */
+                case SNMP_ERR_TOOBIG:
+                case SNMP_ERR_BADVALUE:
+                case SNMP_ERR_READONLY:
+                case SNMP_ERR_GENERR:
+                /* in SNMPv2p, SNMPv2c, SNMPv2u, SNMPv2*, and SNMPv3 PDUs */
+                case SNMP_ERR_NOACCESS:
+                case SNMP_ERR_WRONGTYPE:
+                case SNMP_ERR_WRONGLENGTH:
+                case SNMP_ERR_WRONGENCODING:
+                case SNMP_ERR_WRONGVALUE:
+                case SNMP_ERR_NOCREATION:
+                case SNMP_ERR_INCONSISTENTVALUE:
+                case SNMP_ERR_RESOURCEUNAVAILABLE:
+                case SNMP_ERR_COMMITFAILED:
+                case SNMP_ERR_UNDOFAILED:
+                case SNMP_ERR_AUTHORIZATIONERROR:
+                case SNMP_ERR_NOTWRITABLE:
+                /* in SNMPv2c, SNMPv2u, SNMPv2*, and SNMPv3 PDUs */
+                case SNMP_ERR_INCONSISTENTNAME:
+                default:
+                    strlcpy(err_str,
+                            (char *)snmp_errstring((*response)->errstat),
+                            STR_BUF_SIZE);
+                    *err_num = (int)(*response)->errstat;
+                    *err_ind = (*response)->errindex;
+                    py_log_msg(DEBUG, "sync PDU: %s", err_str);
+
+                    PyErr_SetString(TDSNMPException, err_str);
+                    break;
+             }
+             break;
+
+        case STAT_TIMEOUT:
+            snmp_sess_error(ss, err_num, err_ind, &tmp_err_str);
+            strlcpy(err_str, tmp_err_str, STR_BUF_SIZE);
+            py_log_msg(DEBUG, "sync PDU: %s", err_str);
+
+            /* replays raise their own errors */
+            if (!PyErr_Occurred())
+            {
+                PyErr_SetString(TDSNMPTimeoutError,
+                                "timed out while connecting to remote host");
+            }
+            break;
+
+        case STAT_ERROR:
+            snmp_sess_error(ss, err_num, err_ind, &tmp_err_str);
+            strlcpy(err_str, tmp_err_str, STR_BUF_SIZE);
+            py_log_msg(DEBUG, "sync PDU: %s", err_str);
+
+            if (!PyErr_Occurred())
+            {
+                PyErr_SetString(TDSNMPException, tmp_err_str);
+            }
+            break;
+
+        default:
+            strcat(err_str, "send_sync_pdu: unknown status");
+            *err_num = ss->s_snmp_errno;
+            py_log_msg(DEBUG, "sync PDU: %s", err_str);
+
+            break;
+    }
+
+done:
+
+    if (tmp_err_str)
+    {
+        free(tmp_err_str);
+    }
+
+    return status;
+}
+
+/*
+ * Returns a new, empty SNMPVariable.
+ *
+ * SNMPVariable is a slotted class, so the instance is allocated directly
+ * without running __init__; the caller must fill in every slot with
+ * py_netsnmp_varbind_set().
+ */
+static PyObject *py_netsnmp_construct_varbind(void)
+{
+    PyTypeObject *type = (PyTypeObject *) SNMPVariableType;
+
+    return type->tp_alloc(type, 0);
+}
+
+/*
+ * Set an attribute of an SNMPVariable to a latin-1 string.
+ *
+ * The value is stored through the slot directly rather than through
+ * SNMPVariable.__setattr__, whose string conversion it already satisfies.
+ */
+static int py_netsnmp_varbind_set(PyObject *varbind, int attr, char *val,
+                                  size_t len)
+{
+    PyObject *val_obj;
+    int ret;
+
+    if (!(val_obj = PyUnicode_DecodeLatin1((val ? val : ""), len, NULL)))
+    {
+        return -1;
+    }
+    ret = PyObject_GenericSetAttr(varbind, VarbindAttrNames[attr], val_obj);
+    Py_DECREF(val_obj);
+    return ret;
+}
+
+static int py_netsnmp_attr_string(PyObject *obj, char *attr_name, char **val,
+                                  Py_ssize_t *len)
+{
+    *val = NULL;
+    if (obj && attr_name && PyObject_HasAttrString(obj, attr_name))
+    {
+        PyObject *attr = PyObject_GetAttrString(obj, attr_name);
+        if (attr)
+        {
+            int retval;
+
+#if PY_MAJOR_VERSION >= 3
+            // Encode the provided attribute using latin-1 into bytes and
+            // retrieve its value and length
+            PyObject *attr_bytes = PyUnicode_AsEncodedString(attr, "latin-1",
+                                                             "surrogateescape");
+            if (!attr_bytes)
+            {
+                /* Needs decrement? */
+                Py_XDECREF(attr);
+                return -1;
+            }
+            retval = PyBytes_AsStringAndSize(attr_bytes, val, len);
+            //Py_DECREF(attr_bytes);
+#else
+            retval = PyString_AsStringAndSize(attr, val, len);
+#endif
+
+            Py_DECREF(attr);
+            return retval;
+        }
+    }
+
+    return -1;
+}
+
+static long long py_netsnmp_attr_long(PyObject *obj, char *attr_name)
+{
+    long long val = -1;
+
+    if (obj && attr_name && PyObject_HasAttrString(obj, attr_name))
+    {
+        PyObject *attr = PyObject_GetAttrString(obj, attr_name);
+        if (attr)
+        {
+            val = PyLong_AsLong(attr);
+            Py_DECREF(attr);
+        }
+    }
+
+    return val;
+}
+
+static void *py_netsnmp_attr_void_ptr(PyObject *obj, char *attr_name)
+{
+    void *val = NULL;
+
+    if (obj && attr_name && PyObject_HasAttrString(obj, attr_name))
+    {
+        PyObject *attr = PyObject_GetAttrString(obj, attr_name);
+        if (attr)
+        {
+            val = PyLong_AsVoidPtr(attr);
+            Py_DECREF(attr);
+        }
+    }
+
+    return val;
+}
+
+static int py_netsnmp_attr_set_string(PyObject *obj, char *attr_name,
+                                      char *val, size_t len)
+{
+    int ret = -1;
+    if (obj && attr_name)
+    {
+        PyObject* val_obj = PyUnicode_Decode(val, len, "latin-1",
+                                             "surrogateescape");
+        if (!val_obj)
+        {
+            return -1;
+        }
+        ret = PyObject_SetAttrString(obj, attr_name, val_obj);
+        Py_DECREF(val_obj);
+    }
+    return ret;
+}
+
+/**
+ * Update python session object error attributes.
+ *
+ * Copy the error info which may have been returned from __send_sync_pdu(...)
+ * into the python object. This will allow the python code to determine if
+ * an error occured during an snmp operation.
+ *
+ * Currently there are 3 attributes we care about
+ *
+ * error_number - Copy of the value of netsnmp_session.s_errno. This is the
+ * system errno that was generated during our last call into the net-snmp
+ * library.
+ *
+ * error_index - Copy of the value of netsmp_session.s_snmp_errno. These error
+ * numbers are separate from the system errno's and describe SNMP errors.
+ *
+ * error_string - A string describing the error_index that was returned during
+ * our last operation.
+ *
+ * @param[in] session The python object that represents our current Session
+ * @param[in|out] err_str A string describing err_ind
+ * @param[in|out] err_num The system errno currently stored by our session
+ * @param[in|out] err_ind The snmp errno currently stored by our session
+ */
+static void __py_netsnmp_update_session_errors(PyObject *session,
+                                               char *err_str, int err_num,
+                                               int err_ind)
+{
+    PyObject *tmp_for_conversion;
+
+    py_netsnmp_attr_set_string(session, "error_string", err_str,
+                               STRLEN(err_str));
+
+    tmp_for_conversion = PyLong_FromLong(err_num);
+    if (!tmp_for_conversion)
+    {
+        return; /* nothing better to do? */
+    }
+    PyObject_SetAttrString(session, "error_number", tmp_for_conversion);
+    Py_DECREF(tmp_for_conversion);
+
+    tmp_for_conversion = PyLong_FromLong(err_ind);
+    if (!tmp_for_conversion)
+    {
+        return; /* nothing better to do? */
+    }
+    PyObject_SetAttrString(session, "error_index", tmp_for_conversion);
+    Py_DECREF(tmp_for_conversion);
+}
+
+/*
+ * Returns a new reference to a python capsule object containing
+ * a newly allocated session_capsule_ctx.
+ *
+ * This function will raise an exception on failure.
+ */
+static PyObject *create_session_capsule(SnmpSession *session)
+{
+    void *handle = NULL;
+    struct session_capsule_ctx *ctx = NULL;
+    PyObject *capsule = NULL;
+    /* create a long lived handle from throwaway session object */
+    if (!(handle = snmp_sess_open(session)))
+    {
+        PyErr_SetString(TDSNMPConnectionError,
+                        "couldn't create SNMP handle");
+        goto done;
+    }
+    if (!(ctx = malloc(sizeof *ctx)))
+    {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "could not malloc() session_capsule_ctx");
+        goto done;
+    }
+    /*
+     * Create a capsule containing the ctx pointer with an "anonymous" name,
+     * which is automatically destroyed by delete_session_capsule() when
+     * no more references to the object are held.
+     */
+    if (!(capsule = PyCapsule_New(ctx, NULL, delete_session_capsule)))
+    {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "failed to create Python Capsule object");
+        goto done;
+    }
+    /* init session context variables */
+    ctx->handle = handle;
+    ctx->invalid_oids = (bitarray *) ctx->invalid_oids_buf;
+    bitarray_buf_init(ctx->invalid_oids, sizeof(ctx->invalid_oids_buf));
+    ctx->async_head = NULL;
+    ctx->async_tail = NULL;
+    memset(&ctx->stats, 0, sizeof(ctx->stats));
+    memset(&ctx->timing, 0, sizeof(ctx->timing));
+    ctx->outer = NULL;
+    return (capsule);
+done:
+    if (handle)
+    {
+        snmp_sess_close(handle);
+    }
+    if (ctx)
+    {
+        free(ctx);
+    }
+
+    Py_XDECREF(capsule);
+    return NULL;
+}
+
+static void *get_session_handle_from_capsule(PyObject *session_capsule)
+{
+    struct session_capsule_ctx *ctx;
+
+    if (!session_capsule)
+    {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "NULL arg calling get_session_handle_from_capsule");
+        return NULL;
+    }
+    /* raises exception on failure. */
+    if (!(ctx = PyCapsule_GetPointer(session_capsule, NULL)))
+    {
+        return NULL;
+    }
+    if (!ctx->handle)
+    {
+        PyErr_SetString(TDSNMPException, "session is closed");
+        return NULL;
+    }
+    return ctx;
+}
+
+/* Release any asynchronous responses which were never polled. */
+static void free_async_responses(struct session_capsule_ctx *ctx)
+{
+    struct async_response *resp;
+
+    while ((resp = ctx->async_head))
+    {
+        ctx->async_head = resp->next;
+        if (resp->pdu)
+        {
+            snmp_free_pdu(resp->pdu);
+        }
+        free(resp);
+    }
+    ctx->async_tail = NULL;
+}
+
+#ifdef USE_DEPRECATED_COBJECT_API
+/* The CObject API calls destructor with stored pointer */
+    static void delete_session_capsule(void *session_ptr)
+    {
+        struct session_capsule_ctx *ctx = session_ptr;
+        if (ctx)
+        {
+            if (ctx->handle)
+            {
+                snmp_sess_close(ctx->handle);
+            }
+            free_async_responses(ctx);
+            free(ctx);
+        }
+    }
+#else
+    /* Automatically called when Python reclaims session_capsule object. */
+    static void delete_session_capsule(PyObject *session_capsule)
+    {
+        /* PyCapsule_GetPointer will raise an exception if it fails. */
+        struct session_capsule_ctx *ctx = PyCapsule_GetPointer(session_capsule, NULL);
+        if (ctx)
+        {
+            if (ctx->handle)
+            {
+                snmp_sess_close(ctx->handle);
+            }
+            free_async_responses(ctx);
+            free(ctx);
+        }
+    }
+#endif /* USE_DEPRECATED_COBJECT_API */
+
+
+/*
+ * Close the net-snmp session of a capsule and its socket right away rather
+ * than when the capsule is reclaimed; requests on the session raise an
+ * exception afterwards. Closing a session again does nothing.
+ */
+static PyObject *netsnmp_close_session(PyObject *self, PyObject *args)
+{
+    PyObject *session_capsule = NULL;
+    struct session_capsule_ctx *ctx;
+
+    if (!PyArg_ParseTuple(args, "O", &session_capsule))
+    {
+        return NULL;
+    }
+
+    if (!(ctx = PyCapsule_GetPointer(session_capsule, NULL)))
+    {
+        return NULL;
+    }
+
+    if (ctx->handle)
+    {
+        snmp_sess_close(ctx->handle);
+        ctx->handle = NULL;
+    }
+    free_async_responses(ctx);
+
+    Py_RETURN_NONE;
+}
+
+static PyObject *netsnmp_create_session(PyObject *self, PyObject *args)
+{
     int version;
     char *community;
     char *peer;
@@ -1580,54 +2719,380 @@ static PyObject *netsnmp_create_session(PyObject *self, PyObject *args)
     int timeout;
     SnmpSession session = {0};
 
-    if (!PyArg_ParseTuple(args, "issiii", &version, &community, &peer, &lport,
-                          &retries, &timeout))
+    if (!PyArg_ParseTuple(args, "issiii", &version, &community, &peer, &lport,
+                          &retries, &timeout))
+    {
+        goto done;
+    }
+
+    __libraries_init("python");
+    snmp_sess_init(&session);
+
+    session.version = -1;
+#ifndef DISABLE_SNMPV1
+    if (version == 1)
+    {
+        session.version = SNMP_VERSION_1;
+    }
+#endif
+#ifndef DISABLE_SNMPV2C
+    if (version == 2)
+    {
+        session.version = SNMP_VERSION_2c;
+    }
+#endif
+    if (version == 3)
+    {
+        session.version = SNMP_VERSION_3;
+    }
+    if (session.version == -1)
+    {
+        PyErr_Format(PyExc_ValueError, "unsupported SNMP version (%d)",
+                     version);
+        goto done;
+    }
+
+    session.community_len = STRLEN((char *)community);
+    session.community = (u_char *)community;
+    session.peername = peer;
+    session.local_port = lport;
+    session.retries = retries; /* 5 */
+    session.timeout = timeout; /* 1000000L */
+    session.authenticator = NULL;
+
+    return create_session_capsule(&session);
+
+done:
+    return NULL;
+
+}
+
+static PyObject *netsnmp_create_session_v3(PyObject *self, PyObject *args)
+{
+    int version;
+    char *peer;
+    int lport;
+    int retries;
+    int timeout;
+    char *sec_name;
+    int sec_level;
+    char *sec_eng_id;
+    char *context_eng_id;
+    char *context;
+    char *auth_proto;
+    char *auth_pass;
+    char *priv_proto;
+    char *priv_pass;
+    int eng_boots;
+    int eng_time;
+    SnmpSession session = {0};
+
+    if (!PyArg_ParseTuple(args, "isiiisisssssssii", &version,
+                          &peer, &lport, &retries, &timeout,
+                          &sec_name, &sec_level, &sec_eng_id,
+                          &context_eng_id, &context,
+                          &auth_proto, &auth_pass,
+                          &priv_proto, &priv_pass,
+                          &eng_boots, &eng_time))
+    {
+        return NULL;
+    }
+
+    __libraries_init("python");
+    snmp_sess_init(&session);
+
+    if (version == 3)
+    {
+        session.version = SNMP_VERSION_3;
+    }
+    else
+    {
+        PyErr_Format(PyExc_ValueError, "unsupported SNMP version (%d)",
+                     version);
+        goto done;
+    }
+
+    session.peername = peer;
+    session.retries = retries; /* 5 */
+    session.timeout = timeout; /* 1000000L */
+    session.authenticator = NULL;
+    session.contextNameLen = STRLEN(context);
+    session.contextName = context;
+    session.securityNameLen = STRLEN(sec_name);
+    session.securityName = sec_name;
+    session.securityLevel = sec_level;
+    session.securityModel = USM_SEC_MODEL_NUMBER;
+    session.securityEngineIDLen =
+        hex_to_binary2((unsigned char *)sec_eng_id, STRLEN(sec_eng_id),
+                       (char **) &session.securityEngineID);
+    session.contextEngineIDLen =
+        hex_to_binary2((unsigned char *)context_eng_id, STRLEN(context_eng_id),
+                       (char **) &session.contextEngineID);
+    session.engineBoots = eng_boots;
+    session.engineTime = eng_time;
+
+#ifndef DISABLE_MD5
+    if (!strcmp(auth_proto, "MD5"))
+    {
+        session.securityAuthProto =
+            snmp_duplicate_objid(usmHMACMD5AuthProtocol,
+                                 USM_AUTH_PROTO_MD5_LEN);
+        session.securityAuthProtoLen = USM_AUTH_PROTO_MD5_LEN;
+    }
+    else
+#endif
+    if (!strcmp(auth_proto, "SHA"))
+    {
+        session.securityAuthProto =
+            snmp_duplicate_objid(usmHMACSHA1AuthProtocol,
+                                 USM_AUTH_PROTO_SHA_LEN);
+        session.securityAuthProtoLen = USM_AUTH_PROTO_SHA_LEN;
+    }
+    else if (!strcmp(auth_proto, "DEFAULT"))
+    {
+        const oid* a = get_default_authtype(&session.securityAuthProtoLen);
+        session.securityAuthProto
+            = snmp_duplicate_objid(a, session.securityAuthProtoLen);
+    }
+    else
+    {
+        PyErr_Format(PyExc_ValueError,
+                     "unsupported authentication protocol (%s)", auth_proto);
+        goto done;
+    }
+    if (session.securityLevel >= SNMP_SEC_LEVEL_AUTHNOPRIV)
+    {
+        if (STRLEN(auth_pass) > 0)
+        {
+            session.securityAuthKeyLen = USM_AUTH_KU_LEN;
+            if (generate_Ku(session.securityAuthProto,
+                            session.securityAuthProtoLen,
+                            (u_char *)auth_pass, STRLEN(auth_pass),
+                            session.securityAuthKey,
+                            &session.securityAuthKeyLen) != SNMPERR_SUCCESS)
+            {
+                PyErr_SetString(TDSNMPConnectionError,
+                                "error generating Ku from authentication "
+                                "password");
+                goto done;
+            }
+        }
+    }
+#ifndef DISABLE_DES
+    if (!strcmp(priv_proto, "DES"))
+    {
+        session.securityPrivProto =
+            snmp_duplicate_objid(usmDESPrivProtocol,
+                                 USM_PRIV_PROTO_DES_LEN);
+        session.securityPrivProtoLen = USM_PRIV_PROTO_DES_LEN;
+    }
+    else
+#endif
+    if (!strncmp(priv_proto, "AES", 3))
+    {
+        session.securityPrivProto =
+            snmp_duplicate_objid(usmAESPrivProtocol,
+                                 USM_PRIV_PROTO_AES_LEN);
+        session.securityPrivProtoLen = USM_PRIV_PROTO_AES_LEN;
+    }
+    else if (!strcmp(priv_proto, "DEFAULT"))
+    {
+        const oid *p = get_default_privtype(&session.securityPrivProtoLen);
+        session.securityPrivProto =
+            snmp_duplicate_objid(p, session.securityPrivProtoLen);
+    }
+    else
+    {
+        PyErr_Format(PyExc_ValueError,
+                     "unsupported privacy protocol (%s)", priv_proto);
+        goto done;
+    }
+
+    if (session.securityLevel >= SNMP_SEC_LEVEL_AUTHPRIV)
+    {
+        session.securityPrivKeyLen = USM_PRIV_KU_LEN;
+        if (generate_Ku(session.securityAuthProto,
+                        session.securityAuthProtoLen,
+                        (u_char *)priv_pass, STRLEN(priv_pass),
+                        session.securityPrivKey,
+                        &session.securityPrivKeyLen) != SNMPERR_SUCCESS)
+        {
+            PyErr_SetString(TDSNMPConnectionError,
+                            "couldn't gen Ku from priv pass phrase");
+            goto done;
+        }
+    }
+    return create_session_capsule(&session);
+
+done:
+    SAFE_FREE(session.securityEngineID);
+    SAFE_FREE(session.contextEngineID);
+
+    return NULL;
+
+}
+
+/*
+ * Returns an (engine_id, engine_boots, engine_time) tuple describing the
+ * SNMPv3 engine of the agent of a session, with the engine ID as a hex
+ * string, or None when the engine is not known (yet).
+ */
+static PyObject *netsnmp_session_engine_info(PyObject *self, PyObject *args)
+{
+    PyObject *session_capsule = NULL;
+    struct session_capsule_ctx *ctx;
+    netsnmp_session *ss;
+    char engine_id[2 * SNMP_MAX_ENG_SIZE + 1];
+    u_int engine_boots = 0;
+    u_int engine_time = 0;
+    size_t i;
+
+    if (!PyArg_ParseTuple(args, "O", &session_capsule))
     {
-        goto done;
+        return NULL;
     }
 
-    snmp_sess_init(&session);
+    if (!(ctx = get_session_handle_from_capsule(session_capsule)))
+    {
+        return NULL;
+    }
 
-    session.version = -1;
-#ifndef DISABLE_SNMPV1
-    if (version == 1)
+    ss = snmp_sess_session(ctx->handle);
+    if (!ss || !ss->securityEngineIDLen ||
+        ss->securityEngineIDLen > SNMP_MAX_ENG_SIZE)
     {
-        session.version = SNMP_VERSION_1;
+        Py_RETURN_NONE;
     }
-#endif
-#ifndef DISABLE_SNMPV2C
-    if (version == 2)
+
+    for (i = 0; i < ss->securityEngineIDLen; i++)
     {
-        session.version = SNMP_VERSION_2c;
+        snprintf(engine_id + 2 * i, 3, "%02X", ss->securityEngineID[i]);
     }
-#endif
-    if (version == 3)
+    engine_id[2 * ss->securityEngineIDLen] = '\0';
+
+    get_enginetime(ss->securityEngineID, ss->securityEngineIDLen,
+                   &engine_boots, &engine_time, TRUE);
+
+    return Py_BuildValue("(sII)", engine_id, engine_boots, engine_time);
+}
+
+/*
+ * Returns the (requests, responses, retries, timeouts, varbinds, bytes_out,
+ * bytes_in) counters of the requests of a session and the
+ * (total, wait, format, objects) seconds spent by its last operation, which
+ * remain readable once the session is closed.
+ */
+static PyObject *netsnmp_session_stats(PyObject *self, PyObject *args)
+{
+    PyObject *session_capsule = NULL;
+    struct session_capsule_ctx *ctx;
+    struct session_stats *stats;
+    struct session_timing *timing;
+
+    if (!PyArg_ParseTuple(args, "O", &session_capsule))
     {
-        session.version = SNMP_VERSION_3;
+        return NULL;
     }
-    if (session.version == -1)
+
+    if (!(ctx = PyCapsule_GetPointer(session_capsule, NULL)))
     {
-        PyErr_Format(PyExc_ValueError, "unsupported SNMP version (%d)",
-                     version);
-        goto done;
+        return NULL;
     }
 
-    session.community_len = STRLEN((char *)community);
-    session.community = (u_char *)community;
-    session.peername = peer;
-    session.local_port = lport;
-    session.retries = retries; /* 5 */
-    session.timeout = timeout; /* 1000000L */
-    session.authenticator = NULL;
+    stats = &ctx->stats;
+    timing = &ctx->timing;
+    return Py_BuildValue("(KKKKKKK)(dddd)", stats->requests,
+                         stats->responses, stats->retries, stats->timeouts,
+                         stats->varbinds, stats->bytes_out, stats->bytes_in,
+                         timing->total, timing->phases[TIMING_WAIT],
+                         timing->phases[TIMING_FORMAT],
+                         timing->phases[TIMING_OBJECTS]);
+}
 
-    return create_session_capsule(&session);
+/* Reset the counters and last timing of a session. */
+static PyObject *netsnmp_session_stats_reset(PyObject *self, PyObject *args)
+{
+    PyObject *session_capsule = NULL;
+    struct session_capsule_ctx *ctx;
 
-done:
-    return NULL;
+    if (!PyArg_ParseTuple(args, "O", &session_capsule))
+    {
+        return NULL;
+    }
+
+    if (!(ctx = PyCapsule_GetPointer(session_capsule, NULL)))
+    {
+        return NULL;
+    }
 
+    memset(&ctx->stats, 0, sizeof(ctx->stats));
+    memset(&ctx->timing, 0, sizeof(ctx->timing));
+    Py_RETURN_NONE;
 }
 
-static PyObject *netsnmp_create_session_v3(PyObject *self, PyObject *args)
+/*
+ * Start an operation made of asynchronous requests on a session, e.g. the
+ * pieces of a split get sent by BaseSession._pipeline: until stats_end(),
+ * the time spent decoding their responses on this thread is accounted to
+ * the last timing of the session.
+ */
+static PyObject *netsnmp_stats_begin(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    struct session_capsule_ctx *session_ctx = NULL;
+
+    if (!PyArg_ParseTuple(args, "O", &session))
+    {
+        return NULL;
+    }
+
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
+    Py_XDECREF(sess_ptr);
+
+    if (!session_ctx)
+    {
+        return NULL;
+    }
+    __stats_begin(session_ctx);
+    Py_RETURN_NONE;
+}
+
+/*
+ * End the operation started by stats_begin(); wait is the number of
+ * seconds the caller spent waiting for the responses.
+ */
+static PyObject *netsnmp_stats_end(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    struct session_capsule_ctx *session_ctx = NULL;
+    double wait = 0;
+
+    if (!PyArg_ParseTuple(args, "O|d", &session, &wait))
+    {
+        return NULL;
+    }
+
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
+    Py_XDECREF(sess_ptr);
+
+    if (!session_ctx)
+    {
+        return NULL;
+    }
+    if (__stats_current() == session_ctx)
+    {
+        session_ctx->timing.phases[TIMING_WAIT] += wait;
+    }
+    __stats_end(session_ctx);
+    Py_RETURN_NONE;
+}
+
+static PyObject *netsnmp_create_session_tunneled(PyObject *self,
+                                                 PyObject *args)
 {
     int version;
     char *peer;
@@ -1636,645 +3101,868 @@ static PyObject *netsnmp_create_session_v3(PyObject *self, PyObject *args)
     int timeout;
     char *sec_name;
     int sec_level;
-    char *sec_eng_id;
     char *context_eng_id;
     char *context;
-    char *auth_proto;
-    char *auth_pass;
-    char *priv_proto;
-    char *priv_pass;
-    int eng_boots;
-    int eng_time;
+    char *our_identity;
+    char *their_identity;
+    char *their_hostname;
+    char *trust_cert;
     SnmpSession session = {0};
 
-    if (!PyArg_ParseTuple(args, "isiiisisssssssii", &version,
-                          &peer, &lport, &retries, &timeout,
-                          &sec_name, &sec_level, &sec_eng_id,
-                          &context_eng_id, &context,
-                          &auth_proto, &auth_pass,
-                          &priv_proto, &priv_pass,
-                          &eng_boots, &eng_time))
+    if (!PyArg_ParseTuple(args, "isiiisissssss", &version,
+                          &peer, &lport, &retries, &timeout,
+                          &sec_name, &sec_level,
+                          &context_eng_id, &context,
+                          &our_identity, &their_identity,
+                          &their_hostname, &trust_cert))
+    {
+        goto done;
+    }
+
+    if (version != 3)
+    {
+        PyErr_SetString(PyExc_ValueError,
+                        "you must use SNMP version 3 as it's the only "
+                        "version that supports tunneling");
+        goto done;
+    }
+
+    __libraries_init("python");
+    snmp_sess_init(&session);
+
+    session.peername = peer;
+    session.retries = retries; /* 5 */
+    session.timeout = timeout; /* 1000000L */
+    session.contextNameLen = STRLEN(context);
+    session.contextName = context;
+    session.securityNameLen = STRLEN(sec_name);
+    session.securityName = sec_name;
+    session.securityLevel = sec_level;
+    session.securityModel = NETSNMP_TSM_SECURITY_MODEL;
+
+    /* create the transport configuration store */
+    if (!session.transport_configuration)
+    {
+        netsnmp_container_init_list();
+        session.transport_configuration =
+            netsnmp_container_find("transport_configuration:fifo");
+        if (!session.transport_configuration)
+        {
+            py_log_msg(ERROR, "failed to initialize the transport "
+                              "configuration container");
+            goto done;
+        }
+
+        session.transport_configuration->compare =
+            (netsnmp_container_compare*) netsnmp_transport_config_compare;
+    }
+
+    if (our_identity && our_identity[0] != '\0')
+        CONTAINER_INSERT(session.transport_configuration,
+                         netsnmp_transport_create_config("localCert",
+                                                         our_identity));
+
+    if (their_identity && their_identity[0] != '\0')
+        CONTAINER_INSERT(session.transport_configuration,
+                         netsnmp_transport_create_config("peerCert",
+                                                         their_identity));
+
+    if (their_hostname && their_hostname[0] != '\0')
+        CONTAINER_INSERT(session.transport_configuration,
+                         netsnmp_transport_create_config("their_hostname",
+                                                         their_hostname));
+
+    if (trust_cert && trust_cert[0] != '\0')
+        CONTAINER_INSERT(session.transport_configuration,
+                         netsnmp_transport_create_config("trust_cert",
+                                                         trust_cert));
+    return create_session_capsule(&session);
+
+done:
+    return NULL;
+
+}
+
+static PyObject *netsnmp_get(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *varlist = NULL;
+    PyObject *varbind = NULL;
+    PyObject *varlist_iter = NULL;
+    int varlist_len = 0;
+    int varlist_ind;
+
+    /* variables associated for session_ctx (can be condensed into a macro) */
+    PyObject *sess_ptr = NULL;
+    struct session_capsule_ctx *session_ctx = NULL;
+    netsnmp_session *ss = NULL;
+    oid *oid_arr = NULL;
+    int oid_arr_len = 0;
+    u_char *str_buf = NULL;
+    char *err_str = NULL;
+    bitarray *invalid_oids = NULL;
+
+    netsnmp_pdu *pdu = NULL;
+    netsnmp_pdu *response = NULL;
+    netsnmp_variable_list *vars = NULL;
+    int status;
+    char *tag = NULL;
+    char *iid = NULL;
+    int getlabel_flag = NO_FLAGS;
+    int sprintval_flag = USE_BASIC;
+    int best_guess;
+    int retry_nosuch;
+    int err_ind;
+    int err_num;
+    char *tmpstr = NULL;
+    Py_ssize_t tmplen;
+    int error = 0;
+    unsigned long snmp_version = 0;
+
+    if (!args)
+    {
+        const char *err_msg = "netsnmp_get: missing arguments";
+        PyErr_SetString(PyExc_ValueError, err_msg);
+        error = 1;
+        goto done;
+    }
+
+    if (!PyArg_ParseTuple(args, "OO", &session, &varlist))
+    {
+        goto done;
+    }
+
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
+
+    if (!session_ctx)
     {
-        return NULL;
+        error = 1;
+        goto done;
     }
+    __stats_begin(session_ctx);
 
-    snmp_sess_init(&session);
+    ss = session_ctx->handle;
+    invalid_oids = session_ctx->invalid_oids;
+    oid_arr = session_ctx->oid_arr;
+    str_buf = session_ctx->buf;
+    err_str = session_ctx->err_str;
 
-    if (version == 3)
+    snmp_version = py_netsnmp_attr_long(session, "version");
+
+    if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
     {
-        session.version = SNMP_VERSION_3;
+        goto done;
     }
-    else
+
+    best_guess = py_netsnmp_attr_long(session, "best_guess");
+    retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
+
+    pdu = snmp_pdu_create(SNMP_MSG_GET);
+
+    if (!varlist)
     {
-        PyErr_Format(PyExc_ValueError, "unsupported SNMP version (%d)",
-                     version);
+        const char *err_msg = "unexpected error: varlist == null";
+        PyErr_SetString(PyExc_RuntimeError, err_msg);
+        error = 1;
         goto done;
     }
 
-    session.peername = peer;
-    session.retries = retries; /* 5 */
-    session.timeout = timeout; /* 1000000L */
-    session.authenticator = NULL;
-    session.contextNameLen = STRLEN(context);
-    session.contextName = context;
-    session.securityNameLen = STRLEN(sec_name);
-    session.securityName = sec_name;
-    session.securityLevel = sec_level;
-    session.securityModel = USM_SEC_MODEL_NUMBER;
-    session.securityEngineIDLen =
-        hex_to_binary2((unsigned char *)sec_eng_id, STRLEN(sec_eng_id),
-                       (char **) &session.securityEngineID);
-    session.contextEngineIDLen =
-        hex_to_binary2((unsigned char *)context_eng_id, STRLEN(sec_eng_id),
-                       (char **) &session.contextEngineID);
-    session.engineBoots = eng_boots;
-    session.engineTime = eng_time;
+    varlist_iter = PyObject_GetIter(varlist);
 
-#ifndef DISABLE_MD5
-    if (!strcmp(auth_proto, "MD5"))
+    while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
     {
-        session.securityAuthProto =
-            snmp_duplicate_objid(usmHMACMD5AuthProtocol,
-                                 USM_AUTH_PROTO_MD5_LEN);
-        session.securityAuthProtoLen = USM_AUTH_PROTO_MD5_LEN;
+        if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
+            py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
+        {
+            oid_arr_len = 0;
+        }
+        else
+        {
+            __tag2oid_cached(tag, iid, oid_arr, &oid_arr_len, NULL,
+                             best_guess);
+        }
+
+        if (oid_arr_len)
+        {
+            snmp_add_null_var(pdu, oid_arr, oid_arr_len);
+            varlist_len++;
+        }
+        else
+        {
+            PyErr_Format(TDSNMPUnknownObjectIDError,
+                         "unknown object id (%s)",
+                         (tag ? tag : "<null>"));
+            error = 1;
+            snmp_free_pdu(pdu);
+            Py_DECREF(varbind);
+            Py_DECREF(varlist_iter);
+            goto done;
+        }
+
+        /* release reference when done */
+        Py_DECREF(varbind);
     }
-    else
-#endif
-    if (!strcmp(auth_proto, "SHA"))
+
+    Py_XDECREF(varlist_iter);
+
+    if (PyErr_Occurred())
     {
-        session.securityAuthProto =
-            snmp_duplicate_objid(usmHMACSHA1AuthProtocol,
-                                 USM_AUTH_PROTO_SHA_LEN);
-        session.securityAuthProtoLen = USM_AUTH_PROTO_SHA_LEN;
+        error = 1;
+        snmp_free_pdu(pdu);
+        goto done;
     }
-    else if (!strcmp(auth_proto, "DEFAULT"))
+
+    if (snmp_version == 1)
     {
-        const oid* a = get_default_authtype(&session.securityAuthProtoLen);
-        session.securityAuthProto
-            = snmp_duplicate_objid(a, session.securityAuthProtoLen);
+        bitarray_clear_bits(invalid_oids, (size_t) varlist_len);
     }
-    else
+
+    status = __send_sync_pdu(session, ss, pdu, &response, retry_nosuch,
+                             err_str, &err_num, &err_ind, invalid_oids);
+
+    __py_netsnmp_update_session_errors(session, err_str, err_num, err_ind);
+    if (status != 0)
     {
-        PyErr_Format(PyExc_ValueError,
-                     "unsupported authentication protocol (%s)", auth_proto);
+        error = 1;
         goto done;
     }
-    if (session.securityLevel >= SNMP_SEC_LEVEL_AUTHNOPRIV)
+
+    /*
+     * Numeric or full OIDs are formatted per variable by
+     * py_netsnmp_fill_varbind(), which never leaves the library-wide
+     * output format changed, so sessions may be used from any thread.
+     */
+    __py_netsnmp_session_flags(session, &getlabel_flag, &sprintval_flag);
+
+    /*
+     * In SNMPv1 we go through the response variables only if we know
+     * the varlist_ind is not set in the invalid_oids bit array.
+     * For bits that are set, we fix the input varbind so that it
+     * indicates NOSUCHNAME. For bits that are not set, we fill in the
+     * corresponding varbind and advance.
+     *
+     * In SNMPv2/v3 we simply fill the response variables against the
+     * original input Varbind list.
+     */
+    vars = (response ? response->variables : NULL);
+
+    for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
     {
-        if (STRLEN(auth_pass) > 0)
+        int no_such_name = 0;
+
+        if (snmp_version == 1)
         {
-            session.securityAuthKeyLen = USM_AUTH_KU_LEN;
-            if (generate_Ku(session.securityAuthProto,
-                            session.securityAuthProtoLen,
-                            (u_char *)auth_pass, STRLEN(auth_pass),
-                            session.securityAuthKey,
-                            &session.securityAuthKeyLen) != SNMPERR_SUCCESS)
+            if (!vars)
             {
-                PyErr_SetString(TDSNMPConnectionError,
-                                "error generating Ku from authentication "
-                                "password");
-                goto done;
+                /* if no more variables in response then remaining varbinds are invalid. */
+                no_such_name = 1;
+            }
+            else if (bitarray_test_bit(invalid_oids, varlist_ind))
+            {
+                /* oid is invalid */
+                no_such_name = 1;
             }
         }
+        else if (!vars)
+        {
+            /*
+             * sanity check for snmp v2/v3: no more varbinds to inspect;
+             * this should throw an exception.
+             */
+            py_log_msg(DEBUG,
+                       "netsnmp_get: response had less vars compared to varlist");
+            break;
+        }
+
+        varbind = PySequence_GetItem(varlist, varlist_ind);
+
+        if (no_such_name)
+        {
+            if (!PyObject_HasAttrString(varbind, "oid"))
+            {
+                py_log_msg(DEBUG, "netsnmp_get: bad varbind (%d)",
+                           varlist_ind);
+                Py_XDECREF(varbind);
+            }
+
+            py_netsnmp_attr_set_string(varbind, "snmp_type", "NOSUCHNAME",
+                                       strlen("NOSUCHNAME"));
+
+            py_netsnmp_attr_set_string(varbind, "value",
+                                       "NOSUCHNAME", strlen("NOSUCHNAME"));
+
+            Py_DECREF(varbind);
+        }
+        else if (PyObject_HasAttrString(varbind, "oid"))
+        {
+            py_netsnmp_fill_varbind(varbind, vars, getlabel_flag,
+                                    sprintval_flag, str_buf,
+                                    sizeof(session_ctx->buf));
+
+            Py_DECREF(varbind);
+        }
+        else
+        {
+            py_log_msg(DEBUG, "netsnmp_get: bad varbind (%d)", varlist_ind);
+            Py_XDECREF(varbind);
+        }
+
+        /*
+         * in v1 this will only advance if the varbind index is valid;
+         * in v2/v3 no_such_name is always set to 0.
+         */
+        if (!no_such_name)
+        {
+            vars = vars->next_variable;
+        }
     }
-#ifndef DISABLE_DES
-    if (!strcmp(priv_proto, "DES"))
-    {
-        session.securityPrivProto =
-            snmp_duplicate_objid(usmDESPrivProtocol,
-                                 USM_PRIV_PROTO_DES_LEN);
-        session.securityPrivProtoLen = USM_PRIV_PROTO_DES_LEN;
-    }
-    else
-#endif
-    if (!strncmp(priv_proto, "AES", 3))
-    {
-        session.securityPrivProto =
-            snmp_duplicate_objid(usmAESPrivProtocol,
-                                 USM_PRIV_PROTO_AES_LEN);
-        session.securityPrivProtoLen = USM_PRIV_PROTO_AES_LEN;
-    }
-    else if (!strcmp(priv_proto, "DEFAULT"))
+
+done:
+    __stats_end(session_ctx);
+    Py_XDECREF(sess_ptr);
+    if (response)
     {
-        const oid *p = get_default_privtype(&session.securityPrivProtoLen);
-        session.securityPrivProto =
-            snmp_duplicate_objid(p, session.securityPrivProtoLen);
+        snmp_free_pdu(response);
+        response = NULL;
     }
-    else
+
+    if (error)
     {
-        PyErr_Format(PyExc_ValueError,
-                     "unsupported privacy protocol (%s)", priv_proto);
-        goto done;
+        return NULL;
     }
+    return Py_None;
+}
+
+static PyObject *netsnmp_getnext(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    PyObject *varlist;
+    PyObject *varbind;
+    int varlist_len = 0;
+    int varlist_ind;
+    struct session_capsule_ctx *session_ctx = NULL;
+    netsnmp_session *ss;
+    netsnmp_pdu *pdu = NULL;
+    netsnmp_pdu *response = NULL;
+    netsnmp_variable_list *vars;
+    oid *oid_arr;
+    int oid_arr_len = MAX_OID_LEN;
+    int status;
+    u_char str_buf[STR_BUF_SIZE];
+    char *tag;
+    char *iid = NULL;
+    int getlabel_flag = NO_FLAGS;
+    int sprintval_flag = USE_BASIC;
+    int best_guess;
+    int retry_nosuch;
+    int err_ind;
+    int err_num;
+    char err_str[STR_BUF_SIZE];
+    char *tmpstr;
+    Py_ssize_t tmplen;
+    int error = 0;
+    unsigned long snmp_version = 0;
 
-    if (session.securityLevel >= SNMP_SEC_LEVEL_AUTHPRIV)
+    BITARRAY_DECLARE(snmpv1_invalid_oids, DEFAULT_NUM_BAD_OIDS);
+    bitarray *invalid_oids = snmpv1_invalid_oids;
+
+    oid_arr = calloc(MAX_OID_LEN, sizeof(oid));
+
+    if (oid_arr && args)
     {
-        session.securityPrivKeyLen = USM_PRIV_KU_LEN;
-        if (generate_Ku(session.securityAuthProto,
-                        session.securityAuthProtoLen,
-                        (u_char *)priv_pass, STRLEN(priv_pass),
-                        session.securityPrivKey,
-                        &session.securityPrivKeyLen) != SNMPERR_SUCCESS)
+        if (!PyArg_ParseTuple(args, "OO", &session, &varlist))
         {
-            PyErr_SetString(TDSNMPConnectionError,
-                            "couldn't gen Ku from priv pass phrase");
             goto done;
         }
-    }
-    return create_session_capsule(&session);
 
-done:
-    SAFE_FREE(session.securityEngineID);
-    SAFE_FREE(session.contextEngineID);
+        sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+        session_ctx = get_session_handle_from_capsule(sess_ptr);
 
-    return NULL;
+        if (!session_ctx)
+        {
+            error = 1;
+            goto done;
+        }
+        __stats_begin(session_ctx);
 
-}
+        ss = session_ctx->handle;
 
-static PyObject *netsnmp_create_session_tunneled(PyObject *self,
-                                                 PyObject *args)
-{
-    int version;
-    char *peer;
-    int lport;
-    int retries;
-    int timeout;
-    char *sec_name;
-    int sec_level;
-    char *context_eng_id;
-    char *context;
-    char *our_identity;
-    char *their_identity;
-    char *their_hostname;
-    char *trust_cert;
-    SnmpSession session = {0};
+        snmp_version = py_netsnmp_attr_long(session, "version");
 
-    if (!PyArg_ParseTuple(args, "isiiisissssss", &version,
-                          &peer, &lport, &retries, &timeout,
-                          &sec_name, &sec_level,
-                          &context_eng_id, &context,
-                          &our_identity, &their_identity,
-                          &their_hostname, &trust_cert))
-    {
-        goto done;
-    }
+        if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
+        {
+            goto done;
+        }
+        memcpy(&err_str, tmpstr, tmplen);
+        err_num = py_netsnmp_attr_long(session, "error_number");
+        err_ind = py_netsnmp_attr_long(session, "error_index");
 
-    if (version != 3)
-    {
-        PyErr_SetString(PyExc_ValueError,
-                        "you must use SNMP version 3 as it's the only "
-                        "version that supports tunneling");
-        goto done;
-    }
+        best_guess = py_netsnmp_attr_long(session, "best_guess");
+        retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
 
-    snmp_sess_init(&session);
+        pdu = snmp_pdu_create(SNMP_MSG_GETNEXT);
 
-    session.peername = peer;
-    session.retries = retries; /* 5 */
-    session.timeout = timeout; /* 1000000L */
-    session.contextNameLen = STRLEN(context);
-    session.contextName = context;
-    session.securityNameLen = STRLEN(sec_name);
-    session.securityName = sec_name;
-    session.securityLevel = sec_level;
-    session.securityModel = NETSNMP_TSM_SECURITY_MODEL;
+        if (varlist)
+        {
+            PyObject *varlist_iter = PyObject_GetIter(varlist);
 
-    /* create the transport configuration store */
-    if (!session.transport_configuration)
-    {
-        netsnmp_container_init_list();
-        session.transport_configuration =
-            netsnmp_container_find("transport_configuration:fifo");
-        if (!session.transport_configuration)
+            while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
+            {
+                if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
+                    py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
+                {
+                    oid_arr_len = 0;
+                }
+                else
+                {
+                    __tag2oid_cached(tag, iid, oid_arr, &oid_arr_len, NULL,
+                                     best_guess);
+                }
+
+                py_log_msg(DEBUG,
+                           "netsnmp_getnext: filling request: %s:%s:%d:%d",
+                           tag, iid, oid_arr_len, best_guess);
+
+                if (oid_arr_len)
+                {
+                    snmp_add_null_var(pdu, oid_arr, oid_arr_len);
+                    varlist_len++;
+                }
+                else
+                {
+                    PyErr_Format(TDSNMPUnknownObjectIDError,
+                                 "unknown object id (%s)",
+                                 (tag ? tag : "<null>"));
+                    error = 1;
+                    snmp_free_pdu(pdu);
+                    Py_DECREF(varbind);
+                    Py_DECREF(varlist_iter);
+                    goto done;
+                }
+                /* release reference when done */
+                Py_DECREF(varbind);
+            }
+
+            Py_DECREF(varlist_iter);
+
+            if (PyErr_Occurred())
+            {
+                error = 1;
+                snmp_free_pdu(pdu);
+                goto done;
+            }
+        }
+
+        /* if we cannot represent the number of bad oids, we will need to resize. */
+        if (snmp_version == 1 && DEFAULT_NUM_BAD_OIDS < varlist_len)
         {
-            py_log_msg(ERROR, "failed to initialize the transport "
-                              "configuration container");
+            invalid_oids = bitarray_calloc(varlist_len);
+
+            if (!invalid_oids)
+            {
+                error = 1;
+                snmp_free_pdu(pdu);
+                const char *err_msg = "failed to call bitarray_calloc";
+                PyErr_SetString(PyExc_RuntimeError, err_msg);
+                goto done;
+            }
+        }
+
+        status = __send_sync_pdu(session, ss, pdu, &response, retry_nosuch,
+                                 err_str, &err_num, &err_ind, invalid_oids);
+
+        __py_netsnmp_update_session_errors(session, err_str, err_num, err_ind);
+        if (status != 0)
+        {
+            error = 1;
             goto done;
         }
 
-        session.transport_configuration->compare =
-            (netsnmp_container_compare*) netsnmp_transport_config_compare;
-    }
+        /*
+         * Numeric or full OIDs are formatted per variable by
+         * py_netsnmp_fill_varbind(), which never leaves the library-wide
+         * output format changed, so sessions may be used from any thread.
+         */
+        __py_netsnmp_session_flags(session, &getlabel_flag, &sprintval_flag);
+        /*
+         * In SNMPv1 we go through the response variables only if we know
+         * the varlist_ind is not set in the invalid_oids bit array.
+         * For bits that are set, we fix the input varbind so that it
+         * indicates NOSUCHNAME. For bits that are not set, we fill in the
+         * corresponding varbind and advance.
+         *
+         * In SNMPv2/v3 we simply fill the response variables against the
+         * original input Varbind list.
+         */
+        vars = (response ? response->variables : NULL);
 
-    if (our_identity && our_identity[0] != '\0')
-        CONTAINER_INSERT(session.transport_configuration,
-                         netsnmp_transport_create_config("localCert",
-                                                         our_identity));
+        for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
+        {
+            int no_such_name = 0;
 
-    if (their_identity && their_identity[0] != '\0')
-        CONTAINER_INSERT(session.transport_configuration,
-                         netsnmp_transport_create_config("peerCert",
-                                                         their_identity));
+            if (snmp_version == 1)
+            {
+                /* check if oid is invalid */
+                if (bitarray_test_bit(invalid_oids, varlist_ind))
+                {
+                    no_such_name = 1;
+                }
+            }
+            else if (!vars)
+            {
+                /*
+                 * no more varbinds to inspect
+                 * (this will only happen if no response is received from SNMP.
+                 */
+                break;
+            }
 
-    if (their_hostname && their_hostname[0] != '\0')
-        CONTAINER_INSERT(session.transport_configuration,
-                         netsnmp_transport_create_config("their_hostname",
-                                                         their_hostname));
+            varbind = PySequence_GetItem(varlist, varlist_ind);
+
+            if (!no_such_name && PyObject_HasAttrString(varbind, "oid"))
+            {
+                py_netsnmp_fill_varbind(varbind, vars, getlabel_flag,
+                                        sprintval_flag, str_buf,
+                                        sizeof(str_buf));
+            }
+            else if (no_such_name)
+            {
+                if (!PyObject_HasAttrString(varbind, "oid"))
+                {
+                    py_log_msg(DEBUG, "netsnmp_get: bad varbind (%d)",
+                               varlist_ind);
+                    //Py_XDECREF(varbind); /* Double decref? */
+                }
+
+                py_netsnmp_attr_set_string(varbind, "snmp_type", "NOSUCHNAME",
+                                           strlen("NOSUCHNAME"));
+
+                py_netsnmp_attr_set_string(varbind, "value",
+                                           "NOSUCHNAME", strlen("NOSUCHNAME"));
+            }
+            else
+            {
+                py_log_msg(DEBUG, "netsnmp_getnext: bad varbind (%d)",
+                           varlist_ind);
+            }
+            Py_XDECREF(varbind);
+            /*
+             * in v1 this will only advance if the varbind index is valid;
+             * in v2/v3 no_such_name is always set to 0.
+             */
+            if (!no_such_name)
+            {
+                vars = vars->next_variable;
+            }
+        }
 
-    if (trust_cert && trust_cert[0] != '\0')
-        CONTAINER_INSERT(session.transport_configuration,
-                         netsnmp_transport_create_config("trust_cert",
-                                                         trust_cert));
-    return create_session_capsule(&session);
+    }
 
 done:
-    return NULL;
+    __stats_end(session_ctx);
+    Py_XDECREF(sess_ptr);
+    /* the pointers will be equal if we didn't allocate additional space */
+    if (invalid_oids != snmpv1_invalid_oids)
+    {
+        bitarray_free(invalid_oids);
+    }
 
+    SAFE_FREE(oid_arr);
+    if (response)
+    {
+        snmp_free_pdu(response);
+        response = NULL;
+    }
+    if (error)
+    {
+        return NULL;
+    }
+    return Py_None;
 }
 
-static PyObject *netsnmp_get(PyObject *self, PyObject *args)
+static PyObject *netsnmp_walk(PyObject *self, PyObject *args)
 {
     PyObject *session = NULL;
     PyObject *varlist = NULL;
-    PyObject *varbind = NULL;
-    PyObject *varlist_iter = NULL;
-    int varlist_len = 0;
-    int varlist_ind;
 
-    /* variables associated for session_ctx (can be condensed into a macro) */
+    if (!PyArg_ParseTuple(args, "OO", &session, &varlist) ||
+        __py_netsnmp_walk_varlist(session, SNMP_MSG_GETNEXT, 0, 0,
+                                  varlist) < 0)
+    {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject *netsnmp_getbulk(PyObject *self, PyObject *args)
+{
+    int nonrepeaters;
+    int maxrepetitions;
+    PyObject *session = NULL;
     PyObject *sess_ptr = NULL;
+    PyObject *varlist;
+    PyObject *varbinds = NULL;
+    PyObject *varbind;
+    PyObject *varbinds_iter;
+    int varbind_ind;
     struct session_capsule_ctx *session_ctx = NULL;
-    netsnmp_session *ss = NULL;
-    oid *oid_arr = NULL;
-    int oid_arr_len = 0;
-    u_char *str_buf = NULL;
-    u_char *str_bufp = NULL;
-    char *err_str = NULL;
-    bitarray *invalid_oids = NULL;
-
+    netsnmp_session *ss;
     netsnmp_pdu *pdu = NULL;
     netsnmp_pdu *response = NULL;
-    netsnmp_variable_list *vars = NULL;
-    struct tree *tp = NULL;
-    int len;
-    int type;
-    char type_str[MAX_TYPE_NAME_LEN];
+    netsnmp_variable_list *vars;
+    oid *oid_arr;
+    int oid_arr_len = MAX_OID_LEN;
     int status;
-    int buf_over = 0;
-    char *tag = NULL;
-    char *iid = NULL;
+    u_char str_buf[STR_BUF_SIZE];
+    char *tag;
+    char *iid;
     int getlabel_flag = NO_FLAGS;
     int sprintval_flag = USE_BASIC;
-    int old_format;
     int best_guess;
     int retry_nosuch;
     int err_ind;
     int err_num;
-    char *tmpstr = NULL;
+    char err_str[STR_BUF_SIZE];
+    char *tmpstr;
     Py_ssize_t tmplen;
     int error = 0;
-    unsigned long snmp_version = 0;
-
-    if (!args)
-    {
-        const char *err_msg = "netsnmp_get: missing arguments";
-        PyErr_SetString(PyExc_ValueError, err_msg);
-        error = 1;
-        goto done;
-    }
-
-    if (!PyArg_ParseTuple(args, "OO", &session, &varlist))
-    {
-        goto done;
-    }
-
-    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
-    session_ctx = get_session_handle_from_capsule(sess_ptr);
-
-    if (!session_ctx)
-    {
-        goto done;
-    }
-
-    ss = session_ctx->handle;
-    invalid_oids = session_ctx->invalid_oids;
-    oid_arr = session_ctx->oid_arr;
-    str_buf = session_ctx->buf;
-    str_bufp = str_buf;
-    err_str = session_ctx->err_str;
-
-    snmp_version = py_netsnmp_attr_long(session, "version");
-
-    if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
-    {
-        goto done;
-    }
-
-    if (py_netsnmp_attr_long(session, "use_long_names"))
-    {
-        getlabel_flag |= USE_LONG_NAMES;
-    }
-    if (py_netsnmp_attr_long(session, "use_numeric"))
-    {
-        getlabel_flag |= USE_NUMERIC_OIDS;
-    }
-    if (py_netsnmp_attr_long(session, "use_enums"))
-    {
-        sprintval_flag = USE_ENUMS;
-    }
-    if (py_netsnmp_attr_long(session, "use_sprint_value"))
-    {
-        sprintval_flag = USE_SPRINT_VALUE;
-    }
-    best_guess = py_netsnmp_attr_long(session, "best_guess");
-    retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
-
-    pdu = snmp_pdu_create(SNMP_MSG_GET);
 
-    if (!varlist)
-    {
-        const char *err_msg = "unexpected error: varlist == null";
-        PyErr_SetString(PyExc_RuntimeError, err_msg);
-        error = 1;
-        goto done;
-    }
-
-    varlist_iter = PyObject_GetIter(varlist);
+    oid_arr = calloc(MAX_OID_LEN, sizeof(oid));
 
-    while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
+    if (oid_arr && args)
     {
-        if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
-            py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
-        {
-            oid_arr_len = 0;
-        }
-        else
-        {
-            tp = __tag2oid(tag, iid, oid_arr, &oid_arr_len, NULL,
-                           best_guess);
-        }
-
-        if (oid_arr_len)
-        {
-            snmp_add_null_var(pdu, oid_arr, oid_arr_len);
-            varlist_len++;
-        }
-        else
+        if (!PyArg_ParseTuple(args, "OiiO", &session, &nonrepeaters,
+                              &maxrepetitions, &varlist))
         {
-            PyErr_Format(TDSNMPUnknownObjectIDError,
-                         "unknown object id (%s)",
-                         (tag ? tag : "<null>"));
-            error = 1;
-            snmp_free_pdu(pdu);
-            Py_DECREF(varbind);
-            Py_DECREF(varlist_iter);
             goto done;
         }
 
-        /* release reference when done */
-        Py_DECREF(varbind);
-    }
-
-    Py_XDECREF(varlist_iter);
-
-    if (PyErr_Occurred())
-    {
-        error = 1;
-        snmp_free_pdu(pdu);
-        goto done;
-    }
-
-    if (snmp_version == 1)
-    {
-        bitarray_clear_bits(invalid_oids, (size_t) varlist_len);
-    }
-
-    status = __send_sync_pdu(ss, pdu, &response, retry_nosuch, err_str,
-                             &err_num, &err_ind, invalid_oids);
-
-    __py_netsnmp_update_session_errors(session, err_str, err_num, err_ind);
-    if (status != 0)
-    {
-        error = 1;
-        goto done;
-    }
-
-    /*
-     * Set up for numeric or full OID's, if necessary.  Save the old
-     * output format so that it can be restored when we finish -- this
-     * is a library-wide global, and has to be set/restored for each
-     * session.
-     */
-    old_format = netsnmp_ds_get_int(NETSNMP_DS_LIBRARY_ID,
-                                    NETSNMP_DS_LIB_OID_OUTPUT_FORMAT);
-
-    if (py_netsnmp_attr_long(session, "use_long_names"))
-    {
-        getlabel_flag |= USE_LONG_NAMES;
-
-        netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                           NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                           NETSNMP_OID_OUTPUT_FULL);
-    }
-    /*
-     * Setting use_numeric forces use_long_names on so check for
-     * use_numeric after use_long_names (above) to make sure the final
-     * outcome of NETSNMP_DS_LIB_OID_OUTPUT_FORMAT is
-     * NETSNMP_OID_OUTPUT_NUMERIC
-     */
-    if (py_netsnmp_attr_long(session, "use_numeric"))
-    {
-        getlabel_flag |= USE_LONG_NAMES;
-        getlabel_flag |= USE_NUMERIC_OIDS;
-
-        netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                           NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                           NETSNMP_OID_OUTPUT_NUMERIC);
-    }
-
-
-    /*
-     * In SNMPv1 we go through the response variables only if we know
-     * the varlist_ind is not set in the invalid_oids bit array.
-     * For bits that are set, we fix the input varbind so that it
-     * indicates NOSUCHNAME. For bits that are not set, we fill in the
-     * corresponding varbind and advance.
-     *
-     * In SNMPv2/v3 we simply fill the response variables against the
-     * original input Varbind list.
-     */
-    vars = (response ? response->variables : NULL);
-
-    for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
-    {
-        int no_such_name = 0;
-
-        if (snmp_version == 1)
+        if (varlist &&
+            (varbinds = PyObject_GetAttrString(varlist, "varbinds")))
         {
-            if (!vars)
-            {
-                /* if no more variables in response then remaining varbinds are invalid. */
-                no_such_name = 1;
-            }
-            else if (bitarray_test_bit(invalid_oids, varlist_ind))
+            sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+            session_ctx = get_session_handle_from_capsule(sess_ptr);
+
+            if (!session_ctx)
             {
-                /* oid is invalid */
-                no_such_name = 1;
+                error = 1;
+                goto done;
             }
-        }
-        else if (!vars)
-        {
-            /*
-             * sanity check for snmp v2/v3: no more varbinds to inspect;
-             * this should throw an exception.
-             */
-            py_log_msg(DEBUG,
-                       "netsnmp_get: response had less vars compared to varlist");
-            break;
-        }
+            __stats_begin(session_ctx);
 
-        varbind = PySequence_GetItem(varlist, varlist_ind);
+            ss = session_ctx->handle;
 
-        if (no_such_name)
-        {
-            if (!PyObject_HasAttrString(varbind, "oid"))
+            if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
             {
-                py_log_msg(DEBUG, "netsnmp_get: bad varbind (%d)",
-                           varlist_ind);
-                Py_XDECREF(varbind);
+                goto done;
             }
+            memcpy(&err_str, tmpstr, tmplen);
+            err_num = py_netsnmp_attr_long(session, "error_number");
+            err_ind = py_netsnmp_attr_long(session, "error_index");
 
-            py_netsnmp_attr_set_string(varbind, "snmp_type", "NOSUCHNAME",
-                                       strlen("NOSUCHNAME"));
+            best_guess = py_netsnmp_attr_long(session, "best_guess");
+            retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
 
-            py_netsnmp_attr_set_string(varbind, "value",
-                                       "NOSUCHNAME", strlen("NOSUCHNAME"));
+            pdu = snmp_pdu_create(SNMP_MSG_GETBULK);
 
-            Py_DECREF(varbind);
-        }
-        else if (PyObject_HasAttrString(varbind, "oid"))
-        {
-            size_t str_buf_len = sizeof(session_ctx->buf);
-            size_t out_len = 0;
+            pdu->errstat = nonrepeaters;
+            pdu->errindex = maxrepetitions;
 
-            *str_buf = '.';
-            *(str_buf + 1) = '\0';
-            out_len = 0;
-            tp = netsnmp_sprint_realloc_objid_tree(&str_bufp, &str_buf_len,
-                                                   &out_len, 0, &buf_over,
-                                                   vars->name,
-                                                   vars->name_length);
+            varbinds_iter = PyObject_GetIter(varbinds);
 
-            py_log_msg(DEBUG, "netsnmp_get: str_bufp: %s:%lu:%lu",
-                       str_bufp, str_buf_len, out_len);
+            while (varbinds_iter && (varbind = PyIter_Next(varbinds_iter)))
+            {
+                if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
+                    py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
+                {
+                    oid_arr_len = 0;
+                }
+                else
+                {
+                    __tag2oid_cached(tag, iid, oid_arr, &oid_arr_len, NULL,
+                                     best_guess);
+                }
 
-            /* clamp value */
-            str_buf[sizeof(session_ctx->buf) - 1] = '\0';
+                if (oid_arr_len)
+                {
+                    snmp_add_null_var(pdu, oid_arr, oid_arr_len);
+                }
+                else
+                {
+                    PyErr_Format(TDSNMPUnknownObjectIDError,
+                                 "unknown object id (%s)",
+                                 (tag ? tag : "<null>"));
+                    error = 1;
+                    snmp_free_pdu(pdu);
+                    Py_DECREF(varbind);
+                    Py_DECREF(varbinds_iter);
+                    goto done;
+                }
+                /* release reference when done */
+                Py_DECREF(varbind);
+            }
 
-            type = __translate_asn_type(vars->type);
+            Py_XDECREF(varbinds_iter);
 
-            if (__is_leaf(tp))
+            if (PyErr_Occurred())
             {
-                getlabel_flag &= ~NON_LEAF_NAME;
-                py_log_msg(DEBUG, "netsnmp_get: is_leaf: %d", tp->type);
+                error = 1;
+                snmp_free_pdu(pdu);
+                pdu = NULL;
+                goto done;
             }
-            else
+
+            status = __send_sync_pdu(session, ss, pdu, &response,
+                                     retry_nosuch, err_str, &err_num,
+                                     &err_ind, NULL);
+            __py_netsnmp_update_session_errors(session, err_str, err_num,
+                                               err_ind);
+            if (status != 0)
             {
-                getlabel_flag |= NON_LEAF_NAME;
-                py_log_msg(DEBUG, "netsnmp_get: !is_leaf: %d", tp->type);
+                error = 1;
+                if (response)
+                {
+                    snmp_free_pdu(response);
+                    response = NULL;
+                }
+                goto done;
             }
 
-            py_log_msg(DEBUG, "netsnmp_get: str_buf: %s", str_buf);
+            /*
+             * Numeric or full OIDs are formatted per variable by
+             * py_netsnmp_fill_varbind(), which never leaves the library-wide
+             * output format changed, so sessions may be used from any thread.
+             */
+            __py_netsnmp_session_flags(session, &getlabel_flag, &sprintval_flag);
+            if(response && response->variables)
+            {
+                /* clear varlist to receive response varbinds*/
+                PySequence_DelSlice(varbinds, 0, PySequence_Length(varbinds));
+
+                if (PyErr_Occurred())
+                {
+                    error = 1;
+                    snmp_free_pdu(pdu);
+                    pdu = NULL;
+                    if (response)
+                    {
+                        snmp_free_pdu(response);
+                        response = NULL;
+                    }
+                    goto done;
+                }
 
-            __get_label_iid((char *) str_buf, &tag, &iid, getlabel_flag);
+                for (vars = response->variables, varbind_ind=0;
+                     vars;
+                     vars = vars->next_variable, varbind_ind++)
+                {
 
-            py_netsnmp_attr_set_string(varbind, "oid", tag, STRLEN(tag));
-            py_netsnmp_attr_set_string(varbind, "oid_index", iid,
-                                       STRLEN(iid));
+                    varbind = py_netsnmp_build_varbind(vars, getlabel_flag,
+                                                       sprintval_flag, str_buf,
+                                                       sizeof(str_buf));
 
-            __get_type_str(type, type_str, 1);
+                    if (varbind)
+                    {
+                        /* push varbind onto varbinds */
+                        PyList_Append(varbinds, varbind);
+                    }
+                    else
+                    {
+                        PyObject *none = Py_BuildValue(""); /* new ref */
+                        /* not sure why making vabind failed - should not happen */
+                        PyList_Append(varbinds, none); /* increments ref */
+                        /* Return None for this variable. */
+                        Py_DECREF(none);
+                    }
 
-            py_netsnmp_attr_set_string(varbind, "snmp_type", type_str,
-                                       strlen(type_str));
+                    Py_XDECREF(varbind);
+                }
+            }
 
-            len = __snprint_value((char *) str_buf, sizeof(session_ctx->buf),
-                                  vars, tp, type, sprintval_flag);
-            str_buf[len] = '\0';
-            py_netsnmp_attr_set_string(varbind, "value",
-                                       (char *) str_buf, len);
+            if (response)
+            {
+                snmp_free_pdu(response);
+                response = NULL;
+            }
 
-            Py_DECREF(varbind);
-        }
-        else
-        {
-            py_log_msg(DEBUG, "netsnmp_get: bad varbind (%d)", varlist_ind);
-            Py_XDECREF(varbind);
+            //Py_DECREF(varbinds);
         }
 
-        /*
-         * in v1 this will only advance if the varbind index is valid;
-         * in v2/v3 no_such_name is always set to 0.
-         */
-        if (!no_such_name)
+        if (PyErr_Occurred())
         {
-            vars = vars->next_variable;
+            error = 1;
         }
     }
 
-    /* Reset the library's behavior for numeric/symbolic OID's. */
-    netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                       NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                       old_format);
-
 done:
+    __stats_end(session_ctx);
+    Py_XDECREF(varbinds);
     Py_XDECREF(sess_ptr);
-    if (response)
+    SAFE_FREE(oid_arr);
+    if (error)
     {
-        snmp_free_pdu(response);
-        response = NULL;
+        return NULL;
     }
+    return Py_None;
+}
 
-    if (error)
+static PyObject *netsnmp_bulkwalk(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *varlist = NULL;
+    int nonrepeaters;
+    int maxrepetitions;
+
+    if (!PyArg_ParseTuple(args, "OiiO", &session, &nonrepeaters,
+                          &maxrepetitions, &varlist))
     {
         return NULL;
     }
-    return Py_None;
+
+    py_log_msg(DEBUG, "netsnmp_bulkwalk: nonreps (%d) max_reps (%d)",
+               nonrepeaters, maxrepetitions);
+
+    if (__py_netsnmp_walk_varlist(session, SNMP_MSG_GETBULK, nonrepeaters,
+                                  maxrepetitions, varlist) < 0)
+    {
+        return NULL;
+    }
+    Py_RETURN_NONE;
 }
 
-static PyObject *netsnmp_getnext(PyObject *self, PyObject *args)
+static PyObject *netsnmp_set(PyObject *self, PyObject *args)
 {
     PyObject *session = NULL;
     PyObject *sess_ptr = NULL;
-    PyObject *varlist;
-    PyObject *varbind;
-    int varlist_len = 0;
-    int varlist_ind;
+    PyObject *varlist = NULL;
+    PyObject *varbind = NULL;
+    PyObject *ret = NULL;
     struct session_capsule_ctx *session_ctx = NULL;
-    netsnmp_session *ss;
+    netsnmp_session *ss = NULL;
     netsnmp_pdu *pdu = NULL;
     netsnmp_pdu *response = NULL;
-    netsnmp_variable_list *vars;
-    struct tree *tp;
+    struct tree *tp = NULL;
+    char *tag = NULL;
+    char *iid = NULL;
+    char *val = NULL;
+    char *type_str;
     int len;
-    oid *oid_arr;
+    oid *oid_arr = calloc(MAX_OID_LEN, sizeof(oid));
     int oid_arr_len = MAX_OID_LEN;
     int type;
-    char type_str[MAX_TYPE_NAME_LEN];
-    int status;
-    u_char str_buf[STR_BUF_SIZE];
-    u_char *str_bufp = str_buf;
-    size_t str_buf_len = sizeof(str_buf);
-    size_t out_len = 0;
-    int buf_over = 0;
-    char *tag;
-    char *iid = NULL;
-    int getlabel_flag = NO_FLAGS;
-    int sprintval_flag = USE_BASIC;
-    int old_format;
+    u_char tmp_val_str[STR_BUF_SIZE];
+    int use_enums;
+    struct enum_list *ep = NULL;
     int best_guess;
-    int retry_nosuch;
+    int status;
     int err_ind;
     int err_num;
     char err_str[STR_BUF_SIZE];
-    char *tmpstr;
+    char *tmpstr = NULL;
     Py_ssize_t tmplen;
     int error = 0;
-    unsigned long snmp_version = 0;
-
-    BITARRAY_DECLARE(snmpv1_invalid_oids, DEFAULT_NUM_BAD_OIDS);
-    bitarray *invalid_oids = snmpv1_invalid_oids;
-
-    oid_arr = calloc(MAX_OID_LEN, sizeof(oid));
 
     if (oid_arr && args)
     {
@@ -2288,79 +3976,124 @@ static PyObject *netsnmp_getnext(PyObject *self, PyObject *args)
 
         if (!session_ctx)
         {
+            error = 1;
             goto done;
         }
+        __stats_begin(session_ctx);
 
         ss = session_ctx->handle;
 
-        snmp_version = py_netsnmp_attr_long(session, "version");
-
+        /* PyObject_SetAttrString(); */
         if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
         {
             goto done;
         }
-        memcpy(&err_str, tmpstr, tmplen);
-        err_num = py_netsnmp_attr_long(session, "error_number");
-        err_ind = py_netsnmp_attr_long(session, "error_index");
 
-        if (py_netsnmp_attr_long(session, "use_long_names"))
-        {
-            getlabel_flag |= USE_LONG_NAMES;
-        }
-        if (py_netsnmp_attr_long(session, "use_numeric"))
-        {
-            getlabel_flag |= USE_NUMERIC_OIDS;
-        }
-        if (py_netsnmp_attr_long(session, "use_enums"))
-        {
-            sprintval_flag = USE_ENUMS;
-        }
-        if (py_netsnmp_attr_long(session, "use_sprint_value"))
-        {
-            sprintval_flag = USE_SPRINT_VALUE;
-        }
+        use_enums = py_netsnmp_attr_long(session, "use_enums");
+
         best_guess = py_netsnmp_attr_long(session, "best_guess");
-        retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
 
-        pdu = snmp_pdu_create(SNMP_MSG_GETNEXT);
+        pdu = snmp_pdu_create(SNMP_MSG_SET);
 
         if (varlist)
         {
             PyObject *varlist_iter = PyObject_GetIter(varlist);
 
-            while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
-            {
-                if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
-                    py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
+            while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
+            {
+                if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
+                    py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
+                {
+                    oid_arr_len = 0;
+                }
+                else
+                {
+                    tp = __tag2oid_cached(tag, iid, oid_arr, &oid_arr_len,
+                                          &type, best_guess);
+                }
+
+                if (oid_arr_len == 0)
+                {
+                    PyErr_Format(TDSNMPUnknownObjectIDError,
+                                 "unknown object id (%s)",
+                                 (tag ? tag : "<null>"));
+                    error = 1;
+                    snmp_free_pdu(pdu);
+                    pdu = NULL;
+                    Py_DECREF(varbind);
+                    Py_DECREF(varlist_iter);
+                    goto done;
+                }
+
+                if (type == TYPE_UNKNOWN)
+                {
+                    if (py_netsnmp_attr_string(varbind, "snmp_type", &type_str, NULL) < 0)
+                    {
+                        /**
+                         * NoneType error returned if this is not included.
+                         * Not sure why original author did not raise an error
+                         * here before. Keep an eye out for edge cases!
+                         */
+                        PyErr_SetString(TDSNMPUndeterminedTypeError,
+                                        "a type could not be determine for "
+                                        "the object");
+                        error = 1;
+                        snmp_free_pdu(pdu);
+                        pdu = NULL;
+                        Py_DECREF(varbind);
+                        Py_DECREF(varlist_iter);
+                        goto done;
+                    }
+                    type = __translate_appl_type(type_str);
+                    if (type == TYPE_UNKNOWN)
+                    {
+                        PyErr_SetString(TDSNMPUndeterminedTypeError,
+                                        "a type could not be determine for "
+                                        "the object");
+                        error = 1;
+                        snmp_free_pdu(pdu);
+                        pdu = NULL;
+                        Py_DECREF(varbind);
+                        Py_DECREF(varlist_iter);
+                        goto done;
+                    }
+                }
+
+                if (py_netsnmp_attr_string(varbind, "value", &val, &tmplen) < 0)
                 {
-                    oid_arr_len = 0;
+                    snmp_free_pdu(pdu);
+                    pdu = NULL;
+                    Py_DECREF(varbind);
+                    Py_DECREF(varlist_iter);
+                    goto done;
                 }
-                else
+                memset(tmp_val_str, 0, sizeof(tmp_val_str));
+                if (tmplen >= sizeof(tmp_val_str))
                 {
-                    tp = __tag2oid(tag, iid, oid_arr, &oid_arr_len, NULL,
-                                   best_guess);
+                    tmplen = sizeof(tmp_val_str) - 1;
                 }
-
-                py_log_msg(DEBUG,
-                           "netsnmp_getnext: filling request: %s:%s:%d:%d",
-                           tag, iid, oid_arr_len, best_guess);
-
-                if (oid_arr_len)
+                memcpy(tmp_val_str, val, tmplen);
+                if (type == TYPE_INTEGER && use_enums && tp && tp->enums)
                 {
-                    snmp_add_null_var(pdu, oid_arr, oid_arr_len);
-                    varlist_len++;
+                    for (ep = tp->enums; ep; ep = ep->next)
+                    {
+                        if (val && !strcmp(ep->label, val))
+                        {
+                            snprintf((char *) tmp_val_str, sizeof(tmp_val_str),
+                                     "%d", ep->value);
+                            break;
+                        }
+                    }
                 }
-                else
+                len = (int)tmplen;
+                status = __add_var_val_str(pdu, oid_arr, oid_arr_len,
+                                           (char *) tmp_val_str, len, type);
+
+                if (status == FAILURE)
                 {
-                    PyErr_Format(TDSNMPUnknownObjectIDError,
-                                 "unknown object id (%s)",
-                                 (tag ? tag : "<null>"));
-                    error = 1;
-                    snmp_free_pdu(pdu);
-                    Py_DECREF(varbind);
-                    Py_DECREF(varlist_iter);
-                    goto done;
+                    py_log_msg(ERROR, "set: adding variable/value to PDU");
                 }
+
                 /* release reference when done */
                 Py_DECREF(varbind);
             }
@@ -2371,1596 +4104,2181 @@ static PyObject *netsnmp_getnext(PyObject *self, PyObject *args)
             {
                 error = 1;
                 snmp_free_pdu(pdu);
+                pdu = NULL;
                 goto done;
             }
         }
 
-        /* if we cannot represent the number of bad oids, we will need to resize. */
-        if (snmp_version == 1 && DEFAULT_NUM_BAD_OIDS < varlist_len)
-        {
-            invalid_oids = bitarray_calloc(varlist_len);
+        status = __send_sync_pdu(session, ss, pdu, &response,
+                                 NO_RETRY_NOSUCH, err_str, &err_num,
+                                 &err_ind, NULL);
+        __py_netsnmp_update_session_errors(session, err_str, err_num, err_ind);
 
-            if (!invalid_oids)
-            {
-                error = 1;
-                snmp_free_pdu(pdu);
-                const char *err_msg = "failed to call bitarray_calloc";
-                PyErr_SetString(PyExc_RuntimeError, err_msg);
-                goto done;
-            }
+        if (response)
+        {
+            snmp_free_pdu(response);
+            response = NULL;
         }
 
-        status = __send_sync_pdu(ss, pdu, &response, retry_nosuch, err_str,
-                                 &err_num, &err_ind, invalid_oids);
-
-        __py_netsnmp_update_session_errors(session, err_str, err_num, err_ind);
         if (status != 0)
         {
             error = 1;
             goto done;
         }
 
-        /*
-        ** Set up for numeric or full OID's, if necessary.  Save the old
-        ** output format so that it can be restored when we finish -- this
-        ** is a library-wide global, and has to be set/restored for each
-        ** session.
-        */
-        old_format = netsnmp_ds_get_int(NETSNMP_DS_LIBRARY_ID,
-                                        NETSNMP_DS_LIB_OID_OUTPUT_FORMAT);
-
-        if (py_netsnmp_attr_long(session, "use_long_names"))
+        if (status == STAT_SUCCESS)
         {
-            getlabel_flag |= USE_LONG_NAMES;
-
-            netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                               NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                               NETSNMP_OID_OUTPUT_FULL);
+            ret = Py_BuildValue("i", 1); /* success, return True */
         }
-        /* Setting use_numeric forces use_long_names on so check for
-           use_numeric after use_long_names (above) to make sure the final
-           outcome of NETSNMP_DS_LIB_OID_OUTPUT_FORMAT is
-           NETSNMP_OID_OUTPUT_NUMERIC */
-        if (py_netsnmp_attr_long(session, "use_numeric"))
+        else
         {
-            getlabel_flag |= USE_LONG_NAMES;
-            getlabel_flag |= USE_NUMERIC_OIDS;
-
-            netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                               NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                               NETSNMP_OID_OUTPUT_NUMERIC);
+            ret = Py_BuildValue("i", 0); /* fail, return False */
         }
+    }
 
-        /*
-         * In SNMPv1 we go through the response variables only if we know
-         * the varlist_ind is not set in the invalid_oids bit array.
-         * For bits that are set, we fix the input varbind so that it
-         * indicates NOSUCHNAME. For bits that are not set, we fill in the
-         * corresponding varbind and advance.
-         *
-         * In SNMPv2/v3 we simply fill the response variables against the
-         * original input Varbind list.
-         */
-        vars = (response ? response->variables : NULL);
+done:
+    __stats_end(session_ctx);
+    Py_XDECREF(sess_ptr);
+    SAFE_FREE(oid_arr);
+    if (error)
+    {
+        return NULL;
+    }
+    return (ret ? ret : Py_BuildValue(""));
+}
 
-        for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
+/*
+ * Read the OID/value formatting options from the python session object.
+ */
+static void __py_netsnmp_session_flags(PyObject *session, int *getlabel_flag,
+                                       int *sprintval_flag)
+{
+    *getlabel_flag = NO_FLAGS;
+    *sprintval_flag = USE_BASIC;
+
+    if (py_netsnmp_attr_long(session, "use_long_names"))
+    {
+        *getlabel_flag |= USE_LONG_NAMES;
+    }
+    if (py_netsnmp_attr_long(session, "use_numeric"))
+    {
+        /* use_numeric forces use_long_names on */
+        *getlabel_flag |= USE_LONG_NAMES;
+        *getlabel_flag |= USE_NUMERIC_OIDS;
+    }
+    if (py_netsnmp_attr_long(session, "use_enums"))
+    {
+        *sprintval_flag = USE_ENUMS;
+    }
+    if (py_netsnmp_attr_long(session, "use_sprint_value"))
+    {
+        *sprintval_flag = USE_SPRINT_VALUE;
+    }
+    if (py_netsnmp_attr_long(session, "typed_values"))
+    {
+        *sprintval_flag = USE_TYPED_VALUES;
+    }
+    if (py_netsnmp_attr_long(session, "raw_octet_strings"))
+    {
+        *sprintval_flag |= RAW_OCTET_STRINGS;
+    }
+}
+
+/*
+ * Returns a new tuple of integers holding the sub-identifiers of an OID.
+ */
+static PyObject *py_netsnmp_oid_tuple(oid *name, size_t name_length)
+{
+    PyObject *oid_tuple;
+    PyObject *subid;
+    size_t i;
+
+    if (!(oid_tuple = PyTuple_New(name_length)))
+    {
+        return NULL;
+    }
+    for (i = 0; i < name_length; i++)
+    {
+        if (!(subid = PyLong_FromUnsignedLong(name[i])))
         {
-            int no_such_name = 0;
+            Py_DECREF(oid_tuple);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(oid_tuple, i, subid);
+    }
+    return oid_tuple;
+}
 
-            if (snmp_version == 1)
+/*
+ * Returns a new Python object holding the value of a response variable,
+ * read straight from its value union rather than formatted: an int for the
+ * integer, counter, gauge and timeticks types, bytes for the string types
+ * (IpAddress included, in network order), a tuple of integers for OBJECT
+ * IDENTIFIER values, a float for opaque floats and None for the rest.
+ */
+static PyObject *py_netsnmp_typed_value(netsnmp_variable_list *vars)
+{
+    switch (vars->type)
+    {
+        case ASN_INTEGER:
+            return PyLong_FromLong(*vars->val.integer);
+
+        case ASN_GAUGE:
+        case ASN_COUNTER:
+        case ASN_TIMETICKS:
+        case ASN_UINTEGER:
+            return PyLong_FromUnsignedLong(
+                (unsigned long) *vars->val.integer & 0xffffffffUL);
+
+        case ASN_COUNTER64:
+#ifdef OPAQUE_SPECIAL_TYPES
+        case ASN_OPAQUE_COUNTER64:
+        case ASN_OPAQUE_U64:
+#endif
+            return PyLong_FromUnsignedLongLong(
+                ((unsigned long long) (vars->val.counter64->high &
+                                       0xffffffffUL) << 32) |
+                (vars->val.counter64->low & 0xffffffffUL));
+
+#ifdef OPAQUE_SPECIAL_TYPES
+        case ASN_OPAQUE_I64:
+            return PyLong_FromLongLong((long long) (
+                ((unsigned long long) (vars->val.counter64->high &
+                                       0xffffffffUL) << 32) |
+                (vars->val.counter64->low & 0xffffffffUL)));
+
+        case ASN_OPAQUE_FLOAT:
+            if (vars->val.floatVal)
             {
-                /* check if oid is invalid */
-                if (bitarray_test_bit(invalid_oids, varlist_ind))
-                {
-                    no_such_name = 1;
-                }
+                return PyFloat_FromDouble(*vars->val.floatVal);
             }
-            else if (!vars)
+            break;
+
+        case ASN_OPAQUE_DOUBLE:
+            if (vars->val.doubleVal)
             {
-                /*
-                 * no more varbinds to inspect
-                 * (this will only happen if no response is received from SNMP.
-                 */
-                break;
+                return PyFloat_FromDouble(*vars->val.doubleVal);
             }
+            break;
+#endif
 
-            varbind = PySequence_GetItem(varlist, varlist_ind);
+        case ASN_OCTET_STR:
+        case ASN_OPAQUE:
+        case ASN_IPADDRESS:
+        case ASN_BIT_STR:
+        case ASN_NSAP:
+            return PyBytes_FromStringAndSize((char *) vars->val.string,
+                                             vars->val_len);
 
-            if (!no_such_name && PyObject_HasAttrString(varbind, "oid"))
-            {
-                *str_buf = '.';
-                *(str_buf + 1) = '\0';
-                out_len = 0;
-                tp = netsnmp_sprint_realloc_objid_tree(&str_bufp, &str_buf_len,
-                                                       &out_len, 0, &buf_over,
-                                                       vars->name,
-                                                       vars->name_length);
-                str_buf[sizeof(str_buf) - 1] = '\0';
-
-                type = __translate_asn_type(vars->type);
-
-                if (__is_leaf(tp))
-                {
-                    getlabel_flag &= ~NON_LEAF_NAME;
-                    py_log_msg(DEBUG, "netsnmp_getnext: is_leaf: %d", tp->type);
-                }
-                else
-                {
-                    getlabel_flag |= NON_LEAF_NAME;
-                    py_log_msg(DEBUG, "netsnmp_getnext: !is_leaf: %d", tp->type);
-                }
+        case ASN_OBJECT_ID:
+            return py_netsnmp_oid_tuple(vars->val.objid,
+                                        vars->val_len / sizeof(oid));
 
-                py_log_msg(DEBUG, "netsnmp_getnext: str_buf: %s", str_buf);
+        default:
+            break;
+    }
+    Py_RETURN_NONE;
+}
 
-                __get_label_iid((char *) str_buf, &tag, &iid, getlabel_flag);
+/*
+ * Format the name and the value of a response variable with the OID output
+ * format matching getlabel_flag.
+ *
+ * NETSNMP_DS_LIB_OID_OUTPUT_FORMAT is a library-wide global, so it is only
+ * switched for the duration of the net-snmp formatting calls and restored
+ * before returning. Nothing in between calls back into Python, so no other
+ * thread can observe the switched format: the GIL is held throughout and is
+ * only handed over while executing Python code or in __send_sync_pdu().
+ *
+ * The name is formatted into name_buf (name_buf_size bytes) and tag/iid
+ * point into it; the value is formatted into val_buf unless it is NULL.
+ * Returns the tree node of the name.
+ */
+static struct tree *__sprint_varbind(netsnmp_variable_list *vars,
+                                     int getlabel_flag, int sprintval_flag,
+                                     u_char *name_buf, size_t name_buf_size,
+                                     char **tag, char **iid,
+                                     u_char *val_buf, size_t val_buf_size,
+                                     int *val_len)
+{
+    struct tree *tp;
+    u_char *name_bufp = name_buf;
+    size_t out_len = 0;
+    int buf_over = 0;
+    int old_format = 0;
+    int new_format = 0;
+    int type;
+    int format_value;
 
-                py_log_msg(DEBUG, "netsnmp_getnext: filling response: %s:%s",
-                           tag, iid);
+    if (getlabel_flag & USE_NUMERIC_OIDS)
+    {
+        new_format = NETSNMP_OID_OUTPUT_NUMERIC;
+    }
+    else if (getlabel_flag & USE_LONG_NAMES)
+    {
+        new_format = NETSNMP_OID_OUTPUT_FULL;
+    }
 
-                py_netsnmp_attr_set_string(varbind, "oid", tag, STRLEN(tag));
-                py_netsnmp_attr_set_string(varbind, "oid_index", iid,
-                                           STRLEN(iid));
+    /* only OBJECT IDENTIFIER values and snprint_value() depend on it */
+    sprintval_flag = VALUE_FORMAT(sprintval_flag);
+    format_value = (val_buf && (sprintval_flag == USE_SPRINT_VALUE ||
+                                vars->type == ASN_OBJECT_ID));
 
-                __get_type_str(type, type_str, 1);
+    __mibs_init();
 
-                py_netsnmp_attr_set_string(varbind, "snmp_type", type_str,
-                                           strlen(type_str));
+    if (new_format)
+    {
+        old_format = netsnmp_ds_get_int(NETSNMP_DS_LIBRARY_ID,
+                                        NETSNMP_DS_LIB_OID_OUTPUT_FORMAT);
+        netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
+                           NETSNMP_DS_LIB_OID_OUTPUT_FORMAT, new_format);
+    }
 
-                len = __snprint_value((char *) str_buf, sizeof(str_buf),
-                                      vars, tp, type, sprintval_flag);
-                str_buf[len] = '\0';
+    name_buf[0] = '.';
+    name_buf[1] = '\0';
+    tp = netsnmp_sprint_realloc_objid_tree(&name_bufp, &name_buf_size,
+                                           &out_len, 0, &buf_over,
+                                           vars->name, vars->name_length);
+    name_buf[name_buf_size - 1] = '\0';
 
-                py_netsnmp_attr_set_string(varbind, "value", (char *) str_buf,
-                                           len);
-            }
-            else if (no_such_name)
-            {
-                if (!PyObject_HasAttrString(varbind, "oid"))
-                {
-                    py_log_msg(DEBUG, "netsnmp_get: bad varbind (%d)",
-                               varlist_ind);
-                    //Py_XDECREF(varbind); /* Double decref? */
-                }
+    type = __translate_asn_type(vars->type);
+    if (format_value)
+    {
+        *val_len = __snprint_value((char *) val_buf, val_buf_size, vars, tp,
+                                   type, sprintval_flag);
+    }
+
+    if (new_format)
+    {
+        netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
+                           NETSNMP_DS_LIB_OID_OUTPUT_FORMAT, old_format);
+    }
+
+    if (val_buf)
+    {
+        if (!format_value)
+        {
+            *val_len = __snprint_value((char *) val_buf, val_buf_size, vars,
+                                       tp, type, sprintval_flag);
+        }
+        if (*val_len >= val_buf_size)
+        {
+            *val_len = val_buf_size - 1;
+        }
+        val_buf[*val_len] = '\0';
+    }
+
+    if (__is_leaf(tp))
+    {
+        getlabel_flag &= ~NON_LEAF_NAME;
+    }
+    else
+    {
+        getlabel_flag |= NON_LEAF_NAME;
+    }
+    __get_label_iid((char *) name_buf, tag, iid, getlabel_flag);
+
+    return tp;
+}
+
+/*
+ * Whether the value of a response variable is read straight from it with
+ * py_netsnmp_typed_value() rather than formatted: with typed_values, and
+ * for OCTET STRING values with raw_octet_strings, which become bytes built
+ * from the value and its length without going through a buffer.
+ */
+static int __typed_value(netsnmp_variable_list *vars, int sprintval_flag)
+{
+    return (VALUE_FORMAT(sprintval_flag) == USE_TYPED_VALUES ||
+            ((sprintval_flag & RAW_OCTET_STRINGS) &&
+             vars->type == ASN_OCTET_STR));
+}
+
+/*
+ * Fill in the oid, oid_index, snmp_type and value of an SNMPVariable from a
+ * response variable.
+ *
+ * str_buf is scratch space of str_buf_size bytes which is overwritten.
+ * Returns -1 with an exception set on failure.
+ */
+static int py_netsnmp_fill_varbind(PyObject *varbind,
+                                   netsnmp_variable_list *vars,
+                                   int getlabel_flag, int sprintval_flag,
+                                   u_char *str_buf, size_t str_buf_size)
+{
+    u_char name_buf[STR_BUF_SIZE];
+    char *tag;
+    char *iid;
+    int len;
+    int typed = __typed_value(vars, sprintval_flag);
+    char type_str[MAX_TYPE_NAME_LEN];
+    PyObject *value;
+    int ret = -1;
+    struct session_capsule_ctx *op = __stats_current();
+    double mark = __stats_mark(op);
 
-                py_netsnmp_attr_set_string(varbind, "snmp_type", "NOSUCHNAME",
-                                           strlen("NOSUCHNAME"));
+    /* typed values are read from the variable, so nothing is formatted */
+    __sprint_varbind(vars, getlabel_flag, sprintval_flag, name_buf,
+                     sizeof(name_buf), &tag, &iid,
+                     (typed ? NULL : str_buf), str_buf_size, &len);
 
-                py_netsnmp_attr_set_string(varbind, "value",
-                                           "NOSUCHNAME", strlen("NOSUCHNAME"));
-            }
-            else
-            {
-                py_log_msg(DEBUG, "netsnmp_getnext: bad varbind (%d)",
-                           varlist_ind);
-            }
-            Py_XDECREF(varbind);
-            /*
-             * in v1 this will only advance if the varbind index is valid;
-             * in v2/v3 no_such_name is always set to 0.
-             */
-            if (!no_such_name)
-            {
-                vars = vars->next_variable;
-            }
-        }
+    __get_type_str(__translate_asn_type(vars->type), type_str, 1);
+    __stats_lap(op, TIMING_FORMAT, &mark);
 
-        /* Reset the library's behavior for numeric/symbolic OID's. */
-        netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                           NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                           old_format);
+    if (py_netsnmp_varbind_set(varbind, VARBIND_OID, tag, STRLEN(tag)) < 0 ||
+        py_netsnmp_varbind_set(varbind, VARBIND_OID_INDEX, iid,
+                               STRLEN(iid)) < 0 ||
+        py_netsnmp_varbind_set(varbind, VARBIND_SNMP_TYPE, type_str,
+                               strlen(type_str)) < 0)
+    {
+        goto done;
+    }
+
+    if (!typed)
+    {
+        ret = py_netsnmp_varbind_set(varbind, VARBIND_VALUE,
+                                     (char *) str_buf, len);
+    }
+    else if ((value = py_netsnmp_typed_value(vars)))
+    {
+        ret = PyObject_GenericSetAttr(varbind,
+                                      VarbindAttrNames[VARBIND_VALUE], value);
+        Py_DECREF(value);
     }
 
 done:
-    Py_XDECREF(sess_ptr);
-    /* the pointers will be equal if we didn't allocate additional space */
-    if (invalid_oids != snmpv1_invalid_oids)
+    __stats_lap(op, TIMING_OBJECTS, &mark);
+    if (op)
     {
-        bitarray_free(invalid_oids);
+        op->stats.varbinds++;
     }
+    return ret;
+}
 
-    SAFE_FREE(oid_arr);
-    if (response)
+/*
+ * Returns a new SNMPVariable filled in from a response variable.
+ *
+ * str_buf is scratch space of str_buf_size bytes which is overwritten.
+ */
+static PyObject *py_netsnmp_build_varbind(netsnmp_variable_list *vars,
+                                          int getlabel_flag,
+                                          int sprintval_flag,
+                                          u_char *str_buf,
+                                          size_t str_buf_size)
+{
+    PyObject *varbind;
+
+    if (!(varbind = py_netsnmp_construct_varbind()))
     {
-        snmp_free_pdu(response);
-        response = NULL;
+        return NULL;
     }
-    if (error)
+
+    if (py_netsnmp_fill_varbind(varbind, vars, getlabel_flag, sprintval_flag,
+                                str_buf, str_buf_size) < 0)
     {
+        Py_DECREF(varbind);
         return NULL;
     }
-    return Py_None;
+    return varbind;
 }
 
-static PyObject *netsnmp_walk(PyObject *self, PyObject *args)
+/*
+ * Build a request PDU of the given command from a list of SNMPVariable
+ * objects; for SET requests the value and snmp_type of each variable are
+ * used, otherwise null variables are added.
+ *
+ * Returns NULL and raises an exception on failure.
+ */
+static netsnmp_pdu *__py_netsnmp_build_pdu(PyObject *session,
+                                           struct session_capsule_ctx *ctx,
+                                           int command, PyObject *varlist)
 {
-    PyObject *session = NULL;
-    PyObject *sess_ptr = NULL;
-    PyObject *varlist = NULL;
     PyObject *varlist_iter;
     PyObject *varbind;
-    PyObject *varbinds  = NULL;
-    int varlist_len = 0;
-    int varlist_ind;
-    struct session_capsule_ctx *session_ctx = NULL;
-    netsnmp_session *ss;
-    netsnmp_pdu *pdu = NULL;
-    netsnmp_pdu *response = NULL;
-    /*
-    ** Variable `oldvars` does not appear to fufill any immediate purpose and
-    ** causes segfaults in some cases, especially when running against OID '.1'
-    ** For legacy reasons, however, we will only leave it commented out, should
-    ** we find that it was only partially implemented or actually served a purpose
-    ** somewhere in the Net-SNMP library
-    */
-    netsnmp_variable_list *vars;//, *oldvars;
-    struct tree *tp;
-    int len;
-    oid **oid_arr = NULL;
-    int *oid_arr_len = NULL;
-    oid **oid_arr_broken_check = NULL;
-    int *oid_arr_broken_check_len = NULL;
-    int type;
-    char type_str[MAX_TYPE_NAME_LEN];
-    int status;
-    u_char str_buf[STR_BUF_SIZE];
-    u_char *str_bufp = str_buf;
-    size_t str_buf_len = sizeof(str_buf);
-    size_t out_len = 0;
-    int buf_over = 0;
-    char *tag;
+    netsnmp_pdu *pdu;
+    struct tree *tp = NULL;
+    struct enum_list *ep;
+    char *tag = NULL;
     char *iid = NULL;
-    int getlabel_flag = NO_FLAGS;
-    int sprintval_flag = USE_BASIC;
-    int old_format;
+    char *val = NULL;
+    char *type_str = NULL;
+    u_char tmp_val_str[STR_BUF_SIZE];
+    int oid_arr_len = 0;
+    int type = TYPE_UNKNOWN;
     int best_guess;
-    int retry_nosuch;
-    int err_ind;
-    int err_num;
-    char err_str[STR_BUF_SIZE];
-    int notdone = 1;
-    char *tmpstr;
+    int use_enums;
     Py_ssize_t tmplen;
-    int error = 0;
 
-    if (args)
+    best_guess = py_netsnmp_attr_long(session, "best_guess");
+    use_enums = py_netsnmp_attr_long(session, "use_enums");
+
+    if (!(varlist_iter = PyObject_GetIter(varlist)))
     {
-        if (!PyArg_ParseTuple(args, "OO", &session, &varlist))
+        return NULL;
+    }
+
+    pdu = snmp_pdu_create(command);
+
+    while ((varbind = PyIter_Next(varlist_iter)))
+    {
+        if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
+            py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
         {
-            goto done;
+            oid_arr_len = 0;
         }
-
-        if (!varlist)
+        else
         {
-            goto done;
+            tp = __tag2oid_cached(tag, iid, ctx->oid_arr, &oid_arr_len,
+                                  &type, best_guess);
         }
 
-        if ((varbinds = PyObject_GetAttrString(varlist, "varbinds")) == NULL)
+        if (!oid_arr_len)
         {
-            goto done;
+            PyErr_Format(TDSNMPUnknownObjectIDError, "unknown object id (%s)",
+                         (tag ? tag : "<null>"));
+            goto error;
         }
-        sess_ptr = PyObject_GetAttrString(session, "session_ptr");
-        session_ctx = get_session_handle_from_capsule(sess_ptr);
 
-        if (!session_ctx)
+        if (command != SNMP_MSG_SET)
         {
-            goto done;
+            snmp_add_null_var(pdu, ctx->oid_arr, oid_arr_len);
+            Py_DECREF(varbind);
+            continue;
         }
 
-        ss = session_ctx->handle;
-
-        if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
+        if (type == TYPE_UNKNOWN)
         {
-            goto done;
+            if (py_netsnmp_attr_string(varbind, "snmp_type", &type_str,
+                                       NULL) < 0 ||
+                (type = __translate_appl_type(type_str)) == TYPE_UNKNOWN)
+            {
+                PyErr_SetString(TDSNMPUndeterminedTypeError,
+                                "a type could not be determine for "
+                                "the object");
+                goto error;
+            }
         }
-        memcpy(&err_str, tmpstr, tmplen);
-        err_num = py_netsnmp_attr_long(session, "error_number");
-        err_ind = py_netsnmp_attr_long(session, "error_index");
 
-        if (py_netsnmp_attr_long(session, "use_long_names"))
+        if (py_netsnmp_attr_string(varbind, "value", &val, &tmplen) < 0)
         {
-            getlabel_flag |= USE_LONG_NAMES;
+            goto error;
         }
-        if (py_netsnmp_attr_long(session, "use_numeric"))
+        memset(tmp_val_str, 0, sizeof(tmp_val_str));
+        if (tmplen >= sizeof(tmp_val_str))
         {
-            getlabel_flag |= USE_NUMERIC_OIDS;
+            tmplen = sizeof(tmp_val_str) - 1;
         }
-        if (py_netsnmp_attr_long(session, "use_enums"))
+        memcpy(tmp_val_str, val, tmplen);
+        if (type == TYPE_INTEGER && use_enums && tp && tp->enums)
         {
-            sprintval_flag = USE_ENUMS;
+            for (ep = tp->enums; ep; ep = ep->next)
+            {
+                if (val && !strcmp(ep->label, val))
+                {
+                    snprintf((char *) tmp_val_str, sizeof(tmp_val_str),
+                             "%d", ep->value);
+                    break;
+                }
+            }
         }
-        if (py_netsnmp_attr_long(session, "use_sprint_value"))
+        if (__add_var_val_str(pdu, ctx->oid_arr, oid_arr_len,
+                              (char *) tmp_val_str, (int) tmplen,
+                              type) == FAILURE)
         {
-            sprintval_flag = USE_SPRINT_VALUE;
+            py_log_msg(ERROR, "async_send: adding variable/value to PDU");
         }
-        best_guess = py_netsnmp_attr_long(session, "best_guess");
-        retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
+        Py_DECREF(varbind);
+    }
 
-        pdu = snmp_pdu_create(SNMP_MSG_GETNEXT);
+    Py_DECREF(varlist_iter);
+
+    if (PyErr_Occurred())
+    {
+        snmp_free_pdu(pdu);
+        return NULL;
+    }
+    return pdu;
+
+error:
+    Py_DECREF(varbind);
+    Py_DECREF(varlist_iter);
+    snmp_free_pdu(pdu);
+    return NULL;
+}
+
+/*
+ * Called by net-snmp from within snmp_sess_read() and snmp_sess_timeout()
+ * when a request sent by netsnmp_async_send() completes; the outcome is
+ * queued on the session context for netsnmp_async_poll().
+ */
+static int __async_callback(int op, netsnmp_session *sp, int reqid,
+                            netsnmp_pdu *pdu, void *magic)
+{
+    struct session_capsule_ctx *ctx = magic;
+    struct async_response *resp;
+
+    if (!(resp = calloc(1, sizeof *resp)))
+    {
+        return 1;
+    }
+    resp->reqid = reqid;
 
-        /* we need an initial count for memory allocation */
-        varlist_iter = PyObject_GetIter(varlist);
-        varlist_len = 0;
-        while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
+    if (op == NETSNMP_CALLBACK_OP_RECEIVED_MESSAGE && pdu)
+    {
+        if (pdu->command == SNMP_MSG_REPORT)
         {
-            varlist_len++;
-            Py_DECREF(varbind);
+            resp->status = STAT_ERROR;
+            resp->report_type = snmpv3_get_report_type(pdu);
+        }
+        else
+        {
+            /* net-snmp frees the PDU once we return */
+            resp->pdu = snmp_clone_pdu(pdu);
+            resp->status = resp->pdu ? STAT_SUCCESS : STAT_ERROR;
+            resp->report_type = SNMPERR_GENERR;
         }
-        Py_XDECREF(varlist_iter);
+    }
+    else if (op == NETSNMP_CALLBACK_OP_TIMED_OUT)
+    {
+        resp->status = STAT_TIMEOUT;
+    }
+    else
+    {
+        resp->status = STAT_ERROR;
+        resp->report_type = SNMPERR_GENERR;
+    }
 
-        oid_arr_len              = calloc(varlist_len, sizeof(int));
-        oid_arr_broken_check_len = calloc(varlist_len, sizeof(int));
+    if (ctx->async_tail)
+    {
+        ctx->async_tail->next = resp;
+    }
+    else
+    {
+        ctx->async_head = resp;
+    }
+    ctx->async_tail = resp;
 
-        oid_arr                  = calloc(varlist_len, sizeof(oid *));
-        oid_arr_broken_check     = calloc(varlist_len, sizeof(oid *));
+    return 1;
+}
 
-        for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
-        {
-            oid_arr[varlist_ind] = calloc(MAX_OID_LEN, sizeof(oid));
-            oid_arr_broken_check[varlist_ind] = calloc(MAX_OID_LEN,
-                                                       sizeof(oid));
+static PyObject *netsnmp_async_send(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    PyObject *varlist = NULL;
+    struct session_capsule_ctx *session_ctx = NULL;
+    netsnmp_pdu *pdu = NULL;
+    int command;
+    int nonrepeaters;
+    int maxrepetitions;
+    int reqid = 0;
+    int err_num;
+    int err_ind;
+    char *tmp_err_str = NULL;
+    size_t bytes_out;
+
+    if (!PyArg_ParseTuple(args, "OiiiO", &session, &command, &nonrepeaters,
+                          &maxrepetitions, &varlist))
+    {
+        return NULL;
+    }
+
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
+
+    if (!session_ctx)
+    {
+        goto done;
+    }
+
+    if (!(pdu = __py_netsnmp_build_pdu(session, session_ctx, command,
+                                       varlist)))
+    {
+        goto done;
+    }
+
+    if (command == SNMP_MSG_GETBULK)
+    {
+        pdu->non_repeaters = nonrepeaters;
+        pdu->max_repetitions = maxrepetitions;
+    }
+
+    bytes_out = __varbinds_size(pdu->variables);
+    reqid = snmp_sess_async_send(session_ctx->handle, pdu, __async_callback,
+                                 session_ctx);
+    if (reqid)
+    {
+        session_ctx->stats.requests++;
+        session_ctx->stats.bytes_out += bytes_out;
+    }
+    else
+    {
+        /* the PDU is only released by net-snmp when it was sent */
+        snmp_free_pdu(pdu);
+        snmp_sess_error(session_ctx->handle, &err_num, &err_ind,
+                        &tmp_err_str);
+        py_log_msg(DEBUG, "async_send: %s", tmp_err_str);
+        PyErr_SetString(TDSNMPException,
+                        tmp_err_str ? tmp_err_str : "failed to send PDU");
+        SAFE_FREE(tmp_err_str);
+    }
+
+done:
+    Py_XDECREF(sess_ptr);
+    if (!reqid)
+    {
+        return NULL;
+    }
+    return PyLong_FromLong(reqid);
+}
 
-            oid_arr_len[varlist_ind]              = MAX_OID_LEN;
-            oid_arr_broken_check_len[varlist_ind] = MAX_OID_LEN;
+/*
+ * Append an SNMPVariable for each response variable to varbinds and its
+ * numeric OID, as a tuple of integers, to names.
+ *
+ * Returns -1 with an exception set on failure.
+ */
+static int __py_netsnmp_decode_variables(netsnmp_variable_list *vars,
+                                         int getlabel_flag,
+                                         int sprintval_flag,
+                                         u_char *str_buf,
+                                         size_t str_buf_size,
+                                         PyObject *varbinds,
+                                         PyObject *names)
+{
+    PyObject *varbind;
+    PyObject *name;
+
+    for (; vars; vars = vars->next_variable)
+    {
+        if (!(varbind = py_netsnmp_build_varbind(vars, getlabel_flag,
+                                                 sprintval_flag, str_buf,
+                                                 str_buf_size)))
+        {
+            return -1;
         }
+        PyList_Append(varbinds, varbind);
+        Py_DECREF(varbind);
 
-        /* get the initial starting oids */
-        varlist_iter = PyObject_GetIter(varlist);
-        varlist_ind = 0;
-        while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
+        if (!(name = py_netsnmp_oid_tuple(vars->name, vars->name_length)))
         {
-            if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
-                py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
-            {
-                oid_arr_len[varlist_ind] = 0;
-            }
-            else
-            {
-                tp = __tag2oid(tag, iid,
-                               oid_arr[varlist_ind], &oid_arr_len[varlist_ind],
-                               NULL, best_guess);
-            }
+            return -1;
+        }
+        PyList_Append(names, name);
+        Py_DECREF(name);
+    }
+    return 0;
+}
 
-            if (oid_arr_len[varlist_ind])
-            {
-                py_log_msg(DEBUG, "netsnmp_walk: filling request: %s:%s:%d:%d",
-                           tag, iid, oid_arr_len[varlist_ind], best_guess);
+/*
+ * Returns a new (reqid, status, errstat, errindex, error_string, varbinds,
+ * names) tuple describing a completed asynchronous request; names holds the
+ * numeric OID of each varbind as a tuple of integers.
+ */
+static PyObject *__py_netsnmp_async_result(struct async_response *resp,
+                                           int getlabel_flag,
+                                           int sprintval_flag,
+                                           u_char *str_buf,
+                                           size_t str_buf_size)
+{
+    PyObject *varbinds = NULL;
+    PyObject *names = NULL;
+    const char *err_str = "";
+    long errstat = 0;
+    long errindex = 0;
 
-                snmp_add_null_var(pdu, oid_arr[varlist_ind],
-                                  oid_arr_len[varlist_ind]);
-            }
-            else
-            {
-                PyErr_Format(TDSNMPUnknownObjectIDError,
-                             "unknown object id (%s)",
-                             (tag ? tag : "<null>"));
-                error = 1;
-                snmp_free_pdu(pdu);
-                pdu = NULL;
-                Py_DECREF(varlist_iter);
-                Py_DECREF(varbind);
-                goto done;
-            }
-            /* release reference when done */
-            Py_DECREF(varbind);
-            varlist_ind++;
-        }
+    varbinds = PyObject_CallMethod(tdsnmp_import, "SNMPVariableList", NULL);
+    names = PyList_New(0);
+    if (!varbinds || !names)
+    {
+        goto error;
+    }
+
+    if (resp->status == STAT_TIMEOUT)
+    {
+        err_str = "Timeout";
+    }
+    else if (resp->status == STAT_ERROR)
+    {
+        /* as snmp_sess_error() does for blocking requests */
+        errindex = resp->report_type;
+        err_str = snmp_api_errstring(resp->report_type);
+    }
+    else if (resp->pdu->errstat != SNMP_ERR_NOERROR)
+    {
+        errstat = resp->pdu->errstat;
+        errindex = resp->pdu->errindex;
+        err_str = snmp_errstring(errstat);
+    }
+    else if (__py_netsnmp_decode_variables(resp->pdu->variables,
+                                           getlabel_flag, sprintval_flag,
+                                           str_buf, str_buf_size, varbinds,
+                                           names) < 0)
+    {
+        goto error;
+    }
 
-        Py_XDECREF(varlist_iter);
+    return Py_BuildValue("(iillsNN)", resp->reqid, resp->status, errstat,
+                         errindex, err_str, varbinds, names);
 
-        if (PyErr_Occurred())
-        {
-            error = 1;
-            snmp_free_pdu(pdu);
-            pdu = NULL;
-            goto done;
-        }
+error:
+    Py_XDECREF(varbinds);
+    Py_XDECREF(names);
+    return NULL;
+}
 
-        /*
-        ** Set up for numeric or full OID's, if necessary.  Save the old
-        ** output format so that it can be restored when we finish -- this
-        ** is a library-wide global, and has to be set/restored for each
-        ** session.
-        */
-        old_format = netsnmp_ds_get_int(NETSNMP_DS_LIBRARY_ID,
-                                        NETSNMP_DS_LIB_OID_OUTPUT_FORMAT);
+static PyObject *netsnmp_async_poll(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    PyObject *results = NULL;
+    PyObject *result;
+    struct session_capsule_ctx *session_ctx = NULL;
+    struct session_capsule_ctx *op;
+    struct async_response *resp;
+    netsnmp_variable_list *vars;
+    int readable;
+    int getlabel_flag;
+    int sprintval_flag;
+    int numfds = 0;
+    int block = 0;
+    netsnmp_large_fd_set fdset;
+    struct timeval timeout = {0, 0};
 
-        if (py_netsnmp_attr_long(session, "use_long_names"))
-        {
-            getlabel_flag |= USE_LONG_NAMES;
+    if (!PyArg_ParseTuple(args, "Oi", &session, &readable))
+    {
+        return NULL;
+    }
 
-            netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                               NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                               NETSNMP_OID_OUTPUT_FULL);
-        }
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
 
-        /*
-        ** Setting use_numeric forces use_long_names on so check for
-        ** use_numeric after use_long_names (above) to make sure the final
-        ** outcome of NETSNMP_DS_LIB_OID_OUTPUT_FORMAT is
-        ** NETSNMP_OID_OUTPUT_NUMERIC
-        */
-        if (py_netsnmp_attr_long(session, "use_numeric"))
-        {
-            getlabel_flag |= USE_LONG_NAMES;
-            getlabel_flag |= USE_NUMERIC_OIDS;
+    if (!session_ctx)
+    {
+        goto done;
+    }
+    py_log_threshold = LOG_THRESHOLD_UNKNOWN;
 
-            netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                               NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                               NETSNMP_OID_OUTPUT_NUMERIC);
-        }
+    /*
+     * Neither call blocks: the socket is only read when the event loop
+     * reported it readable, and snmp_sess_timeout() only retransmits or
+     * expires the requests whose timeout has already elapsed.
+     */
+    if (readable)
+    {
+        /*
+         * A poller may hold thousands of sessions, so socket numbers can
+         * exceed FD_SETSIZE; the large fd set grows to fit them.
+         */
+        netsnmp_large_fd_set_init(&fdset, FD_SETSIZE);
+        snmp_sess_select_info2(session_ctx->handle, &numfds, &fdset, &timeout,
+                               &block);
+        snmp_sess_read2(session_ctx->handle, &fdset);
+        netsnmp_large_fd_set_cleanup(&fdset);
+    }
+    snmp_sess_timeout(session_ctx->handle);
 
-        /* delete the existing varbinds that we'll replace */
-        PySequence_DelSlice(varbinds, 0, PySequence_Length(varbinds));
+    if (!(results = PyList_New(0)))
+    {
+        goto done;
+    }
 
-        if (PyErr_Occurred())
-        {
-            error = 1;
-            snmp_free_pdu(pdu);
-            pdu = NULL;
-            goto done;
-        }
+    __py_netsnmp_session_flags(session, &getlabel_flag, &sprintval_flag);
 
-        /* save the starting OID */
+    /*
+     * Within an operation of this session (see stats_begin) the decoded
+     * variables are counted, and timed, as for blocking requests; outside
+     * of one they are counted here, and not for any other operation
+     * running on this thread.
+     */
+    op = __stats_current();
+    if (op != session_ctx)
+    {
+        PyThread_tss_set(&current_operation, NULL);
+    }
 
-        for (vars = pdu->variables, varlist_ind = 0;
-             vars != NULL;
-             vars = vars->next_variable, varlist_ind++)
+    while ((resp = session_ctx->async_head))
+    {
+        session_ctx->async_head = resp->next;
+        if (!session_ctx->async_head)
         {
-
-            oid_arr_broken_check_len[varlist_ind] = vars->name_length;
-            memcpy(oid_arr_broken_check[varlist_ind],
-                   vars->name, vars->name_length * sizeof(oid));
+            session_ctx->async_tail = NULL;
         }
 
-        while (notdone) {
-            status = __send_sync_pdu(ss, pdu, &response, retry_nosuch,
-                                     err_str, &err_num, &err_ind, NULL);
-            __py_netsnmp_update_session_errors(session, err_str, err_num,
-                                               err_ind);
-            if (status != 0)
+        if (resp->status == STAT_SUCCESS)
+        {
+            session_ctx->stats.responses++;
+            session_ctx->stats.bytes_in +=
+                __varbinds_size(resp->pdu->variables);
+            if (op != session_ctx &&
+                resp->pdu->errstat == SNMP_ERR_NOERROR)
             {
-                error = 1;
-                /*
-                 * pdu is released in __send_sync_pdu if an error occurs during
-                 * the snmp_sess_synch_response function. It does not, however,
-                 * appear to be set to NULL afterwards.
-                 */
-                pdu = NULL;
-                if (response)
+                for (vars = resp->pdu->variables; vars;
+                     vars = vars->next_variable)
                 {
-                    snmp_free_pdu(response);
-                    response = NULL;
+                    session_ctx->stats.varbinds++;
                 }
-                goto done;
-            }
-
-            if (!response || !response->variables ||
-                status != STAT_SUCCESS ||
-                response->errstat != SNMP_ERR_NOERROR)
-            {
-                notdone = 0;
             }
-            else
-            {
-
-                pdu = snmp_pdu_create(SNMP_MSG_GETNEXT);
+        }
+        else if (resp->status == STAT_TIMEOUT)
+        {
+            session_ctx->stats.timeouts++;
+            session_ctx->stats.retries += (session_ctx->handle->retries > 0
+                                           ? session_ctx->handle->retries
+                                           : 0);
+        }
 
-                for (vars = (response ? response->variables : NULL),
-                     varlist_ind = 0;
-                     vars && (varlist_ind < varlist_len);
-                     vars = vars->next_variable, varlist_ind++)
-                {
-                    if ((vars->name_length < oid_arr_len[varlist_ind]) ||
-                        (memcmp(oid_arr[varlist_ind], vars->name,
-                                oid_arr_len[varlist_ind] * sizeof(oid)) != 0))
-                    {
-                        notdone = 0;
-                        break;
-                    }
+        result = __py_netsnmp_async_result(resp, getlabel_flag,
+                                           sprintval_flag, session_ctx->buf,
+                                           sizeof(session_ctx->buf));
+        if (resp->pdu)
+        {
+            snmp_free_pdu(resp->pdu);
+        }
+        free(resp);
 
-                    if ((vars->type == SNMP_ENDOFMIBVIEW) ||
-                        (vars->type == SNMP_NOSUCHOBJECT) ||
-                        (vars->type == SNMP_NOSUCHINSTANCE))
-                    {
-                        notdone = 0;
-                        break;
-                    }
+        if (!result)
+        {
+            Py_CLEAR(results);
+            break;
+        }
+        PyList_Append(results, result);
+        Py_DECREF(result);
+    }
 
-                    if (snmp_oid_compare(vars->name, vars->name_length,
-                                         oid_arr_broken_check[varlist_ind],
-                                         oid_arr_broken_check_len[varlist_ind]) <= 0)
-                    {
-                        /*
-                           The agent responded with an illegal response
-                           as the returning OID was lexograghically less
-                           then or equal to the requested OID...
-                           We need to give up here because an infinite
-                           loop will result otherwise.
-
-                           XXX: this really should be an option to
-                           continue like the -Cc option to the snmpwalk
-                           application.
-                        */
-                        notdone = 0;
-                        break;
-                    }
+    if (op != session_ctx)
+    {
+        PyThread_tss_set(&current_operation, op);
+    }
 
-                    varbind = py_netsnmp_construct_varbind();
+done:
+    Py_XDECREF(sess_ptr);
+    return results;
+}
 
-                    if (PyObject_HasAttrString(varbind, "oid"))
-                    {
-                        str_buf[0] = '.';
-                        str_buf[1] = '\0';
-                        out_len = 0;
-                        tp = netsnmp_sprint_realloc_objid_tree(&str_bufp,
-                                                               &str_buf_len,
-                                                               &out_len, 0,
-                                                               &buf_over,
-                                                               vars->name,
-                                                               vars->name_length);
-                        str_buf[sizeof(str_buf) - 1] = '\0';
-
-                        type = __translate_asn_type(vars->type);
-
-                        if (__is_leaf(tp))
-                        {
-                            getlabel_flag &= ~NON_LEAF_NAME;
-                            py_log_msg(DEBUG, "netsnmp_walk: is_leaf: %d", tp->type);
-                        }
-                        else
-                        {
-                            getlabel_flag |= NON_LEAF_NAME;
-                            py_log_msg(DEBUG, "netsnmp_walk: !is_leaf: %d", tp->type);
-                        }
+/*
+ * Returns a (fds, timeout) tuple: the file descriptors to watch for
+ * responses and the number of seconds until the next retransmission or
+ * timeout is due (None when no requests are outstanding).
+ */
+static PyObject *netsnmp_async_select_info(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    PyObject *fds = NULL;
+    PyObject *fd_obj;
+    PyObject *timeout_obj;
+    struct session_capsule_ctx *session_ctx = NULL;
+    int numfds = 0;
+    int block = 1;
+    int fd;
+    netsnmp_large_fd_set fdset;
+    struct timeval timeout = {0, 0};
 
-                        py_log_msg(DEBUG, "netsnmp_walk: str_buf: %s", str_buf);
+    if (!PyArg_ParseTuple(args, "O", &session))
+    {
+        return NULL;
+    }
 
-                        __get_label_iid((char *) str_buf, &tag, &iid,
-                                        getlabel_flag);
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
+    Py_XDECREF(sess_ptr);
 
-                        py_log_msg(DEBUG,
-                                   "netsnmp_walk: filling response: %s:%s",
-                                   tag, iid);
+    if (!session_ctx)
+    {
+        return NULL;
+    }
 
-                        py_netsnmp_attr_set_string(varbind, "oid", tag,
-                                                   STRLEN(tag));
-                        py_netsnmp_attr_set_string(varbind, "oid_index", iid,
-                                                   STRLEN(iid));
+    netsnmp_large_fd_set_init(&fdset, FD_SETSIZE);
+    snmp_sess_select_info2(session_ctx->handle, &numfds, &fdset, &timeout,
+                           &block);
 
-                        __get_type_str(type, type_str, 1);
+    if (!(fds = PyList_New(0)))
+    {
+        netsnmp_large_fd_set_cleanup(&fdset);
+        return NULL;
+    }
+    for (fd = 0; fd < numfds; fd++)
+    {
+        if (NETSNMP_LARGE_FD_ISSET(fd, &fdset))
+        {
+            fd_obj = PyLong_FromLong(fd);
+            PyList_Append(fds, fd_obj);
+            Py_XDECREF(fd_obj);
+        }
+    }
+    netsnmp_large_fd_set_cleanup(&fdset);
 
-                        py_netsnmp_attr_set_string(varbind, "snmp_type",
-                                                   type_str, strlen(type_str));
+    if (block)
+    {
+        Py_INCREF(Py_None);
+        timeout_obj = Py_None;
+    }
+    else
+    {
+        timeout_obj = PyFloat_FromDouble(timeout.tv_sec +
+                                         timeout.tv_usec / 1000000.0);
+    }
 
-                        len = __snprint_value((char *) str_buf,
-                                              sizeof(str_buf), vars, tp,
-                                              type, sprintval_flag);
-                        str_buf[len] = '\0';
+    return Py_BuildValue("(NN)", fds, timeout_obj);
+}
 
-                        py_netsnmp_attr_set_string(varbind, "value",
-                                                   (char *) str_buf, len);
+/*
+ * Translate a list of SNMPVariable objects into a list of numeric OIDs,
+ * each a tuple of integers.
+ */
+static PyObject *netsnmp_numeric_oids(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *varlist = NULL;
+    PyObject *varlist_iter = NULL;
+    PyObject *varbind;
+    PyObject *oids = NULL;
+    PyObject *oid_tuple;
+    oid oid_arr[MAX_OID_LEN];
+    int oid_arr_len = 0;
+    int best_guess;
+    char *tag = NULL;
+    char *iid = NULL;
 
-                        /* push the varbind onto the return varbinds */
-                        PyList_Append(varbinds, varbind);
-                    }
-                    else
-                    {
-                        py_log_msg(DEBUG, "netsnmp_walk: bad varbind (%d)",
-                                   varlist_ind);
-                    }
-                    Py_XDECREF(varbind);
+    if (!PyArg_ParseTuple(args, "OO", &session, &varlist))
+    {
+        return NULL;
+    }
 
-                    memcpy(oid_arr_broken_check[varlist_ind], vars->name,
-                           sizeof(oid) * vars->name_length);
-                    oid_arr_broken_check_len[varlist_ind] = vars->name_length;
+    best_guess = py_netsnmp_attr_long(session, "best_guess");
 
-                    snmp_add_null_var(pdu, vars->name, vars->name_length);
-                }
+    if (!(varlist_iter = PyObject_GetIter(varlist)) ||
+        !(oids = PyList_New(0)))
+    {
+        goto error;
+    }
 
-            }
-            if (response)
-            {
-                snmp_free_pdu(response);
-                response = NULL;
-            }
+    while ((varbind = PyIter_Next(varlist_iter)))
+    {
+        if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
+            py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
+        {
+            oid_arr_len = 0;
         }
+        else
+        {
+            __tag2oid_cached(tag, iid, oid_arr, &oid_arr_len, NULL,
+                             best_guess);
+        }
+        Py_DECREF(varbind);
 
-        /* Reset the library's behavior for numeric/symbolic OIDs. */
-        netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                           NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                           old_format);
-
+        if (!oid_arr_len)
+        {
+            PyErr_Format(TDSNMPUnknownObjectIDError, "unknown object id (%s)",
+                         (tag ? tag : "<null>"));
+            goto error;
+        }
 
-        if (PyErr_Occurred())
+        if (!(oid_tuple = py_netsnmp_oid_tuple(oid_arr, oid_arr_len)))
         {
-            error = 1;
+            goto error;
         }
+        PyList_Append(oids, oid_tuple);
+        Py_DECREF(oid_tuple);
     }
 
-done:
-    Py_XDECREF(sess_ptr);
-    Py_XDECREF(varbinds);
-    SAFE_FREE(oid_arr_len);
-    SAFE_FREE(oid_arr_broken_check_len);
-    for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
+    Py_DECREF(varlist_iter);
+    if (PyErr_Occurred())
     {
-        SAFE_FREE(oid_arr[varlist_ind]);
-        SAFE_FREE(oid_arr_broken_check[varlist_ind]);
+        Py_DECREF(oids);
+        return NULL;
     }
-    SAFE_FREE(oid_arr);
-    SAFE_FREE(oid_arr_broken_check);
-    if (pdu)
+    return oids;
+
+error:
+    Py_XDECREF(varlist_iter);
+    Py_XDECREF(oids);
+    return NULL;
+}
+
+/*
+ * Send a request PDU on a session and wait for the response, updating the
+ * error attributes of the python session object. The PDU is consumed.
+ *
+ * Returns -1 with an exception set on failure.
+ */
+static int __py_netsnmp_send_request(PyObject *session,
+                                     struct session_capsule_ctx *session_ctx,
+                                     netsnmp_pdu *pdu, int nonrepeaters,
+                                     int maxrepetitions,
+                                     netsnmp_pdu **response)
+{
+    int status;
+    int err_num;
+    int err_ind;
+
+    if (pdu->command == SNMP_MSG_GETBULK)
     {
-        snmp_free_pdu(pdu);
-        pdu = NULL;
+        pdu->non_repeaters = nonrepeaters;
+        pdu->max_repetitions = maxrepetitions;
     }
-    if (error)
+
+    status = __send_sync_pdu(session, session_ctx->handle, pdu, response,
+                             NO_RETRY_NOSUCH, session_ctx->err_str, &err_num,
+                             &err_ind, NULL);
+    __py_netsnmp_update_session_errors(session, session_ctx->err_str,
+                                       err_num, err_ind);
+    if (status != 0)
     {
-        return NULL;
+        if (!PyErr_Occurred())
+        {
+            PyErr_SetString(TDSNMPException, session_ctx->err_str);
+        }
+        return -1;
     }
-    return Py_None;
+    return 0;
 }
 
-static PyObject *netsnmp_getbulk(PyObject *self, PyObject *args)
+/*
+ * Whether a response variable continues the walk of root from cursor, in
+ * which case it becomes the new cursor (the rules of
+ * tdsnmp.utils.walk.advance_walk).
+ */
+static int __py_netsnmp_walk_continues(netsnmp_variable_list *vars,
+                                       oid *root, size_t root_len,
+                                       oid *cursor, size_t *cursor_len)
+{
+    if (vars->name_length < root_len ||
+        snmp_oid_compare(vars->name, root_len, root, root_len) ||
+        snmp_oid_compare(vars->name, vars->name_length, cursor,
+                         *cursor_len) <= 0 ||
+        vars->type == SNMP_ENDOFMIBVIEW ||
+        vars->type == SNMP_NOSUCHOBJECT ||
+        vars->type == SNMP_NOSUCHINSTANCE)
+    {
+        return 0;
+    }
+
+    memcpy(cursor, vars->name, vars->name_length * sizeof(oid));
+    *cursor_len = vars->name_length;
+    return 1;
+}
+
+/*
+ * Walk the subtrees of a list of SNMPVariable objects with GETNEXT or
+ * GETBULK requests and replace the variables with the ones found, grouped
+ * by root in the order of the list.
+ *
+ * Every request carries one variable per root still being walked, so all
+ * the roots take as many round trips as the longest of them needs. A root
+ * drops out of the following requests as soon as a response variable does
+ * not continue its walk (see __py_netsnmp_walk_continues()), while the
+ * others go on.
+ *
+ * Returns -1 with an exception set on failure.
+ */
+static int __py_netsnmp_walk_varlist(PyObject *session, int command,
+                                     int nonrepeaters, int maxrepetitions,
+                                     PyObject *varlist)
 {
-    int nonrepeaters;
-    int maxrepetitions;
-    PyObject *session = NULL;
     PyObject *sess_ptr = NULL;
-    PyObject *varlist;
     PyObject *varbinds = NULL;
-    PyObject *varbind;
-    PyObject *varbinds_iter;
-    int varbind_ind;
-    struct session_capsule_ctx *session_ctx = NULL;
-    netsnmp_session *ss;
-    netsnmp_pdu *pdu = NULL;
+    PyObject *varbind = NULL;
+    PyObject **results = NULL;
+    struct session_capsule_ctx *session_ctx;
+    netsnmp_pdu *pdu;
     netsnmp_pdu *response = NULL;
     netsnmp_variable_list *vars;
-    struct tree *tp;
-    int len;
-    oid *oid_arr;
-    int oid_arr_len = MAX_OID_LEN;
-    int type;
-    char type_str[MAX_TYPE_NAME_LEN];
-    int status;
-    u_char str_buf[STR_BUF_SIZE];
-    u_char *str_bufp = str_buf;
-    size_t str_buf_len = sizeof(str_buf);
-    size_t out_len = 0;
-    int buf_over = 0;
+    oid (*roots)[MAX_OID_LEN] = NULL;
+    oid (*cursors)[MAX_OID_LEN] = NULL;
+    int *root_lens = NULL;
+    size_t *cursor_lens = NULL;
+    int *active = NULL;
+    char *finished = NULL;
     char *tag;
     char *iid;
-    int getlabel_flag = NO_FLAGS;
-    int sprintval_flag = USE_BASIC;
-    int old_format;
-    int best_guess;
-    int retry_nosuch;
-    int err_ind;
-    int err_num;
-    char err_str[STR_BUF_SIZE];
-    char *tmpstr;
-    Py_ssize_t tmplen;
-    int error = 0;
+    Py_ssize_t count = 0;
+    int active_count;
+    int first_repeater;
+    int remaining;
+    int getlabel_flag;
+    int sprintval_flag;
+    int best_guess;
+    int root;
+    int i;
+    int ret = -1;
 
-    oid_arr = calloc(MAX_OID_LEN, sizeof(oid));
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    if (!(session_ctx = get_session_handle_from_capsule(sess_ptr)) ||
+        !(varbinds = PyObject_GetAttrString(varlist, "varbinds")) ||
+        (count = PySequence_Length(varbinds)) < 0)
+    {
+        count = 0;
+        goto done;
+    }
+    __stats_begin(session_ctx);
+    if (!count)
+    {
+        ret = 0;
+        goto done;
+    }
 
-    if (oid_arr && args)
+    roots = calloc(count, sizeof(*roots));
+    cursors = calloc(count, sizeof(*cursors));
+    root_lens = calloc(count, sizeof(int));
+    cursor_lens = calloc(count, sizeof(size_t));
+    active = calloc(count, sizeof(int));
+    finished = calloc(count, sizeof(char));
+    results = calloc(count, sizeof(PyObject *));
+    if (!roots || !cursors || !root_lens || !cursor_lens || !active ||
+        !finished || !results)
     {
-        if (!PyArg_ParseTuple(args, "OiiO", &session, &nonrepeaters,
-                              &maxrepetitions, &varlist))
+        PyErr_NoMemory();
+        goto done;
+    }
+
+    /* get the starting oids */
+    best_guess = py_netsnmp_attr_long(session, "best_guess");
+    for (i = 0; i < count; i++)
+    {
+        if (!(varbind = PySequence_GetItem(varbinds, i)))
         {
             goto done;
         }
-
-        if (varlist &&
-            (varbinds = PyObject_GetAttrString(varlist, "varbinds")))
+        tag = NULL;
+        root_lens[i] = MAX_OID_LEN;
+        if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
+            py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
         {
-            sess_ptr = PyObject_GetAttrString(session, "session_ptr");
-            session_ctx = get_session_handle_from_capsule(sess_ptr);
-
-            if (!session_ctx)
-            {
-                goto done;
-            }
-
-            ss = session_ctx->handle;
+            root_lens[i] = 0;
+        }
+        else
+        {
+            __tag2oid_cached(tag, iid, roots[i], &root_lens[i], NULL,
+                             best_guess);
+        }
+        Py_CLEAR(varbind);
 
-            if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
-            {
-                goto done;
-            }
-            memcpy(&err_str, tmpstr, tmplen);
-            err_num = py_netsnmp_attr_long(session, "error_number");
-            err_ind = py_netsnmp_attr_long(session, "error_index");
+        if (!root_lens[i])
+        {
+            PyErr_Format(TDSNMPUnknownObjectIDError,
+                         "unknown object id (%s)", (tag ? tag : "<null>"));
+            goto done;
+        }
+        py_log_msg(DEBUG, "walk: root %s:%s:%d", tag, iid, root_lens[i]);
 
-            if (py_netsnmp_attr_long(session, "use_long_names"))
-            {
-                getlabel_flag |= USE_LONG_NAMES;
-            }
-            if (py_netsnmp_attr_long(session, "use_numeric"))
-            {
-                getlabel_flag |= USE_NUMERIC_OIDS;
-            }
-            if (py_netsnmp_attr_long(session, "use_enums"))
-            {
-                sprintval_flag = USE_ENUMS;
-            }
-            if (py_netsnmp_attr_long(session, "use_sprint_value"))
-            {
-                sprintval_flag = USE_SPRINT_VALUE;
-            }
-            best_guess = py_netsnmp_attr_long(session, "best_guess");
-            retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
+        memcpy(cursors[i], roots[i], root_lens[i] * sizeof(oid));
+        cursor_lens[i] = root_lens[i];
+        active[i] = i;
+        if (!(results[i] = PyList_New(0)))
+        {
+            goto done;
+        }
+    }
+    if (PyErr_Occurred())
+    {
+        goto done;
+    }
 
-            pdu = snmp_pdu_create(SNMP_MSG_GETBULK);
+    /*
+     * Numeric or full OIDs are formatted per variable by
+     * py_netsnmp_fill_varbind(), which never leaves the library-wide
+     * output format changed, so sessions may be used from any thread.
+     */
+    __py_netsnmp_session_flags(session, &getlabel_flag, &sprintval_flag);
 
-            pdu->errstat = nonrepeaters;
-            pdu->errindex = maxrepetitions;
+    active_count = count;
+    while (active_count)
+    {
+        pdu = snmp_pdu_create(command);
+        for (i = 0; i < active_count; i++)
+        {
+            snmp_add_null_var(pdu, cursors[active[i]],
+                              cursor_lens[active[i]]);
+        }
+        if (__py_netsnmp_send_request(session, session_ctx, pdu,
+                                      nonrepeaters, maxrepetitions,
+                                      &response) < 0)
+        {
+            goto done;
+        }
+        if (!response->variables)
+        {
+            break;
+        }
 
-            varbinds_iter = PyObject_GetIter(varbinds);
+        /*
+         * The response holds one variable per non-repeater, followed by rows
+         * of one variable per repeater; every root of a GETNEXT is a
+         * non-repeater.
+         */
+        first_repeater = active_count;
+        if (command == SNMP_MSG_GETBULK && nonrepeaters < active_count)
+        {
+            first_repeater = (nonrepeaters > 0 ? nonrepeaters : 0);
+        }
 
-            while (varbinds_iter && (varbind = PyIter_Next(varbinds_iter)))
+        for (vars = response->variables, i = 0; vars;
+             vars = vars->next_variable, i++)
+        {
+            if (i < first_repeater)
             {
-                if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
-                    py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
-                {
-                    oid_arr_len = 0;
-                }
-                else
-                {
-                    tp = __tag2oid(tag, iid, oid_arr, &oid_arr_len, NULL,
-                                   best_guess);
-                }
-
-                if (oid_arr_len)
-                {
-                    snmp_add_null_var(pdu, oid_arr, oid_arr_len);
-                }
-                else
-                {
-                    PyErr_Format(TDSNMPUnknownObjectIDError,
-                                 "unknown object id (%s)",
-                                 (tag ? tag : "<null>"));
-                    error = 1;
-                    snmp_free_pdu(pdu);
-                    Py_DECREF(varbind);
-                    Py_DECREF(varbinds_iter);
-                    goto done;
-                }
-                /* release reference when done */
-                Py_DECREF(varbind);
+                root = active[i];
             }
-
-            Py_XDECREF(varbinds_iter);
-
-            if (PyErr_Occurred())
+            else if (first_repeater < active_count)
             {
-                error = 1;
-                snmp_free_pdu(pdu);
-                pdu = NULL;
-                goto done;
+                root = active[first_repeater + (i - first_repeater) %
+                              (active_count - first_repeater)];
             }
-
-            status = __send_sync_pdu(ss, pdu, &response, retry_nosuch,
-                                     err_str, &err_num, &err_ind, NULL);
-            __py_netsnmp_update_session_errors(session, err_str, err_num,
-                                               err_ind);
-            if (status != 0)
+            else
             {
-                error = 1;
-                if (response)
-                {
-                    snmp_free_pdu(response);
-                    response = NULL;
-                }
-                goto done;
+                break;
             }
 
-            /*
-             * Set up for numeric or full OID's, if necessary.  Save the old
-             * output format so that it can be restored when we finish -- this
-             * is a library-wide global, and has to be set/restored for each
-             * session.
-             */
-            old_format = netsnmp_ds_get_int(NETSNMP_DS_LIBRARY_ID,
-                                            NETSNMP_DS_LIB_OID_OUTPUT_FORMAT);
-
-            if (py_netsnmp_attr_long(session, "use_long_names"))
+            if (finished[root])
             {
-                getlabel_flag |= USE_LONG_NAMES;
-
-                netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                                   NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                                   NETSNMP_OID_OUTPUT_FULL);
+                continue;
             }
-            /*
-             * Setting use_numeric forces use_long_names on so check for
-             * use_numeric after use_long_names (above) to make sure the final
-             * outcome of NETSNMP_DS_LIB_OID_OUTPUT_FORMAT is
-             *  NETSNMP_OID_OUTPUT_NUMERIC
-             */
-            if (py_netsnmp_attr_long(session, "use_numeric"))
+            if (!__py_netsnmp_walk_continues(vars, roots[root],
+                                             root_lens[root], cursors[root],
+                                             &cursor_lens[root]))
             {
-                getlabel_flag |= USE_LONG_NAMES;
-                getlabel_flag |= USE_NUMERIC_OIDS;
-
-                netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                                   NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                                   NETSNMP_OID_OUTPUT_NUMERIC);
+                finished[root] = 1;
+                continue;
             }
 
-            if(response && response->variables)
+            if (!(varbind = py_netsnmp_build_varbind(
+                      vars, getlabel_flag, sprintval_flag, session_ctx->buf,
+                      sizeof(session_ctx->buf))) ||
+                PyList_Append(results[root], varbind) < 0)
             {
-                /* clear varlist to receive response varbinds*/
-                PySequence_DelSlice(varbinds, 0, PySequence_Length(varbinds));
-
-                if (PyErr_Occurred())
-                {
-                    error = 1;
-                    snmp_free_pdu(pdu);
-                    pdu = NULL;
-                    if (response)
-                    {
-                        snmp_free_pdu(response);
-                        response = NULL;
-                    }
-                    goto done;
-                }
-
-                for (vars = response->variables, varbind_ind=0;
-                     vars;
-                     vars = vars->next_variable, varbind_ind++)
-                {
-
-                    varbind = py_netsnmp_construct_varbind();
-
-                    if (PyObject_HasAttrString(varbind, "oid"))
-                    {
-                        *str_buf = '.';
-                        *(str_buf + 1) = '\0';
-                        out_len = 0;
-                        buf_over = 0;
-                        str_bufp = str_buf;
-                        tp = netsnmp_sprint_realloc_objid_tree(&str_bufp,
-                                                               &str_buf_len,
-                                                               &out_len, 0,
-                                                               &buf_over,
-                                                               vars->name,
-                                                               vars->name_length);
-                        str_buf[sizeof(str_buf) - 1] = '\0';
-
-                        type = __translate_asn_type(vars->type);
-
-                        if (__is_leaf(tp))
-                        {
-                            getlabel_flag &= ~NON_LEAF_NAME;
-                            py_log_msg(DEBUG, "netsnmp_getbulk: is_leaf: %d", tp->type);
-                        }
-                        else
-                        {
-                            getlabel_flag |= NON_LEAF_NAME;
-                            py_log_msg(DEBUG, "netsnmp_getbulk: !is_leaf: %d", tp->type);
-                        }
-
-                        py_log_msg(DEBUG, "netsnmp_getbulk: str_buf: %s", str_buf);
-
-
-                        __get_label_iid((char *) str_buf, &tag, &iid,
-                                        getlabel_flag);
-
-                        py_netsnmp_attr_set_string(varbind, "oid", tag,
-                                                   STRLEN(tag));
-                        py_netsnmp_attr_set_string(varbind, "oid_index", iid,
-                                                   STRLEN(iid));
-
-                        __get_type_str(type, type_str, 1);
-
-                        py_netsnmp_attr_set_string(varbind, "snmp_type",
-                                                   type_str, strlen(type_str));
-
-                        len = __snprint_value((char *) str_buf,
-                                              sizeof(str_buf), vars, tp, type,
-                                              sprintval_flag);
-                        str_buf[len] = '\0';
-
-                        py_netsnmp_attr_set_string(varbind, "value",
-                                                   (char *) str_buf, len);
-
-                        /* push varbind onto varbinds */
-                        PyList_Append(varbinds, varbind);
-                    }
-                    else
-                    {
-                        PyObject *none = Py_BuildValue(""); /* new ref */
-                        /* not sure why making vabind failed - should not happen */
-                        PyList_Append(varbinds, none); /* increments ref */
-                        /* Return None for this variable. */
-                        Py_DECREF(none);
-                    }
-
-                    Py_XDECREF(varbind);
-                }
+                goto done;
             }
+            Py_CLEAR(varbind);
+        }
+        snmp_free_pdu(response);
+        response = NULL;
 
-            /* Reset the library's behavior for numeric/symbolic OID's. */
-            netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                               NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                               old_format);
-
-            if (response)
+        /* finished roots drop out of the next request */
+        for (i = 0, remaining = 0; i < active_count; i++)
+        {
+            if (!finished[active[i]])
             {
-                snmp_free_pdu(response);
-                response = NULL;
+                active[remaining++] = active[i];
             }
-
-            //Py_DECREF(varbinds);
         }
+        active_count = remaining;
+    }
 
-        if (PyErr_Occurred())
+    /* replace the starting variables with the ones found */
+    if (PyList_SetSlice(varbinds, 0, count, NULL) < 0)
+    {
+        goto done;
+    }
+    for (i = 0; i < count; i++)
+    {
+        if (PyList_SetSlice(varbinds, PY_SSIZE_T_MAX, PY_SSIZE_T_MAX,
+                            results[i]) < 0)
         {
-            error = 1;
+            goto done;
         }
     }
+    ret = 0;
 
 done:
+    __stats_end(session_ctx);
+    Py_XDECREF(varbind);
     Py_XDECREF(varbinds);
     Py_XDECREF(sess_ptr);
-    SAFE_FREE(oid_arr);
-    if (error)
+    if (response)
     {
-        return NULL;
+        snmp_free_pdu(response);
     }
-    return Py_None;
+    if (results)
+    {
+        for (i = 0; i < count; i++)
+        {
+            Py_XDECREF(results[i]);
+        }
+    }
+    SAFE_FREE(roots);
+    SAFE_FREE(cursors);
+    SAFE_FREE(root_lens);
+    SAFE_FREE(cursor_lens);
+    SAFE_FREE(active);
+    SAFE_FREE(finished);
+    SAFE_FREE(results);
+    return ret;
 }
 
-static PyObject *netsnmp_bulkwalk(PyObject *self, PyObject *args) {
-    PyObject *session = NULL;
-    PyObject *sess_ptr = NULL;
-    PyObject *varlist = NULL;
-    PyObject *varlist_iter = NULL;
-    PyObject *varbind = NULL;
-    PyObject *varbinds = NULL;
-    int varlist_len = 0;
-    int varlist_ind;
-
-    struct session_capsule_ctx *session_ctx = NULL;
-    netsnmp_session *ss = NULL;
-    netsnmp_pdu *pdu = NULL;
-    netsnmp_pdu *response = NULL;
-    netsnmp_variable_list *vars = NULL;
-
-    struct tree *tp = NULL;
-    int len;
-    oid **oid_arr = NULL;
-    int *oid_arr_len = NULL;
-    //char **initial_oid_str_arr = NULL;
-    char **oid_str_arr = NULL;
-    char **oid_idx_str_arr = NULL;
-    int type;
-    char type_str[MAX_TYPE_NAME_LEN];
-    int status;
-    u_char str_buf[STR_BUF_SIZE];
-    u_char *str_bufp = str_buf;
-    size_t str_buf_len = sizeof(str_buf);
-    size_t out_len = 0;
-    int buf_over = 0;
-    int getlabel_flag = NO_FLAGS;
-    int sprintval_flag = USE_BASIC;
-    int old_format;
-    int best_guess;
-    int retry_nosuch;
-    int err_ind;
-    int err_num;
-    char err_str[STR_BUF_SIZE];
-    int notdone = 1;
-    char *tmpstr = NULL;
-    Py_ssize_t tmplen;
-    int error = 0;
+/*
+ * Send a single request built from a list of SNMPVariable objects and wait
+ * for the response.
+ *
+ * Unlike get/getnext/getbulk, the variables of the request are left alone;
+ * a (varbinds, names) tuple is returned holding the response variables as
+ * an SNMPVariableList and their numeric OIDs as tuples of integers, which
+ * lets Python code step through a walk one response at a time.
+ */
+static PyObject *netsnmp_request(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    PyObject *varlist = NULL;
+    PyObject *varbinds = NULL;
+    PyObject *names = NULL;
+    PyObject *ret = NULL;
+    struct session_capsule_ctx *session_ctx = NULL;
+    netsnmp_pdu *pdu = NULL;
+    netsnmp_pdu *response = NULL;
+    int command;
     int nonrepeaters;
     int maxrepetitions;
+    int getlabel_flag;
+    int sprintval_flag;
 
-    py_log_msg(DEBUG, "netsnmp_bulkwalk: Starting");
-
-    if (args)
+    if (!PyArg_ParseTuple(args, "OiiiO", &session, &command, &nonrepeaters,
+                          &maxrepetitions, &varlist))
     {
-        if (!PyArg_ParseTuple(args, "OiiO", &session, &nonrepeaters,
-                              &maxrepetitions, &varlist))
-        {
-            goto done;
-        }
+        return NULL;
+    }
 
-        py_log_msg(DEBUG, "netsnmp_bulkwalk: nonreps (%d) max_reps (%d) varlist (%S)",
-                   nonrepeaters, maxrepetitions, varlist);
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
 
-        if (!varlist)
-        {
-            goto done;
-        }
+    if (!session_ctx)
+    {
+        goto done;
+    }
+    __stats_begin(session_ctx);
 
-        if ((varbinds = PyObject_GetAttrString(varlist, "varbinds")) == NULL)
-        {
-            goto done;
-        }
+    if (!(pdu = __py_netsnmp_build_pdu(session, session_ctx, command,
+                                       varlist)) ||
+        __py_netsnmp_send_request(session, session_ctx, pdu, nonrepeaters,
+                                  maxrepetitions, &response) < 0)
+    {
+        goto done;
+    }
 
-        sess_ptr = PyObject_GetAttrString(session, "session_ptr");
-        session_ctx = get_session_handle_from_capsule(sess_ptr);
+    __py_netsnmp_session_flags(session, &getlabel_flag, &sprintval_flag);
 
-        if (!session_ctx)
-        {
-            goto done;
-        }
+    varbinds = PyObject_CallMethod(tdsnmp_import, "SNMPVariableList", NULL);
+    names = PyList_New(0);
+    if (!varbinds || !names)
+    {
+        goto done;
+    }
 
-        ss = session_ctx->handle;
+    if (response &&
+        __py_netsnmp_decode_variables(response->variables, getlabel_flag,
+                                      sprintval_flag, session_ctx->buf,
+                                      sizeof(session_ctx->buf), varbinds,
+                                      names) < 0)
+    {
+        goto done;
+    }
 
-        if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
-        {
-            goto done;
-        }
-        memcpy(&err_str, tmpstr, tmplen);
-        err_num = py_netsnmp_attr_long(session, "error_number");
-        err_ind = py_netsnmp_attr_long(session, "error_index");
+    ret = Py_BuildValue("(OO)", varbinds, names);
 
-        if (py_netsnmp_attr_long(session, "use_long_names"))
-        {
-            getlabel_flag |= USE_LONG_NAMES;
-        }
-        if (py_netsnmp_attr_long(session, "use_numeric"))
-        {
-            getlabel_flag |= USE_NUMERIC_OIDS;
-        }
-        if (py_netsnmp_attr_long(session, "use_enums"))
-        {
-            sprintval_flag = USE_ENUMS;
-        }
-        if (py_netsnmp_attr_long(session, "use_sprint_value"))
-        {
-            sprintval_flag = USE_SPRINT_VALUE;
-        }
+done:
+    __stats_end(session_ctx);
+    Py_XDECREF(sess_ptr);
+    Py_XDECREF(varbinds);
+    Py_XDECREF(names);
+    if (response)
+    {
+        snmp_free_pdu(response);
+    }
+    return ret;
+}
 
-        best_guess = py_netsnmp_attr_long(session, "best_guess");
-        retry_nosuch = py_netsnmp_attr_long(session, "retry_no_such");
+/*
+ * Fill oid_arr, which holds MAX_OID_LEN sub-identifiers, from a tuple of
+ * integers.
+ *
+ * Returns -1 with an exception set on failure.
+ */
+static int __py_netsnmp_tuple_oid(PyObject *oid_tuple, oid *oid_arr,
+                                  size_t *oid_arr_len)
+{
+    PyObject *seq;
+    Py_ssize_t len;
+    Py_ssize_t i;
+    unsigned long subid;
 
-        /* we need an initial count for memory allocation */
-        varlist_iter = PyObject_GetIter(varlist);
-        varlist_len = 0;
-        while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
-        {
-            varlist_len++;
-            Py_DECREF(varbind);
-        }
-        Py_XDECREF(varlist_iter);
+    if (!(seq = PySequence_Fast(oid_tuple,
+                                "OID must be a sequence of integers")))
+    {
+        return -1;
+    }
 
-        oid_arr_len = calloc(varlist_len, sizeof(int));
-        oid_arr = calloc(varlist_len, sizeof(oid *));
-        //initial_oid_str_arr = calloc(varlist_len, sizeof(char *));
-        oid_str_arr = calloc(varlist_len, sizeof(char *));
-        oid_idx_str_arr = calloc(varlist_len, sizeof(char *));
+    len = PySequence_Fast_GET_SIZE(seq);
+    if (len > MAX_OID_LEN)
+    {
+        PyErr_SetString(PyExc_ValueError, "OID is too long");
+        Py_DECREF(seq);
+        return -1;
+    }
 
-        for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
+    for (i = 0; i < len; i++)
+    {
+        subid = PyLong_AsUnsignedLong(PySequence_Fast_GET_ITEM(seq, i));
+        if (subid == (unsigned long) -1 && PyErr_Occurred())
         {
-            oid_arr[varlist_ind] = calloc(MAX_OID_LEN, sizeof(oid));
-            oid_arr_len[varlist_ind] = MAX_OID_LEN;
+            Py_DECREF(seq);
+            return -1;
         }
+        oid_arr[i] = subid;
+    }
 
-        /* get the initial oids */
-        py_log_msg(DEBUG, "netsnmp_bulkwalk: Getting initial oids");
-        varlist_ind = 0;
-        varlist_iter = PyObject_GetIter(varlist);
-        while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
-        {
-            if (py_netsnmp_attr_string(varbind, "oid",
-                                       &oid_str_arr[varlist_ind],
-                                       NULL) >= 0 &&
-                py_netsnmp_attr_string(varbind, "oid_index",
-                                       &oid_idx_str_arr[varlist_ind],
-                                       NULL) >= 0
-            )
-            {
-
-                //initial_oid_str_arr[varlist_ind] = oid_str_arr[varlist_ind];
+    Py_DECREF(seq);
+    *oid_arr_len = len;
+    return 0;
+}
 
-                py_log_msg(DEBUG,
-                           "netsnmp_bulkwalk: Initial oid(%s) oid_idx(%s)",
-                           oid_str_arr[varlist_ind],
-                           oid_idx_str_arr[varlist_ind]);
-
-                // Get oid array len
-                tp = __tag2oid(oid_str_arr[varlist_ind],
-                               oid_idx_str_arr[varlist_ind],
-                               oid_arr[varlist_ind],
-                               &oid_arr_len[varlist_ind], NULL, best_guess);
-            }
-            else
-            {
-                oid_arr_len[varlist_ind] = 0;
-            }
+/*
+ * The buffers the rows of a columnar request are appended to; see
+ * tdsnmp.utils.columnar.ColumnBuilder.
+ */
+struct py_netsnmp_columns
+{
+    PyObject *oids;     /* list of labels, equal labels share one object */
+    PyObject *indexes;  /* list of OID indexes */
+    PyObject *types;    /* bytearray of the ASN.1 type of each row */
+    PyObject *numbers;  /* bytearray of a native 64 bit integer per row */
+    PyObject *values;   /* list of values, None where held in numbers */
+    PyObject *labels;   /* dict interning the labels */
+};
 
-            if (!oid_arr_len[varlist_ind])
-            {
-                PyErr_Format(TDSNMPUnknownObjectIDError,
-                             "unknown object id (%s)",
-                             (oid_str_arr[varlist_ind] ? oid_str_arr[varlist_ind] : "<null>"));
-                error = 1;
-                Py_DECREF(varbind);
-                Py_DECREF(varlist_iter);
-                goto done;
-            }
+/*
+ * Append a response variable to the columns.
+ *
+ * The values of INTEGER, Counter32, Gauge32, TimeTicks, UInteger32 and
+ * Counter64 variables are stored in numbers without being formatted;
+ * other values are formatted as for an SNMPVariable and added to values.
+ *
+ * str_buf is scratch space of str_buf_size bytes which is overwritten.
+ * Returns -1 with an exception set on failure.
+ */
+static int py_netsnmp_append_column_row(struct py_netsnmp_columns *columns,
+                                        netsnmp_variable_list *vars,
+                                        int getlabel_flag,
+                                        int sprintval_flag,
+                                        u_char *str_buf,
+                                        size_t str_buf_size)
+{
+    u_char name_buf[STR_BUF_SIZE];
+    char *tag = NULL;
+    char *iid = NULL;
+    int len = 0;
+    int numeric = 1;
+    uint64_t number = 0;
+    PyObject *label = NULL;
+    PyObject *index = NULL;
+    PyObject *value = NULL;
+    Py_ssize_t size;
+    int ret = -1;
+    struct session_capsule_ctx *op = __stats_current();
+    double mark = __stats_mark(op);
 
-            Py_DECREF(varbind);
-            varlist_ind++;
-        }
+    switch (vars->type)
+    {
+        case ASN_INTEGER:
+            number = (uint64_t) (int64_t) *vars->val.integer;
+            break;
+        case ASN_COUNTER:
+        case ASN_GAUGE:
+        case ASN_TIMETICKS:
+        case ASN_UINTEGER:
+            number = (uint64_t) (*vars->val.integer & 0xffffffff);
+            break;
+        case ASN_COUNTER64:
+            number = ((uint64_t) (vars->val.counter64->high & 0xffffffff)
+                      << 32) |
+                     (vars->val.counter64->low & 0xffffffff);
+            break;
+        default:
+            numeric = 0;
+            break;
+    }
 
-        Py_XDECREF(varlist_iter);
+    __sprint_varbind(vars, getlabel_flag, sprintval_flag, name_buf,
+                     sizeof(name_buf), &tag, &iid,
+                     (numeric ? NULL : str_buf), str_buf_size, &len);
+    if (!tag)
+    {
+        tag = "";
+    }
+    __stats_lap(op, TIMING_FORMAT, &mark);
 
-        if (PyErr_Occurred())
+    /* the rows of a walk mostly share the label of the previous row */
+    size = PyList_GET_SIZE(columns->oids);
+    if (size)
+    {
+        label = PyList_GET_ITEM(columns->oids, size - 1);
+        if (PyUnicode_CompareWithASCIIString(label, tag) == 0)
         {
-            error = 1;
-            goto done;
+            Py_INCREF(label);
         }
-
-        /*
-         * Set up for numeric or full OID's, if necessary.  Save the old
-         * output format so that it can be restored when we finish -- this
-         * is a library-wide global, and has to be set/restored for each
-         * session.
-         */
-        old_format = netsnmp_ds_get_int(NETSNMP_DS_LIBRARY_ID,
-                                        NETSNMP_DS_LIB_OID_OUTPUT_FORMAT);
-
-        if (py_netsnmp_attr_long(session, "use_long_names"))
+        else
         {
-            getlabel_flag |= USE_LONG_NAMES;
-            netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                               NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                               NETSNMP_OID_OUTPUT_FULL);
+            label = NULL;
         }
-
-         /*
-          * Setting use_numeric forces use_long_names on so check for
-          * use_numeric after use_long_names (above) to make sure the final
-          * outcome of NETSNMP_DS_LIB_OID_OUTPUT_FORMAT is
-          * NETSNMP_OID_OUTPUT_NUMERIC
-          */
-        if (py_netsnmp_attr_long(session, "use_numeric"))
+    }
+    if (!label)
+    {
+        if (!(value = PyUnicode_DecodeLatin1(tag, strlen(tag), NULL)))
         {
-            getlabel_flag |= USE_LONG_NAMES;
-            getlabel_flag |= USE_NUMERIC_OIDS;
-
-            netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                               NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                               NETSNMP_OID_OUTPUT_NUMERIC);
+            goto done;
         }
-
-        /* delete the existing varbinds that we'll replace */
-        PySequence_DelSlice(varbinds, 0, PySequence_Length(varbinds));
-
-        if (PyErr_Occurred())
+        label = PyDict_SetDefault(columns->labels, value, value);
+        Py_XINCREF(label);
+        Py_CLEAR(value);
+        if (!label)
         {
-            error = 1;
             goto done;
         }
+    }
 
-        py_log_msg(DEBUG, "netsnmp_bulkwalk: Starting bulk walk request");
-        for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
-        {
-            pdu = snmp_pdu_create(SNMP_MSG_GETBULK);
-            pdu->non_repeaters = nonrepeaters;
-            pdu->max_repetitions = maxrepetitions;
-            snmp_add_null_var(pdu, oid_arr[varlist_ind], oid_arr_len[varlist_ind]);
+    if (!(index = PyUnicode_DecodeLatin1(iid, STRLEN(iid), NULL)))
+    {
+        goto done;
+    }
 
-            notdone = 1;
-            while (notdone)
-            {
-                py_log_msg(DEBUG, "netsnmp_bulkwalk: Sending pdu req");
-                status = __send_sync_pdu(ss, pdu, &response, retry_nosuch,
-                                         err_str, &err_num, &err_ind, NULL);
+    if (numeric)
+    {
+        Py_INCREF(Py_None);
+        value = Py_None;
+    }
+    else if (!(value = PyUnicode_DecodeLatin1((char *) str_buf, len, NULL)))
+    {
+        goto done;
+    }
 
-                __py_netsnmp_update_session_errors(session, err_str, err_num,
-                                                   err_ind);
-                if (status != 0) {
-                    error = 1;
-                    if (response)
-                    {
-                        snmp_free_pdu(response);
-                        response = NULL;
-                    }
-                    goto done;
-                }
+    if (PyList_Append(columns->oids, label) < 0 ||
+        PyList_Append(columns->indexes, index) < 0 ||
+        PyList_Append(columns->values, value) < 0)
+    {
+        goto done;
+    }
 
-                if (!response ||
-                    !response->variables ||
-                    status != STAT_SUCCESS ||
-                    response->errstat != SNMP_ERR_NOERROR)
-                {
-                    notdone = 0;
-                }
-                else
-                {
-                    vars = (response ? response->variables : NULL);
-                    while (vars)
-                    {
+    size = PyByteArray_GET_SIZE(columns->types);
+    if (PyByteArray_Resize(columns->types, size + 1) < 0)
+    {
+        goto done;
+    }
+    PyByteArray_AS_STRING(columns->types)[size] = (char) vars->type;
 
-                        if ((vars->name_length < oid_arr_len[varlist_ind]) ||
-                            (memcmp(oid_arr[varlist_ind], vars->name,
-                                    oid_arr_len[varlist_ind] * sizeof(oid)) != 0))
-                        {
-                            py_log_msg(DEBUG,
-                                       "netsnmp_bulkwalk: encountered end condition "
-                                       "(next subtree iteration out of scope)");
-                            notdone = 0;
-                            break;
-                        }
+    size = PyByteArray_GET_SIZE(columns->numbers);
+    if (PyByteArray_Resize(columns->numbers, size + sizeof(number)) < 0)
+    {
+        goto done;
+    }
+    memcpy(PyByteArray_AS_STRING(columns->numbers) + size, &number,
+           sizeof(number));
 
-                        if ((vars->type == SNMP_ENDOFMIBVIEW) ||
-                            (vars->type == SNMP_NOSUCHOBJECT) ||
-                            (vars->type == SNMP_NOSUCHINSTANCE))
-                        {
-                            py_log_msg(DEBUG,
-                                      "netsnmp_bulkwalk: encountered end condition "
-                                      "(ENDOFMIBVIEW, NOSUCHOBJECT, NO SUCH "
-                                      "INSTANCE)");
-                            notdone = 0;
-                            break;
-                        }
+    ret = 0;
 
-                        varbind = py_netsnmp_construct_varbind();
+done:
+    Py_XDECREF(label);
+    Py_XDECREF(index);
+    Py_XDECREF(value);
+    __stats_lap(op, TIMING_OBJECTS, &mark);
+    if (op)
+    {
+        op->stats.varbinds++;
+    }
+    return ret;
+}
 
-                        if (PyObject_HasAttrString(varbind, "oid"))
-                        {
-                            str_buf[0] = '.';
-                            str_buf[1] = '\0';
-                            out_len = 0;
-                            tp = netsnmp_sprint_realloc_objid_tree(&str_bufp,
-                                                                   &str_buf_len,
-                                                                   &out_len, 0,
-                                                                   &buf_over,
-                                                                   vars->name,
-                                                                   vars->name_length);
-                            str_buf[sizeof(str_buf) - 1] = '\0';
-
-                            type = __translate_asn_type(vars->type);
-
-                            if (__is_leaf(tp))
-                            {
-                                getlabel_flag &= ~NON_LEAF_NAME;
-                                py_log_msg(DEBUG,
-                                           "netsnmp_bulkwalk: is_leaf: %d",
-                                           tp->type);
-                            }
-                            else
-                            {
-                                getlabel_flag |= NON_LEAF_NAME;
-                                py_log_msg(DEBUG,
-                                           "netsnmp_bulkwalk: !is_leaf: %d",
-                                           tp->type);
-                            }
-
-                            py_log_msg(DEBUG, "netsnmp_bulkwalk: str_buf: %s",
-                                       str_buf);
-
-                            /*
-                             * Part of adopted code. SNMPVariable does not have
-                             * a root_oid attribute. Maybe this could be added
-                             * in a future update; will not implement now in
-                             * case it breaks someone else's code
-                             */
-                            // py_netsnmp_attr_set_string(varbind, "root_oid",
-                            //                            initial_oid_str_arr[varlist_ind],
-                            //                           STRLEN(initial_oid_str_arr[varlist_ind]));
-
-                            __get_label_iid((char *)str_buf,
-                                            &oid_str_arr[varlist_ind],
-                                            &oid_idx_str_arr[varlist_ind],
-                                            getlabel_flag);
-
-                            py_log_msg(DEBUG,
-                                       "netsnmp_bulkwalk: filling response: %s:%s",
-                                       oid_str_arr[varlist_ind],
-                                       oid_idx_str_arr[varlist_ind]);
-
-                            py_netsnmp_attr_set_string(varbind, "oid",
-                                                       oid_str_arr[varlist_ind],
-                                                       STRLEN(oid_str_arr[varlist_ind]));
-
-                            py_netsnmp_attr_set_string(varbind, "oid_index",
-                                                       oid_idx_str_arr[varlist_ind],
-                                                       STRLEN(oid_idx_str_arr[varlist_ind]));
-
-                            __get_type_str(type, type_str, 1);
-
-                            py_netsnmp_attr_set_string(varbind, "snmp_type",
-                                                       type_str,
-                                                       strlen(type_str));
-
-                            len = __snprint_value((char *)str_buf,
-                                                  sizeof(str_buf), vars, tp,
-                                                  type, sprintval_flag);
-                            str_buf[len] = '\0';
-
-                            py_netsnmp_attr_set_string(varbind, "value",
-                                                       (char *)str_buf, len);
-
-                            /* push the varbind onto the return varbinds */
-                            PyList_Append(varbinds, varbind);
-                        }
-                        else
-                        {
-                            py_log_msg(DEBUG,
-                                       "netsnmp_bulkwalk: bad varbind (%d)",
-                                       varlist_ind);
-                        }
-                        Py_XDECREF(varbind);
-
-                        // Create next request if we've reached the end
-                        if (vars->next_variable == NULL) {
-                            pdu = snmp_pdu_create(SNMP_MSG_GETBULK);
-                            pdu->non_repeaters = nonrepeaters;
-                            pdu->max_repetitions = maxrepetitions;
-                            snmp_add_null_var(pdu, vars->name, vars->name_length);
-                        }
+/*
+ * Like request, but the response variables are appended to the buffers of
+ * a tdsnmp.utils.columnar.ColumnBuilder instead of becoming SNMPVariable
+ * objects; columns is the (oids, indexes, types, numbers, values, labels)
+ * tuple of the builder.
+ *
+ * When root and cursor are given as tuples of integers, only the variables
+ * continuing the walk of root from cursor are appended (the rules of
+ * tdsnmp.utils.walk.advance_walk) and the cursor of the next request is
+ * returned, or None once the walk is finished. Otherwise every variable is
+ * appended and None is returned.
+ */
+static PyObject *netsnmp_columnar_request(PyObject *self, PyObject *args)
+{
+    PyObject *session = NULL;
+    PyObject *sess_ptr = NULL;
+    PyObject *varlist = NULL;
+    PyObject *columns_tuple = NULL;
+    PyObject *root_tuple = Py_None;
+    PyObject *cursor_tuple = Py_None;
+    PyObject *ret = NULL;
+    struct py_netsnmp_columns columns;
+    struct session_capsule_ctx *session_ctx = NULL;
+    netsnmp_pdu *pdu = NULL;
+    netsnmp_pdu *response = NULL;
+    netsnmp_variable_list *vars;
+    oid root[MAX_OID_LEN];
+    oid cursor[MAX_OID_LEN];
+    size_t root_len = 0;
+    size_t cursor_len = 0;
+    int walking;
+    int finished = 1;
+    int command;
+    int nonrepeaters;
+    int maxrepetitions;
+    int getlabel_flag;
+    int sprintval_flag;
 
-                        // Move on to next
-                        vars = vars->next_variable;
-                    }
-                    py_log_msg(DEBUG,
-                               "netsnmp_bulkwalk: Finished reading all "
-                               "variables for req");
-                }
+    if (!PyArg_ParseTuple(args, "OiiiOO|OO", &session, &command,
+                          &nonrepeaters, &maxrepetitions, &varlist,
+                          &columns_tuple, &root_tuple, &cursor_tuple))
+    {
+        return NULL;
+    }
 
-                if (response)
-                {
-                    snmp_free_pdu(response);
-                    response = NULL;
-                }
+    if (!PyArg_ParseTuple(columns_tuple, "O!O!O!O!O!O!:columnar_request",
+                          &PyList_Type, &columns.oids,
+                          &PyList_Type, &columns.indexes,
+                          &PyByteArray_Type, &columns.types,
+                          &PyByteArray_Type, &columns.numbers,
+                          &PyList_Type, &columns.values,
+                          &PyDict_Type, &columns.labels))
+    {
+        return NULL;
+    }
+
+    walking = (root_tuple != Py_None);
+    if (walking &&
+        (__py_netsnmp_tuple_oid(root_tuple, root, &root_len) < 0 ||
+         __py_netsnmp_tuple_oid(cursor_tuple, cursor, &cursor_len) < 0))
+    {
+        return NULL;
+    }
+
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
+
+    if (!session_ctx)
+    {
+        goto done;
+    }
+    __stats_begin(session_ctx);
+
+    if (!(pdu = __py_netsnmp_build_pdu(session, session_ctx, command,
+                                       varlist)) ||
+        __py_netsnmp_send_request(session, session_ctx, pdu, nonrepeaters,
+                                  maxrepetitions, &response) < 0)
+    {
+        goto done;
+    }
+
+    __py_netsnmp_session_flags(session, &getlabel_flag, &sprintval_flag);
+
+    for (vars = (response ? response->variables : NULL); vars;
+         vars = vars->next_variable)
+    {
+        if (walking)
+        {
+            if (!__py_netsnmp_walk_continues(vars, root, root_len, cursor,
+                                             &cursor_len))
+            {
+                finished = 1;
+                break;
             }
+            finished = 0;
         }
-        py_log_msg(DEBUG, "netsnmp_bulkwalk: Ending bulk walk request");
-
-        /* Reset the library's behavior for numeric/symbolic OID's. */
-        netsnmp_ds_set_int(NETSNMP_DS_LIBRARY_ID,
-                           NETSNMP_DS_LIB_OID_OUTPUT_FORMAT,
-                           old_format);
 
-        if (PyErr_Occurred())
+        if (py_netsnmp_append_column_row(&columns, vars, getlabel_flag,
+                                         sprintval_flag, session_ctx->buf,
+                                         sizeof(session_ctx->buf)) < 0)
         {
-            error = 1;
+            goto done;
         }
     }
 
+    if (walking && !finished)
+    {
+        ret = py_netsnmp_oid_tuple(cursor, cursor_len);
+    }
+    else
+    {
+        Py_INCREF(Py_None);
+        ret = Py_None;
+    }
+
 done:
-    py_log_msg(DEBUG, "netsnmp_bulkwalk: Starting cleanup");
-    Py_XDECREF(varbinds);
+    __stats_end(session_ctx);
     Py_XDECREF(sess_ptr);
-    //SAFE_FREE(initial_oid_str_arr);
-    SAFE_FREE(oid_arr_len);
+    if (response)
+    {
+        snmp_free_pdu(response);
+    }
+    return ret;
+}
 
-    for (varlist_ind = 0; varlist_ind < varlist_len; varlist_ind++)
+/*
+ * Build a request PDU of null variables from a sequence of numeric OIDs,
+ * each a tuple of integers, without looking anything up in the MIB.
+ *
+ * Returns NULL and raises an exception on failure.
+ */
+static netsnmp_pdu *__py_netsnmp_build_numeric_pdu(int command,
+                                                   PyObject *oids)
+{
+    PyObject *seq;
+    netsnmp_pdu *pdu;
+    oid oid_arr[MAX_OID_LEN];
+    size_t oid_arr_len;
+    Py_ssize_t i;
+
+    if (!(seq = PySequence_Fast(oids, "OIDs must be a sequence")))
     {
-        SAFE_FREE(oid_arr[varlist_ind]);
+        return NULL;
     }
 
-    SAFE_FREE(oid_arr);
-    SAFE_FREE(oid_str_arr);
-    SAFE_FREE(oid_idx_str_arr);
-    py_log_msg(DEBUG, "netsnmp_bulkwalk: End cleanup");
+    pdu = snmp_pdu_create(command);
+    for (i = 0; i < PySequence_Fast_GET_SIZE(seq); i++)
+    {
+        if (__py_netsnmp_tuple_oid(PySequence_Fast_GET_ITEM(seq, i), oid_arr,
+                                   &oid_arr_len) < 0)
+        {
+            Py_DECREF(seq);
+            snmp_free_pdu(pdu);
+            return NULL;
+        }
+        snmp_add_null_var(pdu, oid_arr, oid_arr_len);
+    }
 
-    if (error)
+    Py_DECREF(seq);
+    return pdu;
+}
+
+/*
+ * Returns a new tdsnmp.utils.variables.NumericVariable holding the numeric
+ * OID, type and value of a response variable; the value is formatted
+ * without consulting the MIB unless __typed_value() says otherwise.
+ *
+ * str_buf is scratch space of str_buf_size bytes which is overwritten.
+ */
+static PyObject *py_netsnmp_build_numeric_varbind(netsnmp_variable_list *vars,
+                                                  int sprintval_flag,
+                                                  u_char *str_buf,
+                                                  size_t str_buf_size)
+{
+    PyTypeObject *type = (PyTypeObject *) NumericVariableType;
+    PyObject *varbind;
+    PyObject *item;
+    char type_str[MAX_TYPE_NAME_LEN];
+    int len;
+    struct session_capsule_ctx *op = __stats_current();
+    double mark = __stats_mark(op);
+
+    if (op)
+    {
+        op->stats.varbinds++;
+    }
+    if (!(varbind = type->tp_alloc(type, 3)))
     {
         return NULL;
     }
-    return Py_None;
+
+    if (!(item = py_netsnmp_oid_tuple(vars->name, vars->name_length)))
+    {
+        goto error;
+    }
+    PyTuple_SET_ITEM(varbind, 0, item);
+
+    __get_type_str(__translate_asn_type(vars->type), type_str, 1);
+    if (!(item = PyUnicode_FromString(type_str)))
+    {
+        goto error;
+    }
+    PyTuple_SET_ITEM(varbind, 1, item);
+
+    if (__typed_value(vars, sprintval_flag))
+    {
+        item = py_netsnmp_typed_value(vars);
+    }
+    else
+    {
+        __stats_lap(op, TIMING_OBJECTS, &mark);
+        len = __snprint_value((char *) str_buf, str_buf_size, vars, NULL,
+                              __translate_asn_type(vars->type), USE_BASIC);
+        if (len >= str_buf_size)
+        {
+            len = str_buf_size - 1;
+        }
+        __stats_lap(op, TIMING_FORMAT, &mark);
+        item = PyUnicode_DecodeLatin1((char *) str_buf, len, NULL);
+    }
+    if (!item)
+    {
+        goto error;
+    }
+    PyTuple_SET_ITEM(varbind, 2, item);
+
+    __stats_lap(op, TIMING_OBJECTS, &mark);
+    return varbind;
+
+error:
+    Py_DECREF(varbind);
+    return NULL;
 }
 
-static PyObject *netsnmp_set(PyObject *self, PyObject *args)
+/*
+ * Send a single request for a sequence of numeric OIDs (tuples of integers)
+ * and append the response variables to results as NumericVariable objects.
+ * Nothing is looked up in the MIB in either direction.
+ *
+ * When root is given, only the variables continuing the walk of root from
+ * the first OID are appended and the cursor of the next request is
+ * returned, or None once the walk is finished. Otherwise every variable is
+ * appended and None is returned.
+ */
+static PyObject *netsnmp_numeric_request(PyObject *self, PyObject *args)
 {
     PyObject *session = NULL;
     PyObject *sess_ptr = NULL;
-    PyObject *varlist = NULL;
-    PyObject *varbind = NULL;
+    PyObject *oids = NULL;
+    PyObject *results = NULL;
+    PyObject *root_tuple = Py_None;
+    PyObject *cursor_tuple;
+    PyObject *varbind;
     PyObject *ret = NULL;
     struct session_capsule_ctx *session_ctx = NULL;
-    netsnmp_session *ss = NULL;
     netsnmp_pdu *pdu = NULL;
     netsnmp_pdu *response = NULL;
-    struct tree *tp = NULL;
-    char *tag = NULL;
-    char *iid = NULL;
-    char *val = NULL;
-    char *type_str;
-    int len;
-    oid *oid_arr = calloc(MAX_OID_LEN, sizeof(oid));
-    int oid_arr_len = MAX_OID_LEN;
-    int type;
-    u_char tmp_val_str[STR_BUF_SIZE];
-    int use_enums;
-    struct enum_list *ep = NULL;
-    int best_guess;
-    int status;
-    int err_ind;
-    int err_num;
-    char err_str[STR_BUF_SIZE];
-    char *tmpstr = NULL;
-    Py_ssize_t tmplen;
-    int error = 0;
+    netsnmp_variable_list *vars;
+    oid root[MAX_OID_LEN];
+    oid cursor[MAX_OID_LEN];
+    size_t root_len = 0;
+    size_t cursor_len = 0;
+    int walking;
+    int sprintval_flag = USE_BASIC;
+    int finished = 1;
+    int command;
+    int nonrepeaters;
+    int maxrepetitions;
 
-    if (oid_arr && args)
+    if (!PyArg_ParseTuple(args, "OiiiOO!|O", &session, &command,
+                          &nonrepeaters, &maxrepetitions, &oids,
+                          &PyList_Type, &results, &root_tuple))
     {
-        if (!PyArg_ParseTuple(args, "OO", &session, &varlist))
-        {
-            goto done;
-        }
-
-        sess_ptr = PyObject_GetAttrString(session, "session_ptr");
-        session_ctx = get_session_handle_from_capsule(sess_ptr);
+        return NULL;
+    }
 
-        if (!session_ctx)
+    walking = (root_tuple != Py_None);
+    if (walking)
+    {
+        if (!(cursor_tuple = PySequence_GetItem(oids, 0)))
         {
-            goto done;
+            return NULL;
         }
-
-        ss = session_ctx->handle;
-
-        /* PyObject_SetAttrString(); */
-        if (py_netsnmp_attr_string(session, "error_string", &tmpstr, &tmplen) < 0)
+        if (__py_netsnmp_tuple_oid(root_tuple, root, &root_len) < 0 ||
+            __py_netsnmp_tuple_oid(cursor_tuple, cursor, &cursor_len) < 0)
         {
-            goto done;
+            Py_DECREF(cursor_tuple);
+            return NULL;
         }
+        Py_DECREF(cursor_tuple);
+    }
 
-        use_enums = py_netsnmp_attr_long(session, "use_enums");
+    sess_ptr = PyObject_GetAttrString(session, "session_ptr");
+    session_ctx = get_session_handle_from_capsule(sess_ptr);
 
-        best_guess = py_netsnmp_attr_long(session, "best_guess");
+    if (!session_ctx)
+    {
+        goto done;
+    }
+    __stats_begin(session_ctx);
+    if (py_netsnmp_attr_long(session, "typed_values"))
+    {
+        sprintval_flag = USE_TYPED_VALUES;
+    }
+    if (py_netsnmp_attr_long(session, "raw_octet_strings"))
+    {
+        sprintval_flag |= RAW_OCTET_STRINGS;
+    }
 
-        pdu = snmp_pdu_create(SNMP_MSG_SET);
+    if (!(pdu = __py_netsnmp_build_numeric_pdu(command, oids)) ||
+        __py_netsnmp_send_request(session, session_ctx, pdu, nonrepeaters,
+                                  maxrepetitions, &response) < 0)
+    {
+        goto done;
+    }
 
-        if (varlist)
+    for (vars = (response ? response->variables : NULL); vars;
+         vars = vars->next_variable)
+    {
+        if (walking)
         {
-            PyObject *varlist_iter = PyObject_GetIter(varlist);
-
-            while (varlist_iter && (varbind = PyIter_Next(varlist_iter)))
+            if (!__py_netsnmp_walk_continues(vars, root, root_len, cursor,
+                                             &cursor_len))
             {
-                if (py_netsnmp_attr_string(varbind, "oid", &tag, NULL) < 0 ||
-                    py_netsnmp_attr_string(varbind, "oid_index", &iid, NULL) < 0)
-                {
-                    oid_arr_len = 0;
-                }
-                else
-                {
-                    tp = __tag2oid(tag, iid, oid_arr, &oid_arr_len, &type,
-                                   best_guess);
-                }
-
-                if (oid_arr_len == 0)
-                {
-                    PyErr_Format(TDSNMPUnknownObjectIDError,
-                                 "unknown object id (%s)",
-                                 (tag ? tag : "<null>"));
-                    error = 1;
-                    snmp_free_pdu(pdu);
-                    pdu = NULL;
-                    Py_DECREF(varbind);
-                    Py_DECREF(varlist_iter);
-                    goto done;
-                }
+                finished = 1;
+                break;
+            }
+            finished = 0;
+        }
 
-                if (type == TYPE_UNKNOWN)
-                {
-                    if (py_netsnmp_attr_string(varbind, "snmp_type", &type_str, NULL) < 0)
-                    {
-                        /**
-                         * NoneType error returned if this is not included.
-                         * Not sure why original author did not raise an error
-                         * here before. Keep an eye out for edge cases!
-                         */
-                        PyErr_SetString(TDSNMPUndeterminedTypeError,
-                                        "a type could not be determine for "
-                                        "the object");
-                        error = 1;
-                        snmp_free_pdu(pdu);
-                        pdu = NULL;
-                        Py_DECREF(varbind);
-                        Py_DECREF(varlist_iter);
-                        goto done;
-                    }
-                    type = __translate_appl_type(type_str);
-                    if (type == TYPE_UNKNOWN)
-                    {
-                        PyErr_SetString(TDSNMPUndeterminedTypeError,
-                                        "a type could not be determine for "
-                                        "the object");
-                        error = 1;
-                        snmp_free_pdu(pdu);
-                        pdu = NULL;
-                        Py_DECREF(varbind);
-                        Py_DECREF(varlist_iter);
-                        goto done;
-                    }
-                }
+        if (!(varbind = py_netsnmp_build_numeric_varbind(
+                  vars, sprintval_flag, session_ctx->buf, sizeof(session_ctx->buf))))
+        {
+            goto done;
+        }
+        if (PyList_Append(results, varbind) < 0)
+        {
+            Py_DECREF(varbind);
+            goto done;
+        }
+        Py_DECREF(varbind);
+    }
 
-                if (py_netsnmp_attr_string(varbind, "value", &val, &tmplen) < 0)
-                {
-                    snmp_free_pdu(pdu);
-                    pdu = NULL;
-                    Py_DECREF(varbind);
-                    Py_DECREF(varlist_iter);
-                    goto done;
-                }
-                memset(tmp_val_str, 0, sizeof(tmp_val_str));
-                if (tmplen >= sizeof(tmp_val_str))
-                {
-                    tmplen = sizeof(tmp_val_str) - 1;
-                }
-                memcpy(tmp_val_str, val, tmplen);
-                if (type == TYPE_INTEGER && use_enums && tp && tp->enums)
-                {
-                    for (ep = tp->enums; ep; ep = ep->next)
-                    {
-                        if (val && !strcmp(ep->label, val))
-                        {
-                            snprintf((char *) tmp_val_str, sizeof(tmp_val_str),
-                                     "%d", ep->value);
-                            break;
-                        }
-                    }
-                }
-                len = (int)tmplen;
-                status = __add_var_val_str(pdu, oid_arr, oid_arr_len,
-                                           (char *) tmp_val_str, len, type);
+    if (walking && !finished)
+    {
+        ret = py_netsnmp_oid_tuple(cursor, cursor_len);
+    }
+    else
+    {
+        Py_INCREF(Py_None);
+        ret = Py_None;
+    }
 
-                if (status == FAILURE)
-                {
-                    py_log_msg(ERROR, "set: adding variable/value to PDU");
-                }
+done:
+    __stats_end(session_ctx);
+    Py_XDECREF(sess_ptr);
+    if (response)
+    {
+        snmp_free_pdu(response);
+    }
+    return ret;
+}
 
-                /* release reference when done */
-                Py_DECREF(varbind);
-            }
+/*
+ * Returns the (hits, misses, max_size, size) of the OID translation cache.
+ */
+static PyObject *netsnmp_oid_cache_info(PyObject *self, PyObject *args)
+{
+    return Py_BuildValue("(KKnn)", oid_cache.hits, oid_cache.misses,
+                         (Py_ssize_t) oid_cache.max_size,
+                         (Py_ssize_t) oid_cache.size);
+}
 
-            Py_DECREF(varlist_iter);
+/*
+ * Set the maximum number of translations the OID cache holds, evicting the
+ * least recently used ones beyond it; 0 disables the cache.
+ */
+static PyObject *netsnmp_oid_cache_configure(PyObject *self, PyObject *args)
+{
+    struct oid_cache_entry **buckets;
+    struct oid_cache_entry *entry;
+    Py_ssize_t max_size;
+    size_t bucket_count = 16;
+    size_t bucket;
 
-            if (PyErr_Occurred())
-            {
-                error = 1;
-                snmp_free_pdu(pdu);
-                pdu = NULL;
-                goto done;
-            }
-        }
+    if (!PyArg_ParseTuple(args, "n", &max_size))
+    {
+        return NULL;
+    }
+    if (max_size < 0)
+    {
+        PyErr_SetString(PyExc_ValueError, "the cache size must not be negative");
+        return NULL;
+    }
 
-        status = __send_sync_pdu(ss, pdu, &response, NO_RETRY_NOSUCH,
-                                 err_str, &err_num, &err_ind, NULL);
-        __py_netsnmp_update_session_errors(session, err_str, err_num, err_ind);
+    oid_cache.max_size = max_size;
+    while (oid_cache.size > oid_cache.max_size)
+    {
+        __oid_cache_remove(oid_cache.lru_tail);
+    }
 
-        if (response)
+    /* Rehash the remaining entries into a table sized for max_size */
+    while (bucket_count < oid_cache.max_size)
+    {
+        bucket_count *= 2;
+    }
+    if (oid_cache.buckets && bucket_count != oid_cache.bucket_count)
+    {
+        if (!(buckets = calloc(bucket_count,
+                               sizeof(struct oid_cache_entry *))))
         {
-            snmp_free_pdu(response);
-            response = NULL;
+            return PyErr_NoMemory();
         }
-
-        if (status != 0)
+        for (entry = oid_cache.lru_head; entry; entry = entry->lru_next)
         {
-            error = 1;
-            goto done;
+            bucket = entry->hash & (bucket_count - 1);
+            entry->bucket_next = buckets[bucket];
+            buckets[bucket] = entry;
         }
+        free(oid_cache.buckets);
+        oid_cache.buckets = buckets;
+        oid_cache.bucket_count = bucket_count;
+    }
 
-        if (status == STAT_SUCCESS)
+    Py_RETURN_NONE;
+}
+
+/*
+ * Forget every translation of the OID cache and reset its statistics, e.g.
+ * after the MIBs have changed.
+ */
+static PyObject *netsnmp_oid_cache_clear(PyObject *self, PyObject *args)
+{
+    __oid_cache_clear();
+    Py_RETURN_NONE;
+}
+
+/*
+ * Choose the MIB modules (colon separated, "" for none, "ALL" for every
+ * module) and directories to load, None for the defaults of the library.
+ * The MIBs are loaded again right away if they already were, which empties
+ * the OID cache; otherwise they are loaded when first needed.
+ */
+static PyObject *netsnmp_set_mibs(PyObject *self, PyObject *args)
+{
+    char *modules;
+    char *directories;
+
+    if (!PyArg_ParseTuple(args, "zz", &modules, &directories))
+    {
+        return NULL;
+    }
+
+    free(mib_modules);
+    free(mib_directories);
+    mib_modules = (modules ? strdup(modules) : NULL);
+    mib_directories = (directories ? strdup(directories) : NULL);
+
+    if (mibs_loaded)
+    {
+        /* the cached translations point into the old MIB tree */
+        __oid_cache_clear();
+        mibs_loaded = 0;
+        __mibs_init();
+    }
+
+    Py_RETURN_NONE;
+}
+
+/*
+ * Load the MIBs now rather than when first needed, e.g. before forking
+ * workers so that they share the parsed tree.
+ */
+static PyObject *netsnmp_load_mibs(PyObject *self, PyObject *args)
+{
+    __mibs_init();
+    Py_RETURN_NONE;
+}
+
+static PyObject *netsnmp_mibs_loaded(PyObject *self, PyObject *args)
+{
+    return PyBool_FromLong(mibs_loaded);
+}
+
+/*
+ * Append a (oid, label, type, leaf, enums) tuple for tp and every node below
+ * it to nodes; name holds the name_len sub-identifiers above tp.
+ *
+ * Returns -1 with an exception set on failure.
+ */
+static int __py_netsnmp_add_mib_nodes(PyObject *nodes, struct tree *tp,
+                                      oid *name, size_t name_len)
+{
+    struct enum_list *ep;
+    PyObject *enums;
+    PyObject *node;
+    PyObject *type;
+    char type_str[MAX_TYPE_NAME_LEN];
+    struct tree *child;
+
+    if (name_len >= MAX_OID_LEN)
+    {
+        return 0;
+    }
+    name[name_len++] = tp->subid;
+
+    if (!(enums = PyList_New(0)))
+    {
+        return -1;
+    }
+    for (ep = tp->enums; ep; ep = ep->next)
+    {
+        PyObject *item = Py_BuildValue("(is)", ep->value, ep->label);
+        if (!item || PyList_Append(enums, item) < 0)
         {
-            ret = Py_BuildValue("i", 1); /* success, return True */
+            Py_XDECREF(item);
+            Py_DECREF(enums);
+            return -1;
         }
-        else
+        Py_DECREF(item);
+    }
+
+    if (__get_type_str(tp->type, type_str, 0))
+    {
+        type = PyUnicode_FromString(type_str);
+    }
+    else
+    {
+        Py_INCREF(Py_None);
+        type = Py_None;
+    }
+
+    node = Py_BuildValue("(NsNNN)", py_netsnmp_oid_tuple(name, name_len),
+                         tp->label, type, PyBool_FromLong(__is_leaf(tp)),
+                         enums);
+    if (!node || PyList_Append(nodes, node) < 0)
+    {
+        Py_XDECREF(node);
+        return -1;
+    }
+    Py_DECREF(node);
+
+    for (child = tp->child_list; child; child = child->next_peer)
+    {
+        if (__py_netsnmp_add_mib_nodes(nodes, child, name, name_len) < 0)
         {
-            ret = Py_BuildValue("i", 0); /* fail, return False */
+            return -1;
         }
     }
+    return 0;
+}
 
-done:
-    Py_XDECREF(sess_ptr);
-    SAFE_FREE(oid_arr);
-    if (error)
+/*
+ * Returns every node of the MIB tree, loading the MIBs if needed, as a
+ * list of (oid, label, type, leaf, enums) tuples: oid is a tuple of
+ * integers, type None for nodes without a syntax and enums a list of
+ * (value, label) tuples.
+ */
+static PyObject *netsnmp_mib_nodes(PyObject *self, PyObject *args)
+{
+    PyObject *nodes;
+    struct tree *tp;
+    oid name[MAX_OID_LEN];
+
+    __mibs_init();
+
+    if (!(nodes = PyList_New(0)))
     {
         return NULL;
     }
-    return (ret ? ret : Py_BuildValue(""));
+    for (tp = get_tree_head(); tp; tp = tp->next_peer)
+    {
+        if (__py_netsnmp_add_mib_nodes(nodes, tp, name, 0) < 0)
+        {
+            Py_DECREF(nodes);
+            return NULL;
+        }
+    }
+    return nodes;
+}
+
+/*
+ * Returns the (modules, directories) the MIBs are loaded from; modules is
+ * None for the defaults of the library.
+ */
+static PyObject *netsnmp_mib_config(PyObject *self, PyObject *args)
+{
+    __libraries_init("python");
+
+    return Py_BuildValue("(zz)", mib_modules,
+                         (mib_directories ? mib_directories :
+                          netsnmp_get_mib_directory()));
 }
 
 /**
@@ -4018,49 +6336,116 @@ done:
     return NULL;
 }
 
-static void py_log_msg(int log_level, char *printf_fmt, ...)
+/* the logging levels of the py_log_msg levels */
+static const int logging_levels[LOG_LEVEL_COUNT] = { 20, 30, 40, 10, 40 };
+
+/*
+ * Read py_log_threshold from the logger, which is enabled for the levels
+ * above the one disabled by logging.disable() and from its effective level
+ * on, as in Logger.isEnabledFor(). When the logger cannot tell, every
+ * message is passed on and the logger decides.
+ */
+static void py_log_refresh_threshold(void)
 {
-    PyObject *log_msg = NULL;
-    va_list fmt_args;
+    PyObject *level;
+    PyObject *manager = NULL;
+    PyObject *disable = NULL;
+    long effective;
+    long disabled;
 
-    va_start(fmt_args, printf_fmt);
-    log_msg = PyUnicode_FromFormatV(printf_fmt, fmt_args);
-    va_end(fmt_args);
+    py_log_threshold = 0;
+    if (!(level = PyObject_CallMethod(PyLogger, "getEffectiveLevel", NULL)) ||
+        !(manager = PyObject_GetAttrString(PyLogger, "manager")) ||
+        !(disable = PyObject_GetAttrString(manager, "disable")))
+    {
+        goto done;
+    }
 
-    if (log_msg == NULL)
+    effective = PyLong_AsLong(level);
+    disabled = PyLong_AsLong(disable);
+    if (!PyErr_Occurred())
     {
-        /* fail silently. */
-        return;
+        py_log_threshold = (effective > disabled ? effective : disabled + 1);
     }
 
-    /* call function depending on loglevel */
-    switch (log_level)
+done:
+    Py_XDECREF(level);
+    Py_XDECREF(manager);
+    Py_XDECREF(disable);
+    PyErr_Clear();
+}
+
+/*
+ * Whether messages of a py_log_msg level would be logged. This costs an
+ * attribute lookup once py_log_threshold is known.
+ */
+static int py_log_is_enabled(int log_level)
+{
+    PyObject *disabled;
+    int is_disabled = 0;
+
+    if (PyLogger == NULL || log_level < 0 || log_level >= LOG_LEVEL_COUNT)
     {
-        case INFO:
-            PyObject_CallMethod(PyLogger, "info", "O", log_msg);
-            break;
+        return 0;
+    }
 
-        case WARNING:
-            PyObject_CallMethod(PyLogger, "warn", "O", log_msg);
-            break;
+    /* logger.disabled is set directly, without a way to notice it */
+    disabled = PyObject_GetAttr(PyLogger, LogDisabledName);
+    if (disabled)
+    {
+        is_disabled = (PyObject_IsTrue(disabled) == 1);
+        Py_DECREF(disabled);
+    }
+    PyErr_Clear();
+    if (is_disabled)
+    {
+        return 0;
+    }
 
-        case ERROR:
-            PyObject_CallMethod(PyLogger, "error", "O", log_msg);
-            break;
+    if (py_log_threshold == LOG_THRESHOLD_UNKNOWN)
+    {
+        py_log_refresh_threshold();
+    }
+    return logging_levels[log_level] >= py_log_threshold;
+}
 
-        case DEBUG:
-            PyObject_CallMethod(PyLogger, "debug", "O", log_msg);
-            break;
+static void py_log_msg(int log_level, char *printf_fmt, ...)
+{
+    static const char *method_names[LOG_LEVEL_COUNT] = {
+        "info", "warning", "error", "debug", "exception"
+    };
+    PyObject *log_msg = NULL;
+    PyObject *result;
+    PyObject *err_type, *err_value, *err_traceback;
+    va_list fmt_args;
 
-        case EXCEPTION:
-            PyObject_CallMethod(PyLogger, "exception", "O", log_msg);
-            break;
+    /* messages may be logged while an exception is being raised */
+    PyErr_Fetch(&err_type, &err_value, &err_traceback);
 
-        default:
-            break;
+    if (!py_log_is_enabled(log_level))
+    {
+        goto done;
+    }
+
+    va_start(fmt_args, printf_fmt);
+    log_msg = PyUnicode_FromFormatV(printf_fmt, fmt_args);
+    va_end(fmt_args);
+
+    if (log_msg == NULL)
+    {
+        /* fail silently. */
+        PyErr_Clear();
+        goto done;
     }
 
+    result = PyObject_CallMethod(PyLogger, method_names[log_level], "O",
+                                 log_msg);
+    Py_XDECREF(result);
     Py_DECREF(log_msg);
+    PyErr_Clear();
+
+done:
+    PyErr_Restore(err_type, err_value, err_traceback);
 }
 
 /*
@@ -4095,6 +6480,42 @@ static PyMethodDef interface_methods[] =
             METH_VARARGS,
             "create a tunneled netsnmp session over tls, dtls or ssh."
         },
+        {
+            "close_session",
+            netsnmp_close_session,
+            METH_VARARGS,
+            "close a netsnmp session."
+        },
+        {
+            "session_engine_info",
+            netsnmp_session_engine_info,
+            METH_VARARGS,
+            "describe the SNMPv3 engine of a session's agent."
+        },
+        {
+            "session_stats",
+            netsnmp_session_stats,
+            METH_VARARGS,
+            "return the counters and last timing of a session."
+        },
+        {
+            "session_stats_reset",
+            netsnmp_session_stats_reset,
+            METH_VARARGS,
+            "reset the counters and last timing of a session."
+        },
+        {
+            "stats_begin",
+            netsnmp_stats_begin,
+            METH_VARARGS,
+            "start timing asynchronous requests of a session."
+        },
+        {
+            "stats_end",
+            netsnmp_stats_end,
+            METH_VARARGS,
+            "stop timing asynchronous requests of a session."
+        },
         {
             "get",
             netsnmp_get,
@@ -4131,6 +6552,96 @@ static PyMethodDef interface_methods[] =
             METH_VARARGS,
             "perform an SNMP BULKWALK operation."
         },
+        {
+            "async_send",
+            netsnmp_async_send,
+            METH_VARARGS,
+            "send an SNMP request without waiting for the response."
+        },
+        {
+            "async_poll",
+            netsnmp_async_poll,
+            METH_VARARGS,
+            "process responses and timeouts of asynchronous requests."
+        },
+        {
+            "async_select_info",
+            netsnmp_async_select_info,
+            METH_VARARGS,
+            "return the sockets and timeout to wait on for a session."
+        },
+        {
+            "numeric_oids",
+            netsnmp_numeric_oids,
+            METH_VARARGS,
+            "translate a variable list into numeric OID tuples."
+        },
+        {
+            "request",
+            netsnmp_request,
+            METH_VARARGS,
+            "send a single request and return its response variables."
+        },
+        {
+            "columnar_request",
+            netsnmp_columnar_request,
+            METH_VARARGS,
+            "send a single request and append its response to columns."
+        },
+        {
+            "numeric_request",
+            netsnmp_numeric_request,
+            METH_VARARGS,
+            "send a single request for numeric OIDs, bypassing the MIB."
+        },
+        {
+            "oid_cache_info",
+            netsnmp_oid_cache_info,
+            METH_VARARGS,
+            "return the statistics of the OID translation cache."
+        },
+        {
+            "oid_cache_configure",
+            netsnmp_oid_cache_configure,
+            METH_VARARGS,
+            "set the maximum size of the OID translation cache."
+        },
+        {
+            "oid_cache_clear",
+            netsnmp_oid_cache_clear,
+            METH_VARARGS,
+            "empty the OID translation cache."
+        },
+        {
+            "set_mibs",
+            netsnmp_set_mibs,
+            METH_VARARGS,
+            "choose the MIB modules and directories to load."
+        },
+        {
+            "load_mibs",
+            netsnmp_load_mibs,
+            METH_VARARGS,
+            "load the MIBs now rather than when first needed."
+        },
+        {
+            "mibs_loaded",
+            netsnmp_mibs_loaded,
+            METH_VARARGS,
+            "return whether the MIBs have been loaded."
+        },
+        {
+            "mib_nodes",
+            netsnmp_mib_nodes,
+            METH_VARARGS,
+            "return every node of the MIB tree."
+        },
+        {
+            "mib_config",
+            netsnmp_mib_config,
+            METH_VARARGS,
+            "return the modules and directories the MIBs are loaded from."
+        },
         {
             NULL,
             NULL,
@@ -4168,6 +6679,13 @@ PyMODINIT_FUNC initinterface(void)
         goto done;
     }
 
+    if (PyThread_tss_create(&current_operation) != 0)
+    {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "failed to create the thread-specific storage");
+        goto done;
+    }
+
     /*
      * Perform global imports:
      *
@@ -4223,6 +6741,28 @@ PyMODINIT_FUNC initinterface(void)
     TDSNMPUndeterminedTypeError = PyObject_GetAttrString(tdsnmp_exceptions_import,
                                                            "TDSNMPUndeterminedTypeError");
 
+    SNMPVariableType = PyObject_GetAttrString(tdsnmp_import, "SNMPVariable");
+    if (SNMPVariableType == NULL || !PyType_Check(SNMPVariableType))
+    {
+        const char *err_msg = "failed to load 'SNMPVariable'";
+        PyErr_SetString(PyExc_ImportError, err_msg);
+        goto done;
+    }
+    NumericVariableType = PyObject_GetAttrString(tdsnmp_import,
+                                                 "NumericVariable");
+    if (NumericVariableType == NULL || !PyType_Check(NumericVariableType))
+    {
+        const char *err_msg = "failed to load 'NumericVariable'";
+        PyErr_SetString(PyExc_ImportError, err_msg);
+        goto done;
+    }
+    VarbindAttrNames[VARBIND_OID] = PyUnicode_InternFromString("oid");
+    VarbindAttrNames[VARBIND_OID_INDEX] =
+        PyUnicode_InternFromString("oid_index");
+    VarbindAttrNames[VARBIND_SNMP_TYPE] =
+        PyUnicode_InternFromString("snmp_type");
+    VarbindAttrNames[VARBIND_VALUE] = PyUnicode_InternFromString("value");
+
     /* Initialise logging (note: automatically has refcount 1) */
     PyLogger = py_get_logger("tdsnmp.c.interface");
 
@@ -4231,9 +6771,33 @@ PyMODINIT_FUNC initinterface(void)
         goto done;
     }
 
-    /* initialise the netsnmp library */
-    __libraries_init("python");
+    LogDisabledName = PyUnicode_InternFromString("disabled");
+
+    /* constants used by the asynchronous interface */
+    PyModule_AddIntConstant(interface_module, "SNMP_MSG_GET", SNMP_MSG_GET);
+    PyModule_AddIntConstant(interface_module, "SNMP_MSG_GETNEXT",
+                            SNMP_MSG_GETNEXT);
+    PyModule_AddIntConstant(interface_module, "SNMP_MSG_GETBULK",
+                            SNMP_MSG_GETBULK);
+    PyModule_AddIntConstant(interface_module, "SNMP_MSG_SET", SNMP_MSG_SET);
+    PyModule_AddIntConstant(interface_module, "STAT_SUCCESS", STAT_SUCCESS);
+    PyModule_AddIntConstant(interface_module, "STAT_ERROR", STAT_ERROR);
+    PyModule_AddIntConstant(interface_module, "STAT_TIMEOUT", STAT_TIMEOUT);
+    PyModule_AddIntConstant(interface_module, "SNMP_ERR_NOSUCHNAME",
+                            SNMP_ERR_NOSUCHNAME);
+    PyModule_AddIntConstant(interface_module, "SNMP_ERR_TOOBIG",
+                            SNMP_ERR_TOOBIG);
+    PyModule_AddIntConstant(interface_module, "SNMPERR_UNKNOWN_ENG_ID",
+                            SNMPERR_UNKNOWN_ENG_ID);
+    PyModule_AddIntConstant(interface_module, "SNMPERR_NOT_IN_TIME_WINDOW",
+                            SNMPERR_NOT_IN_TIME_WINDOW);
+    PyModule_AddIntConstant(interface_module, "SNMPERR_TIMEOUT",
+                            SNMPERR_TIMEOUT);
 
+    /*
+     * The netsnmp library is initialised with the first session, and the
+     * MIBs are loaded when first needed
+     */
     py_log_msg(DEBUG, "initialised tdsnmp.c.interface");
 
 #if PY_MAJOR_VERSION >= 3
@@ -4255,6 +6819,8 @@ done:
     Py_XDECREF(TDSNMPUnknownObjectIDError);
     Py_XDECREF(TDSNMPNoSuchObjectError);
     Py_XDECREF(TDSNMPUndeterminedTypeError);
+    Py_XDECREF(SNMPVariableType);
+    Py_XDECREF(NumericVariableType);
     Py_XDECREF(PyLogger);
 
 #if PY_MAJOR_VERSION >= 3
@@ -7,6 +7,7 @@ AUTH_WITH_PRIVACY = 3
 # SNMP Type
 NO_SUCH_OBJECT = 'NOSUCHOBJECT'
 NO_SUCH_INSTANCE = 'NOSUCHINSTANCE'
+END_OF_MIB_VIEW = 'ENDOFMIBVIEW'
 
 # SNMP Session
 DEFAULT_VERSION = 3
\ No newline at end of file
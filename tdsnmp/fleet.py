@@ -0,0 +1,433 @@
+import itertools
+import multiprocessing
+import struct
+import zlib
+from array import array
+from collections import namedtuple
+from multiprocessing import connection, resource_tracker, shared_memory
+
+from tdsnmp import exceptions
+from tdsnmp.poller import OPERATIONS, PollJob
+from tdsnmp.pool import SessionPool
+from tdsnmp.utils import compat, columnar
+from tdsnmp.utils.columnar import ColumnBuilder
+from tdsnmp.utils.variables import SNMPVariable, SNMPVariableList
+
+MAGIC = b'TDSCOL01'
+
+# magic, row count, label count and the offsets of the number, string end,
+# label id, type and string sections
+HEADER = struct.Struct('=8sIIIIIII')
+
+NUMERIC_TYPES = columnar.SIGNED_TYPES | columnar.UNSIGNED_TYPES
+
+#: The outcome of a job; columns is None and error is set when it failed.
+FleetResult = namedtuple('FleetResult', ['index', 'job', 'columns', 'error'])
+
+
+def _align(offset, size):
+    return (offset + size - 1) // size * size
+
+
+def share(columns):
+    """
+    Copy the rows of a ColumnBuilder into a new shared memory block.
+
+    The block holds the 64 bit numbers and the type codes of the rows as
+    they are, the distinct labels once and the indexes and string values
+    as Latin-1, so that it can be read in place by SharedColumns.
+    Returns:
+        str: The name of the block, to hand to SharedColumns, which removes
+             it
+    """
+    labels = {}
+    ids = array('I', [labels.setdefault(label, len(labels))
+                      for label in columns.oids])
+    strings = [label.encode('latin-1') for label in labels]
+    strings.extend(index.encode('latin-1') for index in columns.indexes)
+    strings.extend(b'' if value is None else value.encode('latin-1')
+                   for value in columns.values)
+    ends = array('I', itertools.accumulate(map(len, strings)))
+
+    rows = len(columns)
+    numbers_offset = _align(HEADER.size, 8)
+    ends_offset = numbers_offset + 8 * rows
+    ids_offset = ends_offset + 4 * len(ends)
+    types_offset = ids_offset + 4 * rows
+    strings_offset = types_offset + rows
+    size = strings_offset + (ends[-1] if ends else 0)
+
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        HEADER.pack_into(block.buf, 0, MAGIC, rows, len(labels),
+                         numbers_offset, ends_offset, ids_offset,
+                         types_offset, strings_offset)
+        block.buf[numbers_offset:ends_offset] = columns.numbers
+        block.buf[ends_offset:ids_offset] = ends.tobytes()
+        block.buf[ids_offset:types_offset] = ids.tobytes()
+        block.buf[types_offset:strings_offset] = columns.types
+        block.buf[strings_offset:size] = b''.join(strings)
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+
+    # The reader owns the block from now on: it must not be removed when
+    # this process exits
+    resource_tracker.unregister(block._name, 'shared_memory')
+    block.close()
+    return block.name
+
+
+class SharedColumns:
+    """
+    The rows collected by a fleet worker, read in place from the shared
+    memory block the worker wrote them to: nothing is unpickled, numbers
+    and type codes are memoryviews of the block and strings are decoded
+    only when asked for.
+
+    The name of the block is removed as soon as it is mapped; the memory is
+    released by close(), or once the object is garbage collected.
+    """
+
+    def __init__(self, name):
+        """
+        Args:
+            name (str): The block, as returned by share()
+        Raises:
+            ValueError: The block does not hold rows
+        """
+        self._block = shared_memory.SharedMemory(name)
+        self._block.unlink()
+        buf = self._block.buf
+
+        (magic, rows, labels, numbers_offset, ends_offset, ids_offset,
+         types_offset, strings_offset) = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            self._block.close()
+            raise ValueError('{0} does not hold rows'.format(name))
+
+        self._labels = labels
+        #: The value of each row as a 64 bit integer (memoryview of 'q'),
+        #: for the rows of integer types
+        self.numbers = buf[numbers_offset:ends_offset].cast('q')
+        #: The ASN.1 type code of each row (memoryview of 'B')
+        self.types = buf[types_offset:strings_offset]
+        self._ends = buf[ends_offset:ids_offset].cast('I')
+        self._ids = buf[ids_offset:types_offset].cast('I')
+        self._strings = buf[strings_offset:]
+
+    def __len__(self):
+        return len(self.types)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Unmap the block; the memoryviews become unusable.
+        """
+        for view in (self.numbers, self.types, self._ends, self._ids,
+                     self._strings):
+            view.release()
+        self._block.close()
+
+    def _string(self, position):
+        start = self._ends[position - 1] if position else 0
+        return str(self._strings[start:self._ends[position]], 'latin-1')
+
+    def oid(self, row):
+        return self._string(self._ids[row])
+
+    def oid_index(self, row):
+        return self._string(self._labels + row)
+
+    def snmp_type(self, row):
+        return columnar.TYPE_NAMES.get(self.types[row])
+
+    def value(self, row):
+        """
+        Returns:
+            The value of a row: an int for the integer types and a string
+            otherwise.
+        """
+        code = self.types[row]
+        if code in columnar.UNSIGNED_TYPES:
+            return self.numbers[row] & 0xFFFFFFFFFFFFFFFF
+        if code in columnar.SIGNED_TYPES:
+            return self.numbers[row]
+        return self._string(self._labels + len(self) + row)
+
+    def variables(self):
+        """
+        Returns:
+            SNMPVariableList: The rows as SNMPVariable objects, as a session
+                              would have returned them.
+        """
+        return SNMPVariableList(
+            SNMPVariable(self.oid(row), self.oid_index(row), self.value(row),
+                         self.snmp_type(row))
+            for row in range(len(self))
+        )
+
+    def result(self):
+        """
+        Returns:
+            ColumnarResult: The rows as NumPy arrays, as with
+                            result_format='columnar'. The arrays do not
+                            refer to the block.
+        """
+        labels = [self._string(position) for position in range(self._labels)]
+        values = [None if self.types[row] in NUMERIC_TYPES
+                  else self._string(self._labels + len(self) + row)
+                  for row in range(len(self))]
+        return columnar.build_result(
+            [labels[label] for label in self._ids],
+            [self.oid_index(row) for row in range(len(self))],
+            bytes(self.types), bytes(self.numbers), values
+        )
+
+
+def _collect(session, job, non_repeaters, max_repetitions):
+    """
+    Run a job, collecting the variables as columns.
+    Returns:
+        ColumnBuilder: The rows of the response
+    """
+    if job.operation not in OPERATIONS:
+        raise ValueError('unknown operation {0}'.format(job.operation))
+    if session.version == 1 and job.operation in ('get_bulk', 'bulkwalk'):
+        raise exceptions.TDSNMPException(
+            'you cannot perform a bulk operation for SNMP version 1'
+        )
+
+    oids = job.oids
+    if isinstance(oids, str) or not isinstance(oids, compat.Iterable):
+        oids = [oids]
+
+    interface = session.get_interface()
+    columns = ColumnBuilder()
+    if job.operation == 'walk':
+        session._walk_columns(oids, 0, 0, columns)
+    elif job.operation == 'bulkwalk':
+        session._walk_columns(oids, 0, max_repetitions, columns)
+    else:
+        command = {
+            'get': interface.SNMP_MSG_GET,
+            'get_next': interface.SNMP_MSG_GETNEXT,
+            'get_bulk': interface.SNMP_MSG_GETBULK,
+        }[job.operation]
+        bulk = job.operation == 'get_bulk'
+        interface.columnar_request(
+            session, command, non_repeaters if bulk else 0,
+            max_repetitions if bulk else 0,
+            session.build_interface_vars(oids), columns.buffers
+        )
+
+    if session.abort_on_nonexistent:
+        columns.validate()
+    return columns
+
+
+def _work(channel, non_repeaters, max_repetitions, max_sessions):
+    """
+    The loop of a worker process: receives batches of (index, job), sends
+    back (index, block name, error) for each job and None once the batch
+    is done, until it receives None.
+    """
+    pool = SessionPool(max_size=max_sessions, idle_timeout=None)
+    try:
+        while True:
+            batch = channel.recv()
+            if batch is None:
+                return
+            for index, job in batch:
+                name = error = None
+                try:
+                    with pool.session(**job.session_kwargs) as session:
+                        columns = _collect(session, job, non_repeaters,
+                                           max_repetitions)
+                    name = share(columns)
+                except Exception as job_error:
+                    error = job_error
+                channel.send((index, name, error))
+            channel.send(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        pool.close()
+
+
+class _Worker:
+    """
+    A worker process and the parent's end of its pipe.
+    """
+
+    def __init__(self, context, args):
+        self.channel, child = context.Pipe()
+        self.process = context.Process(target=_work, args=(child,) + args,
+                                       daemon=True)
+        self.process.start()
+        child.close()
+
+    def close(self):
+        try:
+            self.channel.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.channel.close()
+
+
+class FleetCollector:
+    """
+    Polls a fleet of agents from a pool of worker processes, so that
+    formatting the responses is spread over several cores rather than
+    bound to the GIL of one process.
+
+    Agents are sharded over the workers by hostname and port, and each
+    worker keeps its sessions open (see SessionPool) from one collect() to
+    the next, so the sockets and, for SNMPv3, the discovered engines are
+    reused. A worker runs its jobs one after another, collecting the
+    variables as columns (see result_format='columnar') which it copies
+    into a shared memory block; the parent maps the block as a
+    SharedColumns rather than unpickling the rows.
+
+    Note that the session arguments of the jobs are pickled to reach the
+    workers, and that MIBs loaded in the parent before the workers start
+    are only inherited with the 'fork' start method.
+    """
+
+    def __init__(self, processes=None, non_repeaters=0, max_repetitions=15,
+                 max_sessions=1024, start_method=None):
+        """
+        Args:
+            processes (int): The number of worker processes, by default the
+                             number of CPUs
+            non_repeaters (int): The non-repeaters of get_bulk jobs
+            max_repetitions (int): The max-repetitions of get_bulk and
+                                   bulkwalk jobs
+            max_sessions (int): The maximum number of sessions each worker
+                                keeps open
+            start_method (str): The multiprocessing start method of the
+                                workers, by default the platform's
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        if processes < 1:
+            raise ValueError('processes must be at least 1')
+
+        self.processes = processes
+        self._context = multiprocessing.get_context(start_method)
+        self._args = (non_repeaters, max_repetitions, max_sessions)
+        self._workers = [None] * processes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Stop the worker processes, closing their sessions.
+        """
+        workers, self._workers = self._workers, [None] * self.processes
+        for worker in workers:
+            if worker is not None:
+                worker.close()
+
+    def shard(self, session_kwargs):
+        """
+        Returns:
+            int: The worker polling the agent of the session arguments
+        """
+        agent = '{0}:{1}'.format(session_kwargs.get('hostname', 'localhost'),
+                                 session_kwargs.get('remote_port', 0))
+        return zlib.crc32(agent.encode()) % self.processes
+
+    def collect(self, jobs):
+        """
+        Runs every job.
+        Returns:
+            list(FleetResult): The results in the order of the jobs.
+        """
+        return sorted(self.run(jobs), key=lambda result: result.index)
+
+    def run(self, jobs):
+        """
+        Runs every job, yielding results as the jobs complete.
+        Args:
+            jobs (iterable): PollJob objects or
+                             (session_kwargs, operation, oids) tuples
+        Returns:
+            generator: FleetResult objects in completion order; close the
+                       SharedColumns of each once done with it.
+        """
+        jobs = [PollJob(*job) for job in jobs]
+        batches = {}
+        for index, job in enumerate(jobs):
+            batches.setdefault(self.shard(job.session_kwargs), []).append(
+                (index, job)
+            )
+
+        busy = {}
+        for shard, batch in batches.items():
+            worker = self._workers[shard]
+            if worker is None or not worker.process.is_alive():
+                worker = self._workers[shard] = _Worker(self._context, self._args)
+            worker.channel.send(batch)
+            busy[worker.channel] = (shard, {index for index, _ in batch})
+
+        try:
+            while busy:
+                for channel in connection.wait(list(busy)):
+                    shard, pending = busy[channel]
+                    try:
+                        message = channel.recv()
+                    except EOFError:
+                        del busy[channel]
+                        self._workers[shard] = None
+                        for index in sorted(pending):
+                            error = exceptions.TDSNMPException(
+                                'the worker process exited'
+                            )
+                            yield FleetResult(index, jobs[index], None, error)
+                        continue
+
+                    if message is None:
+                        del busy[channel]
+                        continue
+                    index, name, error = message
+                    pending.discard(index)
+                    columns = None if name is None else SharedColumns(name)
+                    yield FleetResult(index, jobs[index], columns, error)
+        finally:
+            # Abandoned early: drain the workers so that their next batch
+            # starts clean, and free the blocks nobody will read
+            for channel, (shard, _) in busy.items():
+                try:
+                    for message in iter(channel.recv, None):
+                        if message[1] is not None:
+                            SharedColumns(message[1]).close()
+                except EOFError:
+                    self._workers[shard] = None
+
+
+def collect(jobs, processes=None, non_repeaters=0, max_repetitions=15):
+    """
+    Runs a list of jobs with a FleetCollector whose workers are stopped
+    once done.
+
+    :param jobs: PollJob objects or (session_kwargs, operation, oids) tuples
+    :param processes: the number of worker processes
+    :param non_repeaters: the non-repeaters of get_bulk jobs
+    :param max_repetitions: the max-repetitions of get_bulk and bulkwalk jobs
+    :return: a list of FleetResult objects in the order of the jobs
+    """
+    with FleetCollector(processes=processes, non_repeaters=non_repeaters,
+                        max_repetitions=max_repetitions) as collector:
+        return collector.collect(jobs)
@@ -0,0 +1,324 @@
+import hashlib
+import importlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from tdsnmp import exceptions
+
+MAGIC = b'TDSMIB01'
+
+# magic, key, node count and the offsets of the node, name, OID and string
+# sections
+HEADER = struct.Struct('<8s32sIIIII')
+
+# OID offset (in sub-identifiers) and parent node, OID length, type, flags,
+# label offset and length, enums length and offset
+NODE = struct.Struct('<IIHBBIHHI')
+
+NO_PARENT = 0xFFFFFFFF
+LEAF = 0x01
+
+#: The syntaxes nodes may have, as named by the C interface
+TYPE_NAMES = (
+    None, 'OBJECTID', 'OCTETSTR', 'INTEGER', 'INTEGER32', 'UNSIGNED32',
+    'NETADDR', 'IPADDR', 'COUNTER', 'GAUGE', 'TICKS', 'OPAQUE', 'COUNTER64',
+    'NULL', 'UINTEGER', 'NOTIF', 'BITS', 'TRAP'
+)
+
+
+class MIBIndex:
+    """
+    A compiled MIB tree memory-mapped from a file written by build(), so
+    that processes sharing the file share its pages and skip parsing the
+    MIB text files.
+
+    Nodes are stored sorted by OID, and their labels in a separate sorted
+    table, so that lookups in either direction are binary searches in the
+    mapped file.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The index file
+        Raises:
+            ValueError: The file is not a MIB index
+        """
+        self.path = path
+        with open(path, 'rb') as index_file:
+            self._map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError('{0} is not a MIB index'.format(path))
+
+        (magic, self.key, self._count, self._nodes, self._names, self._oids,
+         self._strings) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('{0} is not a MIB index'.format(path))
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._map.close()
+
+    def _node(self, node):
+        return NODE.unpack_from(self._map, self._nodes + node * NODE.size)
+
+    def _oid(self, node):
+        oid_offset, _, oid_len = NODE.unpack_from(
+            self._map, self._nodes + node * NODE.size
+        )[:3]
+        return struct.unpack_from(
+            '<{0}I'.format(oid_len), self._map, self._oids + 4 * oid_offset
+        )
+
+    def _string(self, offset, length):
+        start = self._strings + offset
+        return self._map[start:start + length].decode('ascii')
+
+    def label(self, node):
+        record = self._node(node)
+        return self._string(record[5], record[6])
+
+    def find_name(self, label):
+        """
+        Returns:
+            int: The node labelled label, or None
+        """
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            node, = struct.unpack_from('<I', self._map, self._names + 4 * middle)
+            if self.label(node) < label:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            node, = struct.unpack_from('<I', self._map, self._names + 4 * low)
+            if self.label(node) == label:
+                return node
+        return None
+
+    def find_oid(self, oid):
+        """
+        Returns:
+            int: The deepest node whose OID is a prefix of oid (a tuple of
+                 integers), or None
+        """
+        # The last node sorted before oid is either the deepest prefix of
+        # oid or below one of its prefixes
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if oid < self._oid(middle):
+                high = middle
+            else:
+                low = middle + 1
+
+        node = low - 1
+        while node >= 0 and node != NO_PARENT:
+            node_oid = self._oid(node)
+            if oid[:len(node_oid)] == node_oid:
+                return node
+            node = self._node(node)[1]
+        return None
+
+    def snmp_type(self, node):
+        return TYPE_NAMES[self._node(node)[3]]
+
+    def is_leaf(self, node):
+        return bool(self._node(node)[4] & LEAF)
+
+    def enums(self, node):
+        """
+        Returns:
+            dict: The labels of the values of an enumerated node
+        """
+        record = self._node(node)
+        if not record[7]:
+            return {}
+        enums = {}
+        for item in self._string(record[8], record[7]).split(','):
+            value, label = item.split('=', 1)
+            enums[int(value)] = label
+        return enums
+
+    def resolve(self, oid, oid_index=None):
+        """
+        Translate an OID as accepted by a session (e.g. 'sysDescr.0',
+        'SNMPv2-MIB::sysDescr', '.iso.org.dod' or '.1.3.6.1') and its index
+        into a tuple of integers.
+
+        Raises:
+            TDSNMPUnknownObjectIDError: A label is not in the index
+        """
+        oid = oid.split('::', 1)[-1]
+        parts = [part for part in oid.split('.') if part]
+        if oid_index:
+            parts.extend(part for part in str(oid_index).split('.') if part)
+
+        # Everything from the last label on is below the labelled node
+        labelled = [i for i, part in enumerate(parts) if not part.isdigit()]
+        if not labelled:
+            return tuple(int(part) for part in parts)
+
+        last = labelled[-1]
+        node = self.find_name(parts[last])
+        if node is None:
+            raise exceptions.TDSNMPUnknownObjectIDError(
+                'unknown object id ({0})'.format(oid)
+            )
+        return self._oid(node) + tuple(int(part) for part in parts[last + 1:])
+
+    def describe(self, oid, use_long_names=False, use_numeric=False):
+        """
+        Split an OID (a tuple of integers) into the name and index a session
+        reports, like the C interface does with the MIB loaded.
+
+        Returns:
+            tuple: The name, the index and the node of the OID (None when
+                   no node is a prefix of it)
+        """
+        node = self.find_oid(oid)
+        if use_numeric or node is None:
+            numeric = ['', *map(str, oid)]
+            return '.'.join(numeric[:-1]), numeric[-1], node
+
+        node_oid = self._oid(node)
+        if use_long_names:
+            labels = []
+            ancestor = node
+            while ancestor != NO_PARENT:
+                labels.append(self.label(ancestor))
+                ancestor = self._node(ancestor)[1]
+            name = '.' + '.'.join(reversed(labels))
+        else:
+            name = self.label(node)
+        index = '.'.join(str(subid) for subid in oid[len(node_oid):])
+
+        if self.is_leaf(node):
+            return name, index, node
+        # The C interface does not know where the index starts either
+        return '.'.join(filter(None, (name, index))), '', node
+
+
+def index_key(modules, directories):
+    """
+    Returns:
+        bytes: A digest of the MIB modules to load and of the files in the
+               MIB directories, which changes whenever the index has to be
+               built again.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((modules, os.environ.get('MIBS'))).encode())
+    for directory in (directories or '').split(':'):
+        directory = directory.lstrip('+-')
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        digest.update(directory.encode())
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            digest.update(repr((entry.name, stat.st_size, stat.st_mtime_ns)).encode())
+    return digest.digest()
+
+
+def default_path(key):
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'tdsnmp', 'mib-{0}.idx'.format(key.hex()[:16]))
+
+
+def build(path, key, nodes):
+    """
+    Write an index of nodes, as returned by the mib_nodes function of the C
+    interface, to path.
+    """
+    nodes = sorted(nodes)
+    positions = {node[0]: position for position, node in enumerate(nodes)}
+
+    def parent(oid):
+        for length in range(len(oid) - 1, 0, -1):
+            if oid[:length] in positions:
+                return positions[oid[:length]]
+        return NO_PARENT
+
+    records = bytearray()
+    oids = array('I')
+    strings = bytearray()
+    for oid, label, snmp_type, leaf, enums in nodes:
+        label = label.encode('ascii', 'replace')
+        enums = ','.join('{0}={1}'.format(*enum) for enum in enums).encode('ascii', 'replace')
+        records += NODE.pack(
+            len(oids), parent(oid), len(oid),
+            TYPE_NAMES.index(snmp_type) if snmp_type in TYPE_NAMES else 0,
+            LEAF if leaf else 0, len(strings), len(label), len(enums),
+            len(strings) + len(label)
+        )
+        oids.extend(oid)
+        strings += label + enums
+
+    names = array('I', sorted(range(len(nodes)), key=lambda position: nodes[position][1]))
+    if sys.byteorder == 'big':
+        oids.byteswap()
+        names.byteswap()
+
+    nodes_offset = HEADER.size
+    names_offset = nodes_offset + len(records)
+    oids_offset = names_offset + 4 * len(names)
+    strings_offset = oids_offset + 4 * len(oids)
+    header = HEADER.pack(MAGIC, key, len(nodes), nodes_offset, names_offset,
+                         oids_offset, strings_offset)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as index_file:
+            for section in (header, records, names.tobytes(), oids.tobytes(), strings):
+                index_file.write(section)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def load(path=None):
+    """
+    Map the index of the MIBs configured with tdsnmp.mibs, building it
+    first (which loads the MIBs in this process) when it is missing or the
+    modules or MIB directories have changed since.
+
+    Args:
+        path (str): The index file, by default one per configuration under
+                    $XDG_CACHE_HOME/tdsnmp
+    Returns:
+        MIBIndex: The index, to pass as the mib_index of sessions
+    """
+    interface = importlib.import_module('tdsnmp.c.interface')
+    modules, directories = interface.mib_config()
+    key = index_key(modules, directories)
+    if path is None:
+        path = default_path(key)
+
+    try:
+        index = MIBIndex(path)
+    except (OSError, ValueError):
+        pass
+    else:
+        if index.key == key:
+            return index
+        index.close()
+
+    build(path, key, interface.mib_nodes())
+    return MIBIndex(path)
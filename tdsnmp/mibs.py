@@ -0,0 +1,46 @@
+import importlib
+
+
+def _interface():
+    return importlib.import_module('tdsnmp.c.interface')
+
+
+def configure(modules=None, directories=None):
+    """
+    Choose the MIB modules to load. Importing the C interface parses no MIB:
+    the modules are loaded the first time a name or a value has to be
+    translated through the MIB, which the numeric requests of a session
+    never need. If the MIBs have already been loaded they are loaded again
+    right away, which also empties the translation cache of
+    tdsnmp.utils.oid_cache.
+
+    Args:
+        modules (list or str): Module names (e.g. ['SNMPv2-MIB', 'IF-MIB']),
+                               an empty list to load none for numeric-only
+                               use, 'ALL' for every module found, or None
+                               for the defaults of net-snmp (the MIBS
+                               environment variable and snmp.conf)
+        directories (list or str): Directories to search for modules, or
+                                   None for the defaults of net-snmp
+    """
+    if modules is not None and not isinstance(modules, str):
+        modules = ':'.join(modules)
+    if directories is not None and not isinstance(directories, str):
+        directories = ':'.join(directories)
+    _interface().set_mibs(modules, directories)
+
+
+def load():
+    """
+    Load the configured MIB modules now rather than when first needed, e.g.
+    before forking workers so that they share the parsed tree.
+    """
+    _interface().load_mibs()
+
+
+def loaded():
+    """
+    Returns:
+        bool: Whether the MIB modules have been loaded.
+    """
+    return _interface().mibs_loaded()
@@ -0,0 +1,337 @@
+import heapq
+import itertools
+import selectors
+import time
+from collections import namedtuple
+
+from tdsnmp import exceptions
+from tdsnmp.session.base import BaseSession, Session
+from tdsnmp.utils import compat
+from tdsnmp.utils.snmp_strings import oid_tuple_to_str
+from tdsnmp.utils.variables import SNMPVariable, SNMPVariableList
+from tdsnmp.utils.walk import advance_walk
+
+OPERATIONS = ('get', 'get_next', 'get_bulk', 'walk', 'bulkwalk')
+
+#: A unit of work: the keyword arguments of the Session to create, the
+#: operation (one of OPERATIONS) and the OIDs it applies to.
+PollJob = namedtuple('PollJob', ['session_kwargs', 'operation', 'oids'])
+
+#: The outcome of a job; varbinds is None and error is set when it failed.
+PollResult = namedtuple('PollResult', ['index', 'job', 'varbinds', 'error'])
+
+
+class _JobState:
+    """
+    Book keeping for a job with a request in flight.
+    """
+
+    def __init__(self, index, job, session):
+        self.index = index
+        self.job = job
+        self.session = session
+        self.fds = set()
+        # Whether the session was opened again, closing the sockets in fds
+        self.reopened = False
+        self.results = None
+        # The command and variables of a get, get_next or get_bulk job
+        self.request = None
+        # Generation of the latest timer; older timers are ignored
+        self.timer = 0
+
+        # Walk progress: the roots still to walk, the current one and
+        # the OID the next request is sent from
+        self.roots = []
+        self.root = None
+        self.cursor = None
+
+
+class Poller:
+    """
+    Polls many agents from a single thread.
+
+    Every job gets its own session whose requests are handed to net-snmp
+    without waiting for the response. The sockets of all sessions are
+    then waited on together with one selector, and net-snmp retransmits
+    and times out requests using each session's timeout and retries, so
+    up to `concurrency` agents are polled at once without a thread each.
+
+    Walks proceed one request at a time per agent; the agents themselves
+    are walked concurrently.
+
+    Note that creating an SNMPv3 session discovers the engine ID of the
+    agent, which blocks for the round trip.
+    """
+
+    def __init__(self, jobs, concurrency=1000, non_repeaters=0,
+                 max_repetitions=15):
+        """
+        Args:
+            jobs (iterable): PollJob objects or
+                             (session_kwargs, operation, oids) tuples
+            concurrency (int): The maximum number of jobs in flight
+            non_repeaters (int): The non-repeaters of get_bulk jobs
+            max_repetitions (int): The max-repetitions of get_bulk
+                                   and bulkwalk jobs
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+
+        self.jobs = jobs
+        self.concurrency = concurrency
+        self.non_repeaters = non_repeaters
+        self.max_repetitions = max_repetitions
+
+    def __iter__(self):
+        return self.run()
+
+    def poll(self):
+        """
+        Runs every job.
+        Returns:
+            list(PollResult): The results in the order of the jobs.
+        """
+        return sorted(self.run(), key=lambda result: result.index)
+
+    def run(self):
+        """
+        Runs every job, yielding results as the jobs complete.
+        Returns:
+            generator: PollResult objects in completion order.
+        """
+        selector = selectors.DefaultSelector()
+        timers = []
+        counter = itertools.count()
+        pending = iter(enumerate(self.jobs))
+        active = 0
+
+        try:
+            while True:
+                # Keep the number of jobs in flight up to the cap
+                while active < self.concurrency:
+                    try:
+                        index, job = next(pending)
+                    except StopIteration:
+                        break
+                    state, result = self._start(index, PollJob(*job))
+                    if result is not None:
+                        yield result
+                        continue
+                    active += 1
+                    self._watch(state, selector, timers, counter)
+
+                if not active:
+                    return
+
+                timeout = None
+                if timers:
+                    timeout = max(0, timers[0][0] - time.monotonic())
+
+                ready = {}
+                for key, _ in selector.select(timeout):
+                    ready[id(key.data)] = (key.data, True)
+
+                now = time.monotonic()
+                while timers and timers[0][0] <= now:
+                    _, _, generation, state = heapq.heappop(timers)
+                    if generation == state.timer and id(state) not in ready:
+                        ready[id(state)] = (state, False)
+
+                for state, readable in ready.values():
+                    result = self._process(state, readable)
+                    if result is None:
+                        self._watch(state, selector, timers, counter)
+                        continue
+
+                    active -= 1
+                    for fd in state.fds:
+                        selector.unregister(fd)
+                    state.fds = set()
+                    state.timer = -1
+                    yield result
+        finally:
+            selector.close()
+
+    def _start(self, index, job):
+        """
+        Create the session of a job and send its first request.
+        Returns:
+            tuple: The job state and, when the job already failed, its result.
+        """
+        if job.operation not in OPERATIONS:
+            error = ValueError('unknown operation {0}'.format(job.operation))
+            return None, PollResult(index, job, None, error)
+
+        oids = job.oids
+        if isinstance(oids, str) or not isinstance(oids, compat.Iterable):
+            oids = [oids]
+
+        try:
+            session = Session(**job.session_kwargs)
+            state = _JobState(index, job, session)
+            if session.version == 1 and job.operation in ('get_bulk', 'bulkwalk'):
+                raise exceptions.TDSNMPException(
+                    'you cannot perform a bulk operation for SNMP version 1'
+                )
+
+            varlist = session.build_interface_vars(oids)
+            if job.operation in ('walk', 'bulkwalk'):
+                state.results = []
+                state.roots = session.get_interface().numeric_oids(
+                    session, varlist
+                )
+                self._next_root(state)
+            else:
+                command = {
+                    'get': session.get_interface().SNMP_MSG_GET,
+                    'get_next': session.get_interface().SNMP_MSG_GETNEXT,
+                    'get_bulk': session.get_interface().SNMP_MSG_GETBULK,
+                }[job.operation]
+                state.request = (command, varlist)
+                self._send_request(state)
+        except exceptions.TDSNMPException as error:
+            return None, PollResult(index, job, None, error)
+
+        if state.results is not None and state.root is None:
+            # Walking nothing at all
+            return None, self._finish(state, None)
+        return state, None
+
+    def _next_root(self, state):
+        """
+        Start walking the next root of a walk job, if any.
+        """
+        if not state.roots:
+            state.root = None
+            return
+
+        state.root = state.cursor = tuple(state.roots.pop(0))
+        self._send_walk(state)
+
+    def _send_request(self, state):
+        command, varlist = state.request
+        state.session.get_interface().async_send(
+            state.session, command, self.non_repeaters,
+            self.max_repetitions, varlist
+        )
+
+    def _send_walk(self, state):
+        interface = state.session.get_interface()
+        if state.job.operation == 'bulkwalk':
+            command = interface.SNMP_MSG_GETBULK
+            max_repetitions = self.max_repetitions
+        else:
+            command = interface.SNMP_MSG_GETNEXT
+            max_repetitions = 0
+
+        interface.async_send(
+            state.session, command, 0, max_repetitions,
+            [SNMPVariable(oid_tuple_to_str(state.cursor))]
+        )
+
+    def _process(self, state, readable):
+        """
+        Collect the response of a job and send its next request.
+        Returns:
+            PollResult: The result of the job once it has completed.
+        """
+        session = state.session
+        try:
+            responses = session.get_interface().async_poll(session, readable)
+            for _, status, errstat, errindex, error_string, varbinds, names in responses:
+                error = session.response_error(
+                    status, errstat, errindex, error_string
+                )
+                if error is not None and session.engine_is_stale():
+                    # Send the request again with a freshly discovered
+                    # engine
+                    session.rediscover_engine()
+                    state.reopened = True
+                    if state.root is not None:
+                        self._send_walk(state)
+                    else:
+                        self._send_request(state)
+                    return None
+                if (state.root is not None and session.version == 1 and
+                        isinstance(error, exceptions.TDSNMPNoSuchNameError)):
+                    # SNMPv1 agents signal the end of the MIB view this way
+                    self._next_root(state)
+                    if state.root is None:
+                        return self._finish(state, None)
+                    continue
+                if error is not None:
+                    return self._finish(state, error)
+
+                if state.results is None:
+                    state.results = varbinds
+                    return self._finish(state, None)
+
+                varbinds, state.cursor = advance_walk(
+                    state.root, state.cursor, varbinds, names
+                )
+                state.results.extend(varbinds)
+                if state.cursor is not None:
+                    self._send_walk(state)
+                else:
+                    self._next_root(state)
+                    if state.root is None:
+                        return self._finish(state, None)
+        except exceptions.TDSNMPException as error:
+            return self._finish(state, error)
+
+        return None
+
+    def _finish(self, state, error):
+        varbinds = None
+        if error is None:
+            varbinds = SNMPVariableList(state.results)
+            if state.session.abort_on_nonexistent:
+                try:
+                    BaseSession.validate_results(varbinds)
+                except exceptions.TDSNMPException as validation_error:
+                    error, varbinds = validation_error, None
+
+        return PollResult(state.index, state.job, varbinds, error)
+
+    def _watch(self, state, selector, timers, counter):
+        """
+        Register the sockets of a job with the selector and arm the timer for
+        its next retransmission or timeout.
+        """
+        fds, timeout = state.session.get_interface().async_select_info(
+            state.session
+        )
+        fds = set(fds)
+        if state.reopened:
+            for fd in state.fds:
+                selector.unregister(fd)
+            state.fds = set()
+            state.reopened = False
+        for fd in state.fds - fds:
+            selector.unregister(fd)
+        for fd in fds - state.fds:
+            selector.register(fd, selectors.EVENT_READ, state)
+        state.fds = fds
+
+        state.timer += 1
+        if timeout is not None:
+            heapq.heappush(
+                timers,
+                (time.monotonic() + timeout, next(counter), state.timer, state)
+            )
+
+
+def poll(jobs, concurrency=1000, non_repeaters=0, max_repetitions=15):
+    """
+    Runs a list of jobs with a Poller.
+
+    :param jobs: PollJob objects or (session_kwargs, operation, oids) tuples
+    :param concurrency: the maximum number of jobs in flight
+    :param non_repeaters: the non-repeaters of get_bulk jobs
+    :param max_repetitions: the max-repetitions of get_bulk and bulkwalk jobs
+    :return: a list of PollResult objects in the order of the jobs
+    """
+    return Poller(
+        jobs, concurrency=concurrency, non_repeaters=non_repeaters,
+        max_repetitions=max_repetitions
+    ).poll()
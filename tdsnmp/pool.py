@@ -0,0 +1,225 @@
+import contextlib
+import inspect
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from tdsnmp.session.base import BaseSession, Session
+
+#: Session arguments which are read on every request rather than when the
+#: net-snmp session is opened; pooled sessions are shared regardless of them
+REQUEST_OPTIONS = (
+    'use_long_names', 'use_numeric', 'use_sprint_value', 'use_enums',
+    'best_guess', 'retry_no_such', 'abort_on_nonexistent', 'mib_index',
+    'typed_values', 'record', 'replay', 'result_cache', 'pipeline_depth',
+    'raw_octet_strings'
+)
+
+_REQUEST_DEFAULTS = {
+    name: parameter.default
+    for name, parameter in inspect.signature(BaseSession.__init__).parameters.items()
+    if name in REQUEST_OPTIONS
+}
+
+
+class SessionPool:
+    """
+    Keeps idle sessions open for reuse instead of opening a new socket,
+    and for SNMPv3 discovering the engine of the agent again, on every
+    call.
+
+    Sessions are keyed by their connection arguments (everything except
+    REQUEST_OPTIONS, which are applied each time a session is handed out).
+    A session is handed to one caller at a time; at most `max_size` idle
+    sessions are kept, evicting the least recently used, and sessions idle
+    for longer than `idle_timeout` seconds are closed.
+    """
+
+    def __init__(self, max_size=128, idle_timeout=300):
+        """
+        Args:
+            max_size (int): The maximum number of idle sessions kept open
+            idle_timeout (float): The number of seconds a session may stay
+                                  idle, or None to keep sessions until
+                                  they are evicted
+        """
+        if max_size < 0:
+            raise ValueError('max_size must not be negative')
+
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._serial = itertools.count()
+        # serial -> (key, session, released), least recently used first
+        self._idle = OrderedDict()
+        # key -> serials of the idle sessions, most recently used last
+        self._by_key = {}
+
+    def __len__(self):
+        return len(self._idle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def acquire(self, **session_kwargs):
+        """
+        Hands out an idle session matching the arguments or opens a new one.
+        Args:
+            **session_kwargs: The arguments of the Session
+        Returns:
+            Session: A session to hand back with release() once done.
+        """
+        key, options = self._split(session_kwargs)
+
+        session = None
+        with self._lock:
+            expired = self._expire()
+            serials = self._by_key.get(key)
+            if serials:
+                _, session, _ = self._idle.pop(serials.pop())
+                if not serials:
+                    del self._by_key[key]
+        self._close(expired)
+
+        if session is None:
+            session = Session(**session_kwargs)
+        else:
+            for name, value in options.items():
+                setattr(session, name, value)
+
+        session._pool = self
+        session._pool_key = key
+        return session
+
+    @contextlib.contextmanager
+    def session(self, **session_kwargs):
+        """
+        Context manager handing out a session with acquire() and handing it
+        back with release().
+        """
+        session = self.acquire(**session_kwargs)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def release(self, session):
+        """
+        Hands a session back to the pool.
+        Args:
+            session (Session): A session returned by acquire()
+        """
+        key = session._pool_key
+
+        with self._lock:
+            serial = next(self._serial)
+            self._idle[serial] = (key, session, time.monotonic())
+            self._by_key.setdefault(key, []).append(serial)
+
+            evicted = self._expire()
+            while len(self._idle) > self.max_size:
+                evicted.append(self._pop_oldest())
+        self._close(evicted)
+
+    def close(self):
+        """
+        Close every idle session.
+        """
+        with self._lock:
+            sessions = [session for _, session, _ in self._idle.values()]
+            self._idle.clear()
+            self._by_key.clear()
+        self._close(sessions)
+
+    @staticmethod
+    def _split(session_kwargs):
+        """
+        Returns:
+            tuple: The pool key of the arguments and the request options to
+                   apply to a pooled session.
+        """
+        key = tuple(sorted(
+            (name, value) for name, value in session_kwargs.items()
+            if name not in REQUEST_OPTIONS
+        ))
+        options = dict(_REQUEST_DEFAULTS)
+        options.update(
+            (name, value) for name, value in session_kwargs.items()
+            if name in REQUEST_OPTIONS
+        )
+        return key, options
+
+    def _expire(self):
+        """
+        Remove the sessions which have been idle for too long; must be
+        called with the lock held.
+        Returns:
+            list(Session): The sessions to close.
+        """
+        expired = []
+        if self.idle_timeout is None:
+            return expired
+
+        deadline = time.monotonic() - self.idle_timeout
+        while self._idle and next(iter(self._idle.values()))[2] < deadline:
+            expired.append(self._pop_oldest())
+        return expired
+
+    def _pop_oldest(self):
+        serial, (key, session, _) = self._idle.popitem(last=False)
+        serials = self._by_key[key]
+        serials.remove(serial)
+        if not serials:
+            del self._by_key[key]
+        return session
+
+    @staticmethod
+    def _close(sessions):
+        for session in sessions:
+            session.close()
+
+
+_default_pool = None
+
+
+def set_default_pool(pool):
+    """
+    Makes the helpers of tdsnmp.simple take their sessions from a pool.
+    :param pool: a SessionPool, or None to open a new session on every call
+                 again
+    :return: the pool which was in use before
+    """
+    global _default_pool
+    previous, _default_pool = _default_pool, pool
+    return previous
+
+
+def get_default_pool():
+    """
+    :return: the SessionPool used by the helpers of tdsnmp.simple, if any
+    """
+    return _default_pool
+
+
+def acquire(**session_kwargs):
+    """
+    Returns a session from the default pool, or a new session when there is
+    none.
+    """
+    pool = _default_pool
+    if pool is None:
+        return Session(**session_kwargs)
+    return pool.acquire(**session_kwargs)
+
+
+def release(session):
+    """
+    Hands a session returned by acquire() back to its pool, if any.
+    """
+    pool = getattr(session, '_pool', None)
+    if pool is not None:
+        pool.release(session)
@@ -0,0 +1,189 @@
+import time
+from collections import namedtuple
+
+from tdsnmp.utils import columnar
+from tdsnmp.utils.columnar import require_numpy
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SYS_UP_TIME = (1, 3, 6, 1, 2, 1, 1, 3, 0)
+
+#: The rates of the counters of one agent. oid, oid_index and rate are
+#: parallel NumPy arrays; rate is in units per second and NaN for rows
+#: without a rate this cycle (first sample, new row, counter reset or
+#: agent restart). interval is the number of seconds since the previous
+#: sample, None when there was none to compare with, and reset tells
+#: whether the agent restarted since.
+RateResult = namedtuple(
+    'RateResult', ['hostname', 'oid', 'oid_index', 'rate', 'interval', 'reset']
+)
+
+
+class _Sample:
+    """
+    The last sample of an agent: its counters as parallel arrays, the
+    sysUpTime of the agent in hundredths of seconds and when it was taken.
+    """
+    __slots__ = ('keys', 'types', 'values', 'uptime', 'taken')
+
+    def __init__(self, keys, types, values, uptime, taken):
+        self.keys = keys
+        self.types = types
+        self.values = values
+        self.uptime = uptime
+        self.taken = taken
+
+
+class RatePoller:
+    """
+    Turns Counter32 and Counter64 columns (e.g. ifHCInOctets) into rates.
+
+    Each cycle the columns are walked into NumPy arrays (see
+    result_format='columnar') rather than SNMPVariable objects, and the
+    rates are computed against the previous sample of the agent in a few
+    array operations: Counter32 deltas are taken modulo 2**32 so that
+    wraps count, while a Counter64 going backwards and a sysUpTime going
+    backwards (the agent restarted) are discontinuities without a rate.
+    Only the last sample of each agent is kept, so memory does not grow
+    from one cycle to the next.
+
+    Intervals are measured with the sysUpTime of the agent when it
+    advanced, which does not suffer from the scheduling jitter of the
+    poller, and with the clock of the poller otherwise.
+    """
+
+    def __init__(self, columns, max_repetitions=15):
+        """
+        Args:
+            columns (list): The counter columns to walk, e.g.
+                            ['ifHCInOctets', 'ifHCOutOctets'], each a string
+                            or a tuple as for Session.walk
+            max_repetitions (int): The max-repetitions of the GETBULK
+                                   requests of the walks
+        """
+        require_numpy()
+        self.columns = list(columns)
+        self.max_repetitions = max_repetitions
+        # connect hostname -> _Sample
+        self._samples = {}
+
+    def poll(self, session):
+        """
+        Walk the columns on the agent of a session and return their rates
+        since it was last polled.
+        Returns:
+            RateResult: The rates of the counters
+        """
+        uptime = session.get_numeric(SYS_UP_TIME)[0].value
+        if session.version == 1:
+            result = session.walk(self.columns, result_format='columnar')
+        else:
+            result = session.bulkwalk(
+                self.columns, max_repetitions=self.max_repetitions,
+                result_format='columnar'
+            )
+        return self.update(session.connect_hostname, int(uptime), result)
+
+    def forget(self, hostname):
+        """
+        Drop the last sample of an agent, e.g. once it is no longer polled.
+        """
+        self._samples.pop(hostname, None)
+
+    def update(self, hostname, uptime, result, taken=None):
+        """
+        Store a sample of an agent and compute the rates since its previous
+        one.
+        Args:
+            hostname (str): The agent the sample was taken from
+            uptime (int): The sysUpTime of the agent, in hundredths of
+                          seconds
+            result (ColumnarResult): The walked counters
+            taken (float): When the sample was taken, by time.monotonic()
+        Returns:
+            RateResult: The rates of the counters
+        """
+        if taken is None:
+            taken = time.monotonic()
+
+        keys = result.oid + '.' + result.oid_index
+        types = result.snmp_type
+        counters = (types == columnar.COUNTER) | (types == columnar.COUNTER64)
+        values = self._numbers(result.value, counters)
+
+        rate = numpy.full(len(keys), numpy.nan)
+        previous = self._samples.get(hostname)
+        self._samples[hostname] = _Sample(keys, types, values, uptime, taken)
+
+        reset = previous is None or uptime < previous.uptime
+        if reset:
+            return RateResult(hostname, result.oid, result.oid_index, rate,
+                              None, previous is not None)
+
+        interval = (uptime - previous.uptime) / 100.0
+        if interval <= 0:
+            interval = taken - previous.taken
+        if interval <= 0:
+            return RateResult(hostname, result.oid, result.oid_index, rate,
+                              None, False)
+
+        # Rows of the previous sample matching each row, or -1
+        if len(keys) == len(previous.keys) and (keys == previous.keys).all():
+            matches = numpy.arange(len(keys))
+        else:
+            matches = self._match(previous.keys, keys)
+        found = matches >= 0
+        before = matches[found]
+
+        valid = counters.copy()
+        valid[found] &= previous.types[before] == types[found]
+        valid[~found] = False
+
+        delta = numpy.zeros(len(keys), dtype=numpy.uint64)
+        # uint64 subtraction wraps modulo 2**64, so masking the low 32 bits
+        # gives the delta of Counter32 values across a wrap
+        delta[found] = values[found] - previous.values[before]
+        wrapped = numpy.zeros(len(keys), dtype=bool)
+        wrapped[found] = values[found] < previous.values[before]
+        counter32 = types == columnar.COUNTER
+        delta[counter32] &= numpy.uint64(0xFFFFFFFF)
+        # A Counter64 does not wrap in practice: it was reset
+        valid &= ~(wrapped & (types == columnar.COUNTER64))
+
+        rate[valid] = delta[valid] / interval
+        return RateResult(hostname, result.oid, result.oid_index, rate,
+                          interval, False)
+
+    @staticmethod
+    def _numbers(value, counters):
+        """
+        Returns:
+            numpy.ndarray: The values of the counters as uint64, 0 for the
+                           other rows.
+        """
+        if value.dtype == numpy.uint64:
+            return value
+        numbers = numpy.zeros(len(value), dtype=numpy.uint64)
+        numbers[counters] = value[counters].astype(numpy.uint64)
+        return numbers
+
+    @staticmethod
+    def _match(previous, keys):
+        """
+        Returns:
+            numpy.ndarray: The position of each key in previous, -1 for
+                           keys it does not have.
+        """
+        matches = numpy.full(len(keys), -1)
+        if not len(previous):
+            return matches
+        order = numpy.argsort(previous)
+        positions = numpy.searchsorted(previous[order], keys)
+        positions[positions == len(previous)] = 0
+        candidates = order[positions]
+        hit = previous[candidates] == keys
+        matches[hit] = candidates[hit]
+        return matches
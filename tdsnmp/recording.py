@@ -0,0 +1,97 @@
+import struct
+import zlib
+
+MAGIC = b'TDSREC01'
+
+# the lengths of the request and of the response of an exchange
+EXCHANGE = struct.Struct('<II')
+
+
+class Recording:
+    """
+    The request and response PDUs exchanged by sessions, as encoded by the
+    C interface, so that the responses can be decoded again without the
+    agent or the network.
+
+    A session adds every exchange of its blocking requests to the Recording
+    set as its `record`, and answers requests from the one set as its
+    `replay` instead of sending them. The responses recorded for a request
+    are replayed in order, the last one being repeated once all of them
+    have been served.
+    """
+
+    def __init__(self):
+        # (request, response) in the order they were recorded
+        self._exchanges = []
+        self._responses = {}
+        self._served = {}
+
+    def __len__(self):
+        return len(self._exchanges)
+
+    def record(self, request, response):
+        self._exchanges.append((request, response))
+        self._responses.setdefault(request, []).append(response)
+
+    def response(self, request):
+        """
+        Returns:
+            bytes: The next response recorded for request, or None when
+                   there is none.
+        """
+        responses = self._responses.get(request)
+        if not responses:
+            return None
+        served = self._served.get(request, 0)
+        self._served[request] = served + 1
+        return responses[min(served, len(responses) - 1)]
+
+    def rewind(self):
+        """
+        Replay the responses from the first one again.
+        """
+        self._served = {}
+
+    def save(self, path):
+        """
+        Write the exchanges to path, compressed.
+        """
+        chunks = []
+        for request, response in self._exchanges:
+            chunks.extend((EXCHANGE.pack(len(request), len(response)),
+                           request, response))
+        with open(path, 'wb') as recording_file:
+            recording_file.write(MAGIC)
+            recording_file.write(zlib.compress(b''.join(chunks)))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read the exchanges saved to path.
+
+        Raises:
+            ValueError: The file is not a recording
+        """
+        with open(path, 'rb') as recording_file:
+            data = recording_file.read()
+        if not data.startswith(MAGIC):
+            raise ValueError('{0} is not a recording'.format(path))
+        try:
+            data = zlib.decompress(data[len(MAGIC):])
+        except zlib.error as exc:
+            raise ValueError('{0} is corrupt: {1}'.format(path, exc))
+
+        recording = cls()
+        offset = 0
+        while offset < len(data):
+            if offset + EXCHANGE.size > len(data):
+                raise ValueError('{0} is truncated'.format(path))
+            request_size, response_size = EXCHANGE.unpack_from(data, offset)
+            offset += EXCHANGE.size
+            end = offset + request_size + response_size
+            if end > len(data):
+                raise ValueError('{0} is truncated'.format(path))
+            recording.record(data[offset:offset + request_size],
+                             data[offset + request_size:end])
+            offset = end
+        return recording
@@ -0,0 +1,367 @@
+import asyncio
+
+from tdsnmp import exceptions
+from tdsnmp.session.base import BaseSession, Session
+from tdsnmp.utils import compat
+from tdsnmp.utils.snmp_strings import oid_tuple_to_str
+from tdsnmp.utils.variables import SNMPVariable, SNMPVariableList
+from tdsnmp.utils.walk import advance_walk
+
+
+class AsyncSession:
+    """
+    An asyncio flavour of Session.
+
+    Requests are handed to net-snmp without waiting for the response and
+    the session's socket is watched by the running event loop, which also
+    drives retransmissions and timeouts using the session's timeout and
+    retries. A single thread can therefore keep many requests in flight,
+    on one AsyncSession or across many of them.
+
+    All arguments are passed on to Session.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._session = Session(*args, **kwargs)
+        self._interface = self._session.get_interface()
+        self._loop = None
+        self._readers = set()
+        self._timer = None
+        # request id -> (future waiting for the response, arguments of
+        # async_send after the session)
+        self._pending = {}
+
+    def __getattr__(self, item):
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return getattr(self._session, item)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        Returns:
+            Session: The underlying blocking session.
+        """
+        return self._session
+
+    def close(self):
+        """
+        Stop watching the session's socket and fail any outstanding
+        requests.
+        """
+        pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(
+                    exceptions.TDSNMPException('session was closed')
+                )
+        self._detach()
+
+    async def get(self, *oids, cast_list=False):
+        """
+        Perform an SNMP GET operation.
+        Args:
+            *oids (str or tuple): At least one OID, but can be multiple. Each OID
+                   may be a string representing the entire OID
+                   (e.g. 'sysDescr.0') or may be a tuple containing the
+                   name as its first item and index as its second
+                   (e.g. ('sysDescr', 0))
+            cast_list (bool): Whether to always return a list
+                              as opposed to a list only when the
+                              result larger than a single item
+
+        Returns:
+            list(SNMPVariable): A list of SNMPVariable objects
+            SNMPVariable: A single SNMPVariable object
+        """
+        if len(oids) == 0:
+            raise TypeError('Must give at least 1 OID')
+
+        varbinds, _ = await self._request(
+            self._interface.SNMP_MSG_GET, self._session.build_interface_vars(oids)
+        )
+        self._validate(varbinds)
+
+        if cast_list:
+            return list(varbinds)
+        return varbinds if len(varbinds) > 1 else varbinds[0]
+
+    async def get_next(self, *oids):
+        """
+        Uses an SNMP GETNEXT operation to retrieve the next variable after
+        the chosen item.
+        :param oids: you may pass in a list of OIDs or single item; each item
+                     may be a string representing the entire OID
+                     (e.g. 'sysDescr.0') or may be a tuple containing the
+                     name as its first item and index as its second
+                     (e.g. ('sysDescr', 0))
+        :return: an SNMPVariable object containing the value that was
+                 retrieved or a list of objects when you send in a list of
+                 OIDs
+        """
+        if len(oids) == 0:
+            raise TypeError('Must give at least 1 OID')
+
+        varbinds, _ = await self._request(
+            self._interface.SNMP_MSG_GETNEXT,
+            self._session.build_interface_vars(oids)
+        )
+        self._validate(varbinds)
+
+        return list(varbinds) if len(varbinds) > 1 else varbinds[0]
+
+    async def get_bulk(self, *oids, non_repeaters=0, max_repetitions=15):
+        """
+        Performs a bulk SNMP GET operation to retrieve multiple pieces of
+        information in a single packet.
+        :param oids: you may pass in a list of OIDs or single item; each item
+                     may be a string representing the entire OID
+                     (e.g. 'sysDescr.0') or may be a tuple containing the
+                     name as its first item and index as its second
+                     (e.g. ('sysDescr', 0))
+        :param non_repeaters: the number of objects that are only expected to
+                              return a single GETNEXT instance, not multiple
+                              instances
+        :param max_repetitions: the number of objects that should be returned
+                                for all the repeating OIDs
+        :return: a list of SNMPVariable objects containing the values that
+                 were retrieved via SNMP
+        """
+        if len(oids) == 0:
+            raise TypeError('Must give at least 1 OID')
+        if self._session.version == 1:
+            raise exceptions.TDSNMPException(
+                'you cannot perform a bulk GET operation for SNMP version 1'
+            )
+
+        varbinds, _ = await self._request(
+            self._interface.SNMP_MSG_GETBULK,
+            self._session.build_interface_vars(oids),
+            non_repeaters, max_repetitions
+        )
+        self._validate(varbinds)
+
+        return varbinds
+
+    async def set(self, oid, value, snmp_type=None):
+        """
+        Perform an SNMP SET operation.
+        :param oid: the OID that you wish to set which may be a string
+                    representing the entire OID (e.g. 'sysDescr.0') or may
+                    be a tuple containing the name as its first item and
+                    index as its second (e.g. ('sysDescr', 0))
+        :param value: the value to set the OID to
+        :param snmp_type: if a numeric OID is used and the object is not in
+                          the parsed MIB, a type must be explicitly supplied
+        :return: a boolean indicating the success of the operation
+        """
+        return await self.set_multiple([(oid, value, snmp_type)])
+
+    async def set_multiple(self, oid_values):
+        """
+        Perform an SNMP SET operation on multiple OIDs with multiple
+        values.
+        :param oid_values: a list of tuples whereby each tuple contains a
+                           (oid, value) or an (oid, value, snmp_type)
+        :return: a boolean indicating the success of the operation
+        """
+        await self._request(
+            self._interface.SNMP_MSG_SET,
+            self._session.build_set_vars(oid_values)
+        )
+        return True
+
+    async def walk(self, oids=('.1.3.6.1.2.1',)):
+        """
+        Uses SNMP GETNEXT operations to retrieve every variable below
+        each of the given OIDs; the OIDs are walked concurrently.
+        :param oids: a single item or a list of items; each item may be a
+                     string representing the entire OID (e.g. 'system') or
+                     may be a tuple containing the name as its first item
+                     and index as its second (e.g. ('sysDescr', 0))
+        :return: a list of SNMPVariable objects containing the values that
+                 were retrieved via SNMP
+        """
+        return await self._walk(oids, max_repetitions=0)
+
+    async def bulkwalk(self, oids=('.1.3.6.1.2.1',), max_repetitions=15):
+        """
+        Uses SNMP GETBULK operations to retrieve every variable below
+        each of the given OIDs; the OIDs are walked concurrently.
+        :param oids: a single item or a list of items; each item may be a
+                     string representing the entire OID (e.g. 'system') or
+                     may be a tuple containing the name as its first item
+                     and index as its second (e.g. ('sysDescr', 0))
+        :param max_repetitions: the number of variables to request in
+                                each GETBULK
+        :return: a list of SNMPVariable objects containing the values that
+                 were retrieved via SNMP
+        """
+        if self._session.version == 1:
+            raise exceptions.TDSNMPException(
+                "BULKWALK is not available for SNMP version 1")
+
+        return await self._walk(oids, max_repetitions=max_repetitions)
+
+    async def _walk(self, oids, max_repetitions):
+        if isinstance(oids, str) or not isinstance(oids, compat.Iterable):
+            oids = (oids,)
+        roots = self._interface.numeric_oids(
+            self._session, self._session.build_interface_vars(oids)
+        )
+
+        results = SNMPVariableList()
+        for varbinds in await asyncio.gather(
+            *[self._walk_root(root, max_repetitions) for root in roots]
+        ):
+            results.extend(varbinds)
+
+        self._validate(results)
+        return results
+
+    async def _walk_root(self, root, max_repetitions):
+        """
+        Walk the subtree below a single numeric OID.
+        """
+        if max_repetitions:
+            command = self._interface.SNMP_MSG_GETBULK
+        else:
+            command = self._interface.SNMP_MSG_GETNEXT
+
+        results = SNMPVariableList()
+        cursor = root
+        while cursor is not None:
+            try:
+                varbinds, names = await self._request(
+                    command, [SNMPVariable(oid_tuple_to_str(cursor))],
+                    0, max_repetitions
+                )
+            except exceptions.TDSNMPNoSuchNameError:
+                # SNMPv1 agents signal the end of the MIB view this way
+                if self._session.version != 1:
+                    raise
+                break
+            varbinds, cursor = advance_walk(root, cursor, varbinds, names)
+            results.extend(varbinds)
+
+        return results
+
+    async def _request(self, command, varlist, non_repeaters=0,
+                       max_repetitions=0):
+        """
+        Send a single request PDU and wait for its response.
+        Returns:
+            tuple: The response varbinds and their numeric OIDs.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._detach()
+            self._loop = loop
+
+        request = (command, non_repeaters, max_repetitions, varlist)
+        reqid = self._interface.async_send(self._session, *request)
+        future = loop.create_future()
+        self._pending[reqid] = (future, request)
+        self._schedule()
+
+        return await future
+
+    def _process(self, readable):
+        """
+        Event loop callback for a readable socket or an expired timer.
+        """
+        try:
+            results = self._interface.async_poll(self._session, readable)
+        except Exception as error:
+            pending, self._pending = self._pending, {}
+            for future, _ in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            results = []
+
+        for reqid, status, errstat, errindex, error_string, varbinds, names in results:
+            future, request = self._pending.pop(reqid, (None, None))
+            # The caller may have given up on the request already
+            if future is None or future.done():
+                continue
+
+            error = self._session.response_error(
+                status, errstat, errindex, error_string
+            )
+            if error is not None and self._session.engine_is_stale():
+                self._pending[reqid] = (future, request)
+                self._rediscover_engine()
+                # The other responses came from the replaced session
+                break
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result((varbinds, names))
+
+        self._schedule()
+
+    def _rediscover_engine(self):
+        """
+        Open the session again with a freshly discovered engine and send
+        the outstanding requests, which went out on the replaced session,
+        again.
+        """
+        # The sockets of the replaced session are closed with it
+        self._detach()
+        pending, self._pending = self._pending, {}
+        try:
+            self._session.rediscover_engine()
+        except exceptions.TDSNMPException as error:
+            for future, _ in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for future, request in pending.values():
+            if future.done():
+                continue
+            try:
+                reqid = self._interface.async_send(self._session, *request)
+            except exceptions.TDSNMPException as error:
+                future.set_exception(error)
+                continue
+            self._pending[reqid] = (future, request)
+
+    def _schedule(self):
+        """
+        Watch the session's sockets and arm the timer for the next
+        retransmission or timeout while requests are outstanding.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            self._detach()
+            return
+
+        fds, timeout = self._interface.async_select_info(self._session)
+        for fd in set(fds) - self._readers:
+            self._loop.add_reader(fd, self._process, True)
+            self._readers.add(fd)
+        if timeout is not None:
+            self._timer = self._loop.call_later(timeout, self._process, False)
+
+    def _detach(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._loop is not None:
+            for fd in self._readers:
+                self._loop.remove_reader(fd)
+        self._readers = set()
+
+    def _validate(self, varbinds):
+        if self._session.abort_on_nonexistent:
+            BaseSession.validate_results(varbinds)
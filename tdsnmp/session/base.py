@@ -1,10 +1,17 @@
 import re
 import os
 import importlib
-import collections
-from tdsnmp import exceptions, enums
+import selectors
+import time
+from tdsnmp import exceptions, enums, stats
+from tdsnmp.utils import compat
+from tdsnmp.utils.columnar import ColumnBuilder, require_numpy
+from tdsnmp.utils.snmp_strings import oid_str_to_tuple, oid_tuple_to_str
 from tdsnmp.utils.variables import SNMPVariable, SNMPVariableList
-from tdsnmp.session import get_session
+from tdsnmp.utils.walk import advance_walk
+from tdsnmp.session import get_session, pdu_limits, repetitions
+
+RESULT_FORMATS = ('list', 'columnar')
 
 
 class BaseSession:
@@ -19,7 +26,9 @@ class BaseSession:
         our_identity='', their_identity='', their_hostname='',
         trust_cert='', use_long_names=False, use_numeric=False,
         use_sprint_value=False, use_enums=False, best_guess=0,
-        retry_no_such=False, abort_on_nonexistent=False
+        retry_no_such=False, abort_on_nonexistent=False, mib_index=None,
+        typed_values=False, record=None, replay=None, result_cache=None,
+        pipeline_depth=4, raw_octet_strings=False
     ):
         if ':' in hostname:
             if remote_port:
@@ -59,6 +68,27 @@ class BaseSession:
         self.best_guess = best_guess
         self.retry_no_such = retry_no_such
         self.abort_on_nonexistent = abort_on_nonexistent
+        #: a tdsnmp.mib_index.MIBIndex to translate names with instead of
+        #: the MIBs loaded by net-snmp
+        self.mib_index = mib_index
+        #: return values as Python objects read straight from the response
+        #: (int, bytes or a tuple of integers) instead of formatted strings
+        self.typed_values = typed_values
+        #: a tdsnmp.recording.Recording to add the PDUs exchanged by the
+        #: blocking requests to
+        self.record = record
+        #: a tdsnmp.recording.Recording to answer the blocking requests from,
+        #: instead of sending them
+        self.replay = replay
+        #: a tdsnmp.session.result_cache.ResultCache to answer get and
+        #: get_next from while its entries are valid
+        self.result_cache = result_cache
+        #: the number of requests kept outstanding at once when a get,
+        #: get_next or set_multiple is split into several
+        self.pipeline_depth = pipeline_depth
+        #: return OCTET STRING values (e.g. MAC addresses) as the bytes of
+        #: the response instead of strings
+        self.raw_octet_strings = raw_octet_strings
 
         # The following variables are required for internal use as they are
         # passed to the C interface
@@ -73,6 +103,7 @@ class BaseSession:
         self.error_index = 0
 
         self.session_ptr = self._get_session()
+        stats.register(self)
 
     @property
     def connect_hostname(self):
@@ -149,6 +180,55 @@ class BaseSession:
             return importlib.import_module('tdsnmp.c.interface')
         return None
 
+    def close(self):
+        """
+        Close the net-snmp session and its socket right away instead of
+        when the session is garbage collected. Requests on a closed
+        session raise TDSNMPException.
+        """
+        self.get_interface().close_session(self.session_ptr)
+
+    @property
+    def stats(self):
+        """
+        The counters of the blocking requests sent on the session since it
+        was created or reset_stats() was called; tdsnmp.stats.collect()
+        reads them for every session.
+        Returns:
+            SessionStats: The counters
+        """
+        counters, _ = self.get_interface().session_stats(self.session_ptr)
+        return stats.SessionStats(*counters)
+
+    @property
+    def last_timing(self):
+        """
+        Where the last call into the C interface spent its time: a get or a
+        walk sent by the C interface, or one request of the walks and
+        tables stepped through in Python.
+        Returns:
+            Timing: The seconds spent in each phase
+        """
+        _, (total, wait, formatting, objects) = \
+            self.get_interface().session_stats(self.session_ptr)
+        other = max(0.0, total - wait - formatting - objects)
+        return stats.Timing(total, wait, formatting, objects, other)
+
+    def reset_stats(self):
+        """
+        Reset the counters and the last timing of the session.
+        """
+        self.get_interface().session_stats_reset(self.session_ptr)
+
+    def engine_is_stale(self):
+        """
+        Returns:
+            bool: Whether the last request failed because the engine of the
+                  agent taken from the cache is out of date; only SNMPv3
+                  sessions cache engines (see rediscover_engine).
+        """
+        return False
+
     def get(self, *oids, cast_list=False):
         """
         Perform an SNMP GET operation using the prepared session to
@@ -171,8 +251,12 @@ class BaseSession:
             raise TypeError('Must give at least 1 OID')
 
         interface_vars = self.build_interface_vars(oids)
-        interface = self.get_interface()
-        interface.get(self, interface_vars)
+        if self.result_cache is not None:
+            interface_vars = SNMPVariableList(self.result_cache.fetch(
+                self, 'get', interface_vars, self._get
+            ))
+        else:
+            interface_vars = self._get(interface_vars)
 
         if self.abort_on_nonexistent:
             self.validate_results(interface_vars)
@@ -181,28 +265,200 @@ class BaseSession:
             return list(interface_vars)
         return interface_vars if len(interface_vars) > 1 else interface_vars[0]
 
+    def _get(self, interface_vars):
+        interface = self.get_interface()
+
+        def send(chunk):
+            if self.mib_index is not None:
+                return self._indexed_request(interface.SNMP_MSG_GET, 0, 0, chunk)
+            interface.get(self, chunk)
+            return chunk
+
+        return self._split_request(interface.SNMP_MSG_GET, interface_vars, send)
+
+    def _split_request(self, command, interface_vars, send):
+        """
+        Send a GET or GETNEXT for a list of variables, split into
+        requests of at most the number of variables learned for the agent
+        (see pdu_limits). A request answered with tooBig lowers the limit
+        and is sent again in smaller pieces.
+        Args:
+            command (int): The SNMP_MSG_* of the requests
+            interface_vars (list): The SNMPVariable objects to send
+            send (callable): Sends a list of SNMPVariable objects in a
+                             single blocking request and returns the
+                             response variables
+        Returns:
+            SNMPVariableList: The response variables in the order of
+                              interface_vars
+        """
+        interface = self.get_interface()
+        limit = pdu_limits.for_agent(self.connect_hostname)
+        if len(interface_vars) <= limit.value:
+            try:
+                return send(interface_vars)
+            except exceptions.TDSNMPException:
+                if (self.error_number != interface.SNMP_ERR_TOOBIG or
+                        not limit.too_big(len(interface_vars))):
+                    raise
+
+        chunks = pdu_limits.chunks(interface_vars, limit.value)
+        # The asynchronous interface neither names variables through
+        # mib_index, records or replays exchanges nor retries without the
+        # variables of a noSuchName
+        if (self.pipeline_depth > 1 and self.mib_index is None and
+                self.record is None and self.replay is None and
+                not self.retry_no_such):
+            return self._pipeline(command, chunks, limit)
+
+        results = SNMPVariableList()
+        for chunk in chunks:
+            results.extend(self._split_request(command, chunk, send))
+        return results
+
+    def _split_set(self, interface_vars, send):
+        """
+        Send a SET for a list of variables in a single request, so that the
+        agent applies all of them or none. Only once the agent answers
+        tooBig is the list split (see pdu_limits), the pieces being sent
+        one at a time and the first one to fail ending the SET.
+        Args:
+            interface_vars (list): The SNMPVariable objects to set
+            send (callable): Sends a list of SNMPVariable objects in a
+                             single blocking request
+        Returns:
+            SNMPVariableList: The variables of interface_vars
+        """
+        interface = self.get_interface()
+        limit = pdu_limits.for_agent(self.connect_hostname)
+        try:
+            return send(interface_vars)
+        except exceptions.TDSNMPException:
+            if (self.error_number != interface.SNMP_ERR_TOOBIG or
+                    not limit.too_big(len(interface_vars))):
+                raise
+
+        results = SNMPVariableList()
+        for chunk in pdu_limits.chunks(interface_vars, limit.value):
+            results.extend(self._split_set(chunk, send))
+        return results
+
+    def _pipeline(self, command, chunks, limit):
+        """
+        Send a request for each chunk of variables, up to pipeline_depth at
+        a time, and merge the responses back in the order of the chunks.
+        """
+        interface = self.get_interface()
+        # Chunks are numbered with tuples, the pieces of a chunk split
+        # after a tooBig sorting between it and the next one
+        pending = [((position,), chunk) for position, chunk in enumerate(chunks)]
+        pending.reverse()
+        in_flight = {}
+        responses = {}
+
+        selector = selectors.DefaultSelector()
+        watched = set()
+        waited = 0.0
+        interface.stats_begin(self)
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < self.pipeline_depth:
+                    key, chunk = pending.pop()
+                    reqid = interface.async_send(self, command, 0, 0, chunk)
+                    in_flight[reqid] = (key, chunk)
+
+                fds, timeout = interface.async_select_info(self)
+                fds = set(fds)
+                for fd in watched - fds:
+                    selector.unregister(fd)
+                for fd in fds - watched:
+                    selector.register(fd, selectors.EVENT_READ)
+                watched = fds
+                started = time.monotonic()
+                readable = bool(selector.select(timeout))
+                waited += time.monotonic() - started
+
+                for reqid, status, errstat, errindex, error_string, varbinds, _ in \
+                        interface.async_poll(self, readable):
+                    # Responses to requests abandoned by an earlier call
+                    if reqid not in in_flight:
+                        continue
+                    key, chunk = in_flight.pop(reqid)
+                    error = self.response_error(status, errstat, errindex, error_string)
+                    if error is None:
+                        responses[key] = varbinds
+                        continue
+                    if self.engine_is_stale():
+                        # The requests in flight went out on the session
+                        # being replaced; its sockets are closed with it
+                        pending.extend(sorted(
+                            list(in_flight.values()) + [(key, chunk)], reverse=True
+                        ))
+                        in_flight.clear()
+                        for fd in watched:
+                            selector.unregister(fd)
+                        watched = set()
+                        interface.stats_end(self, waited)
+                        waited = 0.0
+                        self.rediscover_engine()
+                        interface.stats_begin(self)
+                        break
+                    if (status != interface.STAT_SUCCESS or
+                            errstat != interface.SNMP_ERR_TOOBIG or
+                            not limit.too_big(len(chunk))):
+                        raise error
+                    pieces = pdu_limits.chunks(chunk, limit.value)
+                    pending.extend(reversed([
+                        (key + (position,), piece) for position, piece in enumerate(pieces)
+                    ]))
+        finally:
+            selector.close()
+            interface.stats_end(self, waited)
+
+        results = SNMPVariableList()
+        for key in sorted(responses):
+            results.extend(responses[key])
+        return results
+
     def bulkwalk(self, oids=('.1.3.6.1.2.1',), non_repeaters=0,
-                 max_repetitions=15):
+                 max_repetitions=15, result_format='list'):
         """
         Uses SNMP BULKWALK operation using the prepared session to
         automatically retrieve multiple pieces of information in an OID
         :param non_repeaters:
-        :param max_repetitions:
-        :param oids: you may pass in a single item (multiple values currently
-                     experimental) which may be a string representing the
-                     entire OID (e.g. 'sysDescr.0') or may be a tuple
-                     containing the name as its first item and index as its
-                     second (e.g. ('sysDescr', 0))
+        :param max_repetitions: the number of variables to request in each
+                                GETBULK, or 'auto' to adapt it to the agent
+        :param oids: you may pass in a single item or a list of items; each
+                     may be a string representing the entire OID
+                     (e.g. 'sysDescr.0') or may be a tuple containing the
+                     name as its first item and index as its second
+                     (e.g. ('sysDescr', 0)). The OIDs are walked together,
+                     each GETBULK carrying the ones not finished yet.
+        :param result_format: 'list' or 'columnar' to get a ColumnarResult
+                              of NumPy arrays instead
         :return: a list of SNMPVariable objects containing the values that
-                 were retrieved via SNMP
+                 were retrieved via SNMP, grouped by OID
         """
 
         if self.version == 1:
             raise exceptions.TDSNMPException(
                 "BULKWALK is not available for SNMP version 1")
 
+        if self._check_result_format(result_format) == 'columnar':
+            return self._columnar_walk(oids, non_repeaters, max_repetitions)
+
+        if self.mib_index is not None:
+            if max_repetitions == repetitions.AUTO:
+                max_repetitions = repetitions.for_agent(self.connect_hostname).value
+            return self._indexed_walk(oids, max_repetitions)
+
+        if max_repetitions == repetitions.AUTO:
+            return SNMPVariableList(
+                self._iter_walk(oids, non_repeaters, max_repetitions, False)
+            )
+
         # Build our variable bindings for the C interface
-        oids = (oids,) if isinstance(oids, str) or not isinstance(oids, collections.Iterable) else oids
+        oids = (oids,) if isinstance(oids, str) or not isinstance(oids, compat.Iterable) else oids
         interface_vars = self.build_interface_vars(oids)
 
         # Perform the SNMP walk using GETNEXT operations
@@ -215,21 +471,29 @@ class BaseSession:
         # Return a list of variables
         return interface_vars
 
-    def walk(self, oids=('.1.3.6.1.2.1',)):
+    def walk(self, oids=('.1.3.6.1.2.1',), result_format='list'):
         """
         Uses SNMP GETNEXT operation using the prepared session to
         automatically retrieve multiple pieces of information in an OID.
-        :param oids: you may pass in a single item (multiple values currently
-                     experimental) which may be a string representing the
-                     entire OID (e.g. 'sysDescr.0') or may be a tuple
-                     containing the name as its first item and index as its
-                     second (e.g. ('sysDescr', 0))
+        :param oids: you may pass in a single item or a list of items; each
+                     may be a string representing the entire OID
+                     (e.g. 'sysDescr.0') or may be a tuple containing the
+                     name as its first item and index as its second
+                     (e.g. ('sysDescr', 0)). The OIDs are walked together,
+                     each GETNEXT carrying the ones not finished yet.
+        :param result_format: 'list' or 'columnar' to get a ColumnarResult
+                              of NumPy arrays instead
         :return: a list of SNMPVariable objects containing the values that
-                 were retrieved via SNMP
+                 were retrieved via SNMP, grouped by OID
         """
+        if self._check_result_format(result_format) == 'columnar':
+            return self._columnar_walk(oids, 0, 0)
+
+        if self.mib_index is not None:
+            return list(self._indexed_walk(oids, 0))
 
         # Build our variable bindings for the C interface
-        oids = (oids,) if isinstance(oids, str) or not isinstance(oids, collections.Iterable) else oids
+        oids = (oids,) if isinstance(oids, str) or not isinstance(oids, compat.Iterable) else oids
         interface_vars = self.build_interface_vars(oids)
 
         # Perform the SNMP walk using GETNEXT operations
@@ -242,7 +506,176 @@ class BaseSession:
         # Return a list of variables
         return list(interface_vars)
 
-    def get_bulk(self, *oids, non_repeaters=0, max_repetitions=15):
+    def iter_walk(self, oids=('.1.3.6.1.2.1',), batches=False):
+        """
+        Uses SNMP GETNEXT operations like walk, but yields the variables
+        as each response is decoded instead of collecting the whole
+        subtree first. The OIDs are walked one after another.
+        :param oids: you may pass in a single item or a list of items;
+                     each may be a string representing the entire OID
+                     (e.g. 'system') or may be a tuple containing the name
+                     as its first item and index as its second
+                     (e.g. ('sysDescr', 0))
+        :param batches: whether to yield one SNMPVariableList per response
+                        rather than single variables
+        :return: a generator of SNMPVariable objects (or of
+                 SNMPVariableList objects when batches is set)
+        """
+        return self._iter_walk(oids, 0, 0, batches)
+
+    def iter_bulkwalk(self, oids=('.1.3.6.1.2.1',), non_repeaters=0,
+                      max_repetitions=15, batches=False):
+        """
+        Uses SNMP GETBULK operations like bulkwalk, but yields the
+        variables as each response is decoded instead of collecting the
+        whole subtree first. The OIDs are walked one after another.
+        :param oids: you may pass in a single item or a list of items;
+                     each may be a string representing the entire OID
+                     (e.g. 'system') or may be a tuple containing the name
+                     as its first item and index as its second
+                     (e.g. ('sysDescr', 0))
+        :param non_repeaters: the number of objects that are only expected to
+                              return a single GETNEXT instance, not multiple
+                              instances
+        :param max_repetitions: the number of variables to request in
+                                each GETBULK, or 'auto' to adapt it to the
+                                agent
+        :param batches: whether to yield one SNMPVariableList per response
+                        rather than single variables
+        :return: a generator of SNMPVariable objects (or of
+                 SNMPVariableList objects when batches is set)
+        """
+        if self.version == 1:
+            raise exceptions.TDSNMPException(
+                "BULKWALK is not available for SNMP version 1")
+
+        return self._iter_walk(oids, non_repeaters, max_repetitions, batches)
+
+    def _iter_walk(self, oids, non_repeaters, max_repetitions, batches):
+        interface = self.get_interface()
+        oids = (oids,) if isinstance(oids, str) or not isinstance(oids, compat.Iterable) else oids
+        roots = interface.numeric_oids(self, self.build_interface_vars(oids))
+
+        for root in roots:
+            cursor = root
+            while cursor is not None:
+                varlist = [SNMPVariable(oid_tuple_to_str(cursor))]
+                try:
+                    if max_repetitions:
+                        varbinds, names = self._bulk_request(
+                            non_repeaters, max_repetitions, varlist
+                        )
+                    else:
+                        varbinds, names = interface.request(
+                            self, interface.SNMP_MSG_GETNEXT, 0, 0, varlist
+                        )
+                except exceptions.TDSNMPNoSuchNameError:
+                    # SNMPv1 agents signal the end of the MIB view this way
+                    if self.version != 1:
+                        raise
+                    break
+
+                varbinds, cursor = advance_walk(root, cursor, varbinds, names)
+                if self.abort_on_nonexistent:
+                    self.validate_results(varbinds)
+
+                if not batches:
+                    yield from varbinds
+                elif varbinds:
+                    yield varbinds
+
+    def get_table(self, columns, max_repetitions=15):
+        """
+        Retrieves the rows of a table by walking several of its columns in
+        lockstep: every column still being walked is a repeater of the same
+        GETBULK request (a GETNEXT for SNMP version 1), so the table takes
+        about as many round trips as its longest column alone.
+        :param columns: a list of columns (e.g. ['ifDescr', 'ifInOctets']);
+                        each may be a string or a tuple as for walk
+        :param max_repetitions: the number of rows to request for each
+                                column in each GETBULK, or 'auto' to adapt
+                                it to the agent
+        :return: a dict mapping the index of each row (e.g. '1') to a dict
+                 of the SNMPVariable objects of the row keyed by column;
+                 columns missing a row are left out of it
+        """
+        return dict(self.iter_table(columns, max_repetitions))
+
+    def iter_table(self, columns, max_repetitions=15):
+        """
+        Like get_table, but yields (index, row) tuples in index order as
+        soon as every column has been walked past the row.
+        :param columns: a list of columns (e.g. ['ifDescr', 'ifInOctets']);
+                        each may be a string or a tuple as for walk
+        :param max_repetitions: the number of rows to request for each
+                                column in each GETBULK
+        :return: a generator of (index, row) tuples
+        """
+        interface = self.get_interface()
+        if self.version == 1:
+            max_repetitions = 0
+
+        columns = [columns] if isinstance(columns, str) or not isinstance(columns, compat.Iterable) else list(columns)
+        roots = interface.numeric_oids(self, self.build_interface_vars(columns))
+        cursors = list(roots)
+        active = list(range(len(columns)))
+
+        # index (tuple of integers) -> {column: SNMPVariable}
+        pending = {}
+        while active:
+            varlist = [SNMPVariable(oid_tuple_to_str(cursors[column]))
+                       for column in active]
+            try:
+                if max_repetitions:
+                    varbinds, names = self._bulk_request(
+                        0, max_repetitions, varlist
+                    )
+                else:
+                    varbinds, names = interface.request(
+                        self, interface.SNMP_MSG_GETNEXT, 0, 0, varlist
+                    )
+            except exceptions.TDSNMPNoSuchNameError:
+                # SNMPv1 agents signal the end of the MIB view this way and
+                # point at the variable which ran off it
+                if self.version != 1 or not 0 < self.error_index <= len(active):
+                    raise
+                del active[self.error_index - 1]
+                continue
+
+            # The response repeats the columns in request order
+            still_active = []
+            for position, column in enumerate(active):
+                root = roots[column]
+                column_varbinds = varbinds[position::len(active)]
+                column_names = names[position::len(active)]
+                if varbinds and not column_varbinds:
+                    # The agent cut the response short before this column
+                    still_active.append(column)
+                    continue
+
+                kept, cursor = advance_walk(
+                    root, cursors[column], column_varbinds, column_names
+                )
+                for varbind, name in zip(kept, column_names):
+                    pending.setdefault(name[len(root):], {})[columns[column]] = varbind
+
+                if cursor is not None:
+                    cursors[column] = cursor
+                    still_active.append(column)
+            active = still_active
+
+            # Rows up to the smallest cursor can not gain any more columns
+            horizon = min(
+                (cursors[column][len(roots[column]):] for column in active),
+                default=None
+            )
+            for index in sorted(pending):
+                if horizon is not None and index > horizon:
+                    break
+                yield '.'.join(str(subid) for subid in index), pending.pop(index)
+
+    def get_bulk(self, *oids, non_repeaters=0, max_repetitions=15,
+                 result_format='list'):
         """
         Performs a bulk SNMP GET operation using the prepared session to
         retrieve multiple pieces of information in a single packet.
@@ -255,7 +688,10 @@ class BaseSession:
                               return a single GETNEXT instance, not multiple
                               instances
         :param max_repetitions: the number of objects that should be returned
-                                for all the repeating OIDs
+                                for all the repeating OIDs, or 'auto' to use
+                                the number learned for the agent
+        :param result_format: 'list' or 'columnar' to get a ColumnarResult
+                              of NumPy arrays instead
         :return: a list of SNMPVariable objects containing the values that
                  were retrieved via SNMP
         """
@@ -271,6 +707,36 @@ class BaseSession:
         # Build our variable bindings for the C interface
         interface_vars = self.build_interface_vars(oids)
 
+        if self._check_result_format(result_format) == 'columnar':
+            require_numpy()
+            if max_repetitions == repetitions.AUTO:
+                max_repetitions = repetitions.for_agent(self.connect_hostname).value
+            interface = self.get_interface()
+            columns = ColumnBuilder()
+            interface.columnar_request(
+                self, interface.SNMP_MSG_GETBULK, non_repeaters,
+                max_repetitions, interface_vars, columns.buffers
+            )
+            if self.abort_on_nonexistent:
+                columns.validate()
+            return columns.result()
+
+        if self.mib_index is not None:
+            if max_repetitions == repetitions.AUTO:
+                max_repetitions = repetitions.for_agent(self.connect_hostname).value
+            return self._indexed_request(
+                self.get_interface().SNMP_MSG_GETBULK, non_repeaters,
+                max_repetitions, interface_vars
+            )
+
+        if max_repetitions == repetitions.AUTO:
+            interface_vars, _ = self._bulk_request(
+                non_repeaters, max_repetitions, interface_vars
+            )
+            if self.abort_on_nonexistent:
+                self.validate_results(interface_vars)
+            return interface_vars
+
         self.get_interface().getbulk(self, non_repeaters, max_repetitions, interface_vars)
 
         # Validate the variable list returned
@@ -280,6 +746,269 @@ class BaseSession:
         # Return a list of variables
         return interface_vars
 
+    def _bulk_request(self, non_repeaters, max_repetitions, varlist):
+        """
+        Send a single GETBULK request. With max_repetitions='auto' the value
+        learned for the agent is used, and a request which is too big, or
+        times out although the agent answered before, is retried with fewer
+        repetitions.
+        Returns:
+            tuple: The response varbinds and their numeric OIDs.
+        """
+        interface = self.get_interface()
+        if max_repetitions != repetitions.AUTO:
+            return interface.request(
+                self, interface.SNMP_MSG_GETBULK, non_repeaters,
+                max_repetitions, varlist
+            )
+
+        tuner = repetitions.for_agent(self.connect_hostname)
+        repeaters = max(len(varlist) - non_repeaters, 1)
+        while True:
+            requested = tuner.value
+            started = time.monotonic()
+            try:
+                varbinds, names = interface.request(
+                    self, interface.SNMP_MSG_GETBULK, non_repeaters,
+                    requested, varlist
+                )
+            except exceptions.TDSNMPTimeoutError:
+                # An agent which never answered is down or rejects the
+                # credentials, and net-snmp reports other errors as
+                # timeouts too: neither is about the size of the response
+                if (tuner.latency is None or
+                        self.error_index != interface.SNMPERR_TIMEOUT or
+                        not tuner.failure(requested)):
+                    raise
+                continue
+            except exceptions.TDSNMPException:
+                if (self.error_number != interface.SNMP_ERR_TOOBIG or
+                        not tuner.failure(requested)):
+                    raise
+                continue
+
+            received = (len(varbinds) - non_repeaters) // repeaters
+            if varbinds and varbinds[-1].snmp_type == enums.END_OF_MIB_VIEW:
+                # Agents may stop repeating early at the end of the MIB view
+                received = requested
+            tuner.success(requested, received, time.monotonic() - started)
+            return varbinds, names
+
+    def _columnar_walk(self, oids, non_repeaters, max_repetitions):
+        """
+        Walk the OIDs one after another, collecting the variables as columns
+        in the C interface rather than as SNMPVariable objects.
+        """
+        require_numpy()
+        columns = ColumnBuilder()
+        self._walk_columns(oids, non_repeaters, max_repetitions, columns)
+        return columns.result()
+
+    def _walk_columns(self, oids, non_repeaters, max_repetitions, columns):
+        """
+        Walk the OIDs one after another, appending the variables to a
+        ColumnBuilder.
+        """
+        interface = self.get_interface()
+        if max_repetitions == repetitions.AUTO:
+            max_repetitions = repetitions.for_agent(self.connect_hostname).value
+        if max_repetitions:
+            command = interface.SNMP_MSG_GETBULK
+        else:
+            command = interface.SNMP_MSG_GETNEXT
+
+        oids = (oids,) if isinstance(oids, str) or not isinstance(oids, compat.Iterable) else oids
+        roots = interface.numeric_oids(self, self.build_interface_vars(oids))
+
+        for root in roots:
+            cursor = root
+            while cursor is not None:
+                try:
+                    cursor = interface.columnar_request(
+                        self, command, non_repeaters, max_repetitions,
+                        [SNMPVariable(oid_tuple_to_str(cursor))],
+                        columns.buffers, root, cursor
+                    )
+                except exceptions.TDSNMPNoSuchNameError:
+                    # SNMPv1 agents signal the end of the MIB view this way
+                    if self.version != 1:
+                        raise
+                    break
+
+    def get_numeric(self, *oids):
+        """
+        Perform an SNMP GET operation without any MIB lookups: the OIDs are
+        sent as given and the OIDs of the response are not translated.
+        :param oids: at least one numeric OID, each a tuple of integers
+                     (e.g. (1, 3, 6, 1, 2, 1, 1, 1, 0)) or a dotted string
+                     (e.g. '.1.3.6.1.2.1.1.1.0')
+        :return: a list of NumericVariable objects
+        """
+        return self._numeric_request(self.get_interface().SNMP_MSG_GET, 0, 0, oids)
+
+    def get_next_numeric(self, *oids):
+        """
+        Perform an SNMP GETNEXT operation without any MIB lookups.
+        :param oids: at least one numeric OID, as for get_numeric
+        :return: a list of NumericVariable objects
+        """
+        return self._numeric_request(self.get_interface().SNMP_MSG_GETNEXT, 0, 0, oids)
+
+    def get_bulk_numeric(self, *oids, non_repeaters=0, max_repetitions=15):
+        """
+        Perform an SNMP GETBULK operation without any MIB lookups.
+        :param oids: at least one numeric OID, as for get_numeric
+        :param non_repeaters: the number of objects that are only expected to
+                              return a single GETNEXT instance, not multiple
+                              instances
+        :param max_repetitions: the number of objects that should be returned
+                                for all the repeating OIDs
+        :return: a list of NumericVariable objects
+        """
+        if self.version == 1:
+            raise exceptions.TDSNMPException(
+                "BULKGET is not available for SNMP version 1")
+
+        return self._numeric_request(
+            self.get_interface().SNMP_MSG_GETBULK, non_repeaters,
+            max_repetitions, oids
+        )
+
+    def walk_numeric(self, oids=(1, 3, 6, 1, 2, 1)):
+        """
+        Walks the subtrees of numeric OIDs with GETNEXT operations, like
+        walk but without any MIB lookups in either direction, which saves
+        most of the decoding cost of large walks.
+        :param oids: a numeric OID or a list of them; each may be a tuple
+                     of integers or a dotted string
+        :return: a list of NumericVariable objects
+        """
+        return self._numeric_walk(oids, 0)
+
+    def bulkwalk_numeric(self, oids=(1, 3, 6, 1, 2, 1), max_repetitions=15):
+        """
+        Walks the subtrees of numeric OIDs with GETBULK operations, like
+        bulkwalk but without any MIB lookups in either direction.
+        :param oids: a numeric OID or a list of them; each may be a tuple
+                     of integers or a dotted string
+        :param max_repetitions: the number of variables to request in each
+                                GETBULK
+        :return: a list of NumericVariable objects
+        """
+        if self.version == 1:
+            raise exceptions.TDSNMPException(
+                "BULKWALK is not available for SNMP version 1")
+
+        return self._numeric_walk(oids, max_repetitions)
+
+    def _numeric_request(self, command, non_repeaters, max_repetitions, oids):
+        if len(oids) == 0:
+            raise TypeError('Must give at least 1 OID')
+
+        results = []
+        self.get_interface().numeric_request(
+            self, command, non_repeaters, max_repetitions,
+            [oid_str_to_tuple(oid) for oid in oids], results
+        )
+        if self.abort_on_nonexistent:
+            self.validate_results(results)
+        return results
+
+    def _numeric_walk(self, oids, max_repetitions):
+        interface = self.get_interface()
+        if max_repetitions:
+            command = interface.SNMP_MSG_GETBULK
+        else:
+            command = interface.SNMP_MSG_GETNEXT
+
+        # A single OID may itself be a tuple of integers
+        if isinstance(oids, str) or all(isinstance(subid, int) for subid in oids):
+            oids = (oids,)
+
+        results = []
+        for root in (oid_str_to_tuple(oid) for oid in oids):
+            cursor = root
+            while cursor is not None:
+                try:
+                    cursor = interface.numeric_request(
+                        self, command, 0, max_repetitions, [cursor],
+                        results, root
+                    )
+                except exceptions.TDSNMPNoSuchNameError:
+                    # SNMPv1 agents signal the end of the MIB view this way
+                    if self.version != 1:
+                        raise
+                    break
+
+        if self.abort_on_nonexistent:
+            self.validate_results(results)
+        return results
+
+    def _indexed_request(self, command, non_repeaters, max_repetitions, interface_vars):
+        """
+        Send a single request for variables named through mib_index rather
+        than the MIBs of net-snmp.
+        """
+        numeric_vars = self._numeric_request(
+            command, non_repeaters, max_repetitions,
+            [self.mib_index.resolve(var.oid, var.oid_index) for var in interface_vars]
+        )
+        return self._indexed_varbinds(numeric_vars)
+
+    def _indexed_walk(self, oids, max_repetitions):
+        oids = (oids,) if isinstance(oids, str) or not isinstance(oids, compat.Iterable) else oids
+        roots = [self.mib_index.resolve(var.oid, var.oid_index)
+                 for var in self.build_interface_vars(oids)]
+        return self._indexed_varbinds(self._numeric_walk(roots, max_repetitions))
+
+    def _indexed_varbinds(self, numeric_vars):
+        """
+        Name NumericVariable objects through mib_index the way the C
+        interface names response variables through the MIB.
+        """
+        varbinds = SNMPVariableList()
+        for var in numeric_vars:
+            oid, oid_index, node = self.mib_index.describe(
+                var.oid, self.use_long_names, self.use_numeric
+            )
+            if self.typed_values or isinstance(var.value, bytes):
+                # Stored as is, like the C interface does, since
+                # SNMPVariable.__setattr__ would turn integers into strings
+                varbind = SNMPVariable(oid, oid_index, None, var.snmp_type)
+                object.__setattr__(varbind, 'value', var.value)
+                varbinds.append(varbind)
+                continue
+            value = var.value
+            if self.use_enums and node is not None and var.snmp_type == 'INTEGER':
+                value = self.mib_index.enums(node).get(int(value), value)
+            varbinds.append(SNMPVariable(oid, oid_index, value, var.snmp_type))
+        return varbinds
+
+    def _index_set_vars(self, vars_list):
+        """
+        Replace the names of SET variables with numeric OIDs, and fill in
+        their types and enumerated values, from mib_index.
+        """
+        for var in vars_list:
+            oid = self.mib_index.resolve(var.oid, var.oid_index)
+            node = self.mib_index.find_oid(oid)
+            if node is not None:
+                if var.snmp_type is None:
+                    var.snmp_type = self.mib_index.snmp_type(node)
+                if self.use_enums and not str(var.value).lstrip('-').isdigit():
+                    labels = {label: value for value, label
+                              in self.mib_index.enums(node).items()}
+                    var.value = labels.get(var.value, var.value)
+            var.oid, var.oid_index = oid_tuple_to_str(oid), ''
+
+    @staticmethod
+    def _check_result_format(result_format):
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(
+                'unknown result_format {0}'.format(result_format)
+            )
+        return result_format
+
     def get_next(self, *oids):
         """
         Uses an SNMP GETNEXT operation using the prepared session to
@@ -302,7 +1031,12 @@ class BaseSession:
         interface_vars = self.build_interface_vars(oids)
 
         # Perform the SNMP GET operation
-        self.get_interface().getnext(self, interface_vars)
+        if self.result_cache is not None:
+            interface_vars = SNMPVariableList(self.result_cache.fetch(
+                self, 'get_next', interface_vars, self._get_next
+            ))
+        else:
+            interface_vars = self._get_next(interface_vars)
 
         # Validate the variable list returned
         if self.abort_on_nonexistent:
@@ -311,6 +1045,17 @@ class BaseSession:
         # Return a list or single item depending on what was passed in
         return list(interface_vars) if len(interface_vars) > 1 else interface_vars[0]
 
+    def _get_next(self, interface_vars):
+        interface = self.get_interface()
+
+        def send(chunk):
+            if self.mib_index is not None:
+                return self._indexed_request(interface.SNMP_MSG_GETNEXT, 0, 0, chunk)
+            interface.getnext(self, chunk)
+            return chunk
+
+        return self._split_request(interface.SNMP_MSG_GETNEXT, interface_vars, send)
+
     def set(self, oid, value, snmp_type=None):
         """
         Perform an SNMP SET operation using the prepared session.
@@ -324,15 +1069,11 @@ class BaseSession:
         :return: a boolean indicating the success of the operation
         """
 
-        vars_list = SNMPVariableList()
-        # OIDs specified as a tuple (e.g. ('sysContact', 0))
-        if isinstance(oid, tuple):
-            oid, oid_index = oid
-            vars_list.append(SNMPVariable(oid=oid, oid_index=oid_index,
-                                          value=value, snmp_type=snmp_type))
-        # OIDs specefied as a string (e.g. 'sysContact.0')
-        else:
-            vars_list.append(SNMPVariable(oid=oid, value=value, snmp_type=snmp_type))
+        vars_list = self.build_set_vars([(oid, value, snmp_type)])
+        if self.result_cache is not None:
+            self.result_cache.invalidate(self, vars_list)
+        if self.mib_index is not None:
+            self._index_set_vars(vars_list)
 
         # Perform the set operation and return whether or not it worked
         success = self.get_interface().set(self, vars_list)
@@ -342,34 +1083,33 @@ class BaseSession:
         """
         Perform an SNMP SET operation on multiple OIDs with multiple
         values using the prepared session.
+
+        The variables are sent in a single request, which the agent applies
+        as a whole. Only if it answers tooBig are they sent again in
+        smaller requests, one at a time: the SET is then no longer atomic,
+        and when a request fails the ones before it have been applied.
         :param oid_values: a list of tuples whereby each tuple contains a
                            (oid, value) or an (oid, value, snmp_type)
         :return: a list of SNMPVariable objects containing the values that
                  were retrieved via SNMP
         """
 
-        vars_list = SNMPVariableList()
-        for oid_value in oid_values:
-            if len(oid_value) == 2:
-                oid, value = oid_value
-                snmp_type = None
-            else:
-                oid, value, snmp_type = oid_value
-
-            # OIDs specified as a tuple (e.g. ('sysContact', 0))
-            if isinstance(oid, tuple):
-                oid, oid_index = oid
-                vars_list.append(SNMPVariable(oid=oid, oid_index=oid_index,
-                                              value=value, snmp_type=snmp_type))
-            # OIDs specefied as a string (e.g. 'sysContact.0')
-            else:
-                vars_list.append(
-                    SNMPVariable(oid=oid, value=value, snmp_type=snmp_type)
-                )
+        vars_list = self.build_set_vars(oid_values)
+        if self.result_cache is not None:
+            self.result_cache.invalidate(self, vars_list)
+        if self.mib_index is not None:
+            self._index_set_vars(vars_list)
 
         # Perform the set operation and return whether or not it worked
-        success = self.get_interface().set(self, vars_list)
-        return bool(success)
+        interface = self.get_interface()
+        successes = []
+
+        def send(chunk):
+            successes.append(bool(interface.set(self, chunk)))
+            return chunk
+
+        self._split_set(vars_list, send)
+        return all(successes)
 
     @staticmethod
     def build_interface_vars(oids):
@@ -393,6 +1133,38 @@ class BaseSession:
                 ret.append(SNMPVariable(oid=oid))
         return ret
 
+    @staticmethod
+    def build_set_vars(oid_values):
+        """
+        Prepare the variable binding list of a SET request
+        for the C interface.
+        Args:
+            oid_values: A list of (oid, value) or (oid, value, snmp_type)
+                        tuples, each OID in string or tuple form
+
+        Returns:
+            list: A list of SNMPVariable objects.
+        """
+        ret = SNMPVariableList()
+        for oid_value in oid_values:
+            if len(oid_value) == 2:
+                oid, value = oid_value
+                snmp_type = None
+            else:
+                oid, value, snmp_type = oid_value
+
+            # OIDs specified as a tuple (e.g. ('sysContact', 0))
+            if isinstance(oid, tuple):
+                oid, oid_index = oid
+                ret.append(SNMPVariable(oid=oid, oid_index=oid_index,
+                                        value=value, snmp_type=snmp_type))
+            # OIDs specefied as a string (e.g. 'sysContact.0')
+            else:
+                ret.append(
+                    SNMPVariable(oid=oid, value=value, snmp_type=snmp_type)
+                )
+        return ret
+
     @staticmethod
     def validate_results(snmp_vars):
         """
@@ -415,10 +1187,51 @@ class BaseSession:
                     'no such instance {0} could be found'.format(variable)
                 )
 
+    def response_error(self, status, errstat, errindex, error_string):
+        """
+        Records the outcome of a request sent with the asynchronous
+        interface on the session, as the blocking calls do.
+        Args:
+            status (int): The net-snmp status (STAT_SUCCESS, STAT_ERROR
+                          or STAT_TIMEOUT)
+            errstat (int): The error status of the response PDU
+            errindex (int): The error index of the response PDU
+            error_string (str): The error message
+
+        Returns:
+            TDSNMPException: The exception matching the error,
+                             None when the request succeeded.
+        """
+        interface = self.get_interface()
+        self.error_string = error_string
+        self.error_number = errstat
+        self.error_index = errindex
+
+        if status == interface.STAT_TIMEOUT:
+            return exceptions.TDSNMPTimeoutError(
+                'timed out while connecting to remote host'
+            )
+        if status != interface.STAT_SUCCESS:
+            return exceptions.TDSNMPException(error_string)
+        if errstat == interface.SNMP_ERR_NOSUCHNAME:
+            return exceptions.TDSNMPNoSuchNameError(
+                'no such name error encountered'
+            )
+        if errstat:
+            return exceptions.TDSNMPException(error_string)
+        return None
+
 
 class Session(BaseSession):
     """
     Router class that proxies to specific versions of Session classes.
+
+    Separate Session objects may be used from parallel threads: requests
+    are sent without holding the GIL and OIDs are formatted per variable
+    without leaving net-snmp's global output format changed, so sessions
+    with different use_long_names/use_numeric settings do not interfere.
+    A single Session must not be shared by threads running requests at
+    the same time.
     """
     def __init__(self, *args, **kwargs):
         super().__setattr__('_args', args)
@@ -434,10 +1247,23 @@ class Session(BaseSession):
     # TODO: There has to be a better way to do this...
     def get_session_ptr(self): return self._routed_session.get_session_ptr()
     def get_interface(self): return self._routed_session.get_interface()
+    def close(self): return self._routed_session.close()
+    def reset_stats(self): return self._routed_session.reset_stats()
+    def engine_is_stale(self): return self._routed_session.engine_is_stale()
     def get(self, *args, **kwargs): return self._routed_session.get(*args, **kwargs)
     def walk(self, *args, **kwargs): return self._routed_session.walk(*args, **kwargs)
     def bulkwalk(self, *args, **kwargs): return self._routed_session.bulkwalk(*args, **kwargs)
+    def iter_walk(self, *args, **kwargs): return self._routed_session.iter_walk(*args, **kwargs)
+    def iter_bulkwalk(self, *args, **kwargs): return self._routed_session.iter_bulkwalk(*args, **kwargs)
     def get_next(self, *args, **kwargs): return self._routed_session.get_next(*args, **kwargs)
     def get_bulk(self, *args, **kwargs): return self._routed_session.get_bulk(*args, **kwargs)
+    def get_table(self, *args, **kwargs): return self._routed_session.get_table(*args, **kwargs)
+    def get_numeric(self, *args, **kwargs): return self._routed_session.get_numeric(*args, **kwargs)
+    def get_next_numeric(self, *args, **kwargs): return self._routed_session.get_next_numeric(*args, **kwargs)
+    def get_bulk_numeric(self, *args, **kwargs): return self._routed_session.get_bulk_numeric(*args, **kwargs)
+    def walk_numeric(self, *args, **kwargs): return self._routed_session.walk_numeric(*args, **kwargs)
+    def bulkwalk_numeric(self, *args, **kwargs): return self._routed_session.bulkwalk_numeric(*args, **kwargs)
+    def iter_table(self, *args, **kwargs): return self._routed_session.iter_table(*args, **kwargs)
     def set(self, *args, **kwargs): return self._routed_session.set(*args, **kwargs)
-    def set_multiple(self, *args, **kwargs): return self._routed_session.set_multiple(*args, **kwargs)
\ No newline at end of file
+    def set_multiple(self, *args, **kwargs): return self._routed_session.set_multiple(*args, **kwargs)
+    def response_error(self, *args, **kwargs): return self._routed_session.response_error(*args, **kwargs)
\ No newline at end of file
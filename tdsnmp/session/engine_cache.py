@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class EngineCache:
+    """
+    Remembers the SNMPv3 engine ID, boots and time discovered for each
+    agent so that new sessions to it can skip the discovery exchange.
+
+    Entries are kept in memory and, when `path` is given, in a JSON file
+    shared by every process using the same path. The engine time of an
+    entry is advanced by the time elapsed since it was discovered, and
+    entries older than `ttl` seconds are discovered again.
+    """
+
+    def __init__(self, ttl=3600, path=None):
+        """
+        Args:
+            ttl (float): The number of seconds an entry stays valid
+            path (str): A file to share the entries through, if any
+        """
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        # agent -> (engine_id, engine_boots, engine_time, discovered)
+        self._entries = {}
+        self._stamp_seen = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, agent):
+        """
+        Args:
+            agent (str): The hostname and port of the agent
+        Returns:
+            tuple: The (engine_id, engine_boots, engine_time) of the agent,
+                   or None when nothing valid is cached.
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(agent)
+
+        if entry is None:
+            return None
+
+        engine_id, engine_boots, engine_time, discovered = entry
+        elapsed = time.time() - discovered
+        if not 0 <= elapsed < self.ttl:
+            return None
+        return engine_id, engine_boots, engine_time + int(elapsed)
+
+    def put(self, agent, engine_id, engine_boots, engine_time):
+        """
+        Cache the engine discovered for an agent.
+        """
+        self._update(agent, (engine_id, engine_boots, engine_time, time.time()))
+
+    def invalidate(self, agent):
+        """
+        Forget the engine of an agent, e.g. after it has been replaced or
+        rebooted.
+        """
+        self._update(agent, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            if self.path is not None:
+                with self._file_lock():
+                    self._write({})
+
+    def _update(self, agent, entry):
+        with self._lock:
+            if self.path is None:
+                self._apply(self._entries, agent, entry)
+                return
+
+            # Merge with the entries other processes have written meanwhile
+            with self._file_lock():
+                entries = self._read()
+                self._apply(entries, agent, entry)
+                self._write(entries)
+            self._entries = entries
+
+    @staticmethod
+    def _apply(entries, agent, entry):
+        if entry is None:
+            entries.pop(agent, None)
+        else:
+            entries[agent] = entry
+
+    def _load(self):
+        """
+        Reread the file when another process has changed it.
+        """
+        if self.path is None:
+            return
+        try:
+            stamp = self._stamp(os.stat(self.path))
+        except OSError:
+            return
+        if stamp != self._stamp_seen:
+            self._entries = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as cache_file:
+                self._stamp_seen = self._stamp(os.fstat(cache_file.fileno()))
+                entries = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        return {agent: tuple(entry) for agent, entry in entries.items()}
+
+    def _write(self, entries):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._stamp_seen = self._stamp(os.stat(self.path))
+
+    @staticmethod
+    def _stamp(stat):
+        # Every write replaces the file, so its inode changes too
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _file_lock(self):
+        return _FileLock(self.path + '.lock')
+
+
+class _FileLock:
+    """
+    Serialises updates of the cache file between processes where fcntl is
+    available.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.lock_file = open(self.path, 'a')
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+
+#: The cache SNMPv3 sessions use unless given another one
+default_engine_cache = EngineCache()
@@ -0,0 +1,66 @@
+import threading
+
+#: The number of variables a request carries at most until the agent has
+#: answered one with tooBig
+DEFAULT_LIMIT = 64
+
+
+class PduLimit:
+    """
+    The number of variables the get, get_next and set requests sent to an
+    agent carry at most; longer lists of OIDs are split into requests of
+    this size.
+
+    The size of a response is only known once it arrives, so the limit is
+    a number of variables rather than of bytes: when the agent answers
+    tooBig, the limit drops to half the variables of the request.
+    """
+
+    def __init__(self, initial=DEFAULT_LIMIT, minimum=1):
+        self.value = initial
+        self.minimum = minimum
+
+    def too_big(self, requested):
+        """
+        Account for a request the agent answered with tooBig.
+        :param requested: the number of variables of the request
+        :return: whether a smaller request is worth trying
+        """
+        if requested <= self.minimum:
+            return False
+        self.value = max(self.minimum, min(self.value, requested // 2))
+        return True
+
+
+def chunks(items, size):
+    """
+    Split a list into lists of at most size items.
+    """
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+_lock = threading.Lock()
+_agents = {}
+
+
+def for_agent(agent):
+    """
+    Returns the PduLimit remembered for an agent, identified by its
+    hostname and port.
+    """
+    with _lock:
+        limit = _agents.get(agent)
+        if limit is None:
+            limit = _agents[agent] = PduLimit()
+        return limit
+
+
+def forget(agent=None):
+    """
+    Forget the limit learned for an agent, or for all agents.
+    """
+    with _lock:
+        if agent is None:
+            _agents.clear()
+        else:
+            _agents.pop(agent, None)
@@ -0,0 +1,81 @@
+import threading
+
+AUTO = 'auto'
+
+
+class AdaptiveRepetitions:
+    """
+    Chooses the max-repetitions of the GETBULK requests sent to an agent.
+
+    The value doubles while responses come back complete and faster than
+    `target_latency` seconds. It is halved when a request times out, is
+    answered with tooBig or takes `spike_factor` times longer than usual.
+    When the agent truncates a response to fit its message size, the value
+    drops to the number of repetitions that fitted.
+    """
+
+    def __init__(self, initial=15, minimum=1, maximum=1000,
+                 target_latency=0.25, spike_factor=4):
+        self.value = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.spike_factor = spike_factor
+        # Exponentially smoothed latency of the responses
+        self.latency = None
+
+    def success(self, requested, repetitions, elapsed):
+        """
+        Account for a response.
+        :param requested: the max-repetitions of the request
+        :param repetitions: the number of repetitions in the response
+        :param elapsed: the seconds the request took
+        """
+        if self.latency is not None and elapsed > self.spike_factor * self.latency:
+            self.value = max(self.minimum, requested // 2)
+        elif repetitions < requested:
+            self.value = max(self.minimum, repetitions)
+        elif elapsed < self.target_latency:
+            self.value = min(self.maximum, max(self.value, requested * 2))
+
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency = 0.8 * self.latency + 0.2 * elapsed
+
+    def failure(self, requested):
+        """
+        Account for a request which timed out or was too big.
+        :return: whether a smaller request is worth trying
+        """
+        if requested <= self.minimum:
+            return False
+        self.value = max(self.minimum, requested // 2)
+        return True
+
+
+_lock = threading.Lock()
+_agents = {}
+
+
+def for_agent(agent):
+    """
+    Returns the AdaptiveRepetitions remembered for an agent, identified by
+    its hostname and port.
+    """
+    with _lock:
+        repetitions = _agents.get(agent)
+        if repetitions is None:
+            repetitions = _agents[agent] = AdaptiveRepetitions()
+        return repetitions
+
+
+def forget(agent=None):
+    """
+    Forget the max-repetitions learned for an agent, or for all agents.
+    """
+    with _lock:
+        if agent is None:
+            _agents.clear()
+        else:
+            _agents.pop(agent, None)
@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import OrderedDict
+
+from tdsnmp import enums, exceptions
+from tdsnmp.utils.oid_cache import CacheInfo
+from tdsnmp.utils.variables import SNMPVariable
+
+
+def oid_key(var):
+    """
+    Returns:
+        str: The OID of a variable with its index, e.g. 'sysDescr.0'
+    """
+    if var.oid_index:
+        return '{0}.{1}'.format(var.oid, var.oid_index)
+    return var.oid
+
+
+def numeric_keys(session, interface_vars):
+    """
+    Returns:
+        list: The numeric OID of each variable as a tuple of integers, or
+              its oid_key when the MIB does not know it
+    """
+    interface = session.get_interface()
+    try:
+        return interface.numeric_oids(session, interface_vars)
+    except exceptions.TDSNMPUnknownObjectIDError:
+        pass
+
+    keys = []
+    for var in interface_vars:
+        try:
+            keys.append(interface.numeric_oids(session, [var])[0])
+        except exceptions.TDSNMPUnknownObjectIDError:
+            keys.append(oid_key(var))
+    return keys
+
+
+# Answers which may change as soon as the object is created
+_UNCACHED_TYPES = frozenset((enums.NO_SUCH_OBJECT, enums.NO_SUCH_INSTANCE,
+                             enums.END_OF_MIB_VIEW, 'NOSUCHNAME'))
+
+
+def _copy(var):
+    # Bypasses SNMPVariable.__setattr__, which would turn typed values into
+    # strings
+    clone = SNMPVariable.__new__(SNMPVariable)
+    for name in SNMPVariable.__slots__:
+        object.__setattr__(clone, name, getattr(var, name))
+    return clone
+
+
+class ResultCache:
+    """
+    Remembers the variables returned by get and get_next for a while, so
+    that values which hardly ever change (e.g. sysDescr.0 or ifDescr) are
+    not requested from the agent again on every call.
+
+    Entries are kept per agent and credentials (the community, or the
+    SNMPv3 user and context), per operation and per requested OID, however
+    it is written: 'sysDescr.0', ('sysDescr', 0) and '.1.3.6.1.2.1.1.1.0'
+    share an entry. A set of an OID drops the entries requesting or
+    returning it for the same agent. Answers that an object does not exist
+    are not kept. At most maxsize entries are kept, the least recently used
+    ones being evicted first.
+
+    A cache may be shared by any number of sessions and threads.
+    """
+
+    def __init__(self, ttl=60, ttls=None, maxsize=4096):
+        """
+        Args:
+            ttl (float): The number of seconds entries stay valid by default
+            ttls (dict): The number of seconds entries stay valid for OIDs
+                         starting with each prefix, e.g.
+                         {'sysDescr': 3600, 'ifDescr': 600}; the longest
+                         prefix of an OID applies. 0 disables caching.
+            maxsize (int): The maximum number of entries
+        """
+        if maxsize < 0:
+            raise ValueError('the cache size must not be negative')
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        # (scope, operation, numeric oid) -> (variable, expires, numeric oid
+        # of the variable)
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl_for(self, oid):
+        """
+        Returns:
+            float: The number of seconds the entry of an OID stays valid
+        """
+        best = None
+        for prefix in self.ttls:
+            if oid == prefix or oid.startswith(prefix.rstrip('.') + '.'):
+                if best is None or len(prefix) > len(best):
+                    best = prefix
+        return self.ttl if best is None else self.ttls[best]
+
+    def cache_info(self):
+        """
+        Returns:
+            CacheInfo: The hits and misses of the cache and its size
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize,
+                             len(self._entries))
+
+    def clear(self):
+        """
+        Drop every entry and reset the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    def fetch(self, session, operation, interface_vars, request):
+        """
+        Answer the variables cached for a request of a session, and send
+        the others with request.
+        Args:
+            session (BaseSession): The session making the request
+            operation (str): 'get' or 'get_next'
+            interface_vars (list): The SNMPVariable objects requested
+            request (callable): Sends a list of SNMPVariable objects and
+                                returns the response variables in order
+        Returns:
+            list: The variables of the response, in the requested order
+        """
+        scope = self._scope(session)
+        keys = [(scope, operation, key)
+                for key in numeric_keys(session, interface_vars)]
+        results = [None] * len(keys)
+        now = time.monotonic()
+
+        with self._lock:
+            for position, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    results[position] = _copy(entry[0])
+                    self._hits += 1
+                else:
+                    self._misses += 1
+
+        missing = [position for position, result in enumerate(results)
+                   if result is None]
+        if not missing:
+            return results
+
+        fetched = request([interface_vars[position] for position in missing])
+        returned = numeric_keys(session, fetched)
+        now = time.monotonic()
+        with self._lock:
+            for position, var, returned_key in zip(missing, fetched, returned):
+                results[position] = var
+                ttl = self.ttl_for(oid_key(interface_vars[position]))
+                if ttl > 0 and self.maxsize and var.snmp_type not in _UNCACHED_TYPES:
+                    self._entries[keys[position]] = (_copy(var), now + ttl,
+                                                     returned_key)
+                    self._entries.move_to_end(keys[position])
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return results
+
+    def invalidate(self, session, interface_vars):
+        """
+        Drop the entries of a session's agent requesting or returning any
+        of the OIDs of interface_vars, e.g. once they have been set.
+        Args:
+            interface_vars (list): SNMPVariable objects
+        """
+        scope = self._scope(session)
+        oids = set(numeric_keys(session, interface_vars))
+        with self._lock:
+            stale = [key for key, (_, _, returned) in self._entries.items()
+                     if key[0] == scope and (key[2] in oids or returned in oids)]
+            for key in stale:
+                del self._entries[key]
+
+    @staticmethod
+    def _scope(session):
+        if session.version == 3:
+            credentials = (session.security_username, session.context)
+        else:
+            credentials = session.community
+        return session.connect_hostname, session.version, credentials
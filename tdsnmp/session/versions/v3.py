@@ -1,10 +1,91 @@
+import functools
+import weakref
+
+from tdsnmp import exceptions
 from tdsnmp.session.base import BaseSession
+from tdsnmp.session.engine_cache import default_engine_cache
+
+
+class _RediscoveringInterface:
+    """
+    The C interface as seen by an SNMPv3 session. A blocking request of the
+    session that fails because the engine taken from the cache is out of
+    date is sent again once, after discovering the engine; every request
+    goes through here, whichever method of the session sends it.
+    """
+
+    def __init__(self, session, interface):
+        self._session = weakref.ref(session)
+        self._interface = interface
+
+    def __getattr__(self, name):
+        attr = getattr(self._interface, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+
+        session_ref = self._session
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            try:
+                return attr(*args, **kwargs)
+            except exceptions.TDSNMPException:
+                session = session_ref()
+                if (session is None or not args or
+                        not _is_session(args[0], session) or
+                        not session.engine_is_stale()):
+                    raise
+            session.rediscover_engine()
+            return attr(*args, **kwargs)
+
+        # Later lookups find the wrapper without calling __getattr__
+        setattr(self, name, call)
+        return call
+
+
+def _is_session(candidate, session):
+    return (candidate is session or
+            getattr(candidate, '_routed_session', None) is session)
 
 
 class SNMPv3Session(BaseSession):
 
+    def __init__(self, *args, engine_cache=default_engine_cache, **kwargs):
+        """
+        Args:
+            engine_cache (EngineCache): Where to look up and remember the
+                                        engine of the agent, or None to
+                                        always discover it
+        """
+        self.engine_cache = engine_cache
+        self.engine_from_cache = False
+        self._interface = None
+        super().__init__(*args, **kwargs)
+
+    def get_interface(self):
+        interface = super().get_interface()
+        if interface is None:
+            return None
+        if self._interface is None:
+            self._interface = _RediscoveringInterface(self, interface)
+        return self._interface
+
     def get_session_ptr(self):
-        return self.get_interface().session_v3(
+        engine_id = self.security_engine_id
+        engine_boots = self.engine_boots
+        engine_time = self.engine_time
+
+        # Settings given by the caller always win over the cache
+        use_cache = self.engine_cache is not None and not (
+            engine_id or engine_boots or engine_time
+        )
+        cached = None
+        if use_cache:
+            cached = self.engine_cache.get(self.connect_hostname)
+        if cached is not None:
+            engine_id, engine_boots, engine_time = cached
+
+        session_ptr = self.get_interface().session_v3(
                 self.version,
                 self.connect_hostname,
                 self.local_port,
@@ -12,13 +93,42 @@ class SNMPv3Session(BaseSession):
                 self.timeout_microseconds,
                 self.security_username,
                 self.security_level,
-                self.security_engine_id,
+                engine_id,
                 self.context_engine_id,
                 self.context,
                 self.auth_protocol,
                 self.auth_password,
                 self.privacy_protocol,
                 self.privacy_password,
-                self.engine_boots,
-                self.engine_time
+                engine_boots,
+                engine_time
         )
+        self.engine_from_cache = cached is not None
+
+        if use_cache and cached is None:
+            engine = self.get_interface().session_engine_info(session_ptr)
+            if engine is not None:
+                self.engine_cache.put(self.connect_hostname, *engine)
+        return session_ptr
+
+    def engine_is_stale(self):
+        """
+        Returns:
+            bool: Whether the last request failed because the engine taken
+                  from the cache is unknown to the agent or out of its time
+                  window.
+        """
+        interface = self.get_interface()
+        # snmp_sess_error() leaves the SNMP error number in error_index
+        return self.engine_from_cache and self.error_index in (
+            interface.SNMPERR_UNKNOWN_ENG_ID,
+            interface.SNMPERR_NOT_IN_TIME_WINDOW,
+        )
+
+    def rediscover_engine(self):
+        """
+        Forget the cached engine of the agent and open the session again,
+        discovering the engine.
+        """
+        self.engine_cache.invalidate(self.connect_hostname)
+        self.session_ptr = self.get_session_ptr()
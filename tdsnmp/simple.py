@@ -1,4 +1,4 @@
-from .session.base import Session
+from .pool import acquire, release
 
 def snmp_get(oids, **session_kwargs):
     """
@@ -14,8 +14,11 @@ def snmp_get(oids, **session_kwargs):
                           all parameters in the Session class are supported
     """
 
-    session = Session(**session_kwargs)
-    return session.get(oids)
+    session = acquire(**session_kwargs)
+    try:
+        return session.get(oids)
+    finally:
+        release(session)
 
 def snmp_set(oid, value, snmp_type=None, **session_kwargs):
     """
@@ -33,8 +36,11 @@ def snmp_set(oid, value, snmp_type=None, **session_kwargs):
                           all parameters in the Session class are supported
     """
 
-    session = Session(**session_kwargs)
-    return session.set(oid, value, snmp_type)
+    session = acquire(**session_kwargs)
+    try:
+        return session.set(oid, value, snmp_type)
+    finally:
+        release(session)
 
 def snmp_set_multiple(oid_values, **session_kwargs):
     """
@@ -47,8 +53,11 @@ def snmp_set_multiple(oid_values, **session_kwargs):
                           all parameters in the Session class are supported
     """
 
-    session = Session(**session_kwargs)
-    return session.set_multiple(oid_values)
+    session = acquire(**session_kwargs)
+    try:
+        return session.set_multiple(oid_values)
+    finally:
+        release(session)
 
 def snmp_get_next(oids, **session_kwargs):
     """
@@ -64,8 +73,11 @@ def snmp_get_next(oids, **session_kwargs):
                           all parameters in the Session class are supported
     """
 
-    session = Session(**session_kwargs)
-    return session.get_next(oids)
+    session = acquire(**session_kwargs)
+    try:
+        return session.get_next(oids)
+    finally:
+        release(session)
 
 def snmp_get_bulk(oids, non_repeaters=0, max_repetitions=15, **session_kwargs):
     """
@@ -86,16 +98,19 @@ def snmp_get_bulk(oids, non_repeaters=0, max_repetitions=15, **session_kwargs):
                           all parameters in the Session class are supported
     """
 
-    session = Session(**session_kwargs)
-    return session.get_bulk(oids, non_repeaters, max_repetitions)
+    session = acquire(**session_kwargs)
+    try:
+        return session.get_bulk(oids, non_repeaters, max_repetitions)
+    finally:
+        release(session)
 
 def snmp_walk(oids='.1.3.6.1.2.1', **session_kwargs):
     """
     Uses SNMP GETNEXT operation to automatically retrieve multiple
     pieces of information in an OID for you.
-    :param oids: you may pass in a single item (multiple values currently
-                 experimental) which may be a string representing the
-                 entire OID (e.g. 'sysDescr.0') or may be a tuple
+    :param oids: you may pass in a single item or a list of items, which
+                 are walked together; each may be a string representing
+                 the entire OID (e.g. 'sysDescr.0') or may be a tuple
                  containing the name as its first item and index as its
                  second (e.g. ('sysDescr', 0))
     :param session_kwargs: keyword arguments which will be sent used when
@@ -103,8 +118,11 @@ def snmp_walk(oids='.1.3.6.1.2.1', **session_kwargs):
                           all parameters in the Session class are supported
     """
 
-    session = Session(**session_kwargs)
-    return session.walk(oids)
+    session = acquire(**session_kwargs)
+    try:
+        return session.walk(oids)
+    finally:
+        release(session)
 
 def snmp_bulkwalk(
     oids='.1.3.6.1.2.1', non_repeaters=0, max_repetitions=15,
@@ -127,5 +145,97 @@ def snmp_bulkwalk(
              were retrieved via SNMP
     """
 
-    session = Session(**session_kwargs)
-    return session.bulkwalk(oids, non_repeaters, max_repetitions)
\ No newline at end of file
+    session = acquire(**session_kwargs)
+    try:
+        return session.bulkwalk(oids, non_repeaters, max_repetitions)
+    finally:
+        release(session)
+
+def snmp_iter_walk(oids='.1.3.6.1.2.1', batches=False, **session_kwargs):
+    """
+    Uses SNMP GETNEXT operations to retrieve multiple pieces of
+    information in an OID, yielding them as each response arrives.
+    :param oids: you may pass in a single item or a list of items; each
+                 may be a string representing the entire OID
+                 (e.g. 'system') or may be a tuple containing the name as
+                 its first item and index as its second
+                 (e.g. ('sysDescr', 0))
+    :param batches: whether to yield one list of variables per response
+                    rather than single variables
+    :param session_kwargs: keyword arguments which will be sent used when
+                          constructing the session for this operation;
+                          all parameters in the Session class are supported
+    """
+
+    session = acquire(**session_kwargs)
+    try:
+        results = session.iter_walk(oids, batches=batches)
+    except Exception:
+        release(session)
+        raise
+    return _released(session, results)
+
+def snmp_iter_bulkwalk(
+    oids='.1.3.6.1.2.1', non_repeaters=0, max_repetitions=15,
+    batches=False, **session_kwargs
+):
+    """
+    Uses SNMP GETBULK operations to retrieve multiple pieces of
+    information in an OID, yielding them as each response arrives.
+    :param oids: you may pass in a single item or a list of items; each
+                 may be a string representing the entire OID
+                 (e.g. 'system') or may be a tuple containing the name as
+                 its first item and index as its second
+                 (e.g. ('sysDescr', 0))
+    :param non_repeaters: the number of objects that are only expected to
+                          return a single GETNEXT instance, not multiple
+                          instances
+    :param max_repetitions: the number of objects that should be returned
+                            in each response
+    :param batches: whether to yield one list of variables per response
+                    rather than single variables
+    :param session_kwargs: keyword arguments which will be sent used when
+                          constructing the session for this operation;
+                          all parameters in the Session class are supported
+    """
+
+    session = acquire(**session_kwargs)
+    try:
+        results = session.iter_bulkwalk(
+            oids, non_repeaters, max_repetitions, batches=batches
+        )
+    except Exception:
+        release(session)
+        raise
+    return _released(session, results)
+
+def snmp_get_table(columns, max_repetitions=15, **session_kwargs):
+    """
+    Retrieves the rows of a table by walking several of its columns in
+    lockstep with SNMP GETBULK operations.
+    :param columns: a list of columns (e.g. ['ifDescr', 'ifInOctets']);
+                    each may be a string or a tuple as for snmp_walk
+    :param max_repetitions: the number of rows to request for each column
+                            in each response
+    :param session_kwargs: keyword arguments which will be sent used when
+                          constructing the session for this operation;
+                          all parameters in the Session class are supported
+    :return: a dict mapping the index of each row to a dict of the
+             SNMPVariable objects of the row keyed by column
+    """
+
+    session = acquire(**session_kwargs)
+    try:
+        return session.get_table(columns, max_repetitions)
+    finally:
+        release(session)
+
+def _released(session, results):
+    """
+    Yields from the results of an iter_* method, then hands the session
+    back to its pool.
+    """
+    try:
+        yield from results
+    finally:
+        release(session)
\ No newline at end of file
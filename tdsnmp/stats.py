@@ -0,0 +1,59 @@
+import threading
+import weakref
+from collections import namedtuple
+
+#: Counters of the requests sent on a session. The bytes are those
+#: of the BER-encoded variable bindings, without the message headers, and
+#: the retries those net-snmp sent before timing out or retry_no_such did.
+SessionStats = namedtuple('SessionStats', [
+    'requests', 'responses', 'retries', 'timeouts', 'varbinds', 'bytes_out',
+    'bytes_in'
+])
+
+#: Seconds spent by the last operation of a session: in total, waiting for
+#: the agent, formatting names and values with the MIB, building the Python
+#: variables, and on everything else (building requests, walk bookkeeping)
+Timing = namedtuple('Timing', ['total', 'wait', 'format', 'objects', 'other'])
+
+_lock = threading.Lock()
+_sessions = weakref.WeakSet()
+
+
+def register(session):
+    """
+    Add a session to the registry until it is garbage collected; sessions
+    register themselves when they are created.
+    """
+    with _lock:
+        _sessions.add(session)
+
+
+def sessions():
+    """
+    Returns:
+        list: The sessions which have not been garbage collected yet
+    """
+    with _lock:
+        return list(_sessions)
+
+
+def collect():
+    """
+    Read the counters of every registered session, e.g. for an exporter.
+    Reading them costs no request and closed sessions keep theirs.
+
+    Returns:
+        list: A (session, SessionStats) tuple for each session
+    """
+    return [(session, session.stats) for session in sessions()]
+
+
+def totals():
+    """
+    Returns:
+        SessionStats: The counters of all registered sessions added up
+    """
+    return SessionStats(*map(sum, zip(
+        SessionStats(*(0,) * len(SessionStats._fields)),
+        *(stats for _, stats in collect())
+    )))
@@ -0,0 +1,161 @@
+from collections import namedtuple
+
+from tdsnmp import exceptions
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# ASN.1 types of the values the C interface stores as integers
+INTEGER = 0x02
+COUNTER = 0x41
+GAUGE = 0x42
+TIMETICKS = 0x43
+COUNTER64 = 0x46
+UINTEGER = 0x47
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+SIGNED_TYPES = frozenset([INTEGER])
+UNSIGNED_TYPES = frozenset([COUNTER, GAUGE, TIMETICKS, UINTEGER, COUNTER64])
+
+#: The snmp_type an SNMPVariable would carry for each ASN.1 type code
+TYPE_NAMES = {
+    0x02: 'INTEGER',
+    0x03: 'BITS',
+    0x04: 'OCTETSTR',
+    0x05: 'NULL',
+    0x06: 'OBJECTID',
+    0x40: 'IPADDR',
+    0x41: 'COUNTER',
+    0x42: 'GAUGE',
+    0x43: 'TICKS',
+    0x44: 'OPAQUE',
+    0x46: 'COUNTER64',
+    0x47: 'UINTEGER',
+    0x80: 'NOSUCHOBJECT',
+    0x81: 'NOSUCHINSTANCE',
+    0x82: 'ENDOFMIBVIEW',
+}
+
+#: Parallel NumPy arrays holding one row per variable
+ColumnarResult = namedtuple(
+    'ColumnarResult', ['oid', 'oid_index', 'snmp_type', 'value']
+)
+
+
+def require_numpy():
+    """
+    Raises ImproperlyConfigured unless NumPy can be imported.
+    """
+    if numpy is None:
+        raise exceptions.ImproperlyConfigured(
+            "result_format='columnar' requires numpy to be installed"
+        )
+
+
+class ColumnBuilder:
+    """
+    Collects the variables of one or more responses as columns.
+
+    The C interface appends to the buffers directly (see
+    interface.columnar_request), so no SNMPVariable is created per row:
+    labels are shared between rows, the type of each row is a single byte
+    and integer values are packed as native 64 bit integers.
+    """
+
+    def __init__(self):
+        self.oids = []
+        self.indexes = []
+        self.types = bytearray()
+        self.numbers = bytearray()
+        self.values = []
+        self.labels = {}
+
+    def __len__(self):
+        return len(self.types)
+
+    @property
+    def buffers(self):
+        """
+        Returns:
+            tuple: The buffers in the order the C interface expects them.
+        """
+        return (
+            self.oids, self.indexes, self.types, self.numbers, self.values,
+            self.labels
+        )
+
+    def validate(self):
+        """
+        Raises the exceptions validate_results would raise for the rows.
+        """
+        for row, code in enumerate(self.types):
+            if code == NO_SUCH_OBJECT:
+                raise exceptions.TDSNMPNoSuchObjectError(
+                    'no such object {0}.{1} could be found'.format(
+                        self.oids[row], self.indexes[row]
+                    )
+                )
+            if code == NO_SUCH_INSTANCE:
+                raise exceptions.TDSNMPNoSuchInstanceError(
+                    'no such instance {0}.{1} could be found'.format(
+                        self.oids[row], self.indexes[row]
+                    )
+                )
+
+    def result(self):
+        """
+        Returns:
+            ColumnarResult: The rows as NumPy arrays (see build_result).
+        """
+        return build_result(
+            self.oids, self.indexes, bytes(self.types), bytes(self.numbers),
+            self.values
+        )
+
+
+def build_result(oids, indexes, types, numbers, values):
+    """
+    Turn the columns of a ColumnBuilder into NumPy arrays.
+    Args:
+        oids (list): The label of each row
+        indexes (list): The index of each row
+        types (bytes): The ASN.1 type code of each row
+        numbers (bytes): The value of each row as a native 64 bit integer,
+                         for the rows of integer types
+        values (list): The value of each row, for the other rows
+    Returns:
+        ColumnarResult: The rows as NumPy arrays. snmp_type holds the ASN.1
+                        type codes (see TYPE_NAMES) as uint8. value is uint64
+                        when every row is a Counter32, Counter64, Gauge32,
+                        TimeTicks or UInteger32, int64 when the rows are
+                        INTEGERs mixed with 32 bit unsigned types and an
+                        object array of ints and strings otherwise.
+    """
+    require_numpy()
+
+    types = numpy.frombuffer(types, dtype=numpy.uint8)
+    numbers = numpy.frombuffer(numbers, dtype=numpy.int64)
+    codes = set(numpy.unique(types).tolist())
+
+    if codes and codes <= UNSIGNED_TYPES:
+        value = numbers.view(numpy.uint64)
+    elif codes and codes <= (SIGNED_TYPES | UNSIGNED_TYPES) - {COUNTER64}:
+        value = numbers
+    else:
+        value = _objects(values)
+        signed = numpy.isin(types, list(SIGNED_TYPES))
+        unsigned = numpy.isin(types, list(UNSIGNED_TYPES))
+        value[signed] = numbers[signed].tolist()
+        value[unsigned] = numbers.view(numpy.uint64)[unsigned].tolist()
+
+    return ColumnarResult(_objects(oids), _objects(indexes), types, value)
+
+
+def _objects(items):
+    array = numpy.empty(len(items), dtype=object)
+    array[:] = items
+    return array
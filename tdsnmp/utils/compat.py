@@ -3,6 +3,11 @@ import sys
 
 PY3 = sys.version_info[0] == 3
 
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+
 if PY3:
     text_type = str
 
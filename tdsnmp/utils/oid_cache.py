@@ -0,0 +1,55 @@
+import importlib
+from collections import namedtuple
+
+from tdsnmp.utils import snmp_strings
+
+#: Statistics of a cache, with the fields of functools.lru_cache's
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+def _interface():
+    try:
+        return importlib.import_module('tdsnmp.c.interface')
+    except ImportError:
+        return None
+
+
+def cache_info():
+    """
+    Returns the statistics of the OID caches.
+
+    Returns:
+        dict: A CacheInfo for 'split', the cache splitting OIDs into a name
+              and an index when building variables, and for 'translate',
+              the cache of the C interface translating names into numeric
+              OIDs (None when the C interface is not built).
+    """
+    info = {'split': CacheInfo(*snmp_strings.split_oid.cache_info()),
+            'translate': None}
+    interface = _interface()
+    if interface is not None:
+        info['translate'] = CacheInfo(*interface.oid_cache_info())
+    return info
+
+
+def set_cache_size(maxsize):
+    """
+    Bound both OID caches to maxsize entries, evicting the least recently
+    used ones; 0 disables them.
+    """
+    if maxsize < 0:
+        raise ValueError('the cache size must not be negative')
+    snmp_strings.set_split_oid_cache_size(maxsize)
+    interface = _interface()
+    if interface is not None:
+        interface.oid_cache_configure(maxsize)
+
+
+def clear_cache():
+    """
+    Empty both OID caches and reset their statistics.
+    """
+    snmp_strings.split_oid.cache_clear()
+    interface = _interface()
+    if interface is not None:
+        interface.oid_cache_clear()
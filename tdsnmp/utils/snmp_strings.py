@@ -1,10 +1,14 @@
 from __future__ import unicode_literals
 
+import functools
 import re
 import string
 
 from tdsnmp.utils import compat
 
+#: The number of OIDs the split and translation caches hold by default
+DEFAULT_OID_CACHE_SIZE = 4096
+
 OID_INDEX_RE = re.compile(
     r'''(
             \.?\d+(?:\.\d+)*              # numeric OID
@@ -19,6 +23,43 @@ OID_INDEX_RE = re.compile(
 )
 
 
+# Matches the characters missing from string.printable, and those
+# characters as bytes for bytes.translate to delete
+_NON_PRINTABLE_RE = re.compile('[^{0}]'.format(re.escape(string.printable)))
+_NON_PRINTABLE_BYTES = bytes(
+    code for code in range(256) if chr(code) not in string.printable
+)
+
+#: The number of values whose printable check is remembered
+PRINTABLE_CACHE_SIZE = 1024
+
+#: The length of the longest value whose printable check is remembered;
+#: the cache holds on to the values, so large ones are scanned every time
+PRINTABLE_CACHE_MAX_LENGTH = 4096
+
+
+def _is_printable(value):
+    if isinstance(value, bytes):
+        return len(value.translate(None, _NON_PRINTABLE_BYTES)) == len(value)
+    return _NON_PRINTABLE_RE.search(value) is None
+
+
+_cached_is_printable = functools.lru_cache(maxsize=PRINTABLE_CACHE_SIZE)(_is_printable)
+
+
+def is_printable(value):
+    """
+    Tells whether a value (str or bytes) only holds characters of
+    string.printable. The value is scanned without a Python loop, and the
+    answer is remembered for the most recent short values.
+
+    :param value: the str or bytes to check
+    """
+    if len(value) <= PRINTABLE_CACHE_MAX_LENGTH:
+        return _cached_is_printable(value)
+    return _is_printable(value)
+
+
 def strip_non_printable(value):
     """
     Removes any non-printable characters and adds an indicator to the string
@@ -28,20 +69,21 @@ def strip_non_printable(value):
     """
     if value is None:
         return None
+    # Values of sessions with typed_values or raw_octet_strings set
+    if isinstance(value, bytes):
+        if is_printable(value):
+            return value.decode('ascii')
+        printable_value = value.translate(None, _NON_PRINTABLE_BYTES).decode('ascii')
+    elif not isinstance(value, compat.text_type):
+        return value
+    elif is_printable(value):
+        return value
+    else:
+        printable_value = _NON_PRINTABLE_RE.sub('', value)
 
-    # Filter all non-printable characters
-    # (note that we must use join to account for the fact that Python 3
-    # returns a generator)
-    printable_value = ''.join(
-        filter(lambda c: c in string.printable, value)
-    )
-
-    if printable_value != value:
-        if printable_value:
-            printable_value += ' '
-        printable_value += '(contains binary)'
-
-    return printable_value
+    if printable_value:
+        printable_value += ' '
+    return printable_value + '(contains binary)'
 
 
 def tostr(value):
@@ -70,14 +112,66 @@ def normalize_oid(oid, oid_index=None):
     :param oid: the OID to normalize
     :param oid_index: the OID index to normalize
     """
-    # This regular expression is used to extract the index from an OID
-
     # Determine the OID index from the OID if not specified
     if oid_index is None and oid is not None:
-        # We attempt to extract the index from an OID (e.g. sysDescr.0
-        # or .iso.org.dod.internet.mgmt.mib-2.system.sysContact.0)
-        match = OID_INDEX_RE.match(oid)
-        if match:
-            oid, oid_index = match.group(1, 2)
+        # Numeric OIDs have no separate index, and are usually unique
+        # (e.g. the cursors of a walk) so they would only flood the cache
+        if oid[-1:] != '.' and oid.replace('.', '').isdigit():
+            return oid, ''
+        return split_oid(oid)
 
     return oid, oid_index
+
+
+def _split_oid(oid):
+    """
+    Extracts the index from an OID (e.g. sysDescr.0 or
+    .iso.org.dod.internet.mgmt.mib-2.system.sysContact.0).
+
+    :param oid: the OID to split
+    :return: a tuple of the OID and its index, which is None when the OID
+             cannot be parsed
+    """
+    match = OID_INDEX_RE.match(oid)
+    if match:
+        return match.group(1, 2)
+    return oid, None
+
+
+#: Memoized _split_oid, see tdsnmp.utils.oid_cache
+split_oid = functools.lru_cache(maxsize=DEFAULT_OID_CACHE_SIZE)(_split_oid)
+
+
+def set_split_oid_cache_size(maxsize):
+    """
+    Replace the split_oid cache with an empty one holding up to maxsize
+    OIDs.
+    """
+    global split_oid
+    split_oid = functools.lru_cache(maxsize=maxsize)(_split_oid)
+
+
+def oid_tuple_to_str(oid_tuple):
+    """
+    Formats a numeric OID held as a tuple of integers as a dotted string
+    (e.g. (1, 3, 6, 1) becomes '.1.3.6.1').
+
+    :param oid_tuple: the OID sub-identifiers
+    """
+    return '.' + '.'.join(str(subid) for subid in oid_tuple)
+
+
+def oid_str_to_tuple(oid):
+    """
+    Parses a numeric OID given as a dotted string (e.g. '.1.3.6.1' or
+    '1.3.6.1') into a tuple of integers; tuples and lists of integers are
+    returned as tuples. Names are not resolved through the MIB.
+
+    :param oid: the OID to parse
+    """
+    if isinstance(oid, (tuple, list)):
+        return tuple(int(subid) for subid in oid)
+    try:
+        return tuple(int(subid) for subid in oid.strip('.').split('.'))
+    except ValueError:
+        raise ValueError('not a numeric OID: {0!r}'.format(oid))
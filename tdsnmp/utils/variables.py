@@ -1,3 +1,5 @@
+from collections import namedtuple
+
 from tdsnmp.utils import compat, snmp_strings
 
 
@@ -16,6 +18,11 @@ class SNMPVariable:
                       NOSUCHOBJECT and NOSUCHINSTANCE respectively
     """
 
+    # Responses can hold hundreds of thousands of variables, so they are
+    # kept compact; the C interface allocates instances itself and fills
+    # the slots directly, bypassing __init__ and __setattr__.
+    __slots__ = ('oid', 'oid_index', 'value', 'snmp_type')
+
     def __init__(self, oid=None, oid_index=None, value=None, snmp_type=None):
         self.oid, self.oid_index = snmp_strings.normalize_oid(oid, oid_index)
         self.value = value
@@ -41,7 +48,14 @@ class SNMPVariable:
         )
 
     def __setattr__(self, name, value):
-        self.__dict__[name] = snmp_strings.tostr(value)
+        object.__setattr__(self, name, snmp_strings.tostr(value))
+
+
+#: A variable returned by the numeric requests of a session, which bypass
+#: the MIB: oid is a tuple of integers, snmp_type and value are strings as
+#: in SNMPVariable, values being formatted without MIB hints (or typed, as
+#: with the typed_values option of the session).
+NumericVariable = namedtuple('NumericVariable', ['oid', 'snmp_type', 'value'])
 
 
 class SNMPVariableList(list):
@@ -0,0 +1,36 @@
+from tdsnmp import enums
+from tdsnmp.utils.variables import SNMPVariableList
+
+# Variable types which end the walk of a subtree
+END_OF_WALK_TYPES = (
+    enums.END_OF_MIB_VIEW, enums.NO_SUCH_OBJECT, enums.NO_SUCH_INSTANCE
+)
+
+
+def advance_walk(root, cursor, varbinds, names):
+    """
+    Takes the response to a GETNEXT or GETBULK sent from cursor while walking
+    the subtree below root and keeps the variables that belong to the walk.
+
+    The walk is finished when the response leaves the subtree, reaches the
+    end of the MIB view or when the agent fails to move the walk forward.
+
+    :param root: the numeric OID (tuple of integers) being walked
+    :param cursor: the numeric OID the request was sent from
+    :param varbinds: the SNMPVariable objects of the response
+    :param names: the numeric OIDs of varbinds
+    :return: a tuple of the variables belonging to the walk and the cursor
+             for the next request, which is None when the walk is finished
+    """
+    results = SNMPVariableList()
+    if not varbinds:
+        return results, None
+
+    for varbind, name in zip(varbinds, names):
+        if (name[:len(root)] != root or name <= cursor or
+                varbind.snmp_type in END_OF_WALK_TYPES):
+            return results, None
+        results.append(varbind)
+        cursor = name
+
+    return results, cursor
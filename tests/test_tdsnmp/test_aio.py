@@ -0,0 +1,92 @@
+"""
+test_aio
+----------------------------------
+
+Tests for `tdsnmp.session.aio` module.
+"""
+import asyncio
+import pytest
+
+pytest.importorskip('tdsnmp.c.interface')
+
+from tdsnmp import exceptions  # noqa: E402
+from tdsnmp.session.aio import AsyncSession  # noqa: E402
+
+from .fixtures import sess_v1_args, sess_v2_args, sess_v3_args  # noqa: E402,F401
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def test_aio_get(sess_v2_args):
+    sess = AsyncSession(**sess_v2_args)
+    res = run(sess.get('sysUpTime.0', 'sysContact.0', 'sysLocation.0'))
+
+    assert len(res) == 3
+    assert res[0].oid == 'sysUpTimeInstance'
+    assert res[1].oid == 'sysContact'
+    assert res[1].oid_index == '0'
+    assert res[2].value == 'my original location'
+
+
+def test_aio_get_concurrent(sess_v2_args):
+    async def gather():
+        async with AsyncSession(**sess_v2_args) as sess:
+            return await asyncio.gather(
+                *[sess.get('sysContact.0') for _ in range(20)]
+            )
+
+    res = run(gather())
+    assert len(res) == 20
+    assert all(item.oid == 'sysContact' for item in res)
+
+
+def test_aio_get_next(sess_v3_args):
+    sess = AsyncSession(**sess_v3_args)
+    res = run(sess.get_next('sysUpTime.0'))
+
+    assert res.oid == 'sysContact'
+    assert res.oid_index == '0'
+
+
+def test_aio_get_bulk_v1(sess_v1_args):
+    sess = AsyncSession(**sess_v1_args)
+    with pytest.raises(exceptions.TDSNMPException):
+        run(sess.get_bulk('sysUpTime', 'sysORLastChange'))
+
+
+def test_aio_walk(sess_v2_args):
+    sess = AsyncSession(**sess_v2_args)
+    res = run(sess.walk(['system', 'ifNumber']))
+    blocking = sess.session.walk(['system', 'ifNumber'])
+
+    assert [(var.oid, var.oid_index) for var in res] == \
+        [(var.oid, var.oid_index) for var in blocking]
+
+
+def test_aio_walk_v1_end_of_mib_view(sess_v1_args):
+    # Nothing follows .2, so a v1 agent answers noSuchName
+    sess = AsyncSession(**sess_v1_args)
+    res = run(sess.walk(['sysContact', '.2']))
+    blocking = sess.session.walk(['sysContact', '.2'])
+
+    assert [(var.oid, var.oid_index) for var in res] == \
+        [(var.oid, var.oid_index) for var in blocking] == [('sysContact', '0')]
+
+
+def test_aio_bulkwalk(sess_v2_args):
+    sess = AsyncSession(**sess_v2_args)
+    res = run(sess.bulkwalk('system', max_repetitions=5))
+
+    assert len(res) >= 7
+    assert res[0].oid == 'sysDescr'
+
+
+def test_aio_timeout():
+    sess = AsyncSession(
+        version=2, hostname='localhost', remote_port=11162,
+        community='public', timeout=1, retries=0
+    )
+    with pytest.raises(exceptions.TDSNMPTimeoutError):
+        run(sess.get('sysContact.0'))
@@ -0,0 +1,68 @@
+"""
+test_columnar
+----------------------------------
+
+Tests for the columnar result builder.
+"""
+import struct
+import pytest
+
+from tdsnmp import exceptions
+from tdsnmp.utils import columnar
+from tdsnmp.utils.columnar import ColumnBuilder
+
+
+def fill(columns, rows):
+    """
+    Append rows the way the C interface does.
+    """
+    for label, index, code, number, value in rows:
+        columns.oids.append(columns.labels.setdefault(label, label))
+        columns.indexes.append(index)
+        columns.types.append(code)
+        columns.numbers.extend(struct.pack('=q', number))
+        columns.values.append(value)
+
+
+def test_columnar_001_validate():
+    columns = ColumnBuilder()
+    fill(columns, [('sysDescr', '0', 0x04, 0, 'Linux')])
+    columns.validate()
+
+    fill(columns, [('sysFoo', '0', columnar.NO_SUCH_OBJECT, 0, '')])
+    with pytest.raises(exceptions.TDSNMPNoSuchObjectError):
+        columns.validate()
+
+
+def test_columnar_002_unsigned():
+    numpy = pytest.importorskip('numpy')
+
+    columns = ColumnBuilder()
+    fill(columns, [
+        ('ifInOctets', '1', columnar.COUNTER, 10, None),
+        ('ifInOctets', '2', columnar.COUNTER, 20, None),
+        ('ifHCInOctets', '1', columnar.COUNTER64, -1, None),
+    ])
+    res = columns.result()
+
+    assert list(res.oid) == ['ifInOctets', 'ifInOctets', 'ifHCInOctets']
+    assert list(res.oid_index) == ['1', '2', '1']
+    assert res.snmp_type.dtype == numpy.uint8
+    assert res.value.dtype == numpy.uint64
+    assert res.value.tolist() == [10, 20, 2 ** 64 - 1]
+
+
+def test_columnar_003_mixed():
+    numpy = pytest.importorskip('numpy')
+
+    columns = ColumnBuilder()
+    fill(columns, [
+        ('ifIndex', '1', columnar.INTEGER, -5, None),
+        ('ifInOctets', '1', columnar.COUNTER, 7, None),
+    ])
+    assert columns.result().value.dtype == numpy.int64
+
+    fill(columns, [('ifDescr', '1', 0x04, 0, 'lo')])
+    res = columns.result()
+    assert res.value.dtype == object
+    assert res.value.tolist() == [-5, 7, 'lo']
@@ -0,0 +1,129 @@
+"""
+test_engine_cache
+----------------------------------
+
+Tests for the SNMPv3 engine discovery cache.
+"""
+import importlib.util
+import pytest
+
+from tdsnmp import exceptions
+from tdsnmp.session import engine_cache
+from tdsnmp.session.base import Session
+from tdsnmp.session.engine_cache import EngineCache
+from tdsnmp.session.versions.v3 import _RediscoveringInterface
+
+from .fixtures import sess_v3_args  # noqa: F401
+
+requires_interface = pytest.mark.skipif(
+    importlib.util.find_spec('tdsnmp.c.interface') is None,
+    reason='the C interface is not built'
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(engine_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_engine_cache_memory(clock):
+    cache = EngineCache(ttl=60)
+    assert cache.get('localhost:161') is None
+
+    cache.put('localhost:161', '80001F88', 3, 500)
+    clock[0] += 10
+    assert cache.get('localhost:161') == ('80001F88', 3, 510)
+
+    clock[0] += 60
+    assert cache.get('localhost:161') is None
+
+    cache.put('localhost:161', '80001F88', 3, 500)
+    cache.invalidate('localhost:161')
+    assert cache.get('localhost:161') is None
+
+
+def test_engine_cache_file(clock, tmpdir):
+    path = str(tmpdir.join('engines.json'))
+    writer = EngineCache(path=path)
+    reader = EngineCache(path=path)
+
+    writer.put('a:161', '80001F88', 1, 100)
+    assert reader.get('a:161') == ('80001F88', 1, 100)
+
+    reader.put('b:161', '80001F89', 2, 200)
+    assert writer.get('a:161') == ('80001F88', 1, 100)
+    assert writer.get('b:161') == ('80001F89', 2, 200)
+
+    writer.invalidate('a:161')
+    assert reader.get('a:161') is None
+    assert len(reader) == 1
+
+
+@requires_interface
+def test_engine_cache_session(sess_v3_args):  # noqa: F811
+    cache = EngineCache()
+
+    sess = Session(engine_cache=cache, **sess_v3_args)
+    assert not sess.engine_from_cache
+    assert len(cache) == 1
+
+    sess = Session(engine_cache=cache, **sess_v3_args)
+    assert sess.engine_from_cache
+    assert sess.get('sysContact.0').oid == 'sysContact'
+
+    sess.rediscover_engine()
+    assert not sess.engine_from_cache
+    assert sess.get('sysContact.0').oid == 'sysContact'
+
+
+class StaleEngineInterface:
+    """
+    Fails the requests of sessions opened with the cached engine.
+    """
+    SNMP_MSG_GET = 0xA0
+
+    def __init__(self):
+        self.sent = []
+
+    def request(self, session, command):
+        self.sent.append(session.session_ptr)
+        if session.session_ptr == 'cached':
+            raise exceptions.TDSNMPException('Unknown engine ID')
+        return 'response'
+
+    def numeric_oids(self, session, varlist):
+        self.sent.append(session.session_ptr)
+        raise exceptions.TDSNMPUnknownObjectIDError('unknown object id')
+
+
+class StaleEngineSession:
+    session_ptr = 'cached'
+
+    def engine_is_stale(self):
+        return self.session_ptr == 'cached'
+
+    def rediscover_engine(self):
+        self.session_ptr = 'discovered'
+
+
+def test_engine_cache_rediscovers_any_request():
+    session = StaleEngineSession()
+    fake = StaleEngineInterface()
+    interface = _RediscoveringInterface(session, fake)
+    assert interface.SNMP_MSG_GET == 0xA0
+
+    assert interface.request(session, interface.SNMP_MSG_GET) == 'response'
+    assert fake.sent == ['cached', 'discovered']
+
+    # Other failures are raised as they are
+    with pytest.raises(exceptions.TDSNMPUnknownObjectIDError):
+        interface.numeric_oids(session, [])
+    assert fake.sent == ['cached', 'discovered', 'discovered']
+
+    # So are failures of requests on other sessions
+    session.session_ptr = 'cached'
+    with pytest.raises(exceptions.TDSNMPException):
+        interface.request(StaleEngineSession(), interface.SNMP_MSG_GET)
+    assert session.session_ptr == 'cached'
@@ -0,0 +1,127 @@
+"""
+test_fleet
+----------------------------------
+
+Tests for `tdsnmp.fleet` module.
+"""
+import importlib.util
+import multiprocessing
+import struct
+import pytest
+
+from tdsnmp import fleet
+from tdsnmp.fleet import FleetCollector, SharedColumns
+from tdsnmp.poller import PollJob
+from tdsnmp.utils.columnar import ColumnBuilder
+
+from .fixtures import sess_v1_args, sess_v2_args, sess_v3_args  # noqa: F401
+
+requires_interface = pytest.mark.skipif(
+    importlib.util.find_spec('tdsnmp.c.interface') is None,
+    reason='the C interface is not built'
+)
+
+ROWS = [
+    ('ifDescr', '1', 0x04, 0, 'eth0'),
+    ('ifDescr', '2', 0x04, 0, '\xe9th1'),
+    ('ifInOctets', '1', 0x41, 7, None),
+    ('ifType', '1', 0x02, -3, None),
+    ('ifHCInOctets', '1', 0x46, -1, None),
+]
+
+
+def share_rows(rows):
+    columns = ColumnBuilder()
+    for label, index, code, number, value in rows:
+        columns.oids.append(columns.labels.setdefault(label, label))
+        columns.indexes.append(index)
+        columns.types.append(code)
+        columns.numbers.extend(struct.pack('=q', number))
+        columns.values.append(value)
+    return fleet.share(columns)
+
+
+def share_in_child(channel):
+    channel.send(share_rows(ROWS))
+
+
+def test_fleet_shared_columns():
+    with SharedColumns(share_rows(ROWS)) as columns:
+        assert len(columns) == 5
+        assert columns.types.tolist() == [0x04, 0x04, 0x41, 0x02, 0x46]
+        assert [columns.oid(row) for row in range(5)] == [
+            'ifDescr', 'ifDescr', 'ifInOctets', 'ifType', 'ifHCInOctets'
+        ]
+        assert [columns.value(row) for row in range(5)] == [
+            'eth0', '\xe9th1', 7, -3, 2 ** 64 - 1
+        ]
+
+        res = columns.variables()
+        assert [(var.oid, var.oid_index, var.snmp_type) for var in res[1:3]] == [
+            ('ifDescr', '2', 'OCTETSTR'), ('ifInOctets', '1', 'COUNTER')
+        ]
+        assert res[2].value == '7'
+
+    with SharedColumns(share_rows([])) as columns:
+        assert len(columns) == 0
+        assert columns.variables() == []
+
+
+def test_fleet_shared_columns_result():
+    pytest.importorskip('numpy')
+
+    with SharedColumns(share_rows(ROWS)) as columns:
+        res = columns.result()
+    assert list(res.oid_index) == ['1', '2', '1', '1', '1']
+    assert list(res.value) == ['eth0', '\xe9th1', 7, -3, 2 ** 64 - 1]
+
+
+def test_fleet_shared_columns_from_child():
+    context = multiprocessing.get_context('spawn')
+    parent, child = context.Pipe()
+    process = context.Process(target=share_in_child, args=(child,))
+    process.start()
+    name = parent.recv()
+    process.join()
+
+    with SharedColumns(name) as columns:
+        assert columns.oid_index(1) == '2'
+        assert columns.value(4) == 2 ** 64 - 1
+
+
+def test_fleet_shard():
+    collector = FleetCollector(processes=4)
+    shards = {collector.shard({'hostname': 'switch{0}'.format(number)})
+              for number in range(50)}
+    assert shards <= {0, 1, 2, 3}
+    assert len(shards) > 1
+    assert (collector.shard({'hostname': 'switch1', 'community': 'a'}) ==
+            collector.shard({'hostname': 'switch1', 'community': 'b'}))
+
+    with pytest.raises(ValueError):
+        FleetCollector(processes=0)
+
+
+@requires_interface
+def test_fleet_collect(sess_v1_args, sess_v2_args, sess_v3_args):
+    jobs = [
+        PollJob(sess_v1_args, 'get', ['sysContact.0', 'sysLocation.0']),
+        PollJob(sess_v2_args, 'walk', 'system'),
+        PollJob(sess_v3_args, 'bulkwalk', 'system'),
+        PollJob(sess_v1_args, 'get_bulk', 'system'),
+    ]
+    with FleetCollector(processes=2) as collector:
+        for _ in range(2):
+            res = collector.collect(jobs)
+            assert [result.index for result in res] == [0, 1, 2, 3]
+            assert all(result.error is None for result in res[:3])
+            assert res[3].columns is None
+            assert res[3].error is not None
+
+            assert [res[0].columns.oid(row) for row in range(2)] == [
+                'sysContact', 'sysLocation'
+            ]
+            assert len(res[1].columns) == len(res[2].columns) > 2
+            assert res[1].columns.variables()[0].oid == 'sysDescr'
+            for result in res[:3]:
+                result.columns.close()
@@ -0,0 +1,70 @@
+"""
+test_mib_index
+----------------------------------
+
+Tests for the memory-mapped MIB index.
+"""
+import pytest
+
+from tdsnmp import exceptions
+from tdsnmp.mib_index import MIBIndex, build, index_key
+
+NODES = [
+    ((1,), 'iso', None, False, []),
+    ((1, 3), 'org', None, False, []),
+    ((1, 3, 6), 'dod', None, False, []),
+    ((1, 3, 6, 1), 'internet', None, False, []),
+    ((1, 3, 6, 1, 2), 'mgmt', None, False, []),
+    ((1, 3, 6, 1, 2, 1), 'mib-2', None, False, []),
+    ((1, 3, 6, 1, 2, 1, 1), 'system', None, False, []),
+    ((1, 3, 6, 1, 2, 1, 1, 1), 'sysDescr', 'OCTETSTR', True, []),
+    ((1, 3, 6, 1, 2, 1, 2, 2, 1, 8), 'ifOperStatus', 'INTEGER', True,
+     [(1, 'up'), (2, 'down')]),
+]
+
+
+@pytest.fixture
+def index(tmpdir):
+    path = str(tmpdir.join('mibs.idx'))
+    build(path, b'k' * 32, reversed(NODES))
+    index = MIBIndex(path)
+    yield index
+    index.close()
+
+
+def test_mib_index_resolve(index):
+    assert len(index) == len(NODES)
+    assert index.key == b'k' * 32
+    assert index.resolve('sysDescr.0') == (1, 3, 6, 1, 2, 1, 1, 1, 0)
+    assert index.resolve('SNMPv2-MIB::sysDescr', '0') == (1, 3, 6, 1, 2, 1, 1, 1, 0)
+    assert index.resolve('.iso.org.dod.internet.mgmt.mib-2.system') == (1, 3, 6, 1, 2, 1, 1)
+    assert index.resolve('.1.3.6.1', '2') == (1, 3, 6, 1, 2)
+    with pytest.raises(exceptions.TDSNMPUnknownObjectIDError):
+        index.resolve('ifDescr.1')
+
+
+def test_mib_index_describe(index):
+    name, oid_index, node = index.describe((1, 3, 6, 1, 2, 1, 2, 2, 1, 8, 3))
+    assert (name, oid_index) == ('ifOperStatus', '3')
+    assert index.snmp_type(node) == 'INTEGER'
+    assert index.enums(node) == {1: 'up', 2: 'down'}
+
+    assert index.describe((1, 3, 6, 1, 2, 1, 1, 1, 0), use_long_names=True)[:2] == (
+        '.iso.org.dod.internet.mgmt.mib-2.system.sysDescr', '0'
+    )
+    assert index.describe((1, 3, 6, 1, 2, 1, 1, 1, 0), use_numeric=True)[:2] == (
+        '.1.3.6.1.2.1.1.1', '0'
+    )
+    # Below a node which is not a leaf, the index is unknown
+    assert index.describe((1, 3, 6, 1, 2, 1, 9, 1))[:2] == ('mib-2.9.1', '')
+    assert index.describe((2, 1))[:2] == ('.2', '1')
+
+
+def test_mib_index_key(tmpdir):
+    tmpdir.join('IF-MIB.txt').write('IF-MIB DEFINITIONS ::= BEGIN')
+    key = index_key(None, str(tmpdir))
+    assert index_key(None, str(tmpdir)) == key
+    assert index_key('IF-MIB', str(tmpdir)) != key
+
+    tmpdir.join('SNMPv2-MIB.txt').write('SNMPv2-MIB DEFINITIONS ::= BEGIN')
+    assert index_key(None, str(tmpdir)) != key
@@ -0,0 +1,44 @@
+"""
+test_pdu_limits
+----------------------------------
+
+Tests for splitting long lists of OIDs into requests.
+"""
+from tdsnmp.session import pdu_limits
+from tdsnmp.session.pdu_limits import PduLimit
+
+
+def test_pdu_limits_too_big():
+    limit = PduLimit(initial=64, minimum=2)
+
+    assert limit.too_big(100)
+    assert limit.value == 50
+    # A smaller request than the limit was too big
+    assert limit.too_big(30)
+    assert limit.value == 15
+    # Pieces of requests sent before the limit dropped keep it
+    assert limit.too_big(40)
+    assert limit.value == 15
+
+    assert limit.too_big(3)
+    assert limit.value == 2
+    assert not limit.too_big(2)
+
+
+def test_pdu_limits_chunks():
+    assert pdu_limits.chunks(list(range(7)), 3) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert pdu_limits.chunks([], 3) == []
+
+
+def test_pdu_limits_per_agent():
+    pdu_limits.forget()
+    limit = pdu_limits.for_agent('switch1:161')
+    assert limit.value == pdu_limits.DEFAULT_LIMIT
+    assert pdu_limits.for_agent('switch1:161') is limit
+
+    limit.too_big(10)
+    assert pdu_limits.for_agent('switch2:161').value == pdu_limits.DEFAULT_LIMIT
+
+    pdu_limits.forget('switch1:161')
+    assert pdu_limits.for_agent('switch1:161').value == pdu_limits.DEFAULT_LIMIT
+    pdu_limits.forget()
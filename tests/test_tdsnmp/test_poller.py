@@ -0,0 +1,182 @@
+"""
+test_poller
+----------------------------------
+
+Tests for `tdsnmp.poller` module.
+"""
+import importlib.util
+import pytest
+
+from tdsnmp import exceptions
+from tdsnmp.poller import Poller, PollJob, _JobState, poll
+from tdsnmp.session.base import BaseSession
+from tdsnmp.utils.variables import SNMPVariable
+
+from .fixtures import sess_v1_args, sess_v2_args, sess_v3_args  # noqa: F401
+
+requires_interface = pytest.mark.skipif(
+    importlib.util.find_spec('tdsnmp.c.interface') is None,
+    reason='the C interface is not built'
+)
+
+
+def test_poller_unknown_operation():
+    res = poll([({}, 'delete', 'sysDescr.0')])
+
+    assert len(res) == 1
+    assert res[0].index == 0
+    assert res[0].varbinds is None
+    assert isinstance(res[0].error, ValueError)
+
+
+def test_poller_invalid_concurrency():
+    with pytest.raises(ValueError):
+        Poller([], concurrency=0)
+
+
+@requires_interface
+def test_poller_get(sess_v1_args, sess_v2_args, sess_v3_args):
+    jobs = [
+        PollJob(sess_v1_args, 'get', ['sysContact.0', 'sysLocation.0']),
+        PollJob(sess_v2_args, 'get_next', 'sysUpTime.0'),
+        PollJob(sess_v3_args, 'get_bulk', ['sysUpTime', 'sysORLastChange']),
+    ]
+    res = poll(jobs)
+
+    assert [result.index for result in res] == [0, 1, 2]
+    assert all(result.error is None for result in res)
+    assert res[0].varbinds[0].oid == 'sysContact'
+    assert res[0].varbinds[1].oid == 'sysLocation'
+    assert res[1].varbinds[0].oid == 'sysContact'
+    assert res[2].varbinds[0].oid == 'sysUpTimeInstance'
+
+
+@requires_interface
+def test_poller_walk_matches_session(sess_v2_args):
+    from tdsnmp.session.base import Session
+
+    expected = Session(**sess_v2_args).walk('system')
+    jobs = [(sess_v2_args, 'walk', 'system'), (sess_v2_args, 'bulkwalk', 'system')] * 10
+
+    results = list(Poller(jobs, concurrency=4, max_repetitions=5))
+    assert sorted(result.index for result in results) == list(range(20))
+    for result in results:
+        assert result.error is None
+        assert [(var.oid, var.oid_index) for var in result.varbinds] == \
+            [(var.oid, var.oid_index) for var in expected]
+
+
+@requires_interface
+def test_poller_bulk_v1(sess_v1_args):
+    res = poll([(sess_v1_args, 'bulkwalk', 'system')])
+
+    assert isinstance(res[0].error, exceptions.TDSNMPException)
+
+
+@requires_interface
+def test_poller_timeout():
+    session_kwargs = {
+        'version': 2, 'hostname': 'localhost', 'remote_port': 11162,
+        'community': 'public', 'timeout': 1, 'retries': 0
+    }
+    res = poll([(session_kwargs, 'get', 'sysContact.0')] * 3)
+
+    assert all(
+        isinstance(result.error, exceptions.TDSNMPTimeoutError)
+        for result in res
+    )
+
+
+class FakeInterface:
+    STAT_SUCCESS = 0
+    STAT_ERROR = 1
+    STAT_TIMEOUT = 2
+    SNMP_ERR_NOSUCHNAME = 2
+    SNMP_MSG_GETNEXT = 0xA1
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.sent = []
+
+    def async_send(self, session, command, non_repeaters, max_repetitions, varlist):
+        self.sent.append(varlist[0].oid)
+        return len(self.sent)
+
+    def async_poll(self, session, readable):
+        responses, self.responses = self.responses, []
+        return responses
+
+
+class FakeSession:
+    response_error = BaseSession.response_error
+    engine_is_stale = BaseSession.engine_is_stale
+
+    def __init__(self, version, interface):
+        self.version = version
+        self.abort_on_nonexistent = False
+        self.interface = interface
+
+    def get_interface(self):
+        return self.interface
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_poller_walk_v1_end_of_mib_view(version):
+    sys_descr = (1, 3, 6, 1, 2, 1, 1, 1)
+    no_such_name = (FakeInterface.STAT_SUCCESS, FakeInterface.SNMP_ERR_NOSUCHNAME,
+                    1, 'noSuchName', [], [])
+    interface = FakeInterface([
+        (1, 0, 0, 0, '', [SNMPVariable('sysDescr', '0', 'Linux', 'OCTETSTR')],
+         [sys_descr + (0,)]),
+        (2,) + no_such_name,
+        (3,) + no_such_name,
+    ])
+    state = _JobState(0, PollJob({}, 'walk', ['sysDescr', 'sysObjectID']),
+                      FakeSession(version, interface))
+    state.results = []
+    state.roots = [(1, 3, 6, 1, 2, 1, 1, 2)]
+    state.root = state.cursor = sys_descr
+
+    result = Poller([])._process(state, True)
+
+    if version == 1:
+        # Each root ends at the noSuchName instead of failing the job
+        assert result.error is None
+        assert [var.value for var in result.varbinds] == ['Linux']
+        assert interface.sent == ['.1.3.6.1.2.1.1.1.0', '.1.3.6.1.2.1.1.2']
+    else:
+        assert isinstance(result.error, exceptions.TDSNMPNoSuchNameError)
+
+
+class StaleEngineSession(FakeSession):
+
+    def __init__(self, interface):
+        super().__init__(3, interface)
+        self.rediscovered = 0
+
+    def engine_is_stale(self):
+        return not self.rediscovered
+
+    def rediscover_engine(self):
+        self.rediscovered += 1
+
+
+def test_poller_rediscovers_stale_engine():
+    report = (1, FakeInterface.STAT_ERROR, 0, -1, 'Unknown engine ID', [], [])
+    interface = FakeInterface([report])
+    session = StaleEngineSession(interface)
+    state = _JobState(0, PollJob({}, 'get_next', 'sysDescr'), session)
+    state.request = (FakeInterface.SNMP_MSG_GETNEXT, [SNMPVariable('sysDescr')])
+
+    # The request is sent again on the session opened anew
+    assert Poller([])._process(state, True) is None
+    assert session.rediscovered == 1
+    assert state.reopened
+    assert interface.sent == ['sysDescr']
+
+    interface.responses = [
+        (2, 0, 0, 0, '', [SNMPVariable('sysDescr', '0', 'Linux', 'OCTETSTR')], [])
+    ]
+    result = Poller([])._process(state, True)
+    assert result.error is None
+    assert [var.value for var in result.varbinds] == ['Linux']
@@ -0,0 +1,89 @@
+"""
+test_pool
+----------------------------------
+
+Tests for the session pool.
+"""
+import importlib.util
+import pytest
+
+from tdsnmp import exceptions, pool
+from tdsnmp.pool import SessionPool
+from tdsnmp.simple import snmp_get
+
+from .fixtures import sess_v2_args  # noqa: F401
+
+requires_interface = pytest.mark.skipif(
+    importlib.util.find_spec('tdsnmp.c.interface') is None,
+    reason='the C interface is not built'
+)
+
+
+class FakeSession:
+    def __init__(self, pool, **session_kwargs):
+        self._pool = pool
+        self._pool_key, _ = pool._split(session_kwargs)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_reuse_and_options():
+    sessions = SessionPool()
+    fake = FakeSession(sessions, hostname='a')
+    sessions.release(fake)
+
+    res = sessions.acquire(hostname='a', use_numeric=True)
+    assert res is fake
+    assert res.use_numeric is True
+    assert res.use_enums is False
+    assert len(sessions) == 0
+
+
+def test_pool_lru_eviction():
+    sessions = SessionPool(max_size=2)
+    fakes = [FakeSession(sessions, hostname=name) for name in 'abc']
+    for fake in fakes:
+        sessions.release(fake)
+
+    assert len(sessions) == 2
+    assert [fake.closed for fake in fakes] == [True, False, False]
+    assert sessions.acquire(hostname='c') is fakes[2]
+
+    sessions.close()
+    assert fakes[1].closed
+
+
+def test_pool_idle_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(pool.time, 'monotonic', lambda: now[0])
+
+    sessions = SessionPool(idle_timeout=10)
+    old, new = FakeSession(sessions, hostname='a'), FakeSession(sessions, hostname='b')
+    sessions.release(old)
+    now[0] += 5
+    sessions.release(new)
+    now[0] += 6
+
+    assert sessions.acquire(hostname='b') is new
+    assert old.closed
+    assert len(sessions) == 0
+
+
+@requires_interface
+def test_pool_simple_helpers(sess_v2_args):  # noqa: F811
+    sessions = SessionPool()
+    previous = pool.set_default_pool(sessions)
+    try:
+        assert snmp_get('sysContact.0', **sess_v2_args).oid == 'sysContact'
+        assert len(sessions) == 1
+        assert snmp_get('sysContact.0', **sess_v2_args).oid == 'sysContact'
+        assert len(sessions) == 1
+    finally:
+        pool.set_default_pool(previous)
+
+    session = sessions.acquire(**sess_v2_args)
+    session.close()
+    with pytest.raises(exceptions.TDSNMPException):
+        session.get('sysContact.0')
@@ -0,0 +1,92 @@
+"""
+test_rates
+----------------------------------
+
+Tests for turning counters into rates.
+"""
+import math
+import struct
+import pytest
+
+from tdsnmp.utils import columnar
+from tdsnmp.utils.columnar import ColumnBuilder
+
+numpy = pytest.importorskip('numpy')
+
+from tdsnmp.rates import RatePoller  # noqa: E402
+
+
+def sample(rows):
+    columns = ColumnBuilder()
+    for label, index, code, number in rows:
+        columns.oids.append(columns.labels.setdefault(label, label))
+        columns.indexes.append(index)
+        columns.types.append(code)
+        columns.numbers.extend(struct.pack('=Q', number))
+        columns.values.append(None)
+    return columns.result()
+
+
+def rates(result):
+    return [None if math.isnan(rate) else rate for rate in result.rate]
+
+
+def test_rates_001_deltas_and_wraps():
+    poller = RatePoller(['ifInOctets', 'ifHCInOctets'])
+    first = poller.update('switch1', 1000, sample([
+        ('ifInOctets', '1', columnar.COUNTER, 1000),
+        ('ifInOctets', '2', columnar.COUNTER, 2 ** 32 - 500),
+        ('ifHCInOctets', '1', columnar.COUNTER64, 2 ** 40),
+        ('ifHCInOctets', '2', columnar.COUNTER64, 5000),
+    ]))
+    assert rates(first) == [None] * 4
+    assert first.interval is None and not first.reset
+
+    second = poller.update('switch1', 2000, sample([
+        ('ifInOctets', '1', columnar.COUNTER, 3000),
+        ('ifInOctets', '2', columnar.COUNTER, 500),
+        ('ifHCInOctets', '1', columnar.COUNTER64, 2 ** 40 + 10000),
+        # Went backwards: the counter was reset
+        ('ifHCInOctets', '2', columnar.COUNTER64, 100),
+    ]))
+    assert second.interval == 10.0
+    assert rates(second) == [200.0, 100.0, 1000.0, None]
+    assert list(second.oid_index) == ['1', '2', '1', '2']
+
+
+def test_rates_002_rows_change():
+    poller = RatePoller(['ifInOctets'])
+    poller.update('switch1', 0, sample([
+        ('ifInOctets', '1', columnar.COUNTER, 100),
+        ('ifInOctets', '3', columnar.COUNTER, 300),
+    ]))
+    result = poller.update('switch1', 100, sample([
+        ('ifInOctets', '2', columnar.COUNTER, 200),
+        ('ifInOctets', '3', columnar.COUNTER, 330),
+        ('ifInOctets', '4', columnar.GAUGE, 400),
+    ]))
+    assert rates(result) == [None, 30.0, None]
+
+    # Samples are kept per agent
+    other = poller.update('switch2', 100, sample([
+        ('ifInOctets', '3', columnar.COUNTER, 330),
+    ]))
+    assert rates(other) == [None]
+
+
+def test_rates_003_restart():
+    poller = RatePoller(['ifInOctets'])
+    poller.update('switch1', 5000, sample([('ifInOctets', '1', columnar.COUNTER, 100)]))
+    result = poller.update('switch1', 200, sample([('ifInOctets', '1', columnar.COUNTER, 200)]))
+    assert result.reset
+    assert rates(result) == [None]
+
+    # sysUpTime did not move: the clock of the poller is used
+    poller.update('switch1', 200, sample([('ifInOctets', '1', columnar.COUNTER, 250)]), taken=1.0)
+    result = poller.update('switch1', 200, sample([('ifInOctets', '1', columnar.COUNTER, 350)]),
+                           taken=3.0)
+    assert rates(result) == [50.0]
+
+    poller.forget('switch1')
+    result = poller.update('switch1', 300, sample([('ifInOctets', '1', columnar.COUNTER, 400)]))
+    assert rates(result) == [None]
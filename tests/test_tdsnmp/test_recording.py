@@ -0,0 +1,46 @@
+"""
+test_recording
+----------------------------------
+
+Tests for recording and replaying PDU exchanges.
+"""
+import pytest
+
+from tdsnmp.recording import Recording
+
+
+def test_recording_replays_responses_in_order():
+    recording = Recording()
+    recording.record(b'request', b'first')
+    recording.record(b'other', b'other response')
+    recording.record(b'request', b'second')
+
+    assert len(recording) == 3
+    assert recording.response(b'request') == b'first'
+    assert recording.response(b'request') == b'second'
+    # The last response is repeated
+    assert recording.response(b'request') == b'second'
+    assert recording.response(b'unknown') is None
+
+    recording.rewind()
+    assert recording.response(b'request') == b'first'
+
+
+def test_recording_save_load(tmpdir):
+    path = str(tmpdir.join('walk.rec'))
+    recording = Recording()
+    recording.record(b'\x00' * 20, b'\x01' * 300)
+    recording.record(b'request', b'')
+    recording.save(path)
+
+    loaded = Recording.load(path)
+    assert len(loaded) == 2
+    assert loaded.response(b'\x00' * 20) == b'\x01' * 300
+    assert loaded.response(b'request') == b''
+
+
+def test_recording_load_invalid(tmpdir):
+    path = tmpdir.join('invalid.rec')
+    path.write_binary(b'not a recording')
+    with pytest.raises(ValueError):
+        Recording.load(str(path))
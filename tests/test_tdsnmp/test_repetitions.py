@@ -0,0 +1,107 @@
+"""
+test_repetitions
+----------------------------------
+
+Tests for the adaptive max-repetitions of GETBULK requests.
+"""
+import pytest
+
+from tdsnmp import exceptions
+from tdsnmp.session import repetitions
+from tdsnmp.session.base import BaseSession
+from tdsnmp.session.repetitions import AdaptiveRepetitions
+from tdsnmp.utils.variables import SNMPVariable
+
+
+def test_repetitions_grow_while_fast():
+    tuner = AdaptiveRepetitions(initial=10, maximum=64, target_latency=0.1)
+    for _ in range(5):
+        tuner.success(tuner.value, tuner.value, 0.01)
+    assert tuner.value == 64
+
+    # Slow but steady responses keep the value
+    tuner = AdaptiveRepetitions(initial=10, target_latency=0.1)
+    tuner.success(10, 10, 0.2)
+    tuner.success(10, 10, 0.2)
+    assert tuner.value == 10
+
+
+def test_repetitions_back_off():
+    tuner = AdaptiveRepetitions(initial=40, minimum=5)
+
+    # The agent truncated the response to fit its message size
+    tuner.success(40, 30, 0.01)
+    assert tuner.value == 30
+
+    # Latency spike
+    tuner.success(30, 30, 1.0)
+    assert tuner.value == 15
+
+    assert tuner.failure(15)
+    assert tuner.value == 7
+    assert tuner.failure(7)
+    assert tuner.value == 5
+    assert not tuner.failure(5)
+
+
+def test_repetitions_per_agent():
+    repetitions.forget()
+    tuner = repetitions.for_agent('localhost:161')
+    assert repetitions.for_agent('localhost:161') is tuner
+    assert repetitions.for_agent('localhost:162') is not tuner
+
+    repetitions.forget('localhost:161')
+    assert repetitions.for_agent('localhost:161') is not tuner
+    repetitions.forget()
+
+
+class TimeoutInterface:
+    """
+    Fails every request with a timeout, leaving error_index in the session.
+    """
+    SNMP_MSG_GETBULK = 0xA5
+    SNMP_ERR_TOOBIG = 1
+    SNMPERR_TIMEOUT = -24
+
+    def __init__(self, error_index):
+        self.error_index = error_index
+        self.sent = []
+
+    def request(self, session, command, non_repeaters, max_repetitions, varlist):
+        self.sent.append(max_repetitions)
+        session.error_index = self.error_index
+        raise exceptions.TDSNMPTimeoutError('timed out')
+
+
+class FakeSession:
+    _bulk_request = BaseSession._bulk_request
+    connect_hostname = 'localhost:161'
+    error_number = 0
+    error_index = 0
+
+    def __init__(self, interface):
+        self.interface = interface
+
+    def get_interface(self):
+        return self.interface
+
+
+@pytest.mark.parametrize('error_index, answered, sent', [
+    # The agent never answered: it is down or rejects the credentials
+    (TimeoutInterface.SNMPERR_TIMEOUT, False, [16]),
+    (TimeoutInterface.SNMPERR_TIMEOUT, True, [16, 8, 4, 2, 1]),
+    # Other errors reported as timeouts
+    (-1, True, [16]),
+])
+def test_repetitions_back_off_on_timeouts(error_index, answered, sent):
+    repetitions.forget()
+    tuner = repetitions.for_agent('localhost:161')
+    tuner.value = 16
+    if answered:
+        tuner.latency = 0.01
+    interface = TimeoutInterface(error_index)
+
+    with pytest.raises(exceptions.TDSNMPTimeoutError):
+        FakeSession(interface)._bulk_request(0, repetitions.AUTO, [SNMPVariable('ifDescr')])
+    assert interface.sent == sent
+    repetitions.forget()
@@ -0,0 +1,180 @@
+"""
+test_result_cache
+----------------------------------
+
+Tests for the cache of get and get_next results.
+"""
+import pytest
+
+from tdsnmp import exceptions
+from tdsnmp.session.result_cache import ResultCache, oid_key
+from tdsnmp.utils.variables import SNMPVariable, SNMPVariableList
+
+SYSTEM = {'sysDescr': 1, 'sysUpTime': 3, 'sysContact': 4, 'sysName': 5}
+
+
+class FakeInterface:
+    """
+    Translates the OIDs of the system group.
+    """
+
+    @staticmethod
+    def numeric_oids(session, interface_vars):
+        oids = []
+        for var in interface_vars:
+            name, _, index = oid_key(var).partition('.')
+            if not name:
+                oids.append(tuple(int(part) for part in index.split('.')))
+            elif name in SYSTEM:
+                oids.append((1, 3, 6, 1, 2, 1, 1, SYSTEM[name], int(index)))
+            else:
+                raise exceptions.TDSNMPUnknownObjectIDError(name)
+        return oids
+
+
+class FakeSession:
+    version = 2
+    community = 'public'
+    connect_hostname = 'switch1'
+
+    @staticmethod
+    def get_interface():
+        return FakeInterface
+
+
+class Agent:
+    """
+    Answers requests with the name of each OID as its value.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, interface_vars):
+        self.requests.append([var.oid for var in interface_vars])
+        return [SNMPVariable(var.oid, var.oid_index, var.oid.upper(), 'OCTETSTR')
+                for var in interface_vars]
+
+
+def request(*oids):
+    return SNMPVariableList(SNMPVariable(oid) for oid in oids)
+
+
+def test_result_cache_001_merges_hits_and_misses():
+    cache = ResultCache(ttl=60)
+    agent = Agent()
+    session = FakeSession()
+
+    res = cache.fetch(session, 'get', request('sysName.0'), agent)
+    assert [var.value for var in res] == ['SYSNAME']
+
+    res = cache.fetch(session, 'get', request('sysDescr.0', 'sysName.0', 'sysContact.0'), agent)
+    assert [var.value for var in res] == ['SYSDESCR', 'SYSNAME', 'SYSCONTACT']
+    # Only the misses were sent
+    assert agent.requests == [['sysName'], ['sysDescr', 'sysContact']]
+
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 3, 3)
+
+    # Entries are kept per operation and per agent
+    cache.fetch(session, 'get_next', request('sysName.0'), agent)
+    other = FakeSession()
+    other.connect_hostname = 'switch2'
+    cache.fetch(other, 'get', request('sysName.0'), agent)
+    assert len(agent.requests) == 4
+
+
+def test_result_cache_002_ttls(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('tdsnmp.session.result_cache.time.monotonic', lambda: now[0])
+
+    cache = ResultCache(ttl=10, ttls={'sysDescr': 3600, 'sysUpTime': 0})
+    assert cache.ttl_for('sysDescr.0') == 3600
+    assert cache.ttl_for('sysDescription.0') == 10
+
+    agent = Agent()
+    session = FakeSession()
+    oids = ('sysDescr.0', 'sysName.0', 'sysUpTime.0')
+    cache.fetch(session, 'get', request(*oids), agent)
+    cache.fetch(session, 'get', request(*oids), agent)
+    assert agent.requests[1] == ['sysUpTime']
+
+    now[0] += 60
+    cache.fetch(session, 'get', request(*oids), agent)
+    assert agent.requests[2] == ['sysName', 'sysUpTime']
+
+
+def test_result_cache_003_lru_and_invalidate():
+    cache = ResultCache(maxsize=2)
+    agent = Agent()
+    session = FakeSession()
+
+    cache.fetch(session, 'get', request('sysDescr.0'), agent)
+    cache.fetch(session, 'get', request('sysName.0'), agent)
+    cache.fetch(session, 'get', request('sysDescr.0'), agent)
+    cache.fetch(session, 'get', request('sysContact.0'), agent)
+    assert len(cache) == 2
+
+    # sysName.0 was the least recently used
+    cache.fetch(session, 'get', request('sysDescr.0', 'sysName.0'), agent)
+    assert agent.requests[-1] == ['sysName']
+
+    cache.invalidate(session, request('sysName.0'))
+    cache.fetch(session, 'get', request('sysName.0'), agent)
+    assert agent.requests[-1] == ['sysName']
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.cache_info().hits == 0
+
+    with pytest.raises(ValueError):
+        ResultCache(maxsize=-1)
+
+
+def test_result_cache_004_copies():
+    cache = ResultCache()
+    session = FakeSession()
+    first = cache.fetch(session, 'get', request('sysName.0'), Agent())[0]
+    first.value = 'changed'
+
+    cached = cache.fetch(session, 'get', request('sysName.0'), Agent())[0]
+    assert cached.value == 'SYSNAME'
+    assert cached is not first
+
+
+def test_result_cache_005_numeric_oids():
+    cache = ResultCache()
+    agent = Agent()
+    session = FakeSession()
+
+    cache.fetch(session, 'get', request('sysContact.0'), agent)
+    cache.fetch(session, 'get', request('.1.3.6.1.2.1.1.4.0'), agent)
+    assert len(agent.requests) == 1
+
+    # However the OID is written, a set drops the entry
+    cache.invalidate(session, request('.1.3.6.1.2.1.1.4.0'))
+    cache.fetch(session, 'get', request('sysContact.0'), agent)
+    assert len(agent.requests) == 2
+
+    # OIDs the MIB does not know are kept as written
+    cache.fetch(session, 'get', request('sysFoo.0', 'sysName.0'), agent)
+    cache.fetch(session, 'get', request('sysFoo.0'), agent)
+    assert agent.requests[-1] == ['sysFoo', 'sysName']
+    cache.invalidate(session, request('sysFoo.0'))
+    assert len(cache) == 2
+
+
+def test_result_cache_006_missing_objects():
+    cache = ResultCache()
+    session = FakeSession()
+    requests = []
+
+    def agent(interface_vars):
+        requests.append(interface_vars)
+        return [SNMPVariable(var.oid, var.oid_index, 'NOSUCHINSTANCE',
+                             'NOSUCHINSTANCE') for var in interface_vars]
+
+    cache.fetch(session, 'get', request('sysName.0'), agent)
+    cache.fetch(session, 'get', request('sysName.0'), agent)
+    assert len(requests) == 2
+    assert len(cache) == 0
@@ -8,11 +8,18 @@ test_tdsnmp
 Tests for `tdsnmp` module.
 """
 import re
+import logging
 import platform
+import time
 import pytest
 
-from tdsnmp import exceptions
+from tdsnmp import exceptions, mib_index, mibs, stats
+from tdsnmp.recording import Recording
+from tdsnmp.session import pdu_limits
+from tdsnmp.session.result_cache import ResultCache
 from tdsnmp.session.base import Session
+from tdsnmp.utils import oid_cache
+from tdsnmp.utils.snmp_strings import oid_str_to_tuple
 
 from .fixtures import sess_v1, sess_v2, sess_v3
 from .helpers import snmp_set_via_cli
@@ -383,6 +390,424 @@ def test_session_021_walk_all(sess):
         assert res[5].value == 'my original location'
         assert res[5].snmp_type == 'OCTETSTR'
 
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_022_iter_walk(sess):
+    res = sess.iter_walk('system')
+
+    assert not isinstance(res, list)
+    assert [(var.oid, var.oid_index, var.value) for var in res] == \
+        [(var.oid, var.oid_index, var.value) for var in sess.walk('system')]
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_023_iter_bulkwalk(sess):
+    if sess.version == 1:
+        with pytest.raises(exceptions.TDSNMPException):
+            sess.iter_bulkwalk('system')
+    else:
+        batches = list(
+            sess.iter_bulkwalk('system', max_repetitions=3, batches=True)
+        )
+
+        assert len(batches) >= 3
+        assert all(0 < len(batch) <= 3 for batch in batches)
+
+        res = [var for batch in batches for var in batch]
+        assert res[0].oid == 'sysDescr'
+        assert res[0].oid_index == '0'
+        assert [(var.oid, var.oid_index) for var in res] == \
+            [(var.oid, var.oid_index) for var in sess.walk('system')]
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_024_walk_columnar(sess):
+    numpy = pytest.importorskip('numpy')
+
+    res = sess.walk('system', result_format='columnar')
+    expected = sess.walk('system')
+
+    assert list(res.oid) == [var.oid for var in expected]
+    assert list(res.oid_index) == [var.oid_index for var in expected]
+    assert res.snmp_type.dtype == numpy.uint8
+
+    # sysUpTime is a TimeTicks value held as an integer
+    row = list(res.oid).index('sysUpTime')
+    assert int(res.value[row]) > 0
+    assert res.value[0] == expected[0].value
+
+
+@pytest.mark.parametrize('sess', [sess_v2(), sess_v3()])
+def test_session_025_bulk_columnar(sess):
+    numpy = pytest.importorskip('numpy')
+
+    res = sess.bulkwalk('ifInOctets', result_format='columnar')
+    assert res.value.dtype == numpy.uint64
+    assert set(res.oid) == {'ifInOctets'}
+
+    res = sess.get_bulk(
+        'sysUpTime', 'sysORLastChange', non_repeaters=2,
+        result_format='columnar'
+    )
+    assert list(res.oid) == ['sysUpTime', 'sysORLastChange']
+    assert res.value.dtype == numpy.uint64
+
+    with pytest.raises(ValueError):
+        sess.walk('system', result_format='rows')
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_026_get_table(sess):
+    columns = ['ifIndex', 'ifDescr', 'ifInOctets']
+    res = sess.get_table(columns, max_repetitions=2)
+
+    assert res
+    for column in columns:
+        walked = sess.walk(column)
+        assert sorted(res) == sorted(var.oid_index for var in walked)
+        for var in walked:
+            assert res[var.oid_index][column].value == var.value or \
+                column == 'ifInOctets'
+
+    assert [index for index, _ in sess.iter_table(columns)] == list(res)
+
+
+@pytest.mark.parametrize('sess', [sess_v2(), sess_v3()])
+def test_session_027_bulkwalk_auto_repetitions(sess):
+    expected = [(var.oid, var.oid_index) for var in sess.walk('system')]
+
+    res = sess.bulkwalk('system', max_repetitions='auto')
+    assert [(var.oid, var.oid_index) for var in res] == expected
+
+    res = sess.get_bulk('sysDescr', max_repetitions='auto')
+    assert res[0].oid == 'sysDescr'
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_028_numeric(sess):
+    res = sess.get_numeric((1, 3, 6, 1, 2, 1, 1, 4, 0), '.1.3.6.1.2.1.1.1.0')
+    assert res[0].oid == (1, 3, 6, 1, 2, 1, 1, 4, 0)
+    assert res[0].snmp_type == 'OCTETSTR'
+    assert res[0].value == sess.get('sysContact.0').value
+    assert res[1].oid == (1, 3, 6, 1, 2, 1, 1, 1, 0)
+
+    res = sess.get_next_numeric((1, 3, 6, 1, 2, 1, 1, 4))
+    assert res[0].oid == (1, 3, 6, 1, 2, 1, 1, 4, 0)
+
+    def values(varbinds):
+        # sysUpTime moves on between the walks
+        return [(var.snmp_type, var.value) for var in varbinds
+                if var.snmp_type != 'TICKS']
+
+    expected = values(sess.walk('system'))
+    res = sess.walk_numeric('.1.3.6.1.2.1.1')
+    assert values(res) == expected
+    assert all(var.oid[:7] == (1, 3, 6, 1, 2, 1, 1) for var in res)
+
+    if sess.version != 1:
+        res = sess.bulkwalk_numeric((1, 3, 6, 1, 2, 1, 1), max_repetitions=3)
+        assert values(res) == expected
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_029_oid_cache(sess):
+    oid_cache.clear_cache()
+    sess.get('sysDescr.0')
+    sess.get(('sysDescr', '0'))
+    sess.walk('.1.3.6.1.2.1.1')
+
+    info = oid_cache.cache_info()['translate']
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_030_restricted_mibs(sess):
+    try:
+        mibs.configure([])
+        # Earlier tests may or may not have loaded the MIBs already
+        mibs.load()
+        assert mibs.loaded()
+        res = sess.get_numeric('.1.3.6.1.2.1.1.1.0')
+        assert res[0].oid == (1, 3, 6, 1, 2, 1, 1, 1, 0)
+        with pytest.raises(exceptions.TDSNMPUnknownObjectIDError):
+            sess.get('sysDescr.0')
+
+        mibs.configure(['SNMPv2-MIB'])
+        assert sess.get('sysDescr.0').value == res[0].value
+    finally:
+        mibs.configure(None)
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_031_mib_index(sess, tmpdir):
+    path = str(tmpdir.join('mibs.idx'))
+    index = mib_index.load(path)
+    assert mib_index.load(path).key == index.key
+
+    def names(varbinds):
+        return [(var.oid, var.oid_index, var.snmp_type) for var in varbinds]
+
+    expected = sess.walk('system')
+    sess.mib_index = index
+    try:
+        assert names(sess.walk('system')) == names(expected)
+        res = sess.get('sysContact.0')
+        assert (res.oid, res.oid_index) == ('sysContact', '0')
+        assert sess.get_next('sysContact.0').oid == 'sysName'
+    finally:
+        sess.mib_index = None
+
+
+@pytest.mark.parametrize('sess', [sess_v2()])
+def test_session_032_c_logging_level(sess, caplog):
+    logger = logging.getLogger('tdsnmp.c.interface')
+    try:
+        logger.disabled = False
+        with caplog.at_level(logging.DEBUG, logger='tdsnmp.c.interface'):
+            sess.walk('system')
+        assert any(record.name == 'tdsnmp.c.interface' for record in caplog.records)
+
+        # The extension notices that the level changed
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, logger='tdsnmp.c.interface'):
+            sess.walk('system')
+        assert not caplog.records
+    finally:
+        logger.disabled = True
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_033_typed_values(sess):
+    oids = ['sysDescr.0', 'sysObjectID.0', 'sysServices.0']
+    formatted = sess.get(oids)
+    sess.typed_values = True
+    try:
+        descr, object_id, services = sess.get(oids)
+        assert descr.value == formatted[0].value.encode('latin-1')
+        assert object_id.value == oid_str_to_tuple(formatted[1].value)
+        assert services.value == int(formatted[2].value)
+        assert services.oid == 'sysServices'
+
+        numeric = sess.get_numeric('.1.3.6.1.2.1.1.7.0')
+        assert numeric[0].value == services.value
+    finally:
+        sess.typed_values = False
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_034_multi_root_walk(sess):
+    roots = ['sysDescr', 'system', 'sysContact']
+
+    def names(varbinds):
+        return [(var.oid, var.oid_index) for var in varbinds]
+
+    expected = [name for root in roots for name in names(sess.walk(root))]
+    assert len(expected) >= 9
+    assert names(sess.walk(roots)) == expected
+
+    if sess.version != 1:
+        assert names(sess.bulkwalk(roots, max_repetitions=2)) == expected
+        assert names(sess.bulkwalk(roots, non_repeaters=1, max_repetitions=2)) == expected
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2()])
+def test_session_035_record_replay(sess):
+    def values(varbinds):
+        return [(var.oid, var.oid_index, var.snmp_type, var.value) for var in varbinds]
+
+    recording = Recording()
+    sess.record = recording
+    try:
+        expected = sess.walk('system')
+        expected_get = sess.get('sysDescr.0')
+    finally:
+        sess.record = None
+    assert len(recording) == len(expected) + 2
+
+    # Nothing listens on this port
+    replayed = Session(hostname='localhost', remote_port=1, version=sess.version,
+                       timeout=0.1, retries=0, replay=recording)
+    assert values(replayed.walk('system')) == values(expected)
+    assert values([replayed.get('sysDescr.0')]) == values([expected_get])
+    with pytest.raises(exceptions.TDSNMPTimeoutError):
+        replayed.get('sysContact.0')
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2()])
+def test_session_036_stats(sess):
+    sess.reset_stats()
+    sess.get(['sysDescr.0', 'sysContact.0'])
+    counters = sess.stats
+    assert counters.requests == counters.responses == 1
+    assert counters.varbinds == 2
+    assert counters.timeouts == counters.retries == 0
+    assert 0 < counters.bytes_out < counters.bytes_in
+
+    timing = sess.last_timing
+    assert timing.total > 0
+    assert 0 < timing.wait <= timing.total
+    assert timing.wait + timing.format + timing.objects <= timing.total
+
+    # Nothing listens on this port
+    unreachable = Session(hostname='localhost', remote_port=1, version=sess.version,
+                          timeout=0.1, retries=1)
+    with pytest.raises(exceptions.TDSNMPTimeoutError):
+        unreachable.get('sysDescr.0')
+    counters = unreachable.stats
+    assert (counters.requests, counters.responses) == (1, 0)
+    assert (counters.timeouts, counters.retries) == (1, 1)
+
+    registered = [session for session, _ in stats.collect()]
+    assert unreachable._routed_session in registered
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2()])
+def test_session_037_rates(sess):
+    pytest.importorskip('numpy')
+    from tdsnmp.rates import RatePoller
+
+    poller = RatePoller(['ifInOctets', 'ifOutOctets'])
+    first = poller.poll(sess)
+    assert len(first.rate) > 0
+    assert first.interval is None
+
+    time.sleep(1.1)
+    second = poller.poll(sess)
+    assert list(second.oid_index) == list(first.oid_index)
+    assert second.interval >= 1
+    assert all(rate >= 0 for rate in second.rate)
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_038_result_cache(sess):
+    sess.result_cache = ResultCache(ttl=60)
+    try:
+        expected = sess.get(['sysDescr.0', 'sysName.0'])
+        sess.reset_stats()
+        res = sess.get(['sysName.0', 'sysContact.0', 'sysDescr.0'])
+        assert sess.stats.requests == 1
+        assert sess.stats.varbinds == 1
+        assert [var.value for var in (res[2], res[0])] == [var.value for var in expected]
+        assert res[1].oid == 'sysContact'
+
+        assert sess.set('sysContact.0', 'cached@example.com')
+        assert sess.get('sysContact.0').value == 'cached@example.com'
+        assert sess.result_cache.cache_info().hits == 2
+    finally:
+        sess.result_cache = None
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+@pytest.mark.parametrize('pipeline_depth', [1, 4])
+def test_session_039_split_requests(sess, pipeline_depth):
+    oids = ['sysDescr.0', 'sysObjectID.0', 'sysUpTime.0', 'sysContact.0',
+            'sysName.0', 'sysLocation.0', 'sysServices.0', 'sysORLastChange.0']
+    expected = [(var.oid, var.oid_index) for var in sess.get(oids)]
+
+    pdu_limits.forget(sess.connect_hostname)
+    pdu_limits.for_agent(sess.connect_hostname).value = 3
+    sess.pipeline_depth = pipeline_depth
+    try:
+        sess.reset_stats()
+        res = sess.get(oids)
+        assert [(var.oid, var.oid_index) for var in res] == expected
+        assert sess.stats.requests == sess.stats.responses == 3
+        assert sess.stats.varbinds == len(oids)
+        assert sess.last_timing.total > 0
+
+        res = sess.get_next(oids)
+        assert len(res) == len(oids)
+        assert [var.oid for var in res[:2]] == ['sysObjectID', 'sysUpTimeInstance']
+
+        # A SET is only split once the agent answers tooBig
+        pdu_limits.for_agent(sess.connect_hostname).value = 1
+        sess.reset_stats()
+        assert sess.set_multiple([
+            ('sysContact.0', 'split@example.com'),
+            ('sysLocation.0', 'far'),
+        ])
+        assert sess.stats.requests == 1
+        res = sess.get(['sysContact.0', 'sysLocation.0'])
+        assert [var.value for var in res] == ['split@example.com', 'far']
+    finally:
+        pdu_limits.forget(sess.connect_hostname)
+        sess.pipeline_depth = 4
+
+
+@pytest.mark.parametrize('sess', [sess_v1(), sess_v2(), sess_v3()])
+def test_session_040_raw_octet_strings(sess):
+    oids = ['sysDescr.0', 'sysServices.0']
+    formatted = sess.get(oids)
+    sess.raw_octet_strings = True
+    try:
+        descr, services = sess.get(oids)
+        assert descr.value == formatted[0].value.encode('latin-1')
+        assert descr.snmp_type == 'OCTETSTR'
+        assert services.value == formatted[1].value
+
+        numeric = sess.get_numeric('.1.3.6.1.2.1.1.1.0', '.1.3.6.1.2.1.1.7.0')
+        assert [var.value for var in numeric] == [descr.value, services.value]
+        assert repr(descr) == repr(formatted[0])
+    finally:
+        sess.raw_octet_strings = False
+
+
+@pytest.mark.parametrize('pipeline_depth', [1, 4])
+def test_session_041_split_retry_no_such(pipeline_depth):
+    sess = sess_v1()
+    sess.retry_no_such = True
+    sess.pipeline_depth = pipeline_depth
+    pdu_limits.forget(sess.connect_hostname)
+    pdu_limits.for_agent(sess.connect_hostname).value = 2
+    try:
+        res = sess.get(['sysDescr.0', 'sysContact.0', 'sysDescr.100', 'sysName.0'])
+        assert [var.snmp_type for var in res][2] == 'NOSUCHNAME'
+        assert res[3].oid == 'sysName'
+    finally:
+        pdu_limits.forget(sess.connect_hostname)
+
+
+@pytest.mark.parametrize('sess', [sess_v2()])
+def test_session_042_c_logging_configuration(sess, caplog):
+    logger = logging.getLogger('tdsnmp.c.interface')
+    parent = logging.getLogger('tdsnmp')
+    level = parent.level
+    try:
+        logger.disabled = False
+        with caplog.at_level(logging.DEBUG, logger='tdsnmp'):
+            sess.walk('system')
+            assert caplog.records
+
+            # The level of a parent logger applies from the next operation
+            caplog.clear()
+            parent.setLevel(logging.WARNING)
+            sess.walk('system')
+            assert not caplog.records
+
+            parent.setLevel(logging.DEBUG)
+            logging.disable(logging.CRITICAL)
+            try:
+                sess.walk('system')
+                assert not caplog.records
+            finally:
+                logging.disable(logging.NOTSET)
+            sess.walk('system')
+            assert caplog.records
+    finally:
+        parent.setLevel(level)
+        logger.disabled = True
+
+
+def test_session_043_get_table_end_of_mib_view():
+    # SNMPv1 agents answer noSuchName for a column past the end of the view
+    sess = sess_v1()
+    columns = ['ifIndex', '.1.9.9.9']
+    res = sess.get_table(columns)
+
+    assert sorted(res) == sorted(var.oid_index for var in sess.walk('ifIndex'))
+    assert all(list(row) == ['ifIndex'] for row in res.values())
+    assert sess.get_table(['.1.9.9.9']) == {}
+
+
 if __name__ == '__main__':
     import sys
     sys.exit(pytest.main())
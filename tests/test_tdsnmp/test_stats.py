@@ -0,0 +1,40 @@
+"""
+test_stats
+----------------------------------
+
+Tests for the registry of session statistics.
+"""
+import gc
+
+from tdsnmp import stats
+
+
+class FakeSession:
+    def __init__(self, *counters):
+        self.stats = stats.SessionStats(*counters)
+
+
+def test_stats_collect_totals():
+    first = FakeSession(2, 2, 0, 0, 10, 100, 1000)
+    second = FakeSession(3, 2, 3, 1, 5, 50, 500)
+    stats.register(first)
+    stats.register(second)
+
+    collected = dict((id(session), counters) for session, counters in stats.collect())
+    assert collected[id(first)] == first.stats
+    assert collected[id(second)] == second.stats
+
+    totals = stats.totals()
+    assert totals.requests >= 5
+    assert totals.bytes_in >= 1500
+
+
+def test_stats_registry_is_weak():
+    session = FakeSession(1, 1, 0, 0, 1, 10, 10)
+    stats.register(session)
+    assert session in stats.sessions()
+    registered = len(stats.sessions())
+
+    del session
+    gc.collect()
+    assert len(stats.sessions()) == registered - 1
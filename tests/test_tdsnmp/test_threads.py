@@ -0,0 +1,88 @@
+"""
+test_threads
+----------------------------------
+
+Stress tests running separate sessions from parallel threads.
+"""
+import importlib.util
+import threading
+import pytest
+
+from tdsnmp.session.base import Session
+
+from .fixtures import sess_v2_args  # noqa: F401
+
+requires_interface = pytest.mark.skipif(
+    importlib.util.find_spec('tdsnmp.c.interface') is None,
+    reason='the C interface is not built'
+)
+
+THREADS = 16
+ITERATIONS = 50
+
+
+def run_threads(target, *args):
+    errors = []
+
+    def runner(*args):
+        try:
+            target(*args)
+        except Exception as error:  # pragma: no cover
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=runner, args=(index,) + args)
+        for index in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+
+
+@requires_interface
+def test_threads_mixed_oid_formats(sess_v2_args):
+    expected = {
+        (False, False): 'sysContact',
+        (True, False): '.iso.org.dod.internet.mgmt.mib-2.system.sysContact',
+        (False, True): '.1.3.6.1.2.1.1.4',
+    }
+
+    def worker(index):
+        use_long_names, use_numeric = list(expected)[index % len(expected)]
+        sess = Session(
+            use_long_names=use_long_names, use_numeric=use_numeric,
+            **sess_v2_args
+        )
+        oid = expected[(use_long_names, use_numeric)]
+        for _ in range(ITERATIONS):
+            res = sess.get('sysContact.0')
+            assert res.oid == oid
+            assert res.oid_index == '0'
+
+            res = sess.walk('system')
+            assert all(
+                var.oid.startswith('.') == (use_long_names or use_numeric)
+                for var in res
+            )
+
+    run_threads(worker)
+
+
+@requires_interface
+def test_threads_bulkwalk(sess_v2_args):
+    reference = [
+        (var.oid, var.oid_index, var.value)
+        for var in Session(**sess_v2_args).bulkwalk('ifTable')
+    ]
+
+    def worker(index):
+        sess = Session(**sess_v2_args)
+        for _ in range(ITERATIONS // 5):
+            res = sess.bulkwalk('ifTable')
+            assert [(var.oid, var.oid_index) for var in res] == \
+                [(oid, oid_index) for oid, oid_index, _ in reference]
+
+    run_threads(worker)
@@ -1,4 +1,10 @@
-from tdsnmp.utils.snmp_strings import strip_non_printable, tostr
+import pytest
+
+from tdsnmp.utils import oid_cache
+from tdsnmp.utils.snmp_strings import (
+    DEFAULT_OID_CACHE_SIZE, is_printable, normalize_oid, oid_str_to_tuple,
+    strip_non_printable, tostr
+)
 from tdsnmp.utils.compat import iso_8859_1
 
 def test_utils_000_strip_non_printable_regular():
@@ -26,4 +32,52 @@ def test_utils_004_tostr_string():
 
 
 def test_utils_005_tostr_integer():
-    assert tostr(1234) == '1234'
\ No newline at end of file
+    assert tostr(1234) == '1234'
+
+
+def test_utils_006_oid_str_to_tuple():
+    assert oid_str_to_tuple('.1.3.6.1.2.1') == (1, 3, 6, 1, 2, 1)
+    assert oid_str_to_tuple('1.3.6.1') == (1, 3, 6, 1)
+    assert oid_str_to_tuple([1, 3, 6]) == (1, 3, 6)
+    with pytest.raises(ValueError):
+        oid_str_to_tuple('sysDescr.0')
+
+
+def test_utils_007_oid_cache():
+    oid_cache.clear_cache()
+    assert normalize_oid('sysDescr.0') == ('sysDescr', '0')
+    assert normalize_oid('sysDescr.0') == ('sysDescr', '0')
+    assert normalize_oid('.1.3.6.1.2.1.1.1.0') == ('.1.3.6.1.2.1.1.1.0', '')
+
+    info = oid_cache.cache_info()['split']
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    oid_cache.set_cache_size(1)
+    normalize_oid('sysDescr.0')
+    normalize_oid('sysContact.0')
+    info = oid_cache.cache_info()['split']
+    assert (info.maxsize, info.currsize) == (1, 1)
+
+    oid_cache.set_cache_size(DEFAULT_OID_CACHE_SIZE)
+
+
+def test_utils_008_strip_non_printable_typed():
+    assert strip_non_printable(b'my thingo\x9b') == 'my thingo (contains binary)'
+    assert strip_non_printable(1234) == 1234
+    assert strip_non_printable((1, 3, 6)) == (1, 3, 6)
+
+
+def test_utils_009_is_printable():
+    assert is_printable('hello there\n')
+    assert not is_printable('caf\xe9')
+    assert is_printable(b'hello there\t')
+    assert not is_printable(b'\x00\x1b\x21\xaa\x00\x01')
+
+    value = 'x' * 100000 + '\x9b'
+    assert not is_printable(value)
+    assert is_printable(value[:-1])
+    assert strip_non_printable(value) == 'x' * 100000 + ' (contains binary)'
+    assert strip_non_printable(b'x' * 100000) == 'x' * 100000
+
+    assert strip_non_printable(b'\x00\x1b!\xaa') == '! (contains binary)'
+    assert strip_non_printable(b'eth0') == 'eth0'
@@ -1,3 +1,7 @@
+import pickle
+
+import pytest
+
 from tdsnmp.utils.compat import iso_8859_1
 from tdsnmp.utils.variables import SNMPVariable, SNMPVariableList
 
@@ -91,4 +95,26 @@ def test_variables_009_snmp_variable_numeric():
 
 def test_variables_010_snmp_variable_list():
     varlist = SNMPVariableList(['sysContact.0', 'sysLocation.0', 'sysDescr.0'])
-    assert varlist.varbinds == ['sysContact.0', 'sysLocation.0', 'sysDescr.0']
\ No newline at end of file
+    assert varlist.varbinds == ['sysContact.0', 'sysLocation.0', 'sysDescr.0']
+
+
+def test_variables_011_snmp_variable_slots():
+    var = SNMPVariable('sysDescr.0')
+    assert not hasattr(var, '__dict__')
+    with pytest.raises(AttributeError):
+        var.root_oid = 'sysDescr'
+
+
+def test_variables_012_snmp_variable_setattr_tostr():
+    var = SNMPVariable('sysUpTime.0')
+    var.value = 12345
+    var.snmp_type = 'TICKS'
+    assert var.value == '12345'
+    assert var.snmp_type == 'TICKS'
+
+
+def test_variables_013_snmp_variable_pickle():
+    var = SNMPVariable('sysDescr', '0', 'my thingo', 'OCTETSTR')
+    copy = pickle.loads(pickle.dumps(var))
+    assert (copy.oid, copy.oid_index, copy.value, copy.snmp_type) == \
+        ('sysDescr', '0', 'my thingo', 'OCTETSTR')